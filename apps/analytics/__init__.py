@@ -0,0 +1 @@
+# __init__.py para el módulo de analíticas
@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import SellerRollup
+
+
+@admin.register(SellerRollup)
+class SellerRollupAdmin(admin.ModelAdmin):
+    """Agregados calculados por rollup_analytics: solo lectura"""
+    list_display = ('seller', 'period', 'start', 'kind', 'count', 'amount')
+    list_filter = ('period', 'kind')
+    search_fields = ('seller__email', 'seller__username')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from apps.analytics import rollups
+
+
+class Command(BaseCommand):
+    help = 'Agrega los eventos nuevos por hora, día y mes y aplica la retención (ejecutar periódicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag', type=int, default=30,
+            help='Segundos de antigüedad mínima (desde su inserción) de los eventos a agregar'
+        )
+        parser.add_argument(
+            '--no-compact', action='store_true',
+            help='Solo agregar, sin borrar eventos ni agregados vencidos'
+        )
+
+    def handle(self, *args, **options):
+        total = rollups.rollup(lag=timedelta(seconds=options['lag']))
+        self.stdout.write(self.style.SUCCESS(f'Eventos agregados: {total}'))
+        if not options['no_compact']:
+            removed = rollups.compact()
+            self.stdout.write(
+                f'Borrados: {removed.events} eventos, {removed.hourly} agregados por hora, '
+                f'{removed.daily} por día, {removed.sketches} sketches de únicos'
+            )
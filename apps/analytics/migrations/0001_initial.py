@@ -0,0 +1,83 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('audios', '0011_trending'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estado de los agregados',
+                'verbose_name_plural': 'Estado de los agregados',
+            },
+        ),
+        migrations.CreateModel(
+            name='SellerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hora'), ('day', 'Día'), ('month', 'Mes')], max_length=5, verbose_name='Período')),
+                ('start', models.DateTimeField(verbose_name='Inicio')),
+                ('kind', models.CharField(choices=[('view', 'Visualización'), ('play', 'Reproducción'), ('favorite', 'Favorito'), ('download', 'Descarga'), ('purchase', 'Compra')], max_length=10, verbose_name='Tipo')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Cantidad')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Importe')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analytics_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Agregado por vendedor',
+                'verbose_name_plural': 'Agregados por vendedor',
+                'unique_together': {('seller', 'period', 'start', 'kind')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('view', 'Visualización'), ('play', 'Reproducción'), ('favorite', 'Favorito'), ('download', 'Descarga'), ('purchase', 'Compra')], max_length=10, verbose_name='Tipo')),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Importe')),
+                ('created_at', models.DateTimeField(verbose_name='Fecha del evento')),
+                ('recorded_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de registro')),
+                ('audio', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='audios.audio')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Evento',
+                'verbose_name_plural': 'Eventos',
+                'indexes': [models.Index(fields=['created_at'], name='analytics_event_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AudioRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hora'), ('day', 'Día'), ('month', 'Mes')], max_length=5, verbose_name='Período')),
+                ('start', models.DateTimeField(verbose_name='Inicio')),
+                ('kind', models.CharField(choices=[('view', 'Visualización'), ('play', 'Reproducción'), ('favorite', 'Favorito'), ('download', 'Descarga'), ('purchase', 'Compra')], max_length=10, verbose_name='Tipo')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Cantidad')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Importe')),
+                ('audio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='audios.audio')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Agregado por audio',
+                'verbose_name_plural': 'Agregados por audio',
+                'indexes': [models.Index(fields=['seller', 'period', 'start'], name='analytics_audio_seller_idx')],
+                'unique_together': {('audio', 'period', 'start', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def backfill_events(apps, schema_editor):
+    """Compras y descargas anteriores a las analíticas (las visualizaciones no tienen historial)"""
+    Event = apps.get_model('analytics', 'Event')
+    AudioPurchase = apps.get_model('audios', 'AudioPurchase')
+    DownloadEvent = apps.get_model('audios', 'DownloadEvent')
+    purchases = AudioPurchase.objects.values_list('audio_id', 'user_id', 'price', 'purchased_at')
+    Event.objects.bulk_create(
+        (Event(kind='purchase', audio_id=audio_id, user_id=user_id, amount=price, created_at=purchased_at)
+         for audio_id, user_id, price, purchased_at in purchases.iterator()),
+        batch_size=500,
+    )
+    downloads = DownloadEvent.objects.values_list('audio_id', 'user_id', 'created_at')
+    Event.objects.bulk_create(
+        (Event(kind='download', audio_id=audio_id, user_id=user_id, created_at=created_at)
+         for audio_id, user_id, created_at in downloads.iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('audios', '0004_downloads'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('audios', '0011_trending'),
+        ('analytics', '0002_backfill_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='visitor',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Visitante'),
+        ),
+        migrations.CreateModel(
+            name='SellerSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('kind', models.CharField(choices=[('view', 'Visualización'), ('play', 'Reproducción'), ('favorite', 'Favorito'), ('download', 'Descarga'), ('purchase', 'Compra')], max_length=10, verbose_name='Tipo')),
+                ('registers', models.BinaryField(verbose_name='Registros')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analytics_sketches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Únicos por vendedor',
+                'verbose_name_plural': 'Únicos por vendedor',
+                'unique_together': {('seller', 'day', 'kind')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AudioSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('kind', models.CharField(choices=[('view', 'Visualización'), ('play', 'Reproducción'), ('favorite', 'Favorito'), ('download', 'Descarga'), ('purchase', 'Compra')], max_length=10, verbose_name='Tipo')),
+                ('registers', models.BinaryField(verbose_name='Registros')),
+                ('audio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sketches', to='audios.audio')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Únicos por audio',
+                'verbose_name_plural': 'Únicos por audio',
+                'unique_together': {('audio', 'day', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from apps.audios.models import Audio
+
+User = get_user_model()
+
+
+class EventKind(models.TextChoices):
+    VIEW = 'view', 'Visualización'
+    PLAY = 'play', 'Reproducción'
+    FAVORITE = 'favorite', 'Favorito'
+    DOWNLOAD = 'download', 'Descarga'
+    PURCHASE = 'purchase', 'Compra'
+
+
+class Event(models.Model):
+    """
+    Registro append-only de eventos (ver ``apps.analytics.tracking``).
+
+    Sin claves foráneas en la base: los eventos llegan en lotes y el audio
+    puede haberse borrado entretanto; las agregaciones los descartan.
+    """
+    kind = models.CharField(max_length=10, choices=EventKind.choices, verbose_name='Tipo')
+    audio = models.ForeignKey(Audio, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+                             related_name='+')
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name='Importe')
+    # Hash de 64 bits del visitante (usuario, sesión o IP + User-Agent) para contar únicos
+    visitor = models.BigIntegerField(null=True, blank=True, verbose_name='Visitante')
+    created_at = models.DateTimeField(verbose_name='Fecha del evento')
+    # Hora de la inserción: el agregado espera a que los lotes en curso se confirmen
+    recorded_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de registro')
+    
+    class Meta:
+        verbose_name = 'Evento'
+        verbose_name_plural = 'Eventos'
+        indexes = [
+            models.Index(fields=['created_at'], name='analytics_event_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.audio_id} - {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class Period(models.TextChoices):
+    HOUR = 'hour', 'Hora'
+    DAY = 'day', 'Día'
+    MONTH = 'month', 'Mes'
+
+
+class Rollup(models.Model):
+    """Eventos de un tipo agregados por período (hora, día o mes en la zona horaria del sitio)"""
+    period = models.CharField(max_length=5, choices=Period.choices, verbose_name='Período')
+    start = models.DateTimeField(verbose_name='Inicio')
+    kind = models.CharField(max_length=10, choices=EventKind.choices, verbose_name='Tipo')
+    count = models.PositiveIntegerField(default=0, verbose_name='Cantidad')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Importe')
+    
+    class Meta:
+        abstract = True
+
+
+class AudioRollup(Rollup):
+    audio = models.ForeignKey(Audio, on_delete=models.CASCADE, related_name='rollups')
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    
+    class Meta:
+        verbose_name = 'Agregado por audio'
+        verbose_name_plural = 'Agregados por audio'
+        unique_together = ('audio', 'period', 'start', 'kind')
+        indexes = [
+            models.Index(fields=['seller', 'period', 'start'], name='analytics_audio_seller_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.audio_id} {self.period} {self.start:%Y-%m-%d %H:%M} {self.kind}: {self.count}"
+
+
+class SellerRollup(Rollup):
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='analytics_rollups')
+    
+    class Meta:
+        verbose_name = 'Agregado por vendedor'
+        verbose_name_plural = 'Agregados por vendedor'
+        unique_together = ('seller', 'period', 'start', 'kind')
+    
+    def __str__(self):
+        return f"{self.seller_id} {self.period} {self.start:%Y-%m-%d %H:%M} {self.kind}: {self.count}"
+
+
+class Sketch(models.Model):
+    """HyperLogLog comprimido de los visitantes de un día (ver ``apps.analytics.sketches``)"""
+    day = models.DateField(verbose_name='Día')
+    kind = models.CharField(max_length=10, choices=EventKind.choices, verbose_name='Tipo')
+    registers = models.BinaryField(verbose_name='Registros')
+    
+    class Meta:
+        abstract = True
+
+
+class AudioSketch(Sketch):
+    audio = models.ForeignKey(Audio, on_delete=models.CASCADE, related_name='sketches')
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    
+    class Meta:
+        verbose_name = 'Únicos por audio'
+        verbose_name_plural = 'Únicos por audio'
+        unique_together = ('audio', 'day', 'kind')
+    
+    def __str__(self):
+        return f"{self.audio_id} {self.day} {self.kind}"
+
+
+class SellerSketch(Sketch):
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='analytics_sketches')
+    
+    class Meta:
+        verbose_name = 'Únicos por vendedor'
+        verbose_name_plural = 'Únicos por vendedor'
+        unique_together = ('seller', 'day', 'kind')
+    
+    def __str__(self):
+        return f"{self.seller_id} {self.day} {self.kind}"
+
+
+class RollupState(models.Model):
+    """Último Event ya agregado (fila única)"""
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Estado de los agregados'
+        verbose_name_plural = 'Estado de los agregados'
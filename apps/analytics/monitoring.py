@@ -0,0 +1,13 @@
+"""Métricas de analíticas (ver ``core.metrics``)"""
+from django.utils import timezone
+
+from core import metrics
+
+from .models import Event, RollupState
+
+
+@metrics.gauge('analytics_rollup_lag_seconds', 'Antigüedad del evento más viejo sin agregar')
+def rollup_lag():
+    last_id = RollupState.objects.filter(pk=1).values_list('last_event_id', flat=True).first() or 0
+    oldest = Event.objects.filter(pk__gt=last_id).order_by('pk').values_list('recorded_at', flat=True).first()
+    return (timezone.now() - oldest).total_seconds() if oldest else 0
@@ -0,0 +1,141 @@
+"""
+Consultas de los paneles de analíticas.
+
+Todo se lee de los agregados (``rollups``), nunca de los eventos crudos:
+una serie de N días son N filas por tipo de evento, sin importar cuántos
+eventos hubo. Los agregados se actualizan cuando corre
+``rollup_analytics``, así que los números van unos minutos atrasados.
+Los únicos salen de combinar los sketches diarios (``sketches``): son
+estimaciones con ~2 % de error.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import sketches
+from .models import AudioRollup, EventKind, Period, SellerRollup
+from .rollups import period_starts
+
+FIELDS = {
+    EventKind.VIEW: 'views',
+    EventKind.PLAY: 'plays',
+    EventKind.FAVORITE: 'favorites',
+    EventKind.DOWNLOAD: 'downloads',
+    EventKind.PURCHASE: 'purchases',
+}
+
+Day = namedtuple('Day', ['date', 'views', 'plays', 'favorites', 'downloads', 'purchases', 'revenue'])
+Sales = namedtuple('Sales', ['total', 'this_month'])
+Chart = namedtuple('Chart', ['label', 'total', 'bars'])
+Bar = namedtuple('Bar', ['date', 'value', 'percent'])
+Uniques = namedtuple('Uniques', ['visitors', 'listeners'])
+
+
+def _first_day(days, now):
+    return period_starts(now or timezone.now())[Period.DAY] - timedelta(days=days - 1)
+
+
+def _daily(rows, days, now):
+    """Serie de ``days`` días (los que no tienen agregados quedan en cero)"""
+    first = _first_day(days, now)
+    values = {}
+    for start, kind, count, amount in rows:
+        day = values.setdefault(timezone.localtime(start).date(), dict.fromkeys(Day._fields, 0))
+        day[FIELDS[kind]] = count
+        if kind == EventKind.PURCHASE:
+            day['revenue'] = amount
+    series = []
+    for offset in range(days):
+        date = (first + timedelta(days=offset)).date()
+        day = values.get(date, dict.fromkeys(Day._fields, 0))
+        day['date'] = date
+        series.append(Day(**day))
+    return series
+
+
+def seller_daily(seller, days=30, now=None):
+    rows = SellerRollup.objects.filter(
+        seller=seller, period=Period.DAY, start__gte=_first_day(days, now)
+    ).values_list('start', 'kind', 'count', 'amount')
+    return _daily(rows, days, now)
+
+
+def audio_daily(audio, days=30, now=None):
+    rows = AudioRollup.objects.filter(
+        audio=audio, period=Period.DAY, start__gte=_first_day(days, now)
+    ).values_list('start', 'kind', 'count', 'amount')
+    return _daily(rows, days, now)
+
+
+def seller_sales(seller, now=None):
+    """Ventas totales y del mes en curso, desde los agregados mensuales"""
+    month = period_starts(now or timezone.now())[Period.MONTH]
+    total = this_month = Decimal(0)
+    rows = SellerRollup.objects.filter(seller=seller, period=Period.MONTH, kind=EventKind.PURCHASE)
+    for start, amount in rows.values_list('start', 'amount'):
+        total += amount
+        if start == month:
+            this_month = amount
+    return Sales(total=total, this_month=this_month)
+
+
+def _as_uniques(counts):
+    return Uniques(visitors=counts.get(EventKind.VIEW, 0), listeners=counts.get(EventKind.PLAY, 0))
+
+
+def seller_uniques(seller, days=30, now=None):
+    """Visitantes y oyentes únicos del vendedor en los últimos ``days`` días"""
+    return _as_uniques(sketches.seller_uniques(seller, days=days, now=now))
+
+
+def seller_uniques_this_month(seller, now=None):
+    month = period_starts(now or timezone.now())[Period.MONTH]
+    return _as_uniques(sketches.seller_uniques(seller, since=month.date()))
+
+
+def audio_uniques(audio, days=30, now=None):
+    return _as_uniques(sketches.audio_uniques([audio.pk], days=days, now=now).get(audio.pk, {}))
+
+
+def top_tracks(seller, days=30, limit=5, now=None):
+    """Audios del vendedor con más reproducciones en los últimos días (con sus oyentes únicos)"""
+    tracks = list(
+        AudioRollup.objects.filter(
+            seller=seller, period=Period.DAY, start__gte=_first_day(days, now),
+            kind__in=[EventKind.VIEW, EventKind.PLAY],
+        )
+        .values('audio_id', 'audio__title', 'audio__slug')
+        .annotate(
+            views=Coalesce(Sum('count', filter=Q(kind=EventKind.VIEW)), 0),
+            plays=Coalesce(Sum('count', filter=Q(kind=EventKind.PLAY)), 0),
+        )
+        .order_by('-plays', '-views')[:limit]
+    )
+    uniques = sketches.audio_uniques([track['audio_id'] for track in tracks], days=days, now=now)
+    for track in tracks:
+        track['listeners'] = uniques.get(track['audio_id'], {}).get(EventKind.PLAY, 0)
+    return tracks
+
+
+def chart(series, field, label):
+    """Barras de una columna de la serie, en porcentaje del máximo"""
+    values = [getattr(day, field) for day in series]
+    peak = max(values, default=0) or 1
+    return Chart(
+        label=label,
+        total=sum(values),
+        bars=[Bar(day.date, value, round(value * 100 / peak)) for day, value in zip(series, values)],
+    )
+
+
+def charts(series):
+    return [
+        chart(series, 'views', 'Visualizaciones'),
+        chart(series, 'plays', 'Reproducciones'),
+        chart(series, 'downloads', 'Descargas'),
+        chart(series, 'revenue', 'Ventas ($)'),
+    ]
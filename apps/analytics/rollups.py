@@ -0,0 +1,158 @@
+"""
+Agregados de los eventos por audio y por vendedor.
+
+``rollup()`` (comando ``rollup_analytics``, periódico) toma los ``Event``
+nuevos desde la última pasada, los cuenta por audio, tipo y hora en una
+consulta y suma cada grupo a los agregados de su hora, su día y su mes
+(``AudioRollup`` y ``SellerRollup``). Como en ``flush_download_counts``,
+avanza una marca de agua sobre el id y solo toma eventos insertados hace
+más de ``lag``, para no saltear ids de lotes que todavía no se
+confirmaron. La fila de ``RollupState`` bloqueada serializa las pasadas,
+así que los agregados se leen, se suman en Python y se escriben en lote.
+
+Las vistas y reproducciones con visitante se suman además a los sketches
+diarios de únicos (``sketches``) en la misma pasada.
+
+``compact()`` aplica la retención: borra los eventos crudos ya agregados
+con más de ``ANALYTICS_RAW_RETENTION_DAYS`` y los agregados por hora y por
+día más viejos que ``ANALYTICS_HOURLY_RETENTION_DAYS`` y
+``ANALYTICS_DAILY_RETENTION_DAYS`` (como los sketches diarios). Los
+mensuales se conservan.
+"""
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from . import sketches
+from .models import AudioRollup, AudioSketch, Event, Period, RollupState, SellerRollup, SellerSketch
+
+Compaction = namedtuple('Compaction', ['events', 'hourly', 'daily', 'sketches'])
+
+
+def _days(name, default):
+    return timedelta(days=getattr(settings, name, default))
+
+
+def period_starts(hour):
+    """Inicio de la hora, el día y el mes (hora local) que contienen a ``hour``"""
+    local = timezone.localtime(hour)
+    day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        Period.HOUR: local.replace(minute=0, second=0, microsecond=0),
+        Period.DAY: day,
+        Period.MONTH: day.replace(day=1),
+    }
+
+
+def _merge(model, owner, totals, sellers=None):
+    """
+    Suma ``totals`` {(dueño, período, inicio, tipo): [cantidad, importe]} a
+    los agregados. ``sellers`` ({audio: vendedor}) completa el vendedor de
+    los agregados por audio nuevos.
+    """
+    existing = {}
+    keys_by_period = defaultdict(set)
+    for owner_id, period, start, kind in totals:
+        keys_by_period[period].add(start)
+    owners = {key[0] for key in totals}
+    for period, starts in keys_by_period.items():
+        rows = model.objects.filter(**{f'{owner}_id__in': owners}, period=period, start__in=starts)
+        for row in rows:
+            existing[getattr(row, f'{owner}_id'), row.period, row.start, row.kind] = row
+
+    changed, created = [], []
+    for key, (count, amount) in totals.items():
+        row = existing.get(key)
+        if row is None:
+            owner_id, period, start, kind = key
+            row = model(**{f'{owner}_id': owner_id}, period=period, start=start, kind=kind,
+                        count=count, amount=amount)
+            if sellers is not None:
+                row.seller_id = sellers[owner_id]
+            created.append(row)
+        else:
+            row.count += count
+            row.amount += amount
+            changed.append(row)
+    model.objects.bulk_update(changed, ['count', 'amount'], batch_size=500)
+    model.objects.bulk_create(created, batch_size=500)
+
+
+def rollup(lag=timedelta(seconds=30)):
+    """Agrega los eventos nuevos desde la última pasada; retorna cuántos"""
+    with transaction.atomic():
+        state, _ = RollupState.objects.select_for_update().get_or_create(pk=1)
+        last_id = Event.objects.filter(
+            pk__gt=state.last_event_id, recorded_at__lte=timezone.now() - lag
+        ).aggregate(last=Max('id'))['last']
+        if last_id is None:
+            return 0
+
+        # El join con el audio descarta los eventos de audios borrados
+        groups = (
+            Event.objects.filter(pk__gt=state.last_event_id, pk__lte=last_id)
+            .order_by()
+            .values_list('audio_id', 'audio__seller_id', 'kind', TruncHour('created_at'))
+            .annotate(count=Count('id'), amount=Sum('amount'))
+        )
+        by_audio = defaultdict(lambda: [0, Decimal(0)])
+        by_seller = defaultdict(lambda: [0, Decimal(0)])
+        sellers = {}
+        total = 0
+        for audio_id, seller_id, kind, hour, count, amount in groups:
+            total += count
+            sellers[audio_id] = seller_id
+            for period, start in period_starts(hour).items():
+                for totals, owner_id in ((by_audio, audio_id), (by_seller, seller_id)):
+                    entry = totals[owner_id, period, start, kind]
+                    entry[0] += count
+                    entry[1] += amount or 0
+
+        _merge(AudioRollup, 'audio', by_audio, sellers)
+        _merge(SellerRollup, 'seller', by_seller)
+
+        visits = (
+            Event.objects.filter(
+                pk__gt=state.last_event_id, pk__lte=last_id,
+                kind__in=sketches.UNIQUE_KINDS, visitor__isnull=False,
+            )
+            .order_by()
+            .values_list('audio_id', 'audio__seller_id', 'kind', TruncDate('created_at'), 'visitor')
+            .distinct()
+        )
+        sketches.add_visits(visits.iterator(chunk_size=2000))
+
+        state.last_event_id = last_id
+        state.save(update_fields=['last_event_id', 'updated_at'])
+    return total
+
+
+def compact(now=None):
+    """Borra los eventos y agregados que salieron de su período de retención"""
+    now = now or timezone.now()
+    last_id = RollupState.objects.filter(pk=1).values_list('last_event_id', flat=True).first() or 0
+    events, _ = Event.objects.filter(
+        pk__lte=last_id, created_at__lt=now - _days('ANALYTICS_RAW_RETENTION_DAYS', 30)
+    ).delete()
+
+    removed = {}
+    for period, setting, default in ((Period.HOUR, 'ANALYTICS_HOURLY_RETENTION_DAYS', 14),
+                                     (Period.DAY, 'ANALYTICS_DAILY_RETENTION_DAYS', 400)):
+        cutoff = now - _days(setting, default)
+        removed[period] = sum(
+            model.objects.filter(period=period, start__lt=cutoff).delete()[0]
+            for model in (AudioRollup, SellerRollup)
+        )
+    day_cutoff = timezone.localdate(now - _days('ANALYTICS_DAILY_RETENTION_DAYS', 400))
+    removed_sketches = sum(
+        model.objects.filter(day__lt=day_cutoff).delete()[0] for model in (AudioSketch, SellerSketch)
+    )
+    return Compaction(
+        events=events, hourly=removed[Period.HOUR], daily=removed[Period.DAY], sketches=removed_sketches
+    )
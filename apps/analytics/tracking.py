@@ -0,0 +1,82 @@
+"""
+Registro de eventos de analíticas (vistas, reproducciones, favoritos,
+descargas y compras).
+
+Un INSERT por evento sumaría una escritura a cada vista. ``track()`` solo
+agrega el evento a un buffer del proceso; el buffer se escribe con un
+``bulk_create`` al llegar a ``ANALYTICS_BUFFER_SIZE`` eventos, cuando pasó
+``ANALYTICS_FLUSH_INTERVAL`` desde la última escritura (en el siguiente
+evento) y al terminar el proceso. Si el proceso muere de golpe se pierde
+lo que estaba en el buffer: es aceptable para estadísticas, no para
+contadores que se cobran (las compras también se guardan en
+``AudioPurchase``).
+
+Si ``track()`` se llama dentro de una transacción el evento entra al
+buffer recién cuando confirma (``on_commit``): un favorito o una compra
+revertidos no dejan evento, y el ``bulk_create`` de eventos de otros
+requests nunca corre dentro de la transacción de quien llama.
+
+Cada evento guarda su hora real; ``rollups`` los agrega de forma
+incremental, así que los que llegan tarde se suman a su período.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from core.buffers import ProcessBuffer
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+
+def _buffer_size():
+    return getattr(settings, 'ANALYTICS_BUFFER_SIZE', 200)
+
+
+def _flush_interval():
+    return getattr(settings, 'ANALYTICS_FLUSH_INTERVAL', 5.0)
+
+
+_events = ProcessBuffer(list, interval=_flush_interval, size=_buffer_size)
+
+
+def visitor_hash(key):
+    """Hash de 64 bits (con signo, para ``BigIntegerField``) de la identidad del visitante"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little', signed=True)
+
+
+def track(kind, audio_id, user_id=None, amount=None, visitor=None):
+    """Agrega un evento al buffer (sin consultas salvo cuando toca escribirlo)"""
+    event = Event(
+        kind=kind, audio_id=audio_id, user_id=user_id, amount=amount,
+        visitor=visitor_hash(visitor) if visitor else None, created_at=timezone.now(),
+    )
+    # Fuera de una transacción se ejecuta en el momento
+    transaction.on_commit(lambda: _append(event))
+
+
+def _append(event):
+    with _events as events:
+        events.append(event)
+    if _events.due():
+        flush()
+
+
+@_events.flusher
+def flush():
+    """Escribe los eventos del buffer en un lote; retorna cuántos"""
+    events = _events.take()
+    if not events:
+        return 0
+    try:
+        # En un savepoint: un error no arruina la transacción del request que hizo la escritura
+        with transaction.atomic():
+            Event.objects.bulk_create(events, batch_size=500)
+    except DatabaseError as e:
+        logger.warning('Se descartaron %s eventos de analíticas: %s', len(events), e)
+        return 0
+    return len(events)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'analytics'
+
+urlpatterns = [
+    path('audios/<slug:slug>/reproduccion/', views.play, name='play'),
+    path('audios/<slug:slug>/', views.audio_stats, name='audio_stats'),
+]
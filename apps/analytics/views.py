@@ -0,0 +1,37 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
+
+from apps.audios import view_counting
+from apps.audios.models import Audio
+
+from . import reports, tracking
+from .models import EventKind
+
+
+@require_POST
+def play(request, slug):
+    """Beacon del reproductor: una reproducción por carga de la página"""
+    audio = get_object_or_404(Audio.objects.only('id'), slug=slug, status=Audio.Status.PUBLISHED)
+    user_id = request.user.pk if request.user.is_authenticated else None
+    tracking.track(EventKind.PLAY, audio.id, user_id, visitor=view_counting.visitor_key(request))
+    return HttpResponse(status=204)
+
+
+@login_required
+def audio_stats(request, slug):
+    """Tendencia diaria de un audio (para su vendedor)"""
+    audio = get_object_or_404(Audio.objects.select_related('seller'), slug=slug)
+    if audio.seller_id != request.user.pk and not request.user.is_admin_user:
+        messages.warning(request, 'No tienes permisos para acceder a esta sección.')
+        return redirect('core:home')
+    
+    daily = reports.audio_daily(audio, days=30)
+    context = {
+        'audio': audio,
+        'charts': reports.charts(daily),
+        'uniques': reports.audio_uniques(audio, days=30),
+    }
+    return render(request, 'analytics/audio_stats.html', context)
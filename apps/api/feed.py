@@ -0,0 +1,131 @@
+"""
+Feed de sincronización del catálogo publicado, en NDJSON.
+
+Para socios y el clúster de búsqueda, que mantienen una copia del catálogo:
+
+1. ``snapshot()``: exportación completa. La primera línea es
+   ``{"watermark": N}`` y después viene un objeto por línea (categorías,
+   géneros, etiquetas y audios, en ese orden);
+2. ``changes(N)``: lo que cambió después de la marca de agua ``N``, un
+   objeto por línea con su ``seq``, y al final ``{"watermark": M, "more": ...}``
+   para el siguiente pedido.
+
+Cada línea de objeto es ``{"type", "id", "op": "upsert", "data"}`` o
+``{"type", "id", "op": "delete"}``, con los mismos campos que la API
+(``resources.py``) salvo los contadores, que cambian todo el tiempo y no
+se registran en ``changelog``. El feed resuelve el estado actual de cada
+objeto cambiado, así que aplicar un cambio es idempotente: la marca de
+agua del snapshot se toma antes de leer y lo que cambie durante la
+exportación vuelve a llegar con ``changes()``.
+
+La exportación no carga las tablas en memoria: cada recurso se lee con
+``values_list(...).iterator(chunk_size=CATALOG_FEED_CHUNK_SIZE)`` (cursor
+del lado del servidor en PostgreSQL, ``fetchmany`` en SQLite) y se emite
+por bloques. ``changes()`` lee el registro por bloques de ids y resuelve
+el estado de cada bloque con una consulta por tipo.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.audios import changelog
+
+from .resources import RESOURCES, plan, render
+
+Kind = changelog.Kind
+
+# Orden del snapshot: lo que referencian los audios va antes
+FEEDS = (
+    (Kind.CATEGORY, 'categorias'),
+    (Kind.GENRE, 'generos'),
+    (Kind.TAG, 'etiquetas'),
+    (Kind.AUDIO, 'audios'),
+)
+_RESOURCES = dict(FEEDS)
+# Campos de la API que no publica el feed
+VOLATILE_FIELDS = ('views', 'downloads', 'favorites', 'trending_score', 'updated_at')
+
+
+def _chunk_size():
+    return getattr(settings, 'CATALOG_FEED_CHUNK_SIZE', 1000)
+
+
+def _plan(resource):
+    return plan(resource, [name for name in resource.fields if name not in VOLATILE_FIELDS])
+
+
+def _line(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+
+
+def _entry(kind, object_id, data, seq=None):
+    entry = {'seq': seq} if seq is not None else {}
+    entry.update(type=kind, id=object_id)
+    if data is None:
+        entry['op'] = 'delete'
+    else:
+        entry.update(op='upsert', data=data)
+    return entry
+
+
+def snapshot(chunk_size=None):
+    """Líneas NDJSON (en bloques) del catálogo publicado completo"""
+    chunk_size = chunk_size or _chunk_size()
+    yield _line({'watermark': changelog.watermark()})
+    for kind, name in FEEDS:
+        resource = RESOURCES[name]
+        columns, fields = _plan(resource)
+        rows = resource.queryset().order_by(resource.key).values_list(*columns)
+        lines = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            lines.append(_line(_entry(kind, row[0], render(row, fields))))
+            if len(lines) >= chunk_size:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+
+
+def _current(keys):
+    """{(kind, id): datos o None si ya no está publicado}, una consulta por tipo"""
+    ids_by_kind = {}
+    for kind, object_id in keys:
+        ids_by_kind.setdefault(kind, []).append(object_id)
+    current = dict.fromkeys(keys)
+    for kind, ids in ids_by_kind.items():
+        resource = RESOURCES[_RESOURCES[kind]]
+        columns, fields = _plan(resource)
+        rows = resource.queryset().filter(**{f'{resource.key}__in': ids}).values_list(*columns)
+        for row in rows:
+            current[(kind, row[0])] = render(row, fields)
+    return current
+
+
+def changes(since, limit=None, chunk_size=None):
+    """
+    Líneas NDJSON (en bloques) de los cambios posteriores a ``since``, hasta
+    ``limit`` cambios. Valida la marca de agua antes de empezar: lanza
+    ``changelog.ChangesPruned`` si la retención ya borró parte del tramo.
+    """
+    pending = changelog.changes_since(since)
+    limit = limit or getattr(settings, 'CATALOG_FEED_LIMIT', 10000)
+    return _changes(pending, since, limit, chunk_size or _chunk_size())
+
+
+def _changes(pending, watermark, limit, chunk_size):
+    read = 0
+    while read < limit:
+        chunk = list(pending.filter(id__gt=watermark)[:min(chunk_size, limit - read)])
+        if not chunk:
+            break
+        # Un objeto que cambió varias veces en el bloque se entrega una vez, con su último seq
+        latest = {(kind, object_id): seq for seq, kind, object_id in chunk}
+        current = _current(latest.keys())
+        yield ''.join(
+            _line(_entry(kind, object_id, current[(kind, object_id)], seq=seq))
+            for (kind, object_id), seq in sorted(latest.items(), key=lambda item: item[1])
+        )
+        read += len(chunk)
+        watermark = chunk[-1][0]
+    yield _line({'watermark': watermark, 'more': read >= limit})
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.api import feed
+from apps.audios import changelog
+
+
+class Command(BaseCommand):
+    help = (
+        'Feed de sincronización del catálogo en NDJSON: "snapshot" exporta todo, "changes" lo que cambió '
+        'después de --since y "prune" aplica la retención del registro de cambios'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['snapshot', 'changes', 'prune'])
+        parser.add_argument('--since', type=int, default=0, help='marca de agua de la sincronización anterior')
+        parser.add_argument('--limit', type=int, default=None, help='máximo de cambios (CATALOG_FEED_LIMIT)')
+        parser.add_argument('--chunk-size', type=int, default=None, help='filas por bloque (CATALOG_FEED_CHUNK_SIZE)')
+        parser.add_argument('--days', type=int, default=None, help='retención (CATALOG_CHANGELOG_RETENTION_DAYS)')
+        parser.add_argument('--output', default='-', help='archivo de salida (por defecto stdout)')
+
+    def handle(self, *args, **options):
+        if options['action'] == 'prune':
+            deleted = changelog.prune(options['days'])
+            self.stdout.write(self.style.SUCCESS(f'Cambios borrados: {deleted}'))
+            return
+
+        if options['action'] == 'snapshot':
+            lines = feed.snapshot(chunk_size=options['chunk_size'])
+        else:
+            try:
+                lines = feed.changes(options['since'], limit=options['limit'], chunk_size=options['chunk_size'])
+            except changelog.ChangesPruned:
+                raise CommandError('La marca de agua es anterior a los cambios conservados: exporta un snapshot')
+
+        if options['output'] == '-':
+            for block in lines:
+                self.stdout.write(block, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for block in lines:
+                output.write(block)
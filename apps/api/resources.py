@@ -0,0 +1,235 @@
+"""
+Recursos de la API de catálogo.
+
+Cada recurso define su queryset base, la columna de la paginación por
+cursor (un id estable), los campos públicos y sus filtros. Un campo es una
+o más columnas leídas con ``values_list`` y una función opcional que arma
+el valor: la API nunca instancia modelos, así que una página de 200 audios
+son 200 tuplas y 200 dicts.
+
+``version()`` es la única consulta que necesita una revalidación: el
+``updated_at`` más reciente y la cantidad de filas (que cambia con las
+bajas, que no dejan ``updated_at``).
+"""
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max
+
+from apps.audios import cards
+from apps.audios.catalog import CatalogFilters
+from apps.audios.models import AudioCard, Category, Genre, Tag
+
+User = get_user_model()
+
+Field = namedtuple('Field', ['columns', 'transform'])
+Resource = namedtuple('Resource', ['name', 'queryset', 'key', 'descending', 'fields', 'filters'])
+Version = namedtuple('Version', ['last_modified', 'count'])
+
+# Rango de un entero de 64 bits: uno mayor revienta la consulta con OverflowError
+MAX_INT = 2 ** 63 - 1
+# El precio más alto que entra en la columna (``max_digits=10, decimal_places=2``)
+_price = AudioCard._meta.get_field('price_standard')
+MAX_PRICE = Decimal(10) ** (_price.max_digits - _price.decimal_places)
+
+
+def column(name, transform=None):
+    return Field((name,), transform)
+
+
+def _media_url(name):
+    return default_storage.url(name) if name else None
+
+
+def _seconds(duration):
+    return int(duration.total_seconds()) if duration is not None else None
+
+
+def _tag_names(tags):
+    return [tag['name'] for tag in tags]
+
+
+def _full_name(first_name, last_name):
+    return f'{first_name} {last_name}'.strip()
+
+
+def integer(value, minimum=-MAX_INT - 1):
+    """``int(value)`` entre ``minimum`` y ``MAX_INT``; ``ValueError`` si no es un entero o se sale"""
+    value = int(value)
+    if not minimum <= value <= MAX_INT:
+        raise ValueError(value)
+    return value
+
+
+def _int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return integer(value)
+    except ValueError:
+        raise ValueError(f'"{name}" debe ser un número entero de 64 bits')
+
+
+def _decimal(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'"{name}" debe ser un número')
+    # NaN e infinitos pasan por Decimal() pero no se pueden comparar en la consulta
+    if not value.is_finite() or abs(value) >= MAX_PRICE:
+        raise ValueError(f'"{name}" debe ser un número finito menor que {MAX_PRICE}')
+    return value
+
+
+def filter_audios(queryset, params):
+    """Mismos filtros que el listado (ids de categoría, género y etiqueta, precio) y vendedor"""
+    filters = CatalogFilters(
+        category_id=_int(params, 'category'),
+        genre_id=_int(params, 'genre'),
+        tag_id=_int(params, 'tag'),
+        min_price=_decimal(params, 'min_price'),
+        max_price=_decimal(params, 'max_price'),
+    )
+    queryset = cards.listing(filters)
+    if params.get('seller'):
+        queryset = queryset.filter(seller_username=params['seller'])
+    return queryset
+
+
+def filter_genres(queryset, params):
+    category_id = _int(params, 'category')
+    return queryset if category_id is None else queryset.filter(category_id=category_id)
+
+
+def no_filters(queryset, params):
+    return queryset
+
+
+RESOURCES = {
+    resource.name: resource for resource in (
+        Resource(
+            name='audios',
+            queryset=lambda: AudioCard.objects.all(),
+            key='audio_id',
+            descending=True,
+            fields={
+                'id': column('audio_id'),
+                'title': column('title'),
+                'slug': column('slug'),
+                'cover': column('cover', _media_url),
+                'price': column('price_standard'),
+                'duration': column('duration', _seconds),
+                'is_featured': column('is_featured'),
+                'published_at': column('published_at'),
+                'seller': column('seller_username'),
+                'seller_name': column('seller_name'),
+                'category_id': column('category_id'),
+                'category': column('category_name'),
+                'genre_id': column('genre_id'),
+                'genre': column('genre_name'),
+                'tags': column('tags', _tag_names),
+                'views': column('views_count'),
+                'downloads': column('downloads_count'),
+                'favorites': column('favorites_count'),
+                'trending_score': column('trending_score'),
+                'updated_at': column('updated_at'),
+            },
+            filters=filter_audios,
+        ),
+        Resource(
+            name='categorias',
+            queryset=lambda: Category.objects.filter(is_active=True),
+            key='id',
+            descending=False,
+            fields={
+                'id': column('id'),
+                'name': column('name'),
+                'slug': column('slug'),
+                'description': column('description'),
+                'icon': column('icon'),
+                'updated_at': column('updated_at'),
+            },
+            filters=no_filters,
+        ),
+        Resource(
+            name='generos',
+            queryset=lambda: Genre.objects.filter(is_active=True),
+            key='id',
+            descending=False,
+            fields={
+                'id': column('id'),
+                'name': column('name'),
+                'slug': column('slug'),
+                'category_id': column('category_id'),
+                'updated_at': column('updated_at'),
+            },
+            filters=filter_genres,
+        ),
+        Resource(
+            name='etiquetas',
+            queryset=lambda: Tag.objects.all(),
+            key='id',
+            descending=False,
+            fields={
+                'id': column('id'),
+                'name': column('name'),
+                'slug': column('slug'),
+                'color': column('color'),
+                'updated_at': column('updated_at'),
+            },
+            filters=no_filters,
+        ),
+        Resource(
+            name='vendedores',
+            queryset=lambda: User.objects.filter(user_type='seller', is_active=True),
+            key='id',
+            descending=False,
+            fields={
+                'id': column('id'),
+                'username': column('username'),
+                'name': Field(('first_name', 'last_name'), _full_name),
+                'joined_at': column('created_at'),
+                'updated_at': column('updated_at'),
+            },
+            filters=no_filters,
+        ),
+    )
+}
+
+
+def plan(resource, names):
+    """
+    Columnas a leer (la clave primero: arma el cursor y el id del feed) y,
+    por campo, (nombre, desde, hasta, transformación) sobre cada fila.
+    """
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ValueError(f'Campos desconocidos: {", ".join(unknown)}')
+    columns = [resource.key]
+    fields = []
+    for name in names:
+        field = resource.fields[name]
+        start = len(columns)
+        columns.extend(field.columns)
+        fields.append((name, start, len(columns), field.transform))
+    return columns, fields
+
+
+def render(row, fields):
+    """Dict de una fila de ``values_list`` según el plan de ``plan()``"""
+    item = {}
+    for name, start, stop, transform in fields:
+        item[name] = transform(*row[start:stop]) if transform else row[start]
+    return item
+
+
+def version(resource):
+    """Versión del recurso completo (una consulta)"""
+    row = resource.queryset().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    return Version(**row)
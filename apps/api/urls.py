@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('', views.index, name='index'),
+    path('cambios/', views.changes, name='changes'),
+    path('exportar/', views.export, name='export'),
+    path('<str:resource>/', views.collection, name='collection'),
+]
@@ -0,0 +1,184 @@
+"""
+API de catálogo de solo lectura (JSON).
+
+Cada colección (``/api/v1/<recurso>/``) acepta:
+
+- ``?fields=id,title``: solo esos campos (400 si alguno no existe);
+- ``?limit=N``: tamaño de página (``API_PAGE_SIZE``, hasta ``API_MAX_PAGE_SIZE``);
+- ``?cursor=``: el valor de ``next`` de la página anterior. La paginación
+  es por clave (``id < último``), así que una página profunda cuesta lo
+  mismo que la primera y no se saltean ni repiten filas si el catálogo
+  cambia entre páginas;
+- los filtros del recurso (ver ``resources.py``).
+
+Revalidación: el ETag (fuerte) y el ``Last-Modified`` salen de la versión
+del recurso (``resources.version``: máximo ``updated_at`` y cantidad de
+filas) más la consulta y la codificación pedidas. Un cliente que repite
+el pedido con ``If-None-Match`` recibe un 304 después de esa única
+consulta, sin leer filas ni serializar.
+
+La compresión se hace acá y no con ``GZipMiddleware``, que debilita los
+ETags (``W/``) de las respuestas que comprime: cada codificación tiene su
+propio ETag fuerte y la respuesta declara ``Vary: Accept-Encoding``.
+
+``cambios/`` y ``exportar/`` son el feed de sincronización en NDJSON
+(``feed.py``): se emiten por bloques con ``StreamingHttpResponse``.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.text import compress_sequence, compress_string
+from django.views.decorators.http import require_safe
+
+from apps.audios.changelog import ChangesPruned
+
+from . import feed
+from .resources import RESOURCES, integer, plan, render, version
+
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def _page_size(params):
+    default = getattr(settings, 'API_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+    try:
+        limit = int(params.get('limit', default))
+    except ValueError:
+        raise ValueError('"limit" debe ser un número entero')
+    return max(1, min(limit, maximum))
+
+
+def _encode_cursor(value):
+    return base64.urlsafe_b64encode(str(value).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        return integer(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Cursor inválido')
+
+
+def _page(request, resource):
+    params = request.GET
+    names = [name for name in params.get('fields', '').split(',') if name] or list(resource.fields)
+    columns, fields = plan(resource, names)
+    limit = _page_size(params)
+    queryset = resource.filters(resource.queryset(), params)
+    if resource.descending:
+        queryset = queryset.order_by(f'-{resource.key}')
+    else:
+        queryset = queryset.order_by(resource.key)
+    if params.get('cursor'):
+        lookup = 'lt' if resource.descending else 'gt'
+        queryset = queryset.filter(**{f'{resource.key}__{lookup}': _decode_cursor(params['cursor'])})
+
+    rows = list(queryset.values_list(*columns)[:limit + 1])
+    results = [render(row, fields) for row in rows[:limit]]
+
+    next_url = None
+    if len(rows) > limit:
+        query = params.copy()
+        query['cursor'] = _encode_cursor(rows[limit - 1][0])
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return {'results': results, 'next': next_url}
+
+
+def _revalidation_headers(response):
+    patch_vary_headers(response, ['Accept-Encoding'])
+    # Los clientes y caches pueden guardar la respuesta, pero revalidan siempre
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+@require_safe
+def collection(request, resource):
+    resource = RESOURCES.get(resource)
+    if resource is None:
+        return JsonResponse({'error': 'Recurso desconocido'}, status=404)
+
+    gzip = bool(_accepts_gzip.search(request.headers.get('Accept-Encoding', '')))
+    current = version(resource)
+    digest = hashlib.sha1(
+        f'{resource.name}|{current.count}|{current.last_modified}|{request.GET.urlencode()}|{gzip}'.encode()
+    ).hexdigest()
+    etag = quote_etag(digest)
+    last_modified = current.last_modified.timestamp() if current.last_modified else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _revalidation_headers(not_modified)
+
+    try:
+        page = _page(request, resource)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    body = json.dumps(page, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    response = HttpResponse(content_type='application/json')
+    if gzip and len(body) >= getattr(settings, 'API_GZIP_MIN_LENGTH', 512):
+        body = compress_string(body)
+        response['Content-Encoding'] = 'gzip'
+    response.content = body
+    response['Content-Length'] = len(body)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return _revalidation_headers(response)
+
+
+def _ndjson(request, lines):
+    response = StreamingHttpResponse(content_type='application/x-ndjson')
+    lines = (block.encode() for block in lines)
+    if _accepts_gzip.search(request.headers.get('Accept-Encoding', '')):
+        lines = compress_sequence(lines)
+        response['Content-Encoding'] = 'gzip'
+    response.streaming_content = lines
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+@require_safe
+def changes(request):
+    """Cambios del catálogo posteriores a ``?since=`` (marca de agua)"""
+    try:
+        since = integer(request.GET.get('since', 0), minimum=0)
+        limit = integer(request.GET['limit'], minimum=0) if request.GET.get('limit') else None
+    except ValueError:
+        return JsonResponse({'error': '"since" y "limit" deben ser enteros no negativos de 64 bits'}, status=400)
+    try:
+        lines = feed.changes(since, limit=limit)
+    except ChangesPruned:
+        return JsonResponse(
+            {'error': 'La marca de agua es anterior a los cambios conservados: vuelve a exportar el catálogo'},
+            status=410,
+        )
+    return _ndjson(request, lines)
+
+
+@require_safe
+def export(request):
+    """Exportación completa del catálogo publicado"""
+    return _ndjson(request, feed.snapshot())
+
+
+@require_safe
+def index(request):
+    """Recursos disponibles con sus campos"""
+    return JsonResponse({
+        name: {
+            'url': request.build_absolute_uri(reverse('api:collection', kwargs={'resource': name})),
+            'fields': list(resource.fields),
+        }
+        for name, resource in RESOURCES.items()
+    })
@@ -2,13 +2,18 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from django.db.models import Count, Avg
+from django.db.models import Count, Avg, Q
 from django.contrib import messages
+from django.utils import timezone
 
 from .models import (
     Category, Genre, Tag, Audio, AudioFavorite, 
-    AudioReview, AudioPlaylist
+    AudioReview, AudioPlaylist, PlaylistItem, AudioPurchase, DownloadEvent,
+    DuplicateCandidate, ModerationTask
 )
+from . import cards, catalog, changelog, moderation
+from .favorites import remove_favorites
+from .playlists import recalculate as recalculate_playlist
 
 
 @admin.register(Category)
@@ -28,12 +33,14 @@ class CategoryAdmin(admin.ModelAdmin):
     audio_count.short_description = 'Audios'
     
     def activate_categories(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = queryset.update(is_active=True, updated_at=timezone.now())
+        changelog.record(changelog.Kind.CATEGORY, queryset.values_list('pk', flat=True))
         messages.success(request, f'{updated} categoría(s) activada(s).')
     activate_categories.short_description = "✅ Activar categorías seleccionadas"
     
     def deactivate_categories(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = queryset.update(is_active=False, updated_at=timezone.now())
+        changelog.record(changelog.Kind.CATEGORY, queryset.values_list('pk', flat=True))
         messages.success(request, f'{updated} categoría(s) desactivada(s).')
     deactivate_categories.short_description = "❌ Desactivar categorías seleccionadas"
 
@@ -87,28 +94,55 @@ class AudioReviewInline(admin.TabularInline):
         return False
 
 
+class PossibleDuplicateFilter(admin.SimpleListFilter):
+    title = 'posibles duplicados'
+    parameter_name = 'duplicados'
+
+    def lookups(self, request, model_admin):
+        return (('si', 'Con posibles duplicados'), ('no', 'Sin duplicados'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'si':
+            return queryset.filter(open_duplicates__gt=0)
+        if self.value() == 'no':
+            return queryset.filter(open_duplicates=0)
+        return queryset
+
+
+class DuplicateCandidateInline(admin.TabularInline):
+    model = DuplicateCandidate
+    fk_name = 'audio'
+    extra = 0
+    fields = ('match', 'kind', 'score', 'is_resolved', 'created_at')
+    readonly_fields = ('match', 'kind', 'score', 'created_at')
+
+    def has_add_permission(self, request, obj):
+        return False
+
+
 @admin.register(Audio)
 class AudioAdmin(admin.ModelAdmin):
     list_display = (
         'title', 'seller', 'category', 'status', 'price_standard',
-        'views_count', 'downloads_count', 'is_featured', 'created_at'
+        'views_count', 'downloads_count', 'is_featured', 'duplicates', 'created_at'
     )
     list_filter = (
-        'status', 'category', 'genre', 'is_featured', 
+        'status', PossibleDuplicateFilter, 'category', 'genre', 'is_featured', 
         'allow_preview', 'created_at', 'published_at'
     )
     search_fields = ('title', 'description', 'seller__email', 'seller__first_name', 'seller__last_name')
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = (
-        'slug', 'views_count', 'downloads_count', 'favorites_count',
+        'slug', 'views_count', 'downloads_count', 'favorites_count', 'trending_score',
         'file_size', 'duration', 'bitrate', 'sample_rate',
+        'bpm', 'musical_key', 'loudness_lufs', 'peak_db', 'analyzed_at',
         'created_at', 'updated_at', 'published_at'
     )
     actions = [
         'publish_audios', 'unpublish_audios', 'feature_audios', 
         'unfeature_audios', 'reject_audios'
     ]
-    inlines = [AudioReviewInline]
+    inlines = [DuplicateCandidateInline, AudioReviewInline]
     
     fieldsets = (
         ('Información Básica', {
@@ -121,7 +155,10 @@ class AudioAdmin(admin.ModelAdmin):
             'fields': ('audio_file', 'cover_image', 'cover_preview')
         }),
         ('Información Técnica', {
-            'fields': ('duration', 'file_size', 'bitrate', 'sample_rate'),
+            'fields': (
+                'duration', 'file_size', 'bitrate', 'sample_rate',
+                'bpm', 'musical_key', 'loudness_lufs', 'peak_db', 'analyzed_at'
+            ),
             'classes': ('collapse',)
         }),
         ('Precios', {
@@ -131,7 +168,7 @@ class AudioAdmin(admin.ModelAdmin):
             'fields': ('status', 'is_featured', 'allow_preview')
         }),
         ('Estadísticas', {
-            'fields': ('views_count', 'downloads_count', 'favorites_count'),
+            'fields': ('views_count', 'downloads_count', 'favorites_count', 'trending_score'),
             'classes': ('collapse',)
         }),
         ('Fechas', {
@@ -140,6 +177,18 @@ class AudioAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            open_duplicates=Count('duplicate_candidates', filter=Q(duplicate_candidates__is_resolved=False))
+        )
+
+    def duplicates(self, obj):
+        if not obj.open_duplicates:
+            return '-'
+        return format_html('<span class="badge badge-danger">{}</span>', obj.open_duplicates)
+    duplicates.short_description = 'Duplicados'
+    duplicates.admin_order_field = 'open_duplicates'
+
     def cover_preview(self, obj):
         if obj.cover_image:
             return format_html(
@@ -150,31 +199,94 @@ class AudioAdmin(admin.ModelAdmin):
     cover_preview.short_description = 'Vista previa'
     
     def publish_audios(self, request, queryset):
-        updated = queryset.update(status=Audio.Status.PUBLISHED)
+        audio_ids = list(queryset.values_list('pk', flat=True))
+        with catalog.track(audio_ids):
+            updated = queryset.update(status=Audio.Status.PUBLISHED)
+        moderation.close_tasks(audio_ids, request.user, ModerationTask.Decision.APPROVED)
         messages.success(request, f'{updated} audio(s) publicado(s).')
     publish_audios.short_description = "📢 Publicar audios seleccionados"
     
     def unpublish_audios(self, request, queryset):
-        updated = queryset.update(status=Audio.Status.DRAFT)
+        audio_ids = list(queryset.values_list('pk', flat=True))
+        with catalog.track(audio_ids):
+            updated = queryset.update(status=Audio.Status.DRAFT)
+        moderation.close_tasks(audio_ids, request.user, ModerationTask.Decision.WITHDRAWN)
         messages.success(request, f'{updated} audio(s) despublicado(s).')
     unpublish_audios.short_description = "📝 Despublicar audios seleccionados"
     
     def feature_audios(self, request, queryset):
         updated = queryset.update(is_featured=True)
+        cards.sync(queryset.values_list('pk', flat=True))
         messages.success(request, f'{updated} audio(s) destacado(s).')
     feature_audios.short_description = "⭐ Destacar audios seleccionados"
     
     def unfeature_audios(self, request, queryset):
         updated = queryset.update(is_featured=False)
+        cards.sync(queryset.values_list('pk', flat=True))
         messages.success(request, f'{updated} audio(s) quitado(s) de destacados.')
     unfeature_audios.short_description = "⭐ Quitar de destacados"
     
     def reject_audios(self, request, queryset):
-        updated = queryset.update(status=Audio.Status.REJECTED)
+        audio_ids = list(queryset.values_list('pk', flat=True))
+        with catalog.track(audio_ids):
+            updated = queryset.update(status=Audio.Status.REJECTED)
+        moderation.close_tasks(audio_ids, request.user, ModerationTask.Decision.REJECTED)
         messages.success(request, f'{updated} audio(s) rechazado(s).')
     reject_audios.short_description = "❌ Rechazar audios seleccionados"
 
 
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    list_display = ('audio', 'match', 'kind', 'score', 'audio_status', 'is_resolved', 'created_at')
+    list_filter = ('kind', 'is_resolved', 'audio__status')
+    search_fields = ('audio__title', 'match__title', 'audio__seller__email')
+    list_select_related = ('audio', 'match')
+    readonly_fields = ('audio', 'match', 'kind', 'score', 'created_at')
+    actions = ['resolve_candidates', 'reject_duplicates']
+
+    def has_add_permission(self, request):
+        return False
+
+    def audio_status(self, obj):
+        return obj.audio.get_status_display()
+    audio_status.short_description = 'Estado del audio'
+
+    def resolve_candidates(self, request, queryset):
+        updated = queryset.update(is_resolved=True)
+        messages.success(request, f'{updated} candidato(s) marcado(s) como revisado(s).')
+    resolve_candidates.short_description = "✅ Marcar como revisados (no son duplicados)"
+
+    def reject_duplicates(self, request, queryset):
+        audio_ids = list(queryset.values_list('audio_id', flat=True).distinct())
+        with catalog.track(audio_ids):
+            updated = Audio.objects.filter(pk__in=audio_ids).update(status=Audio.Status.REJECTED)
+        moderation.close_tasks(audio_ids, request.user, ModerationTask.Decision.REJECTED, 'Duplicado')
+        queryset.update(is_resolved=True)
+        messages.success(request, f'{updated} audio(s) rechazado(s) por duplicado.')
+    reject_duplicates.short_description = "❌ Rechazar los audios duplicados"
+
+
+@admin.register(ModerationTask)
+class ModerationTaskAdmin(admin.ModelAdmin):
+    list_display = ('audio', 'submitted_at', 'claimed_by', 'claimed_until', 'decision', 'decided_by', 'decided_at')
+    list_filter = ('decision', 'submitted_at', 'decided_at')
+    search_fields = ('audio__title', 'audio__seller__email')
+    list_select_related = ('audio', 'claimed_by', 'decided_by')
+    readonly_fields = (
+        'audio', 'submitted_at', 'claimed_by', 'claimed_until',
+        'decision', 'decided_by', 'decided_at', 'note'
+    )
+    actions = ['release_tasks']
+
+    def has_add_permission(self, request):
+        return False
+
+    def release_tasks(self, request, queryset):
+        updated = queryset.filter(decided_at__isnull=True).update(claimed_by=None, claimed_until=None)
+        messages.success(request, f'{updated} tarea(s) devuelta(s) a la cola.')
+    release_tasks.short_description = "↩️ Devolver a la cola"
+
+
 @admin.register(AudioFavorite)
 class AudioFavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'audio', 'created_at')
@@ -184,6 +296,37 @@ class AudioFavoriteAdmin(admin.ModelAdmin):
     
     def has_add_permission(self, request):
         return False
+    
+    def delete_model(self, request, obj):
+        remove_favorites(AudioFavorite.objects.filter(pk=obj.pk))
+    
+    def delete_queryset(self, request, queryset):
+        remove_favorites(queryset)
+
+
+@admin.register(AudioPurchase)
+class AudioPurchaseAdmin(admin.ModelAdmin):
+    list_display = ('user', 'audio', 'license', 'price', 'purchased_at')
+    list_filter = ('license', 'purchased_at')
+    search_fields = ('user__email', 'audio__title')
+    raw_id_fields = ('user', 'audio')
+
+
+@admin.register(DownloadEvent)
+class DownloadEventAdmin(admin.ModelAdmin):
+    """Registro append-only: solo lectura"""
+    list_display = ('audio', 'user', 'purchase', 'ip_address', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('audio__title', 'user__email')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(AudioReview)
@@ -197,20 +340,33 @@ class AudioReviewAdmin(admin.ModelAdmin):
         return False
 
 
+class PlaylistItemInline(admin.TabularInline):
+    model = PlaylistItem
+    extra = 0
+    raw_id_fields = ('audio',)
+    readonly_fields = ('added_at',)
+    ordering = ('position',)
+
+
 @admin.register(AudioPlaylist)
 class AudioPlaylistAdmin(admin.ModelAdmin):
-    list_display = ('name', 'user', 'audio_count', 'is_public', 'created_at')
+    list_display = ('name', 'user', 'audio_count', 'total_duration', 'is_public', 'created_at')
     list_filter = ('is_public', 'created_at')
     search_fields = ('name', 'user__email', 'description')
-    filter_horizontal = ('audios',)
+    readonly_fields = ('track_count', 'total_duration')
+    inlines = [PlaylistItemInline]
     
     def audio_count(self, obj):
-        count = obj.audios.count()
         return format_html(
             '<span class="badge badge-primary">{}</span>',
-            count
+            obj.track_count
         )
     audio_count.short_description = 'Audios'
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Los items editados desde el admin no pasan por el servicio
+        recalculate_playlist(form.instance)
 
 
 # Configuración del admin site
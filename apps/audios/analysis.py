@@ -0,0 +1,489 @@
+"""
+Análisis acústico de los audios: BPM, tonalidad, sonoridad y pico.
+
+Cada audio se decodifica una sola vez (WAV PCM con la biblioteca estándar,
+el resto con ffmpeg a float32 estéreo) y todas las medidas salen de esas
+muestras con NumPy:
+
+- Pico: máximo absoluto en dBFS.
+- Sonoridad integrada (ITU-R BS.1770): ponderación K aplicada por bloques
+  (overlap-add), bloques de 400 ms y doble compuerta (-70 LUFS y -10 LU).
+- BPM: flujo espectral de la STFT y autocorrelación de esa envolvente, con
+  preferencia por tempos cercanos a 120.
+- Tonalidad: cromagrama de la misma STFT correlacionado con los perfiles de
+  Krumhansl-Schmuckler.
+- Embedding: media y desvío de los MFCC, centroide espectral, cromagrama y
+  tempo en un vector float32 de ``EMBEDDING_DIM`` valores (ver
+  ``similarity``).
+- Huella: landmarks de los picos del espectrograma (ver ``fingerprints``).
+
+``analyze()`` no toca la base, así que corre en un pool de procesos
+(``AUDIO_ANALYSIS_WORKERS``; 0 la ejecuta en el mismo proceso).
+``schedule()`` la lanza al subir un archivo y guarda el resultado en los
+campos indexados de ``Audio``.
+"""
+import logging
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import fingerprints
+from .models import Audio
+from .monitoring import JOB_SECONDS
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy no hay análisis; los campos quedan vacíos
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DECODE_RATE = 44100
+ANALYSIS_RATE = 22050
+N_FFT = 2048
+HOP = 256
+MIN_BPM, MAX_BPM = 60, 200
+N_MELS, N_MFCC = 40, 20
+# MFCC 1-19 (media y desvío), centroide (media y desvío), cromagrama y tempo
+EMBEDDING_DIM = 2 * (N_MFCC - 1) + 2 + 12 + 1
+
+# Muestras de la respuesta al impulso de la ponderación K (el pasa altos de
+# 38 Hz decae en unos cientos de muestras)
+K_TAPS = 8192
+# Filtro antialiasing al bajar a ANALYSIS_RATE: transición de ~1 kHz a 48 kHz
+LOWPASS_TAPS = 255
+
+KRUMHANSL_MAJOR = [6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88]
+KRUMHANSL_MINOR = [6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17]
+
+_executor = None
+_store_executor = None
+_executor_lock = threading.Lock()
+
+
+class AnalysisError(Exception):
+    """No se pudo decodificar o analizar el audio"""
+
+
+def available():
+    return np is not None
+
+
+# Decodificación
+
+def _read_wav(path, max_seconds):
+    """Muestras (frames, canales) en float32 y sample rate; None si no es PCM legible"""
+    try:
+        with wave.open(path, 'rb') as source:
+            width, channels, rate = source.getsampwidth(), source.getnchannels(), source.getframerate()
+            raw = source.readframes(min(source.getnframes(), int(max_seconds * rate)))
+    except (wave.Error, EOFError):
+        return None
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 3:
+        data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = ((data[:, 0] | (data[:, 1] << 8) | (data[:, 2] << 16)) << 8 >> 8) / float(2 ** 23)
+    else:
+        dtype = {2: np.int16, 4: np.int32}[width]
+        samples = np.frombuffer(raw, dtype=dtype) / float(2 ** (8 * width - 1))
+    return samples.astype(np.float32).reshape(-1, channels), rate
+
+
+def _read_ffmpeg(path, ffmpeg, max_seconds, timeout):
+    command = [
+        ffmpeg, '-nostdin', '-v', 'error', '-i', path, '-map', '0:a:0', '-t', str(max_seconds),
+        '-f', 'f32le', '-ac', '2', '-ar', str(DECODE_RATE), '-',
+    ]
+    try:
+        result = subprocess.run(command, check=True, capture_output=True, timeout=timeout)
+    except FileNotFoundError as exc:
+        raise AnalysisError('ffmpeg no está instalado') from exc
+    except subprocess.TimeoutExpired as exc:
+        raise AnalysisError(f'ffmpeg no terminó en {timeout} s') from exc
+    except subprocess.CalledProcessError as exc:
+        raise AnalysisError(exc.stderr.decode(errors='replace').strip()) from exc
+    return np.frombuffer(result.stdout, dtype='<f4').reshape(-1, 2), DECODE_RATE
+
+
+def decode(path, ffmpeg='ffmpeg'):
+    """
+    Decodifica el archivo una vez: (muestras, sample rate). Solo los primeros
+    ``AUDIO_ANALYSIS_MAX_SECONDS``, para acotar la memoria de cada proceso.
+    """
+    max_seconds = getattr(settings, 'AUDIO_ANALYSIS_MAX_SECONDS', 600)
+    decoded = _read_wav(path, max_seconds) if path.lower().endswith('.wav') else None
+    if decoded is None:
+        decoded = _read_ffmpeg(path, ffmpeg, max_seconds, getattr(settings, 'AUDIO_ANALYSIS_TIMEOUT', 120))
+    samples, rate = decoded
+    if not len(samples):
+        raise AnalysisError('El audio no tiene muestras')
+    return samples, rate
+
+
+# Medidas
+
+def peak_db(samples):
+    peak = float(np.max(np.abs(samples)))
+    return round(float(20 * np.log10(peak)), 2) if peak > 0 else None
+
+
+def _biquad_response(b, a, freqs, rate):
+    z = np.exp(-2j * np.pi * freqs / rate)
+    return (b[0] + b[1] * z + b[2] * z ** 2) / (a[0] + a[1] * z + a[2] * z ** 2)
+
+
+def _k_weighting(freqs, rate):
+    """Respuesta en frecuencia de la ponderación K (shelf + pasa altos RLB)"""
+    gain, q, fc = 4.0, 1 / np.sqrt(2), 1500.0
+    a_gain = 10 ** (gain / 40)
+    w0 = 2 * np.pi * fc / rate
+    alpha = np.sin(w0) / (2 * q)
+    cos, root = np.cos(w0), 2 * np.sqrt(a_gain) * alpha
+    shelf = _biquad_response(
+        [a_gain * ((a_gain + 1) + (a_gain - 1) * cos + root),
+         -2 * a_gain * ((a_gain - 1) + (a_gain + 1) * cos),
+         a_gain * ((a_gain + 1) + (a_gain - 1) * cos - root)],
+        [(a_gain + 1) - (a_gain - 1) * cos + root,
+         2 * ((a_gain - 1) - (a_gain + 1) * cos),
+         (a_gain + 1) - (a_gain - 1) * cos - root],
+        freqs, rate,
+    )
+    q, fc = 0.5, 38.0
+    w0 = 2 * np.pi * fc / rate
+    alpha, cos = np.sin(w0) / (2 * q), np.cos(w0)
+    highpass = _biquad_response(
+        [(1 + cos) / 2, -(1 + cos), (1 + cos) / 2], [1 + alpha, -2 * cos, 1 - alpha], freqs, rate
+    )
+    return shelf * highpass
+
+
+def _k_weighting_fir(rate):
+    """Respuesta al impulso de la ponderación K, truncada a ``K_TAPS`` muestras"""
+    size = 4 * K_TAPS
+    response = _k_weighting(np.fft.rfftfreq(size, 1 / rate), rate)
+    return np.fft.irfft(response, n=size)[:K_TAPS]
+
+
+def _overlap_add(samples, taps, size=1 << 16):
+    """
+    Convolución causal de ``samples`` (frames, canales) con el FIR ``taps``
+    por bloques de FFT (overlap-add): emite la salida bloque a bloque, con la
+    misma cantidad de frames que la entrada y memoria acotada por ``size``.
+    """
+    length = size - len(taps) + 1
+    response = np.fft.rfft(taps, n=size)[:, None]
+    tail = np.zeros((len(taps) - 1, samples.shape[1]))
+    for start in range(0, len(samples), length):
+        block = samples[start:start + length]
+        output = np.fft.irfft(np.fft.rfft(block, n=size, axis=0) * response, n=size, axis=0)
+        output[:len(tail)] += tail
+        tail = output[len(block):len(block) + len(taps) - 1]
+        yield output[:len(block)]
+
+
+def integrated_loudness(samples, rate):
+    """Sonoridad integrada en LUFS según BS.1770 (None si dura menos de 400 ms)"""
+    step = int(0.1 * rate)
+    frames, channels = samples.shape
+    if frames < 4 * step:
+        return None
+    # Energía por tramos de 100 ms a medida que sale cada bloque ponderado:
+    # la memoria no depende de la duración del audio
+    pending = np.zeros((0, channels))
+    energies = []
+    for weighted in _overlap_add(samples, _k_weighting_fir(rate)):
+        pending = np.concatenate([pending, weighted])
+        full = len(pending) // step * step
+        energies.append((pending[:full] ** 2).reshape(-1, step, channels).sum(axis=1))
+        pending = pending[full:]
+
+    # Bloques de 400 ms (cuatro tramos) con 75 % de superposición
+    energy = np.concatenate(energies)
+    cumulative = np.concatenate([np.zeros((1, channels)), np.cumsum(energy, axis=0)])
+    power = ((cumulative[4:] - cumulative[:-4]) / (4 * step)).sum(axis=1)
+    with np.errstate(divide='ignore'):
+        loudness = -0.691 + 10 * np.log10(power)
+
+    gated = power[loudness > -70]
+    if not len(gated):
+        return None
+    relative = -0.691 + 10 * np.log10(gated.mean()) - 10
+    gated = power[(loudness > -70) & (loudness > relative)]
+    return round(float(-0.691 + 10 * np.log10(gated.mean())), 2)
+
+
+def _lowpass(cutoff):
+    """FIR pasa bajos de fase lineal (sinc con ventana de Blackman); ``cutoff`` en ciclos por muestra"""
+    n = np.arange(LOWPASS_TAPS) - (LOWPASS_TAPS - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(LOWPASS_TAPS)
+    return taps / taps.sum()
+
+
+def _mono(samples, rate):
+    """
+    Mezcla a mono a exactamente ANALYSIS_RATE: las huellas de un mismo audio
+    tienen que coincidir aunque los archivos tengan distinto sample rate.
+
+    Antes de bajar la frecuencia se filtra lo que está por encima del nuevo
+    Nyquist; si no, ese contenido se pliega sobre la banda de las huellas y
+    una copia a 48 kHz no se parece a su original a 44,1 kHz.
+    """
+    mono = samples.mean(axis=1)
+    if rate > ANALYSIS_RATE:
+        taps = _lowpass(0.45 * ANALYSIS_RATE / rate)
+        # Se compensa el retardo del filtro para no correr la señal en el tiempo
+        delay = (LOWPASS_TAPS - 1) // 2
+        padded = np.concatenate([mono, np.zeros(delay, dtype=mono.dtype)])[:, None]
+        mono = np.concatenate(list(_overlap_add(padded, taps)))[delay:, 0].astype(np.float32)
+    if rate % ANALYSIS_RATE == 0:
+        mono = mono[::rate // ANALYSIS_RATE]
+    else:
+        positions = np.arange(0, len(mono) - 1, rate / ANALYSIS_RATE)
+        mono = np.interp(positions, np.arange(len(mono)), mono).astype(np.float32)
+    return mono, ANALYSIS_RATE
+
+
+def _mel_filterbank(freqs, rate):
+    """Matriz (bins, N_MELS) de filtros triangulares en escala mel"""
+    def to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    edges = 700 * (10 ** (np.linspace(to_mel(0), to_mel(rate / 2), N_MELS + 2) / 2595) - 1)
+    lower, center, upper = edges[:-2], edges[1:-1], edges[2:]
+    rising = (freqs[:, None] - lower) / (center - lower)
+    falling = (upper - freqs[:, None]) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def _dct_matrix():
+    """DCT-II ortonormal (N_MELS, N_MFCC)"""
+    n = np.arange(N_MELS)[:, None]
+    k = np.arange(N_MFCC)[None, :]
+    matrix = np.cos(np.pi * k * (2 * n + 1) / (2 * N_MELS)) * np.sqrt(2 / N_MELS)
+    matrix[:, 0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+def _spectral_features(mono, rate):
+    """
+    Envolvente de onsets (flujo espectral), cromagrama promedio, timbre
+    (media y desvío de MFCC y centroide) y espectrograma reducido para la
+    huella, en una sola pasada de STFT.
+    """
+    if len(mono) < N_FFT:
+        mono = np.pad(mono, (0, N_FFT - len(mono)))
+    window = np.hanning(N_FFT).astype(np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(mono, N_FFT)[::HOP]
+
+    freqs = np.fft.rfftfreq(N_FFT, 1 / rate)
+    audible = (freqs >= 55) & (freqs <= 5000)
+    pitch_class = (np.round(12 * np.log2(freqs[audible] / 440)).astype(int) + 9) % 12
+    chroma_map = np.zeros((audible.sum(), 12), dtype=np.float32)
+    chroma_map[np.arange(len(pitch_class)), pitch_class] = 1
+    mel_dct = _mel_filterbank(freqs, rate), _dct_matrix()
+
+    flux, chroma, spectrogram = [], np.zeros(12), []
+    # Sumas y sumas de cuadrados: MFCC y centroide normalizado
+    timbre_sum, timbre_squares = np.zeros(N_MFCC + 1), np.zeros(N_MFCC + 1)
+    previous = None
+    # Por tramos para acotar la memoria de la STFT en archivos largos
+    for start in range(0, len(frames), 1024):
+        magnitude = np.abs(np.fft.rfft(frames[start:start + 1024] * window, axis=1)).astype(np.float32)
+        power = magnitude ** 2
+        spectrogram.append(fingerprints.reduce(magnitude, freqs))
+        chroma += (power[:, audible] @ chroma_map).sum(axis=0)
+        mfcc = np.log(power @ mel_dct[0] + 1e-10) @ mel_dct[1]
+        centroid = (magnitude @ freqs) / np.maximum(magnitude.sum(axis=1), 1e-10) / (rate / 2)
+        timbre = np.column_stack([mfcc, centroid])
+        timbre_sum += timbre.sum(axis=0)
+        timbre_squares += (timbre.astype(np.float64) ** 2).sum(axis=0)
+        compressed = np.log1p(100 * magnitude)
+        if previous is not None:
+            compressed = np.vstack([previous, compressed])
+        flux.append(np.maximum(np.diff(compressed, axis=0), 0).sum(axis=1))
+        previous = compressed[-1:]
+    mean = timbre_sum / len(frames)
+    std = np.sqrt(np.maximum(timbre_squares / len(frames) - mean ** 2, 0))
+    # Sin el MFCC 0, que solo mide el volumen
+    timbre = np.concatenate([mean[1:N_MFCC], std[1:N_MFCC], mean[N_MFCC:], std[N_MFCC:]])
+    return np.concatenate(flux), chroma, timbre, np.concatenate(spectrogram)
+
+
+def embedding(timbre, chroma, bpm):
+    """Vector de ``EMBEDDING_DIM`` float32 (bytes) para la búsqueda por similitud"""
+    total = chroma.sum()
+    vector = np.concatenate([
+        timbre,
+        chroma / total if total else chroma,
+        [bpm / MAX_BPM if bpm else 0],
+    ]).astype(np.float32)
+    return vector.tobytes()
+
+
+def estimate_bpm(onsets, frame_rate):
+    """Tempo por autocorrelación de la envolvente de onsets (None si no hay pulso)"""
+    # Resta la media local para quedarse con los picos
+    kernel = np.ones(16) / 16
+    onsets = np.maximum(onsets - np.convolve(onsets, kernel, mode='same'), 0)
+    onsets = onsets - onsets.mean()
+    if not onsets.any():
+        return None
+    size = 2 * len(onsets)
+    spectrum = np.fft.rfft(onsets, n=size)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), n=size)[:len(onsets)]
+
+    lags = np.arange(len(autocorr))
+    valid = (lags >= frame_rate * 60 / MAX_BPM) & (lags <= frame_rate * 60 / MIN_BPM)
+    if not valid.any():
+        return None
+    with np.errstate(divide='ignore'):
+        bpm = np.where(lags > 0, 60 * frame_rate / np.maximum(lags, 1), 0)
+    prior = np.exp(-0.5 * np.log2(np.maximum(bpm, 1) / 120) ** 2)
+    score = np.where(valid, np.maximum(autocorr, 0) * prior, 0)
+    lag = int(np.argmax(score))
+    if score[lag] <= 0:
+        return None
+    # Interpolación parabólica alrededor del máximo
+    if 0 < lag < len(autocorr) - 1:
+        left, center, right = autocorr[lag - 1:lag + 2]
+        denominator = left - 2 * center + right
+        if denominator:
+            lag += 0.5 * (left - right) / denominator
+    return round(float(60 * frame_rate / lag), 1)
+
+
+def estimate_key(chroma):
+    """Índice de tonalidad (0-11 mayores desde Do, 12-23 menores) o None"""
+    if not chroma.any():
+        return None
+    profiles = np.array([
+        np.roll(profile, tonic) for profile in (KRUMHANSL_MAJOR, KRUMHANSL_MINOR) for tonic in range(12)
+    ])
+    scores = [np.corrcoef(chroma, profile)[0, 1] for profile in profiles]
+    return int(np.argmax(scores))
+
+
+def analyze(path, ffmpeg='ffmpeg'):
+    """Medidas acústicas del archivo (sin acceso a la base, apto para otro proceso)"""
+    if np is None:
+        raise AnalysisError('NumPy no está instalado')
+    samples, rate = decode(path, ffmpeg)
+    mono, mono_rate = _mono(samples, rate)
+    onsets, chroma, timbre, spectrogram = _spectral_features(mono, mono_rate)
+    bpm = estimate_bpm(onsets, mono_rate / HOP)
+    return {
+        'bpm': bpm,
+        'musical_key': estimate_key(chroma),
+        'loudness_lufs': integrated_loudness(samples, rate),
+        'peak_db': peak_db(samples),
+        'embedding': embedding(timbre, chroma, bpm),
+        'fingerprint': fingerprints.landmarks(spectrogram, mono_rate / HOP).tobytes(),
+    }
+
+
+def _job(audio_id, path, ffmpeg):
+    """Corre en el proceso hijo: retorna (audio_id, resultados, error, segundos)"""
+    start = time.perf_counter()
+    try:
+        return audio_id, analyze(path, ffmpeg), None, time.perf_counter() - start
+    except Exception as e:
+        return audio_id, None, f'{type(e).__name__}: {e}', time.perf_counter() - start
+
+
+# Ejecución
+
+def _workers():
+    return getattr(settings, 'AUDIO_ANALYSIS_WORKERS', 2)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=_workers())
+    return _executor
+
+
+def _get_store_executor():
+    """Hilo que guarda los resultados del pool (las escrituras no frenan al pool)"""
+    global _store_executor
+    with _executor_lock:
+        if _store_executor is None:
+            _store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analysis-store')
+    return _store_executor
+
+
+def store(audio_id, results):
+    """Guarda las medidas sin pasar por save() (no cambian el catálogo) e indexa la huella"""
+    results = dict(results)
+    fingerprint = results.pop('fingerprint', None)
+    Audio.objects.filter(pk=audio_id).update(analyzed_at=timezone.now(), **results)
+    if fingerprint:
+        fingerprints.index(audio_id, fingerprint)
+
+
+def _save_outcome(outcome):
+    audio_id, results, error, seconds = outcome
+    # Se mide en el proceso principal: los hijos del pool no vuelcan métricas
+    JOB_SECONDS.observe(seconds, job='analysis', outcome='error' if error else 'ok')
+    if error:
+        logger.warning('No se pudo analizar el audio %s: %s', audio_id, error)
+        return False
+    store(audio_id, results)
+    return True
+
+
+def _store_outcome(outcome):
+    try:
+        _save_outcome(outcome)
+    except Exception:
+        logger.exception('No se pudo guardar el análisis del audio %s', outcome[0])
+    finally:
+        # Corre en el hilo de guardado, con su propia conexión
+        close_old_connections()
+
+
+def _finish(future):
+    """
+    Callback del pool: corre en el hilo que gestiona los resultados de todos
+    los trabajos, así que no escribe en la base ahí sino en el hilo de guardado.
+    """
+    try:
+        outcome = future.result()
+    except Exception as e:  # El proceso hijo murió (BrokenProcessPool)
+        logger.warning('Falló un trabajo de análisis: %s', e)
+        return
+    _get_store_executor().submit(_store_outcome, outcome)
+
+
+def schedule(audio):
+    """Analiza el audio en el pool de procesos y guarda el resultado al terminar"""
+    if not available():
+        return
+    args = (audio.pk, audio.audio_file.path, getattr(settings, 'TRANSCODE_FFMPEG', 'ffmpeg'))
+    if _workers() == 0:
+        _save_outcome(_job(*args))
+    else:
+        _get_executor().submit(_job, *args).add_done_callback(_finish)
+
+
+def analyze_many(audios, workers=None):
+    """Analiza varios audios en paralelo; retorna (analizados, fallidos)"""
+    ffmpeg = getattr(settings, 'TRANSCODE_FFMPEG', 'ffmpeg')
+    jobs = [(audio.pk, audio.audio_file.path, ffmpeg) for audio in audios]
+    workers = _workers() if workers is None else workers
+    if workers == 0 or not jobs:
+        outcomes = [_job(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(_job, *zip(*jobs)))
+
+    saved = [_save_outcome(outcome) for outcome in outcomes]
+    return saved.count(True), saved.count(False)
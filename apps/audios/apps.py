@@ -8,3 +8,4 @@ class AudiosConfig(AppConfig):
 
     def ready(self):
         import apps.audios.signals
+        import apps.audios.monitoring  # Registra los gauges de /metrics
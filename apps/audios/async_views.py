@@ -0,0 +1,207 @@
+"""
+Versiones async de las vistas de lectura del catálogo.
+
+Se usan en despliegues ASGI (``ASYNC_VIEWS``, ver ``config/asgi.py``) en
+lugar de las equivalentes de ``views.py``. Las consultas usan el ORM async
+(``aget``, ``acount``, ``async for``) y las que no dependen entre sí se
+lanzan juntas con ``asyncio.gather``.
+
+En Django 4.2 ``login_required``/``require_POST`` no soportan vistas async,
+``request.user`` se resuelve de forma síncrona y ``prefetch_related`` no
+funciona con iteración async; de ahí los helpers de este módulo. El render
+de templates también pasa por ``sync_to_async``, porque los templates
+pueden disparar consultas (usuario, perfiles).
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.views import redirect_to_login
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from django.shortcuts import redirect, render
+
+from core.fanout import afan_out
+
+from . import cards, catalog, catalog_index, facets, favorites, projections, view_counting, views
+from .forms import AudioFilterForm
+from .models import Audio
+from .user_state import get_user_state
+
+User = get_user_model()
+
+arender = sync_to_async(render)
+
+
+@sync_to_async
+def _resolve_user(request):
+    """Fuerza la carga perezosa de ``request.user`` fuera del event loop"""
+    request.user.is_authenticated
+    return request.user
+
+
+def async_login_required(view):
+    """``login_required`` para vistas async"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await _resolve_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def async_require_POST(view):
+    """``require_POST`` para vistas async"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _attach_tags(audios):
+    """Equivalente async de ``prefetch_related('tags')`` (una consulta)"""
+    audios = list(audios)
+    tags_by_audio = {audio.pk: [] for audio in audios}
+    through = Audio.tags.through.objects.filter(audio_id__in=tags_by_audio).select_related('tag')
+    async for row in through:
+        tags_by_audio[row.audio_id].append(row.tag)
+
+    for audio in audios:
+        tags = audio.tags.all()
+        tags._result_cache = tags_by_audio[audio.pk]
+        tags._prefetch_done = True
+        audio._prefetched_objects_cache = {'tags': tags}
+    return audios
+
+
+async def _aget_published(queryset, slug):
+    try:
+        return await queryset.aget(slug=slug, status=Audio.Status.PUBLISHED)
+    except Audio.DoesNotExist:
+        raise Http404('No Audio matches the given query.')
+
+
+async def audio_list(request):
+    """Lista de audios con filtros y búsqueda"""
+    if catalog_index.enabled():
+        # El índice resuelve todo en memoria; no hay consultas que paralelizar
+        return await sync_to_async(views.audio_list)(request)
+
+    form = AudioFilterForm(request.GET)
+    # Los ModelChoiceField validan contra la base
+    filters = await sync_to_async(form.catalog_filters)()
+    sort_by = form.cleaned_data.get('sort_by') if form.is_valid() else None
+    published = Audio.objects.filter(status=Audio.Status.PUBLISHED)
+    search_results = catalog.restrict_queryset(published, filters)
+
+    audios = projections.Projection(cards.listing(filters, sort_by, restricted=search_results))
+
+    total, facet_counts = await asyncio.gather(
+        audios.queryset.acount(),
+        sync_to_async(facets.counts)(filters, queryset=search_results),
+    )
+
+    # Paginator solo calcula los límites; la página se lee con el ORM async
+    paginator = Paginator(range(total), 12)
+    audios_page = paginator.get_page(request.GET.get('page'))
+    audios_page.object_list = []
+    if total:
+        page_rows = audios.rows()[audios_page.start_index() - 1:audios_page.end_index()]
+        audios_page.object_list = projections.hydrate(await _alist(page_rows))
+
+    stats, _ = await asyncio.gather(
+        sync_to_async(views.listing_stats)(facet_counts),
+        sync_to_async(get_user_state(request).annotate)(audios_page.object_list),
+    )
+    context = {
+        'audios': audios_page,
+        'form': form,
+        'stats': stats,
+        'active_filters': any(filters),
+    }
+    return await arender(request, 'audios/list.html', context)
+
+
+async def audio_detail(request, slug):
+    """Detalle de un audio específico"""
+    audio = await _aget_published(
+        Audio.objects.select_related('seller', 'category', 'genre'), slug
+    )
+    # Consultas independientes entre sí; las de lectura del detalle van en
+    # hilos con conexión propia para que corran realmente en paralelo
+    _, results, user = await asyncio.gather(
+        _attach_tags([audio]),
+        afan_out(views.detail_queries(audio)),
+        _resolve_user(request),
+    )
+    related_audios = results['related_audios']
+    more_from_seller = results['more_from_seller']
+    await sync_to_async(view_counting.count_view)(request, audio)
+
+    await sync_to_async(get_user_state(request).annotate)([audio, *related_audios, *more_from_seller])
+
+    context = {
+        'audio': audio,
+        'is_favorite': audio.user_is_favorite,
+        'has_reviewed': audio.user_has_reviewed,
+        'reviews': results['reviews'],
+        'review_stats': results['review_stats'],
+        'related_audios': related_audios,
+        'more_from_seller': more_from_seller,
+        'can_review': user.is_authenticated and user.pk != audio.seller_id,
+    }
+    return await arender(request, 'audios/detail.html', context)
+
+
+@async_login_required
+@async_require_POST
+async def toggle_favorite(request, slug):
+    """Toggle de favorito para un audio"""
+    audio = await _aget_published(Audio.objects.only('id'), slug)
+
+    # El servicio usa transacciones, que el ORM async todavía no soporta
+    result = await sync_to_async(favorites.toggle_favorite)(request.user, audio.id)
+    action = 'added' if result.is_favorite else 'removed'
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({
+            'success': True,
+            'is_favorite': result.is_favorite,
+            'action': action,
+            'favorites_count': result.favorites_count
+        })
+
+    return redirect('audios:detail', slug=slug)
+
+
+@async_login_required
+async def search_suggestions(request):
+    """Sugerencias de búsqueda para autocomplete"""
+    query = request.GET.get('q', '')
+    suggestions = []
+
+    if len(query) >= 2:
+        titles, sellers = await asyncio.gather(
+            _alist(Audio.objects.filter(
+                title__icontains=query,
+                status=Audio.Status.PUBLISHED
+            ).values_list('title', flat=True)[:5]),
+            _alist(User.objects.filter(
+                Q(first_name__icontains=query) | Q(last_name__icontains=query),
+                user_type='seller'
+            ).values_list('first_name', 'last_name')[:3]),
+        )
+        suggestions.extend(titles)
+        suggestions.extend([f"{first} {last}".strip() for first, last in sellers])
+
+    return JsonResponse({'suggestions': suggestions[:8]})
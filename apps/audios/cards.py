@@ -0,0 +1,171 @@
+"""
+Tarjetas del catálogo: el modelo de lectura de los listados.
+
+Cada tarjeta del listado muestra título, portada, precio, vendedor,
+categoría, género y etiquetas. Leerlos de ``Audio`` cuesta un join con
+tres tablas más una consulta de etiquetas con su tabla intermedia por
+página. ``AudioCard`` guarda esos campos ya resueltos (nombres incluidos)
+para los audios publicados, así que una página es una consulta a una sola
+tabla con índices angostos por categoría, género, vendedor y orden.
+
+Las tarjetas se mantienen con señales (``signals.py``):
+
+- ``catalog_changed``: el audio entró o salió del catálogo, o cambió su
+  clasificación o sus etiquetas (incluye los ``QuerySet.update()``
+  envueltos en ``catalog.track()``);
+- ``post_save`` del audio cuando cambian los datos que solo muestra la
+  tarjeta (título, portada, destacado...);
+- ``post_save`` de categorías, géneros, etiquetas y vendedores, para sus
+  nombres.
+
+Los contadores (visualizaciones, descargas, favoritos) se escriben en lote
+con ``QuerySet.update()`` y no emiten señales: ``reconcile()`` (comando
+``reconcile_audio_cards``, periódico) los refresca y de paso corrige
+cualquier tarjeta que se haya desincronizado. ``trending_score`` lo copia
+``trending.recompute``.
+
+Toda escritura de una tarjeta que cambia lo publicado (no los contadores)
+queda en el registro de cambios del catálogo (``changelog.py``).
+"""
+from collections import namedtuple
+
+from . import changelog
+from .models import Audio, AudioCard
+
+# Campos copiados tal cual del audio (los demás salen de sus relaciones)
+AUDIO_FIELDS = (
+    'title', 'slug', 'price_standard', 'duration', 'is_featured', 'published_at',
+    'seller_id', 'category_id', 'genre_id',
+    'views_count', 'downloads_count', 'favorites_count', 'trending_score',
+)
+LOADED_FIELDS = (
+    'title', 'slug', 'cover_image', 'price_standard', 'duration', 'is_featured', 'published_at',
+    'views_count', 'downloads_count', 'favorites_count', 'trending_score',
+    'seller__username', 'seller__first_name', 'seller__last_name', 'category__name', 'genre__name',
+)
+UPDATE_FIELDS = (
+    'title', 'slug', 'cover', 'price_standard', 'duration', 'is_featured', 'published_at',
+    'seller', 'seller_name', 'seller_username', 'category', 'category_name', 'genre', 'genre_name', 'tags',
+    'views_count', 'downloads_count', 'favorites_count', 'trending_score',
+)
+_ATTNAMES = tuple(AudioCard._meta.get_field(field).attname for field in UPDATE_FIELDS)
+COUNTERS = ('views_count', 'downloads_count', 'favorites_count', 'trending_score')
+# Lo que publica el feed de cambios (los contadores no)
+_PUBLISHED_ATTNAMES = tuple(attname for attname in _ATTNAMES if attname not in COUNTERS)
+# Campos del audio que solo afectan a la tarjeta (el resto los cubre catalog_changed)
+DISPLAY_FIELDS = ('title', 'slug', 'cover_image', 'duration', 'is_featured', 'seller_id')
+SORTS = ('published_at', 'price_standard', 'views_count', 'downloads_count', 'favorites_count', 'trending_score')
+
+Reconciliation = namedtuple('Reconciliation', ['created', 'updated', 'removed'])
+
+
+def _tags(audio_ids):
+    """{audio_id: [{'name', 'color'}]} en una consulta"""
+    tags = {}
+    rows = Audio.tags.through.objects.filter(audio_id__in=audio_ids).order_by('tag__name')
+    for audio_id, name, color in rows.values_list('audio_id', 'tag__name', 'tag__color'):
+        tags.setdefault(audio_id, []).append({'name': name, 'color': color})
+    return tags
+
+
+def build(audio_ids):
+    """Tarjetas actualizadas de los audios publicados entre ``audio_ids`` (dos consultas)"""
+    audios = list(
+        Audio.objects.filter(pk__in=audio_ids, status=Audio.Status.PUBLISHED)
+        .select_related('seller', 'category', 'genre')
+        .only(*LOADED_FIELDS)
+    )
+    tags = _tags([audio.pk for audio in audios])
+    return {
+        audio.pk: AudioCard(
+            audio_id=audio.pk,
+            **{field: getattr(audio, field) for field in AUDIO_FIELDS},
+            cover=audio.cover_image.name or '',
+            seller_name=audio.seller.get_full_name() or audio.seller.username,
+            seller_username=audio.seller.username,
+            category_name=audio.category.name,
+            genre_name=audio.genre.name,
+            tags=tags.get(audio.pk, []),
+        )
+        for audio in audios
+    }
+
+
+def _save(cards):
+    AudioCard.objects.bulk_create(
+        cards, batch_size=200, update_conflicts=True, unique_fields=['audio'],
+        update_fields=UPDATE_FIELDS + ('updated_at',),
+    )
+
+
+def sync(audio_ids):
+    """Crea, actualiza o borra las tarjetas de ``audio_ids`` según su estado actual"""
+    audio_ids = list(audio_ids)
+    if not audio_ids:
+        return
+    cards = build(audio_ids)
+    AudioCard.objects.filter(audio_id__in=audio_ids).exclude(audio_id__in=cards.keys()).delete()
+    _save(cards.values())
+    changelog.record(changelog.Kind.AUDIO, audio_ids)
+
+
+def _values(card, attnames=_ATTNAMES):
+    return tuple(getattr(card, attname) for attname in attnames)
+
+
+def reconcile(chunk_size=500):
+    """Compara todas las tarjetas con los audios y escribe solo las diferencias"""
+    stale = list(AudioCard.objects.exclude(audio__status=Audio.Status.PUBLISHED).values_list('audio_id', flat=True))
+    removed, _ = AudioCard.objects.filter(audio_id__in=stale).delete()
+    changelog.record(changelog.Kind.AUDIO, stale)
+    created = updated = 0
+    published = Audio.objects.filter(status=Audio.Status.PUBLISHED).order_by('pk').values_list('pk', flat=True)
+    ids = list(published)
+    for offset in range(0, len(ids), chunk_size):
+        chunk = ids[offset:offset + chunk_size]
+        current = AudioCard.objects.in_bulk(chunk)
+        changed = []
+        published = []
+        for audio_id, card in build(chunk).items():
+            existing = current.get(audio_id)
+            if existing is None:
+                created += 1
+            elif _values(existing) == _values(card):
+                continue
+            else:
+                updated += 1
+            changed.append(card)
+            if existing is None or _values(existing, _PUBLISHED_ATTNAMES) != _values(card, _PUBLISHED_ATTNAMES):
+                published.append(audio_id)
+        _save(changed)
+        changelog.record(changelog.Kind.AUDIO, published)
+    return Reconciliation(created=created, updated=updated, removed=removed)
+
+
+def listing(filters, sort_by=None, restricted=None):
+    """
+    Tarjetas que cumplen los filtros del catálogo, en el orden pedido.
+
+    ``restricted`` es el queryset de audios de ``catalog.restrict_queryset``
+    (búsqueda y filtros acústicos), que se aplica como subconsulta.
+    """
+    cards = AudioCard.objects.all()
+    if restricted is not None:
+        cards = cards.filter(audio_id__in=restricted.values('pk'))
+    if filters.category_id:
+        cards = cards.filter(category_id=filters.category_id)
+    if filters.genre_id:
+        cards = cards.filter(genre_id=filters.genre_id)
+    if filters.tag_id:
+        cards = cards.filter(
+            audio_id__in=Audio.tags.through.objects.filter(tag_id=filters.tag_id).values('audio_id')
+        )
+    if filters.min_price:
+        cards = cards.filter(price_standard__gte=filters.min_price)
+    if filters.max_price:
+        cards = cards.filter(price_standard__lte=filters.max_price)
+    if sort_by and sort_by.lstrip('-') in SORTS:
+        # Se desempata por id para que el orden entre páginas sea estable
+        cards = cards.order_by(sort_by, '-audio')
+    return cards
+
@@ -0,0 +1,137 @@
+"""
+Cambios en el catálogo publicado.
+
+Un audio forma parte del catálogo mientras está publicado. Cada vez que
+entra, sale o cambia algún dato de clasificación (categoría, género,
+precio, etiquetas) se envía la señal ``catalog_changed`` con la foto
+anterior y la nueva. Los índices derivados (facetas, índices en memoria,
+etc.) se mantienen escuchando esta señal en lugar de recalcularse.
+
+Los cambios hechos con ``QuerySet.update()`` no disparan señales de
+modelo; en esos casos hay que envolver la operación con ``track()``.
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.db.models import Q
+from django.dispatch import Signal
+
+from .models import Audio
+
+# Señal enviada con audio_id, before y after (CatalogEntry o None si no está publicado)
+catalog_changed = Signal()
+
+CatalogEntry = namedtuple('CatalogEntry', [
+    'id', 'category_id', 'genre_id', 'price_standard', 'published_at', 'tag_ids',
+])
+
+ENTRY_FIELDS = ('id', 'category_id', 'genre_id', 'price_standard', 'published_at')
+
+# Filtros del listado de audios (ver AudioFilterForm.catalog_filters)
+CatalogFilters = namedtuple('CatalogFilters', [
+    'search', 'category_id', 'genre_id', 'tag_id', 'min_price', 'max_price',
+    'min_bpm', 'max_bpm', 'musical_key', 'min_loudness', 'max_loudness',
+], defaults=[None] * 11)
+
+# Filtros por análisis acústico: no tienen facetas, se resuelven con los índices de la base
+ACOUSTIC_LOOKUPS = {
+    'min_bpm': 'bpm__gte',
+    'max_bpm': 'bpm__lte',
+    'musical_key': 'musical_key',
+    'min_loudness': 'loudness_lufs__gte',
+    'max_loudness': 'loudness_lufs__lte',
+}
+
+
+def search_queryset(queryset, search):
+    """Aplica la búsqueda de texto libre"""
+    return queryset.filter(
+        Q(title__icontains=search) |
+        Q(description__icontains=search) |
+        Q(seller__first_name__icontains=search) |
+        Q(seller__last_name__icontains=search) |
+        Q(tags__name__icontains=search)
+    ).distinct()
+
+
+def acoustic_lookups(filters):
+    """Lookups de los filtros acústicos activos"""
+    return {
+        lookup: getattr(filters, name)
+        for name, lookup in ACOUSTIC_LOOKUPS.items() if getattr(filters, name) is not None
+    }
+
+
+def restrict_queryset(queryset, filters):
+    """
+    Audios que cumplen la búsqueda y los filtros acústicos, o None si no hay.
+
+    Son los filtros sin facetas: los conteos y el índice en memoria trabajan
+    sobre este subconjunto.
+    """
+    lookups = acoustic_lookups(filters)
+    if not filters.search and not lookups:
+        return None
+    if filters.search:
+        queryset = search_queryset(queryset, filters.search)
+    return queryset.filter(**lookups)
+
+
+def filter_queryset(queryset, filters):
+    """Aplica los filtros del catálogo a un queryset de audios"""
+    if filters.search:
+        queryset = search_queryset(queryset, filters.search)
+    queryset = queryset.filter(**acoustic_lookups(filters))
+    if filters.category_id:
+        queryset = queryset.filter(category_id=filters.category_id)
+    if filters.genre_id:
+        queryset = queryset.filter(genre_id=filters.genre_id)
+    if filters.tag_id:
+        queryset = queryset.filter(tags__id=filters.tag_id)
+    if filters.min_price:
+        queryset = queryset.filter(price_standard__gte=filters.min_price)
+    if filters.max_price:
+        queryset = queryset.filter(price_standard__lte=filters.max_price)
+    return queryset
+
+
+def snapshot(audio_ids):
+    """Retorna {audio_id: CatalogEntry o None} leyendo la base (dos consultas)"""
+    audio_ids = list(audio_ids)
+    entries = dict.fromkeys(audio_ids)
+    if not audio_ids:
+        return entries
+
+    rows = Audio.objects.filter(
+        pk__in=audio_ids, status=Audio.Status.PUBLISHED
+    ).values_list(*ENTRY_FIELDS)
+    rows = {row[0]: row for row in rows}
+    if not rows:
+        return entries
+
+    tag_ids = {}
+    for audio_id, tag_id in Audio.tags.through.objects.filter(
+        audio_id__in=rows
+    ).values_list('audio_id', 'tag_id'):
+        tag_ids.setdefault(audio_id, set()).add(tag_id)
+
+    for audio_id, row in rows.items():
+        entries[audio_id] = CatalogEntry(*row, tag_ids=frozenset(tag_ids.get(audio_id, ())))
+    return entries
+
+
+def notify(before, after):
+    """Envía ``catalog_changed`` para cada audio cuya foto cambió"""
+    for audio_id in before.keys() | after.keys():
+        old, new = before.get(audio_id), after.get(audio_id)
+        if old != new:
+            catalog_changed.send(sender=Audio, audio_id=audio_id, before=old, after=new)
+
+
+@contextmanager
+def track(audio_ids):
+    """Notifica los cambios hechos dentro del bloque sobre ``audio_ids``"""
+    audio_ids = list(audio_ids)
+    before = snapshot(audio_ids)
+    yield
+    notify(before, snapshot(audio_ids))
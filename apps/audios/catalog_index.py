@@ -0,0 +1,319 @@
+"""
+Índice en memoria del catálogo publicado.
+
+Guarda los ids de audios publicados en bitmaps (enteros de Python, el bit
+``n`` representa al audio con id ``n``) por categoría, género, etiqueta y
+rango de precio. Una combinación de filtros se resuelve intersectando
+bitmaps y solo los ids de la página pedida se leen de la base. Para cada
+criterio de orden se mantiene un arreglo de ids ordenado.
+
+El índice es opcional (``CATALOG_INDEX_ENABLED``), vive en cada proceso y
+se mantiene con ``catalog_changed``. Como los cambios hechos por otros
+procesos no llegan por señales, el índice se reconstruye completo cada
+``CATALOG_INDEX_REFRESH`` segundos; el mismo plazo aplica a los órdenes
+por contadores (vistas, descargas, favoritos, tendencia), que no emiten
+señales.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from . import catalog, facets, projections
+from .models import Audio
+
+# Orden "Relevancia": el listado usa el orden del modelo (-created_at), que
+# coincide con el orden de los ids
+DEFAULT_SORT = '-id'
+ENTRY_SORTS = ('id', 'published_at', 'price_standard')
+COUNTER_SORTS = ('views_count', 'downloads_count', 'favorites_count', 'trending_score')
+BUILD_CHUNK_SIZE = 2000
+
+
+def enabled():
+    return getattr(settings, 'CATALOG_INDEX_ENABLED', False)
+
+
+def _refresh():
+    return getattr(settings, 'CATALOG_INDEX_REFRESH', 300)
+
+
+def bits_of(ids):
+    """Bitmap con los ids dados"""
+    ids = list(ids)
+    data = bytearray(max(ids, default=-1) // 8 + 1)
+    for audio_id in ids:
+        data[audio_id >> 3] |= 1 << (audio_id & 7)
+    return int.from_bytes(data, 'little')
+
+
+def to_bytes(bits):
+    """Bitmap como bytes (little endian) para consultar bits en O(1)"""
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def iter_bits(bits):
+    """Ids presentes en el bitmap, de menor a mayor"""
+    for offset, byte in enumerate(to_bytes(bits)):
+        while byte:
+            lowest = byte & -byte
+            yield offset * 8 + lowest.bit_length() - 1
+            byte ^= lowest
+
+
+class CatalogIndex:
+    """Bitmaps por faceta y arreglos ordenados de los audios publicados"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.entries = {}
+        self.all = 0
+        self.categories = {}
+        self.genres = {}
+        self.tags = {}
+        self.buckets = {}
+        self._sorted = {}
+        self._sorted_at = {}
+        self.built_at = None
+
+    # Mantenimiento
+
+    def build(self):
+        """
+        Carga el índice completo desde la base.
+
+        Audios y etiquetas se leen en streaming (sin listas de ids en un
+        ``pk__in``) y cada bitmap se arma una sola vez al final a partir de
+        su lista de ids: hacer ``|=`` audio por audio copia en cada paso un
+        entero tan ancho como el id más alto (costo cuadrático).
+        """
+        published = Audio.objects.filter(status=Audio.Status.PUBLISHED)
+        tag_ids, tags = {}, {}
+        through = Audio.tags.through.objects.filter(audio__status=Audio.Status.PUBLISHED)
+        for audio_id, tag_id in through.values_list('audio_id', 'tag_id').iterator(chunk_size=BUILD_CHUNK_SIZE):
+            tag_ids.setdefault(audio_id, []).append(tag_id)
+            tags.setdefault(tag_id, []).append(audio_id)
+
+        entries, categories, genres, buckets = {}, {}, {}, {}
+        no_tags = frozenset()
+        rows = published.values_list(*catalog.ENTRY_FIELDS).iterator(chunk_size=BUILD_CHUNK_SIZE)
+        for row in rows:
+            audio_id, category_id, genre_id, price = row[:4]
+            audio_tags = tag_ids.pop(audio_id, None)
+            entries[audio_id] = catalog.CatalogEntry(*row, tag_ids=frozenset(audio_tags) if audio_tags else no_tags)
+            categories.setdefault(category_id, []).append(audio_id)
+            genres.setdefault(genre_id, []).append(audio_id)
+            buckets.setdefault(facets.price_bucket(price), []).append(audio_id)
+
+        all_bits = bits_of(entries)
+        postings = [
+            {key: bits_of(ids) for key, ids in facet.items()} for facet in (categories, genres, tags, buckets)
+        ]
+        with self._lock:
+            self._reset()
+            self.entries = entries
+            self.all = all_bits
+            self.categories, self.genres, self.tags, self.buckets = postings
+            self.built_at = time.monotonic()
+        return self
+
+    def _postings(self, entry):
+        yield self.categories, entry.category_id
+        yield self.genres, entry.genre_id
+        yield self.buckets, facets.price_bucket(entry.price_standard)
+        for tag_id in entry.tag_ids:
+            yield self.tags, tag_id
+
+    def _add(self, entry):
+        bit = 1 << entry.id
+        self.entries[entry.id] = entry
+        self.all |= bit
+        for postings, key in self._postings(entry):
+            postings[key] = postings.get(key, 0) | bit
+
+    def _remove(self, entry):
+        bit = 1 << entry.id
+        self.entries.pop(entry.id, None)
+        self.all &= ~bit
+        for postings, key in self._postings(entry):
+            remaining = postings.get(key, 0) & ~bit
+            if remaining:
+                postings[key] = remaining
+            else:
+                postings.pop(key, None)
+
+    def apply_change(self, before, after):
+        """Aplica la diferencia entre dos fotos de un audio"""
+        with self._lock:
+            if self.built_at is None:
+                return
+            if before is not None:
+                self._remove(before)
+            if after is not None:
+                self._add(after)
+            for key in ENTRY_SORTS:
+                self._sorted.pop(key, None)
+
+    def is_stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > _refresh()
+
+    # Consultas
+
+    def matching(self, filters, search_bits=None, ignore=None):
+        """Bitmap de los audios que cumplen los filtros (salvo el de ``ignore``)"""
+        bits = self.all if search_bits is None else self.all & search_bits
+        if filters.category_id and ignore != 'category':
+            bits &= self.categories.get(filters.category_id, 0)
+        if filters.genre_id and ignore != 'genre':
+            bits &= self.genres.get(filters.genre_id, 0)
+        if filters.tag_id and ignore != 'tag':
+            bits &= self.tags.get(filters.tag_id, 0)
+        if (filters.min_price or filters.max_price) and ignore != 'price':
+            bits &= self._price_range(filters.min_price, filters.max_price)
+        return bits
+
+    def counts(self, filters, search_ids=None):
+        """Conteos por faceta con popcounts; exactos también para rangos de precio"""
+        search_bits = bits_of(search_ids) if search_ids is not None else None
+
+        def popcounts(postings, ignore):
+            bits = self.matching(filters, search_bits, ignore=ignore)
+            return {key: (bits & posting).bit_count() for key, posting in postings.items()
+                    if bits & posting}
+
+        return facets.FacetCounts(
+            total=self.matching(filters, search_bits).bit_count(),
+            categories=popcounts(self.categories, 'category'),
+            genres=popcounts(self.genres, 'genre'),
+            tags=popcounts(self.tags, 'tag'),
+            price_buckets=popcounts(self.buckets, 'price'),
+            exact=True,
+        )
+
+    def _price_range(self, min_price, max_price):
+        """Rangos cubiertos completos por bitmap; los de los bordes, audio por audio"""
+        bits = 0
+        for bucket in facets.selected_buckets(min_price, max_price)[0]:
+            postings = self.buckets.get(bucket, 0)
+            low, high = facets.bucket_bounds(bucket)
+            covered = (
+                (not min_price or (low is not None and low >= min_price))
+                and (not max_price or (high is not None and high <= max_price))
+            )
+            if covered:
+                bits |= postings
+                continue
+            for audio_id in iter_bits(postings):
+                price = self.entries[audio_id].price_standard
+                if (not min_price or price >= min_price) and (not max_price or price <= max_price):
+                    bits |= 1 << audio_id
+        return bits
+
+    def sorted_ids(self, sort_by):
+        """Ids publicados en el orden pedido (``-campo`` para descendente)"""
+        key = sort_by.lstrip('-')
+        with self._lock:
+            ids = self._sorted.get(key)
+            expired = time.monotonic() - self._sorted_at.get(key, 0) > _refresh()
+            if ids is None or (key in COUNTER_SORTS and expired):
+                ids = self._sort(key)
+                self._sorted[key] = ids
+                self._sorted_at[key] = time.monotonic()
+        return reversed(ids) if sort_by.startswith('-') else iter(ids)
+
+    def _sort(self, key):
+        if key in COUNTER_SORTS:
+            values = dict(
+                Audio.objects.filter(status=Audio.Status.PUBLISHED).values_list('pk', key)
+            )
+            # Se desempata por id para que el orden entre páginas sea estable
+            return sorted(self.entries, key=lambda audio_id: (values.get(audio_id, 0), audio_id))
+        if key == 'id':
+            return sorted(self.entries)
+        return sorted(
+            self.entries,
+            key=lambda audio_id: (getattr(self.entries[audio_id], key) is None,
+                                  getattr(self.entries[audio_id], key), audio_id),
+        )
+
+    def query(self, filters, sort_by=None, search_ids=None):
+        """Resultado paginable de los audios que cumplen los filtros"""
+        sort_by = sort_by or DEFAULT_SORT
+        if sort_by.lstrip('-') not in ENTRY_SORTS + COUNTER_SORTS:
+            raise ValueError(f'Orden no soportado por el índice: {sort_by}')
+        search_bits = bits_of(search_ids) if search_ids is not None else None
+        return IndexResult(self, self.matching(filters, search_bits), sort_by)
+
+
+class IndexResult:
+    """
+    Secuencia perezosa para ``Paginator``.
+
+    ``len()`` es un popcount; al cortar una página se recorre el arreglo
+    ordenado hasta juntar los ids y se leen sus tarjetas (``Card`` de
+    ``projections``) de la base.
+    """
+
+    def __init__(self, index, bits, sort_by):
+        self.index = index
+        self.bits = bits
+        self.sort_by = sort_by
+
+    def count(self):
+        return self.bits.bit_count()
+
+    __len__ = count
+
+    def ids(self, start, stop):
+        """Ids de las posiciones [start, stop) en el orden pedido"""
+        if stop <= start:
+            return []
+        data, ids, seen = to_bytes(self.bits), [], 0
+        for audio_id in self.index.sorted_ids(self.sort_by):
+            byte = audio_id >> 3
+            if byte < len(data) and data[byte] >> (audio_id & 7) & 1:
+                if seen >= start:
+                    ids.append(audio_id)
+                    if len(ids) == stop - start:
+                        break
+                seen += 1
+        return ids
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start, stop, _ = item.indices(self.count())
+        ids = self.ids(start, stop)
+        audios = projections.by_ids(ids)
+        return [audios[audio_id] for audio_id in ids if audio_id in audios]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+_index = CatalogIndex()
+_build_lock = threading.Lock()
+
+
+def get_index():
+    """Índice del proceso, reconstruido si está vencido"""
+    if _index.is_stale():
+        with _build_lock:
+            if _index.is_stale():
+                _index.build()
+    return _index
+
+
+def apply_change(before, after):
+    """Aplica un cambio del catálogo al índice del proceso, si ya está construido"""
+    _index.apply_change(before, after)
+
+
+def warm():
+    """Construye el índice al iniciar el proceso (si está habilitado)"""
+    if enabled():
+        get_index()
+
@@ -0,0 +1,128 @@
+"""
+Registro de cambios del catálogo publicado (para el feed de sincronización).
+
+Cada escritura que cambia lo que se publica de un audio, categoría, género
+o etiqueta agrega una fila ``CatalogChange`` (tipo e id, nada más) en la
+misma transacción que el cambio: si la transacción se revierte, el cambio
+tampoco queda registrado. El feed (``apps/api/feed.py``) lee las filas
+posteriores a una marca de agua y resuelve el estado actual de cada
+objeto, así que varios cambios seguidos del mismo audio se entregan una
+vez y un objeto que ya no está publicado se entrega como baja.
+
+Quién registra:
+
+- ``cards.sync`` y ``cards.reconcile``: todo cambio de la tarjeta de un
+  audio (alta, baja, clasificación, etiquetas, título, destacado...);
+- los receivers de ``signals.py`` que renombran tarjetas con
+  ``QuerySet.update()`` (categoría, género, vendedor) y los ``post_save`` /
+  ``post_delete`` de categorías, géneros y etiquetas;
+- las acciones del admin que activan o desactivan categorías.
+
+Los contadores (visualizaciones, descargas, favoritos, tendencia) no son
+parte del feed y no se registran.
+
+Los ids se asignan al insertar pero las transacciones confirman en otro
+orden: una fila con id menor puede hacerse visible después de que un
+cliente ya avanzó su marca de agua más allá. ``settled_before()`` deja
+afuera las filas de los últimos ``CATALOG_FEED_SETTLE_SECONDS`` (y las
+que les siguen) para que las transacciones en curso terminen antes de
+entregarlas.
+
+"Asentado" se decide por ``created_at``, la hora del INSERT y no la de
+la confirmación: una transacción que sigue abierta más que la ventana
+confirma filas que un cliente ya pudo saltear. Por eso ``record()``
+controla al confirmar cuánto tardó y, si pasó la mitad de la ventana,
+vuelve a registrar los mismos objetos con ids nuevos (el feed resuelve
+el estado actual, así que entregarlos dos veces no hace daño). Si el
+proceso muere entre la confirmación y ese segundo registro, el cambio
+solo llega con la próxima modificación del objeto o una exportación.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import CatalogChange, CatalogChangelogState
+
+Kind = CatalogChange.Kind
+
+
+class ChangesPruned(Exception):
+    """La marca de agua es anterior a lo que conserva el registro: hay que volver a exportar"""
+
+
+def record(kind, object_ids):
+    """Registra que cambiaron los objetos ``object_ids`` de tipo ``kind``"""
+    object_ids = set(object_ids)
+    if not object_ids:
+        return
+    now = timezone.now()
+    CatalogChange.objects.bulk_create(
+        [CatalogChange(kind=kind, object_id=object_id, created_at=now) for object_id in sorted(object_ids)],
+        batch_size=500,
+    )
+    # Fuera de una transacción se ejecuta en el momento (y no tardó nada)
+    transaction.on_commit(lambda: _record_again_if_late(kind, object_ids, now))
+
+
+def _record_again_if_late(kind, object_ids, recorded_at):
+    """Registra de nuevo los cambios de una transacción que tardó en confirmar"""
+    window = getattr(settings, 'CATALOG_FEED_SETTLE_SECONDS', 5)
+    if timezone.now() - recorded_at > timedelta(seconds=window / 2):
+        record(kind, object_ids)
+
+
+def watermark():
+    """
+    Marca de agua para un snapshot: el último cambio asentado (los que siguen
+    pueden ser de transacciones sin confirmar y se entregan después).
+    """
+    row = CatalogChange.objects.aggregate(
+        last=Max('id'), first_unsettled=Min('id', filter=Q(created_at__gte=settled_before())),
+    )
+    if row['first_unsettled'] is not None:
+        last = row['first_unsettled'] - 1
+    else:
+        last = row['last'] or 0
+    return max(last, pruned_through())
+
+
+def pruned_through():
+    return CatalogChangelogState.objects.filter(pk=1).values_list('pruned_through', flat=True).first() or 0
+
+
+def settled_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'CATALOG_FEED_SETTLE_SECONDS', 5))
+
+
+def changes_since(since):
+    """
+    QuerySet de (id, kind, object_id) posteriores a ``since`` y ya asentados,
+    en orden. Lanza ``ChangesPruned`` si la retención ya borró parte del tramo.
+    """
+    if since < pruned_through():
+        raise ChangesPruned(since)
+    changes = CatalogChange.objects.filter(id__gt=since)
+    # Se corta en el primer cambio sin asentar para no saltear los anteriores
+    unsettled = changes.filter(created_at__gte=settled_before()).aggregate(first=Min('id'))['first']
+    if unsettled is not None:
+        changes = changes.filter(id__lt=unsettled)
+    return changes.order_by('id').values_list('id', 'kind', 'object_id')
+
+
+def prune(days=None):
+    """Borra los cambios de más de ``days`` días; retorna cuántos"""
+    if days is None:
+        days = getattr(settings, 'CATALOG_CHANGELOG_RETENTION_DAYS', 30)
+    cutoff = timezone.now() - timedelta(days=days)
+    with transaction.atomic():
+        state, _ = CatalogChangelogState.objects.select_for_update().get_or_create(pk=1)
+        last = CatalogChange.objects.filter(created_at__lt=cutoff).aggregate(last=Max('id'))['last']
+        if last is None:
+            return 0
+        deleted, _ = CatalogChange.objects.filter(id__lte=last).delete()
+        state.pruned_through = max(state.pruned_through, last)
+        state.save(update_fields=['pruned_through', 'updated_at'])
+    return deleted
@@ -0,0 +1,246 @@
+"""
+Entrega de los masters comprados y conteo de descargas.
+
+La descarga se hace en dos pasos: la vista autenticada verifica la compra
+y redirige a una URL con un token firmado de vida corta
+(``DOWNLOAD_TOKEN_MAX_AGE``); esa URL sirve el archivo sin sesión, lo que
+permite reanudar con ``Range`` desde gestores de descargas.
+
+El archivo nunca pasa por Python cuando hay un servidor adelante
+(``DOWNLOAD_BACKEND``):
+
+- ``x-accel``: nginx sirve ``DOWNLOAD_ACCEL_PREFIX`` + ruta del archivo
+  (ubicación ``internal``) y resuelve los ``Range`` él mismo.
+- ``x-sendfile``: Apache/lighttpd con mod_xsendfile.
+- ``django``: ``FileResponse``, que los servidores WSGI envían con
+  ``sendfile()``. Los ``Range`` abiertos (``bytes=N-``, el caso de
+  reanudar) solo posicionan el archivo; los acotados se leen por partes.
+
+Si el token pide otro formato (``?formato=`` en la vista) se entrega el
+derivado de ``transcoding``, que vive en la caché bajo ``MEDIA_ROOT``.
+
+Cada descarga (no las reanudaciones) agrega un ``DownloadEvent``.
+``flush_download_counts()`` los suma a ``Audio.downloads_count`` en lote.
+"""
+import mimetypes
+import os
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import TruncHour
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.encoding import escape_uri_path
+
+from apps.analytics import tracking
+from apps.analytics.models import EventKind
+
+from . import transcoding, trending
+from .models import Audio, AudioPurchase, DownloadCounterState, DownloadEvent
+from .monitoring import DOWNLOADS_FLUSHED
+
+TOKEN_SALT = 'apps.audios.downloads'
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+DownloadGrant = namedtuple('DownloadGrant', ['audio_id', 'user_id', 'purchase_id', 'fmt'], defaults=[None])
+
+
+class RangeNotSatisfiable(Exception):
+    """El rango pedido está fuera del archivo"""
+
+
+def purchase(user, audio, license=Audio.License.STANDARD):
+    """Registra la compra de una licencia al precio actual (idempotente)"""
+    price = audio.get_price_for_license(license)
+    if price is None:
+        raise ValueError(f'El audio no ofrece la licencia {license}')
+    record, created = AudioPurchase.objects.get_or_create(
+        user=user, audio=audio, license=license, defaults={'price': price}
+    )
+    if created:
+        tracking.track(EventKind.PURCHASE, audio.pk, user.pk, amount=price)
+    return record
+
+
+def purchase_for(user, audio):
+    """Compra que habilita la descarga (la licencia más alta); None si no compró"""
+    ranking = {value: index for index, value in enumerate(Audio.License.values)}
+    purchases = AudioPurchase.objects.filter(user=user, audio=audio)
+    return max(purchases, key=lambda purchase: ranking[purchase.license], default=None)
+
+
+def make_token(audio, user, purchase=None, fmt=None):
+    """Token firmado que habilita la descarga durante ``DOWNLOAD_TOKEN_MAX_AGE``"""
+    return signing.dumps(
+        [audio.pk, user.pk, purchase.pk if purchase else None, fmt], salt=TOKEN_SALT, compress=True
+    )
+
+
+def read_token(token):
+    """Retorna el DownloadGrant del token; lanza ``signing.BadSignature`` si no es válido"""
+    max_age = getattr(settings, 'DOWNLOAD_TOKEN_MAX_AGE', 300)
+    return DownloadGrant(*signing.loads(token, salt=TOKEN_SALT, max_age=max_age))
+
+
+def parse_range(header, size):
+    """
+    Interpreta un header ``Range`` de un solo rango.
+
+    Retorna (inicio, fin) inclusivos, o None si no hay rango utilizable (se
+    responde el archivo completo).
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Sufijo: los últimos N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _read_range(file, length):
+    with file:
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(audio, range_header=None, fmt=None):
+    """
+    Respuesta que entrega el master del audio según ``DOWNLOAD_BACKEND``.
+
+    Con ``fmt`` entrega el derivado en ese formato (ver ``transcoding``);
+    puede lanzar ``transcoding.TranscodeError``.
+    """
+    field = audio.audio_file
+    filename = os.path.basename(field.name)
+    path = field.path
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    backend = getattr(settings, 'DOWNLOAD_BACKEND', 'django')
+    file = None
+    if fmt:
+        output = transcoding.FORMATS[fmt]
+        if backend in ('x-accel', 'x-sendfile'):
+            path = str(transcoding.transcode(audio, fmt))
+        else:
+            # Abierto ya: otro proceso puede desalojarlo de la caché antes de leerlo
+            file = transcoding.open_transcoded(audio, fmt)
+            path = file.name
+        filename = f'{os.path.splitext(filename)[0]}.{output.extension}'
+        content_type = output.content_type
+
+    if backend in ('x-accel', 'x-sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if backend == 'x-accel':
+            prefix = getattr(settings, 'DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+            name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+            response['X-Accel-Redirect'] = escape_uri_path(prefix.rstrip('/') + '/' + name)
+        else:
+            response['X-Sendfile'] = path
+        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{escape_uri_path(filename)}"
+        return response
+
+    if file is None:
+        file = open(path, 'rb')
+    size = os.fstat(file.fileno()).st_size
+    try:
+        byte_range = parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(file, as_attachment=True, filename=filename, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        if end == size - 1:
+            # FileResponse toma el largo desde la posición actual: sigue siendo sendfile()
+            response = FileResponse(
+                file, as_attachment=True, filename=filename, content_type=content_type, status=206
+            )
+        else:
+            response = StreamingHttpResponse(
+                _read_range(file, end - start + 1), status=206, content_type=content_type,
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Disposition'] = f"attachment; filename*=UTF-8''{escape_uri_path(filename)}"
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def is_new_download(request):
+    """Las reanudaciones (Range que no empieza en 0) no cuentan como descarga"""
+    if request.method != 'GET':
+        return False
+    match = RANGE_RE.match(request.headers.get('Range', ''))
+    return not match or match.group(1) == '0' or match.groups() == ('', '')
+
+
+def record_download(grant, ip_address=None):
+    """Agrega el evento de descarga (una inserción, sin tocar el contador)"""
+    DownloadEvent.objects.create(
+        audio_id=grant.audio_id,
+        user_id=grant.user_id,
+        purchase_id=grant.purchase_id,
+        ip_address=ip_address,
+    )
+    tracking.track(EventKind.DOWNLOAD, grant.audio_id, grant.user_id)
+
+
+def flush_download_counts(lag=timedelta(seconds=10)):
+    """
+    Suma a ``downloads_count`` los eventos nuevos desde la última pasada.
+
+    Solo toma eventos con más de ``lag`` de antigüedad, para no saltear ids
+    de inserciones que todavía no se confirmaron. Retorna los eventos sumados.
+    """
+    with transaction.atomic():
+        state, _ = DownloadCounterState.objects.select_for_update().get_or_create(pk=1)
+        events = DownloadEvent.objects.filter(
+            pk__gt=state.last_event_id, created_at__lte=timezone.now() - lag
+        )
+        last_id = events.aggregate(last=Max('id'))['last']
+        if last_id is None:
+            return 0
+
+        counts = dict(
+            DownloadEvent.objects.filter(pk__gt=state.last_event_id, pk__lte=last_id)
+            .order_by().values_list('audio_id').annotate(total=Count('id'))
+        )
+        audios_by_count = {}
+        for audio_id, count in counts.items():
+            audios_by_count.setdefault(count, []).append(audio_id)
+        for count, audio_ids in audios_by_count.items():
+            Audio.objects.filter(pk__in=audio_ids).update(downloads_count=F('downloads_count') + count)
+
+        # Las mismas descargas, por hora, para el ranking de tendencias
+        hourly = (
+            DownloadEvent.objects.filter(pk__gt=state.last_event_id, pk__lte=last_id)
+            .order_by().values_list('audio_id', TruncHour('created_at')).annotate(total=Count('id'))
+        )
+        trending.record_many({(audio_id, hour): total for audio_id, hour, total in hourly}, 'downloads')
+
+        state.last_event_id = last_id
+        state.save(update_fields=['last_event_id', 'updated_at'])
+    DOWNLOADS_FLUSHED.inc(sum(counts.values()))
+    return sum(counts.values())
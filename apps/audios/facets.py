@@ -0,0 +1,233 @@
+"""
+Facetas del catálogo (conteos de la barra lateral).
+
+Los conteos de audios publicados se guardan precalculados en
+``FacetCount`` (categoría × género × rango de precio) y ``TagFacetCount``
+(lo mismo por etiqueta). Son tablas chicas: una combinación por fila con
+al menos un audio. Se actualizan con deltas al recibir ``catalog_changed``
+y ``rebuild()`` las regenera desde cero. Un delta que dejaría un conteo
+negativo (deltas perdidos o aplicados dos veces) lo deja en 0 y se
+registra en el log: hay que ejecutar ``rebuild_facets``.
+
+``counts()`` responde "cuántos audios hay por faceta dados los filtros
+actuales" con una lectura de esas tablas (cacheada) y una pasada en
+memoria. Cada dimensión se cuenta aplicando los filtros de las demás,
+para que la barra lateral muestre las alternativas disponibles.
+"""
+import logging
+from bisect import bisect_right
+from collections import Counter, namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from .models import Audio, FacetCount, TagFacetCount
+from .monitoring import cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Límites de los rangos de precio: el rango i es [PRICE_EDGES[i-1], PRICE_EDGES[i])
+PRICE_EDGES = (Decimal('5'), Decimal('10'), Decimal('25'), Decimal('50'), Decimal('100'))
+PRICE_BUCKET_LABELS = (
+    'Menos de $5', '$5 a $10', '$10 a $25', '$25 a $50', '$50 a $100', '$100 o más',
+)
+
+CUBE_CACHE_KEY = 'audios:facets:cube'
+
+FacetCounts = namedtuple('FacetCounts', [
+    'total', 'categories', 'genres', 'tags', 'price_buckets', 'exact',
+])
+
+
+def price_bucket(price):
+    """Índice del rango de precio al que pertenece ``price``"""
+    return bisect_right(PRICE_EDGES, price)
+
+
+def bucket_bounds(bucket):
+    """Retorna (mínimo, máximo) del rango; ``None`` si no tiene límite"""
+    low = PRICE_EDGES[bucket - 1] if bucket > 0 else None
+    high = PRICE_EDGES[bucket] if bucket < len(PRICE_EDGES) else None
+    return low, high
+
+
+def selected_buckets(min_price, max_price):
+    """
+    Rangos que se superponen con [min_price, max_price].
+
+    Retorna (rangos, exacto). ``exacto`` es False si algún límite no coincide
+    con un borde de rango: los conteos son entonces una aproximación.
+    """
+    if min_price is None and max_price is None:
+        return None, True
+
+    buckets = set()
+    for bucket in range(len(PRICE_EDGES) + 1):
+        low, high = bucket_bounds(bucket)
+        if max_price is not None and low is not None and low > max_price:
+            continue
+        if min_price is not None and high is not None and high <= min_price:
+            continue
+        buckets.add(bucket)
+
+    # Un mínimo en un borde no corta ningún rango; cualquier máximo sí
+    exact = max_price is None and (min_price == 0 or min_price in PRICE_EDGES)
+    return buckets, exact
+
+
+def _bucket_expression(field):
+    return Case(
+        *[When(**{f'{field}__lt': edge}, then=Value(index)) for index, edge in enumerate(PRICE_EDGES)],
+        default=Value(len(PRICE_EDGES)),
+        output_field=IntegerField(),
+    )
+
+
+def _keys(entry):
+    bucket = price_bucket(entry.price_standard)
+    yield None, entry.category_id, entry.genre_id, bucket
+    for tag_id in entry.tag_ids:
+        yield tag_id, entry.category_id, entry.genre_id, bucket
+
+
+def _bump(key, delta):
+    tag_id, category_id, genre_id, bucket = key
+    cell = {'category_id': category_id, 'genre_id': genre_id, 'price_bucket': bucket}
+    model = FacetCount
+    if tag_id is not None:
+        model = TagFacetCount
+        cell['tag_id'] = tag_id
+
+    rows = model.objects.filter(**cell)
+    if delta < 0:
+        # Nunca por debajo de 0 ni creando filas: sería una faceta fantasma
+        if rows.filter(count__gte=-delta).update(count=F('count') + delta):
+            return
+        rows.update(count=0)
+        logger.warning('Conteo de facetas desincronizado en %s (delta %s): ejecutar rebuild_facets', key, delta)
+        return
+
+    if rows.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=delta, **cell)
+    except IntegrityError:
+        # Otra transacción creó la fila al mismo tiempo
+        rows.update(count=F('count') + delta)
+
+
+def apply_change(before, after):
+    """Ajusta los conteos con la diferencia entre dos fotos del catálogo"""
+    deltas = Counter()
+    for entry, sign in ((before, -1), (after, 1)):
+        if entry is not None:
+            for key in _keys(entry):
+                deltas[key] += sign
+
+    for key, delta in deltas.items():
+        if delta:
+            _bump(key, delta)
+    cache.delete(CUBE_CACHE_KEY)
+
+
+def _cube_from_queryset(audios):
+    """Filas (categoría, género, rango, cantidad) y las mismas por etiqueta"""
+    rows = list(
+        audios.order_by()
+        .annotate(bucket=_bucket_expression('price_standard'))
+        .values_list('category_id', 'genre_id', 'bucket')
+        .annotate(total=Count('id'))
+    )
+    tag_rows = list(
+        Audio.tags.through.objects.filter(audio__in=audios.values('pk'))
+        .order_by()
+        .annotate(bucket=_bucket_expression('audio__price_standard'))
+        .values_list('tag_id', 'audio__category_id', 'audio__genre_id', 'bucket')
+        .annotate(total=Count('id'))
+    )
+    return rows, tag_rows
+
+
+def _cube():
+    cube = cache.get(CUBE_CACHE_KEY)
+    cache_lookup('facets', cube is not None)
+    if cube is None:
+        rows = list(
+            FacetCount.objects.filter(count__gt=0)
+            .values_list('category_id', 'genre_id', 'price_bucket', 'count')
+        )
+        tag_rows = list(
+            TagFacetCount.objects.filter(count__gt=0)
+            .values_list('tag_id', 'category_id', 'genre_id', 'price_bucket', 'count')
+        )
+        cube = (rows, tag_rows)
+        cache.set(CUBE_CACHE_KEY, cube, getattr(settings, 'FACETS_CACHE_TIMEOUT', 60))
+    return cube
+
+
+def counts(filters, queryset=None):
+    """
+    Conteos por faceta dados los filtros (un ``CatalogFilters``).
+
+    Si se pasa ``queryset`` (p. ej. el resultado de una búsqueda de texto),
+    los conteos se calculan sobre esos audios en lugar de las tablas.
+    """
+    if queryset is None:
+        rows, tag_rows = _cube()
+    else:
+        rows, tag_rows = _cube_from_queryset(Audio.objects.filter(pk__in=queryset.values('pk')))
+    buckets, exact = selected_buckets(filters.min_price, filters.max_price)
+
+    def matches(category_id, genre_id, bucket):
+        return (
+            not filters.category_id or category_id == filters.category_id,
+            not filters.genre_id or genre_id == filters.genre_id,
+            buckets is None or bucket in buckets,
+        )
+
+    base = rows
+    if filters.tag_id:
+        base = [row[1:] for row in tag_rows if row[0] == filters.tag_id]
+
+    total = 0
+    categories, genres, price_buckets, tags = Counter(), Counter(), Counter(), Counter()
+    for category_id, genre_id, bucket, count in base:
+        by_category, by_genre, by_price = matches(category_id, genre_id, bucket)
+        if by_genre and by_price:
+            categories[category_id] += count
+        if by_category and by_price:
+            genres[genre_id] += count
+        if by_category and by_genre:
+            price_buckets[bucket] += count
+        if by_category and by_genre and by_price:
+            total += count
+
+    for tag_id, category_id, genre_id, bucket, count in tag_rows:
+        if all(matches(category_id, genre_id, bucket)):
+            tags[tag_id] += count
+
+    return FacetCounts(total, categories, genres, tags, price_buckets, exact)
+
+
+def rebuild():
+    """Regenera las tablas de facetas desde los audios publicados"""
+    published = Audio.objects.filter(status=Audio.Status.PUBLISHED)
+    rows, tag_rows = _cube_from_queryset(published)
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        TagFacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create([
+            FacetCount(category_id=category_id, genre_id=genre_id, price_bucket=bucket, count=count)
+            for category_id, genre_id, bucket, count in rows
+        ])
+        TagFacetCount.objects.bulk_create([
+            TagFacetCount(tag_id=tag_id, category_id=category_id, genre_id=genre_id,
+                          price_bucket=bucket, count=count)
+            for tag_id, category_id, genre_id, bucket, count in tag_rows
+        ])
+    cache.delete(CUBE_CACHE_KEY)
+    return len(rows), len(tag_rows)
@@ -0,0 +1,163 @@
+"""
+Servicio de favoritos.
+
+Centraliza el alta/baja de favoritos y el mantenimiento de
+``Audio.favorites_count``. Los contadores se ajustan con deltas en SQL
+(``F()``) dentro de la misma transacción que modifica la relación, por lo
+que no se pierden incrementos con peticiones concurrentes. La actividad de
+``trending`` se suma después de confirmar (``on_commit``), fuera de esa
+transacción, para que siga siendo corta.
+"""
+from collections import namedtuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.analytics import tracking
+from apps.analytics.models import EventKind
+
+from . import trending
+from .models import Audio, AudioFavorite
+
+FavoriteResult = namedtuple('FavoriteResult', ['is_favorite', 'favorites_count'])
+
+
+def _supports_update_returning():
+    """
+    PostgreSQL y SQLite >= 3.35 soportan ``UPDATE ... RETURNING``. No sale de
+    ``can_return_columns_from_insert``: MariaDB lo activa (INSERT ... RETURNING)
+    pero no acepta RETURNING en un UPDATE.
+    """
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 35)
+
+
+def _current_count(audio_id):
+    return Audio.objects.filter(pk=audio_id).values_list('favorites_count', flat=True).first() or 0
+
+
+def _apply_delta(audio_id, delta):
+    """Aplica el delta al contador y retorna el valor actualizado"""
+    if _supports_update_returning():
+        table = connection.ops.quote_name(Audio._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET favorites_count = favorites_count + %s '
+                f'WHERE id = %s RETURNING favorites_count',
+                [delta, audio_id],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+    Audio.objects.filter(pk=audio_id).update(favorites_count=F('favorites_count') + delta)
+    return _current_count(audio_id)
+
+
+def _bulk_apply_delta(counts_by_audio, sign):
+    """Ajusta varios contadores agrupando los audios por delta"""
+    audios_by_delta = {}
+    for audio_id, count in counts_by_audio.items():
+        audios_by_delta.setdefault(count, []).append(audio_id)
+
+    for count, audio_ids in audios_by_delta.items():
+        Audio.objects.filter(pk__in=audio_ids).update(
+            favorites_count=F('favorites_count') + sign * count
+        )
+
+
+def toggle_favorite(user, audio_id):
+    """
+    Agrega o quita el audio de los favoritos del usuario.
+
+    Quitar cuesta dos sentencias (DELETE + UPDATE del contador); agregar
+    suma el INSERT. Retorna el estado final y el contador ya actualizado.
+    """
+    try:
+        with transaction.atomic():
+            removed, _ = AudioFavorite.objects.filter(user=user, audio_id=audio_id).delete()
+            if removed:
+                return FavoriteResult(False, _apply_delta(audio_id, -removed))
+
+            AudioFavorite.objects.create(user=user, audio_id=audio_id)
+            transaction.on_commit(lambda: trending.record(audio_id, 'favorites'))
+            tracking.track(EventKind.FAVORITE, audio_id, user.pk)
+            return FavoriteResult(True, _apply_delta(audio_id, 1))
+    except IntegrityError:
+        # Otra petición del mismo usuario agregó el favorito en paralelo
+        return FavoriteResult(True, _current_count(audio_id))
+
+
+def add_favorites(user, audio_ids):
+    """Marca varios audios como favoritos. Retorna los ids agregados."""
+    audio_ids = set(audio_ids)
+    if not audio_ids:
+        return set()
+
+    with transaction.atomic():
+        new_ids = set()
+        for audio_id in audio_ids - favorite_ids(user, audio_ids):
+            # Uno por uno: solo cuentan las filas que insertó esta petición, no
+            # las que otra agregó entre la lectura y el INSERT
+            try:
+                with transaction.atomic():
+                    AudioFavorite.objects.create(user=user, audio_id=audio_id)
+            except IntegrityError:
+                continue
+            new_ids.add(audio_id)
+        Audio.objects.filter(pk__in=new_ids).update(favorites_count=F('favorites_count') + 1)
+        hour = trending.hour_of(timezone.now())
+        transaction.on_commit(
+            lambda: trending.record_many({(audio_id, hour): 1 for audio_id in new_ids}, 'favorites')
+        )
+        for audio_id in new_ids:
+            tracking.track(EventKind.FAVORITE, audio_id, user.pk)
+    return new_ids
+
+
+def remove_favorites(queryset):
+    """Elimina los favoritos del queryset descontando los contadores afectados"""
+    with transaction.atomic():
+        counts = dict(
+            queryset.order_by().values_list('audio_id').annotate(total=Count('id'))
+        )
+        queryset.delete()
+        _bulk_apply_delta(counts, -1)
+    return sum(counts.values())
+
+
+def is_favorite(user, audio_id):
+    """Indica si un audio está en los favoritos del usuario"""
+    if not user.is_authenticated:
+        return False
+    return AudioFavorite.objects.filter(user=user, audio_id=audio_id).exists()
+
+
+def favorite_ids(user, audio_ids):
+    """Retorna el subconjunto de ``audio_ids`` marcado como favorito (una consulta)"""
+    audio_ids = list(audio_ids)
+    if not user.is_authenticated or not audio_ids:
+        return set()
+    return set(
+        AudioFavorite.objects.filter(user=user, audio_id__in=audio_ids)
+        .values_list('audio_id', flat=True)
+    )
+
+
+def recount_favorites(audio_ids=None):
+    """Recalcula los contadores desde la tabla de favoritos (reconciliación)"""
+    totals = (
+        AudioFavorite.objects.filter(audio=OuterRef('pk'))
+        .order_by()
+        .values('audio')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    audios = Audio.objects.all()
+    if audio_ids is not None:
+        audios = audios.filter(pk__in=audio_ids)
+    return audios.update(
+        favorites_count=Coalesce(Subquery(totals, output_field=IntegerField()), Value(0))
+    )
@@ -0,0 +1,168 @@
+"""
+Huellas acústicas para detectar audios duplicados.
+
+- Copias exactas: otro audio con el mismo ``content_hash`` (SHA-256 del
+  archivo). Se marcan al guardar, sin análisis.
+- Casi duplicados (el mismo audio recodificado, recortado o con otro
+  volumen): landmarks al estilo de los sistemas de identificación musical.
+  Se buscan los picos del espectrograma (máximos locales de la banda
+  300-5000 Hz) y cada pico se empareja con los siguientes: ``(f1, f2, Δt)``
+  forma un hash de 24 bits que no depende del volumen ni del códec.
+
+Los hashes se guardan en ``FingerprintHash`` (índice por hash). Para una
+subida se consultan a lo sumo ``QUERY_HASHES`` de sus hashes en una sola
+consulta indexada; los aciertos de un mismo audio que coinciden en el
+desfasaje (instante en el catálogo - instante en la subida) indican la
+misma grabación. El costo depende de cuántos audios comparten esos hashes,
+no del tamaño del catálogo.
+
+Las coincidencias quedan como ``DuplicateCandidate`` para la cola de
+moderación (ver el admin de audios).
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import Audio, DuplicateCandidate, FingerprintHash
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy solo se detectan copias exactas
+    np = None
+
+BAND = (300, 5000)
+TIME_DECIMATION = 4
+PEAK_NEIGHBOURHOOD = (7, 15)  # frames x bins
+PEAKS_PER_SECOND = 8
+FAN_OUT = 5
+MAX_DT = 63
+MAX_HASHES = 3000
+QUERY_HASHES = 500
+MIN_ALIGNED = 8
+NEAR_THRESHOLD = 0.1
+
+
+def reduce(magnitude, freqs):
+    """Espectrograma para huellas: banda útil y ``TIME_DECIMATION`` frames promediados"""
+    band = (freqs >= BAND[0]) & (freqs <= BAND[1])
+    frames = len(magnitude) // TIME_DECIMATION * TIME_DECIMATION
+    return magnitude[:frames, band].reshape(-1, TIME_DECIMATION, band.sum()).mean(axis=1)
+
+
+def _normalize(spectrogram):
+    """En dB relativos al máximo, con piso de -60 dB: no depende del volumen"""
+    peak = spectrogram.max()
+    if peak <= 0:
+        return np.full(spectrogram.shape, -60.0)
+    return 20 * np.log10(np.maximum(spectrogram / peak, 1e-3))
+
+
+def _local_max(spectrogram):
+    """Máximo en la vecindad de cada celda (filtro separable: tiempo y después frecuencia)"""
+    time_size, freq_size = PEAK_NEIGHBOURHOOD
+    padded = np.pad(spectrogram, ((time_size // 2,) * 2, (0, 0)), constant_values=-np.inf)
+    by_time = np.lib.stride_tricks.sliding_window_view(padded, time_size, axis=0).max(axis=-1)
+    padded = np.pad(by_time, ((0, 0), (freq_size // 2,) * 2), constant_values=-np.inf)
+    return np.lib.stride_tricks.sliding_window_view(padded, freq_size, axis=1).max(axis=-1)
+
+
+def landmarks(spectrogram, frame_rate):
+    """Matriz uint32 (N, 2) de (hash, instante) a partir del espectrograma reducido"""
+    if not len(spectrogram):
+        return np.zeros((0, 2), dtype=np.uint32)
+    spectrogram = _normalize(spectrogram)
+    is_peak = (spectrogram == _local_max(spectrogram)) & (spectrogram > spectrogram.mean())
+    times, bins = np.nonzero(is_peak)
+    strength = spectrogram[times, bins]
+
+    # Los picos más fuertes, a lo sumo PEAKS_PER_SECOND en promedio
+    limit = max(int(PEAKS_PER_SECOND * len(spectrogram) / (frame_rate / TIME_DECIMATION)), 1)
+    if len(times) > limit:
+        keep = np.argpartition(-strength, limit - 1)[:limit]
+        times, bins = times[keep], bins[keep]
+    order = np.lexsort((bins, times))
+    times, bins = times[order], bins[order]
+
+    pairs = []
+    for step in range(1, FAN_OUT + 1):
+        anchor, target = slice(None, -step), slice(step, None)
+        dt = times[target] - times[anchor]
+        valid = (dt >= 1) & (dt <= MAX_DT)
+        hashes = (bins[anchor][valid] << 15) | (bins[target][valid] << 6) | dt[valid]
+        pairs.append(np.column_stack([hashes, times[anchor][valid]]))
+    result = np.concatenate(pairs).astype(np.uint32) if pairs else np.zeros((0, 2), dtype=np.uint32)
+    return result[np.argsort(result[:, 1], kind='stable')]
+
+
+def _spread(items, limit):
+    """Hasta ``limit`` elementos repartidos a lo largo de toda la lista"""
+    if len(items) <= limit:
+        return list(items)
+    step = len(items) / limit
+    return [items[int(index * step)] for index in range(limit)]
+
+
+def index(audio_id, fingerprint):
+    """Reemplaza los hashes del audio y registra los casi duplicados que encuentre"""
+    rows = [tuple(row) for row in np.frombuffer(fingerprint, dtype=np.uint32).reshape(-1, 2).tolist()]
+    rows = _spread(rows, MAX_HASHES)
+    matches = find_matches(audio_id, rows)
+    with transaction.atomic():
+        FingerprintHash.objects.filter(audio_id=audio_id).delete()
+        FingerprintHash.objects.bulk_create(
+            [FingerprintHash(hash=hash_value, audio_id=audio_id, offset=offset) for hash_value, offset in rows],
+            batch_size=1000,
+        )
+        for match_id, score in matches:
+            flag(audio_id, match_id, DuplicateCandidate.Kind.NEAR, score)
+    return matches
+
+
+def find_matches(audio_id, rows):
+    """[(audio_id, score)] de los audios con suficientes hashes alineados en el tiempo"""
+    sample = _spread(rows, QUERY_HASHES)
+    if not sample:
+        return []
+    offsets = defaultdict(list)
+    for hash_value, offset in sample:
+        offsets[hash_value].append(offset)
+
+    aligned = Counter()
+    hits = FingerprintHash.objects.filter(hash__in=list(offsets)).exclude(audio_id=audio_id)
+    for hash_value, match_id, offset in hits.values_list('hash', 'audio_id', 'offset').iterator():
+        for query_offset in offsets[hash_value]:
+            aligned[match_id, offset - query_offset] += 1
+
+    # Los picos pueden correrse un frame entre versiones: se suman desfasajes vecinos
+    best = {}
+    for (match_id, delta), count in aligned.items():
+        count += aligned.get((match_id, delta + 1), 0)
+        best[match_id] = max(best.get(match_id, 0), count)
+    matches = [
+        (match_id, count / len(sample)) for match_id, count in best.items()
+        if count >= MIN_ALIGNED and count / len(sample) >= NEAR_THRESHOLD
+    ]
+    return sorted(matches, key=lambda match: -match[1])
+
+
+def flag(audio_id, match_id, kind, score):
+    """Crea o actualiza el candidato; una copia exacta no se degrada a casi duplicado"""
+    candidate, created = DuplicateCandidate.objects.get_or_create(
+        audio_id=audio_id, match_id=match_id, defaults={'kind': kind, 'score': score}
+    )
+    if not created and candidate.kind != DuplicateCandidate.Kind.EXACT:
+        candidate.kind, candidate.score = kind, score
+        candidate.save(update_fields=['kind', 'score'])
+    return candidate
+
+
+def flag_exact(audio):
+    """Marca los audios que ya existían con el mismo contenido"""
+    if not audio.content_hash:
+        return []
+    matches = list(
+        Audio.objects.filter(content_hash=audio.content_hash).exclude(pk=audio.pk).values_list('pk', flat=True)
+    )
+    for match_id in matches:
+        flag(audio.pk, match_id, DuplicateCandidate.Kind.EXACT, 1.0)
+    return matches
@@ -1,6 +1,9 @@
 from django import forms
 from django.core.exceptions import ValidationError
-from .models import Audio, Category, Genre, Tag, AudioReview, AudioPlaylist
+from django.core.files.uploadedfile import UploadedFile
+from .models import MUSICAL_KEY_CHOICES, Audio, Category, Genre, Tag, AudioReview, AudioPlaylist
+from .catalog import CatalogFilters
+from .upload_validation import InvalidAudio, validate_upload
 
 
 class AudioUploadForm(forms.ModelForm):
@@ -91,16 +94,12 @@ class AudioUploadForm(forms.ModelForm):
         
     def clean_audio_file(self):
         audio_file = self.cleaned_data.get('audio_file')
-        if audio_file:
-            # Validar tamaño máximo (50MB)
-            if audio_file.size > 50 * 1024 * 1024:
-                raise ValidationError('El archivo de audio no puede superar los 50MB.')
-            
-            # Validar extensión
-            allowed_extensions = ['mp3', 'wav', 'flac', 'aac', 'ogg']
-            extension = audio_file.name.split('.')[-1].lower()
-            if extension not in allowed_extensions:
-                raise ValidationError(f'Formato no permitido. Use: {", ".join(allowed_extensions)}')
+        if isinstance(audio_file, UploadedFile):
+            # Contenido real (magic bytes y cabecera), no solo tamaño y extensión
+            try:
+                self.instance.media_info = validate_upload(audio_file)
+            except InvalidAudio as e:
+                raise ValidationError(str(e))
         
         return audio_file
     
@@ -185,6 +184,15 @@ class AudioFilterForm(forms.Form):
             'class': 'select select-bordered w-full'
         })
     )
+    tag = forms.ModelChoiceField(
+        queryset=Tag.objects.all(),
+        required=False,
+        to_field_name='slug',
+        empty_label='Todas las etiquetas',
+        widget=forms.Select(attrs={
+            'class': 'select select-bordered w-full'
+        })
+    )
     min_price = forms.DecimalField(
         required=False,
         min_value=0,
@@ -203,6 +211,47 @@ class AudioFilterForm(forms.Form):
             'step': '0.01'
         })
     )
+    min_bpm = forms.IntegerField(
+        required=False,
+        min_value=1,
+        widget=forms.NumberInput(attrs={
+            'class': 'input input-bordered w-full',
+            'placeholder': 'BPM mín.'
+        })
+    )
+    max_bpm = forms.IntegerField(
+        required=False,
+        min_value=1,
+        widget=forms.NumberInput(attrs={
+            'class': 'input input-bordered w-full',
+            'placeholder': 'BPM máx.'
+        })
+    )
+    musical_key = forms.TypedChoiceField(
+        required=False,
+        coerce=int,
+        empty_value=None,
+        choices=[('', 'Todas las tonalidades')] + MUSICAL_KEY_CHOICES,
+        widget=forms.Select(attrs={
+            'class': 'select select-bordered w-full'
+        })
+    )
+    min_loudness = forms.IntegerField(
+        required=False,
+        max_value=0,
+        widget=forms.NumberInput(attrs={
+            'class': 'input input-bordered w-full',
+            'placeholder': 'LUFS mín.'
+        })
+    )
+    max_loudness = forms.IntegerField(
+        required=False,
+        max_value=0,
+        widget=forms.NumberInput(attrs={
+            'class': 'input input-bordered w-full',
+            'placeholder': 'LUFS máx.'
+        })
+    )
     sort_by = forms.ChoiceField(
         required=False,
         choices=[
@@ -211,6 +260,7 @@ class AudioFilterForm(forms.Form):
             ('published_at', 'Más antiguos'),
             ('price_standard', 'Precio: menor a mayor'),
             ('-price_standard', 'Precio: mayor a menor'),
+            ('-trending_score', 'Tendencias'),
             ('-views_count', 'Más populares'),
             ('-downloads_count', 'Más descargados'),
             ('-favorites_count', 'Más favoritos'),
@@ -219,6 +269,25 @@ class AudioFilterForm(forms.Form):
             'class': 'select select-bordered w-full'
         })
     )
+    
+    def catalog_filters(self):
+        """Filtros activos como CatalogFilters (vacío si el formulario no es válido)"""
+        if not self.is_valid():
+            return CatalogFilters()
+        data = self.cleaned_data
+        return CatalogFilters(
+            search=data.get('search') or None,
+            category_id=data['category'].pk if data.get('category') else None,
+            genre_id=data['genre'].pk if data.get('genre') else None,
+            tag_id=data['tag'].pk if data.get('tag') else None,
+            min_price=data.get('min_price') or None,
+            max_price=data.get('max_price') or None,
+            min_bpm=data.get('min_bpm'),
+            max_bpm=data.get('max_bpm'),
+            musical_key=data.get('musical_key'),
+            min_loudness=data.get('min_loudness'),
+            max_loudness=data.get('max_loudness'),
+        )
 
 
 class AudioReviewForm(forms.ModelForm):
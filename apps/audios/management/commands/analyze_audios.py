@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.audios import analysis
+from apps.audios.models import Audio
+
+
+class Command(BaseCommand):
+    help = 'Calcula BPM, tonalidad, sonoridad y pico de los audios (por defecto, los no analizados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Reanalizar también los ya analizados')
+        parser.add_argument('--workers', type=int, default=None, help='Procesos en paralelo')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if not analysis.available():
+            raise CommandError('El análisis acústico requiere NumPy.')
+
+        audios = Audio.objects.exclude(audio_file='').only('id', 'audio_file').order_by('id')
+        if not options['all']:
+            audios = audios.filter(analyzed_at__isnull=True)
+
+        done = failed = 0
+        batch_size = options['batch_size']
+        last_id = 0
+        while True:
+            batch = list(audios.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            analyzed, errors = analysis.analyze_many(batch, workers=options['workers'])
+            done += analyzed
+            failed += errors
+            self.stdout.write(f'  {done + failed} audios procesados...')
+
+        self.stdout.write(self.style.SUCCESS(f'Audios analizados: {done} (fallidos: {failed})'))
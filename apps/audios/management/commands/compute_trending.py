@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.audios import trending
+
+
+class Command(BaseCommand):
+    help = 'Recalcula Audio.trending_score desde la actividad por hora (ejecutar periódicamente)'
+
+    def handle(self, *args, **options):
+        run = trending.recompute()
+        self.stdout.write(self.style.SUCCESS(
+            f'Audios con actividad: {run.scored}, scores actualizados: {run.updated}, '
+            f'horas vencidas borradas: {run.pruned}'
+        ))
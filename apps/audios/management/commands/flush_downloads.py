@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from apps.audios import downloads
+
+
+class Command(BaseCommand):
+    help = 'Suma los eventos de descarga nuevos a Audio.downloads_count (ejecutar periódicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag', type=int, default=10,
+            help='Segundos de antigüedad mínima de los eventos a sumar'
+        )
+
+    def handle(self, *args, **options):
+        total = downloads.flush_download_counts(lag=timedelta(seconds=options['lag']))
+        self.stdout.write(self.style.SUCCESS(f'Descargas sumadas a los contadores: {total}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.audios import facets
+
+
+class Command(BaseCommand):
+    help = 'Regenera los conteos de facetas del catálogo desde los audios publicados'
+
+    def handle(self, *args, **options):
+        rows, tag_rows = facets.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Facetas regeneradas: {rows} combinaciones, {tag_rows} por etiqueta'
+            )
+        )
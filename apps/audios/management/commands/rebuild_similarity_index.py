@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.audios import analysis, similarity
+
+
+class Command(BaseCommand):
+    help = 'Calcula los embeddings faltantes en paralelo y regenera el índice de similitud'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recompute', action='store_true',
+                            help='Volver a analizar todos los audios publicados')
+        parser.add_argument('--workers', type=int, default=None, help='Procesos en paralelo')
+
+    def handle(self, *args, **options):
+        if not analysis.available():
+            raise CommandError('La búsqueda por similitud requiere NumPy.')
+
+        analyzed, failed, indexed = similarity.rebuild(
+            recompute=options['recompute'], workers=options['workers']
+        )
+        self.stdout.write(f'Audios analizados: {analyzed} (fallidos: {failed})')
+        self.stdout.write(self.style.SUCCESS(f'Índice de similitud regenerado: {indexed} audios'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.audios import cards
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza las tarjetas del listado con los audios publicados y refresca sus contadores (ejecutar periódicamente)'
+
+    def handle(self, *args, **options):
+        result = cards.reconcile()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Tarjetas: {result.created} creadas, {result.updated} actualizadas, {result.removed} borradas'
+            )
+        )
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:06
+
+import datetime
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+POSITION_GAP = 1024
+
+
+def copy_playlist_audios(apps, schema_editor):
+    """Copia la relación M2M original a PlaylistItem y calcula los totales"""
+    AudioPlaylist = apps.get_model('audios', 'AudioPlaylist')
+    PlaylistItem = apps.get_model('audios', 'PlaylistItem')
+    Through = AudioPlaylist.audios.through
+
+    for playlist in AudioPlaylist.objects.all():
+        rows = Through.objects.filter(audioplaylist_id=playlist.pk).order_by('id')
+        PlaylistItem.objects.bulk_create([
+            PlaylistItem(playlist_id=playlist.pk, audio_id=row.audio_id, position=(index + 1) * POSITION_GAP)
+            for index, row in enumerate(rows)
+        ])
+        total = rows.aggregate(total=Sum('audio__duration'))['total']
+        AudioPlaylist.objects.filter(pk=playlist.pk).update(
+            track_count=rows.count(),
+            total_duration=total or datetime.timedelta(0),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaylistItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.BigIntegerField(verbose_name='Posición')),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Audio de playlist',
+                'verbose_name_plural': 'Audios de playlist',
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='audioplaylist',
+            name='total_duration',
+            field=models.DurationField(default=datetime.timedelta(0), verbose_name='Duración total'),
+        ),
+        migrations.AddField(
+            model_name='audioplaylist',
+            name='track_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Cantidad de audios'),
+        ),
+        migrations.AddIndex(
+            model_name='audioplaylist',
+            index=models.Index(fields=['user', '-updated_at'], name='audios_audi_user_id_632393_idx'),
+        ),
+        migrations.AddField(
+            model_name='playlistitem',
+            name='audio',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playlist_items', to='audios.audio'),
+        ),
+        migrations.AddField(
+            model_name='playlistitem',
+            name='playlist',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='audios.audioplaylist'),
+        ),
+        migrations.RunPython(copy_playlist_audios, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='audioplaylist',
+            name='audios',
+        ),
+        migrations.AddField(
+            model_name='audioplaylist',
+            name='audios',
+            field=models.ManyToManyField(blank=True, related_name='in_playlists', through='audios.PlaylistItem', to='audios.audio'),
+        ),
+        migrations.AddIndex(
+            model_name='playlistitem',
+            index=models.Index(fields=['playlist', 'position'], name='audios_play_playlis_3cb978_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='playlistitem',
+            unique_together={('playlist', 'audio')},
+        ),
+    ]
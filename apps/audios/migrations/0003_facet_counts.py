@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:09
+
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+PRICE_EDGES = (Decimal('5'), Decimal('10'), Decimal('25'), Decimal('50'), Decimal('100'))
+
+
+def populate_facets(apps, schema_editor):
+    """Calcula los conteos iniciales desde los audios publicados"""
+    Audio = apps.get_model('audios', 'Audio')
+    FacetCount = apps.get_model('audios', 'FacetCount')
+    TagFacetCount = apps.get_model('audios', 'TagFacetCount')
+
+    cells, tag_cells = Counter(), Counter()
+    published = Audio.objects.filter(status='published').prefetch_related('tags')
+    for audio in published.iterator(chunk_size=500):
+        cell = (audio.category_id, audio.genre_id, bisect_right(PRICE_EDGES, audio.price_standard))
+        cells[cell] += 1
+        for tag in audio.tags.all():
+            tag_cells[(tag.pk, *cell)] += 1
+
+    FacetCount.objects.bulk_create([
+        FacetCount(category_id=category_id, genre_id=genre_id, price_bucket=bucket, count=count)
+        for (category_id, genre_id, bucket), count in cells.items()
+    ])
+    TagFacetCount.objects.bulk_create([
+        TagFacetCount(tag_id=tag_id, category_id=category_id, genre_id=genre_id,
+                      price_bucket=bucket, count=count)
+        for (tag_id, category_id, genre_id, bucket), count in tag_cells.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0002_playlist_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price_bucket', models.PositiveSmallIntegerField(verbose_name='Rango de precio')),
+                ('count', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='audios.category')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='audios.genre')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='audios.tag')),
+            ],
+            options={
+                'verbose_name': 'Conteo de facetas por etiqueta',
+                'verbose_name_plural': 'Conteos de facetas por etiqueta',
+                'unique_together': {('tag', 'category', 'genre', 'price_bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price_bucket', models.PositiveSmallIntegerField(verbose_name='Rango de precio')),
+                ('count', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='audios.category')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='audios.genre')),
+            ],
+            options={
+                'verbose_name': 'Conteo de facetas',
+                'verbose_name_plural': 'Conteos de facetas',
+                'unique_together': {('category', 'genre', 'price_bucket')},
+            },
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('audios', '0003_facet_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('license', models.CharField(choices=[('standard', 'Licencia Estándar'), ('extended', 'Licencia Extendida'), ('exclusive', 'Licencia Exclusiva')], max_length=20, verbose_name='Licencia')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio pagado')),
+                ('purchased_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de compra')),
+                ('audio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchases', to='audios.audio')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audio_purchases', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Compra',
+                'verbose_name_plural': 'Compras',
+                'ordering': ['-purchased_at'],
+                'unique_together': {('user', 'audio', 'license')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DownloadCounterState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estado de contadores de descargas',
+                'verbose_name_plural': 'Estado de contadores de descargas',
+            },
+        ),
+        migrations.CreateModel(
+            name='DownloadEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('audio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='download_events', to='audios.audio')),
+                ('purchase', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='download_events', to='audios.audiopurchase')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Descarga',
+                'verbose_name_plural': 'Descargas',
+            },
+        ),
+    ]
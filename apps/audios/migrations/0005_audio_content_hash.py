@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0004_downloads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audio',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='Hash del contenido (SHA-256)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0005_audio_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audio',
+            name='media_info',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Información técnica del archivo'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0006_audio_media_info'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audio',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Analizado'),
+        ),
+        migrations.AddField(
+            model_name='audio',
+            name='bpm',
+            field=models.FloatField(blank=True, db_index=True, null=True, verbose_name='BPM'),
+        ),
+        migrations.AddField(
+            model_name='audio',
+            name='loudness_lufs',
+            field=models.FloatField(blank=True, db_index=True, null=True, verbose_name='Sonoridad integrada (LUFS)'),
+        ),
+        migrations.AddField(
+            model_name='audio',
+            name='musical_key',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Do mayor'), (1, 'Do# mayor'), (2, 'Re mayor'), (3, 'Re# mayor'), (4, 'Mi mayor'), (5, 'Fa mayor'), (6, 'Fa# mayor'), (7, 'Sol mayor'), (8, 'Sol# mayor'), (9, 'La mayor'), (10, 'La# mayor'), (11, 'Si mayor'), (12, 'Do menor'), (13, 'Do# menor'), (14, 'Re menor'), (15, 'Re# menor'), (16, 'Mi menor'), (17, 'Fa menor'), (18, 'Fa# menor'), (19, 'Sol menor'), (20, 'Sol# menor'), (21, 'La menor'), (22, 'La# menor'), (23, 'Si menor')], db_index=True, null=True, verbose_name='Tonalidad'),
+        ),
+        migrations.AddField(
+            model_name='audio',
+            name='peak_db',
+            field=models.FloatField(blank=True, null=True, verbose_name='Pico (dBFS)'),
+        ),
+    ]
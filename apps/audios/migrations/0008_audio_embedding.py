@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0007_audio_acoustic_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audio',
+            name='embedding',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Embedding acústico (float32)'),
+        ),
+    ]
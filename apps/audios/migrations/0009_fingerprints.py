@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0008_audio_embedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FingerprintHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.IntegerField()),
+                ('offset', models.PositiveIntegerField(verbose_name='Instante (frames)')),
+                ('audio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint_hashes', to='audios.audio')),
+            ],
+            options={
+                'verbose_name': 'Hash de huella',
+                'verbose_name_plural': 'Hashes de huellas',
+                'indexes': [models.Index(fields=['hash', 'audio'], name='fingerprint_hash_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('exact', 'Copia exacta'), ('near', 'Casi duplicado')], max_length=10, verbose_name='Tipo')),
+                ('score', models.FloatField(verbose_name='Coincidencia')),
+                ('is_resolved', models.BooleanField(default=False, verbose_name='Revisado')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('audio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='audios.audio')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='audios.audio', verbose_name='Coincide con')),
+            ],
+            options={
+                'verbose_name': 'Posible duplicado',
+                'verbose_name_plural': 'Posibles duplicados',
+                'ordering': ['is_resolved', '-score'],
+                'unique_together': {('audio', 'match')},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def enqueue_pending_audios(apps, schema_editor):
+    """Crea la tarea de moderación de los audios que ya estaban pendientes"""
+    Audio = apps.get_model('audios', 'Audio')
+    ModerationTask = apps.get_model('audios', 'ModerationTask')
+    ModerationTask.objects.bulk_create(
+        ModerationTask(audio_id=audio_id, submitted_at=updated_at)
+        for audio_id, updated_at in Audio.objects.filter(status='pending').values_list('id', 'updated_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('audios', '0009_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submitted_at', models.DateTimeField(verbose_name='Enviado')),
+                ('claimed_until', models.DateTimeField(blank=True, null=True, verbose_name='Reclamado hasta')),
+                ('decision', models.CharField(blank=True, choices=[('approved', 'Aprobado'), ('rejected', 'Rechazado'), ('withdrawn', 'Retirado por el vendedor')], max_length=10, verbose_name='Decisión')),
+                ('decided_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de decisión')),
+                ('note', models.TextField(blank=True, verbose_name='Motivo')),
+                ('audio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='moderation_task', to='audios.audio')),
+                ('claimed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Reclamado por')),
+                ('decided_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Moderador')),
+            ],
+            options={
+                'verbose_name': 'Tarea de moderación',
+                'verbose_name_plural': 'Tareas de moderación',
+                'ordering': ['submitted_at'],
+                'indexes': [models.Index(condition=models.Q(('decided_at__isnull', True)), fields=['submitted_at'], name='moderation_open_idx'), models.Index(fields=['decided_at'], name='moderation_decided_idx')],
+            },
+        ),
+        migrations.RunPython(enqueue_pending_audios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0010_moderation_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Hora')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Visualizaciones')),
+                ('favorites', models.PositiveIntegerField(default=0, verbose_name='Favoritos')),
+                ('downloads', models.PositiveIntegerField(default=0, verbose_name='Descargas')),
+                ('reviews', models.PositiveIntegerField(default=0, verbose_name='Reseñas')),
+            ],
+            options={
+                'verbose_name': 'Actividad por hora',
+                'verbose_name_plural': 'Actividad por hora',
+            },
+        ),
+        migrations.AddField(
+            model_name='audio',
+            name='trending_score',
+            field=models.FloatField(default=0, verbose_name='Tendencia'),
+        ),
+        migrations.AddIndex(
+            model_name='audio',
+            index=models.Index(fields=['status', '-trending_score', '-id'], name='audio_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='audio',
+            index=models.Index(fields=['status', 'category', '-trending_score', '-id'], name='audio_trending_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='audio',
+            index=models.Index(fields=['status', 'genre', '-trending_score', '-id'], name='audio_trending_genre_idx'),
+        ),
+        migrations.AddField(
+            model_name='audioactivity',
+            name='audio',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='audios.audio'),
+        ),
+        migrations.AddIndex(
+            model_name='audioactivity',
+            index=models.Index(fields=['hour'], name='audio_activity_hour_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='audioactivity',
+            unique_together={('audio', 'hour')},
+        ),
+    ]
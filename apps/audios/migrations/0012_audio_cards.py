@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('audios', '0011_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioCard',
+            fields=[
+                ('audio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='audios.audio')),
+                ('title', models.CharField(max_length=200, verbose_name='Título')),
+                ('slug', models.SlugField(db_index=False, max_length=200, verbose_name='Slug')),
+                ('cover', models.ImageField(blank=True, upload_to='', verbose_name='Portada')),
+                ('price_standard', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio estándar')),
+                ('duration', models.DurationField(blank=True, null=True, verbose_name='Duración')),
+                ('is_featured', models.BooleanField(default=False, verbose_name='Destacado')),
+                ('published_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de publicación')),
+                ('seller_name', models.CharField(max_length=300, verbose_name='Vendedor')),
+                ('seller_username', models.CharField(max_length=150, verbose_name='Usuario del vendedor')),
+                ('category_name', models.CharField(max_length=100, verbose_name='Categoría')),
+                ('genre_name', models.CharField(max_length=100, verbose_name='Género')),
+                ('tags', models.JSONField(blank=True, default=list, verbose_name='Etiquetas')),
+                ('views_count', models.PositiveIntegerField(default=0, verbose_name='Visualizaciones')),
+                ('downloads_count', models.PositiveIntegerField(default=0, verbose_name='Descargas')),
+                ('favorites_count', models.PositiveIntegerField(default=0, verbose_name='Favoritos')),
+                ('trending_score', models.FloatField(default=0, verbose_name='Tendencia')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='audios.category')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='audios.genre')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarjeta de audio',
+                'verbose_name_plural': 'Tarjetas de audios',
+                'ordering': ['-audio'],
+                'indexes': [models.Index(fields=['category', '-audio'], name='audio_card_category_idx'), models.Index(fields=['genre', '-audio'], name='audio_card_genre_idx'), models.Index(fields=['seller', '-published_at'], name='audio_card_seller_idx'), models.Index(fields=['-published_at'], name='audio_card_published_idx'), models.Index(fields=['price_standard'], name='audio_card_price_idx'), models.Index(fields=['-trending_score', '-audio'], name='audio_card_trending_idx'), models.Index(fields=['is_featured', '-audio'], name='audio_card_featured_idx')],
+            },
+        ),
+    ]
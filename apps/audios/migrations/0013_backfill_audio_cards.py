@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def backfill_cards(apps, schema_editor):
+    """Tarjetas de los audios ya publicados (lo mismo que cards.build, con los modelos históricos)"""
+    Audio = apps.get_model('audios', 'Audio')
+    AudioCard = apps.get_model('audios', 'AudioCard')
+    tags = {}
+    through = Audio.tags.through.objects.filter(audio__status='published').order_by('tag__name')
+    for audio_id, name, color in through.values_list('audio_id', 'tag__name', 'tag__color').iterator():
+        tags.setdefault(audio_id, []).append({'name': name, 'color': color})
+
+    audios = Audio.objects.filter(status='published').select_related('seller', 'category', 'genre')
+    AudioCard.objects.bulk_create(
+        (AudioCard(
+            audio_id=audio.pk, title=audio.title, slug=audio.slug, cover=audio.cover_image.name or '',
+            price_standard=audio.price_standard, duration=audio.duration, is_featured=audio.is_featured,
+            published_at=audio.published_at,
+            seller_id=audio.seller_id,
+            seller_name=f'{audio.seller.first_name} {audio.seller.last_name}'.strip() or audio.seller.username,
+            seller_username=audio.seller.username,
+            category_id=audio.category_id, category_name=audio.category.name,
+            genre_id=audio.genre_id, genre_name=audio.genre.name,
+            tags=tags.get(audio.pk, []),
+            views_count=audio.views_count, downloads_count=audio.downloads_count,
+            favorites_count=audio.favorites_count, trending_score=audio.trending_score,
+        ) for audio in audios.iterator(chunk_size=500)),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0012_audio_cards'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_cards, migrations.RunPython.noop),
+    ]
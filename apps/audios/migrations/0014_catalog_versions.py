@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0013_backfill_audio_cards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audiocard',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='audiocard',
+            index=models.Index(fields=['updated_at'], name='audio_card_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:29
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audios', '0014_catalog_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChangelogState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pruned_through', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estado del registro de cambios',
+                'verbose_name_plural': 'Estado del registro de cambios',
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('audio', 'Audio'), ('category', 'Categoría'), ('genre', 'Género'), ('tag', 'Etiqueta')], max_length=10, verbose_name='Tipo')),
+                ('object_id', models.BigIntegerField(verbose_name='Id')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Cambio del catálogo',
+                'verbose_name_plural': 'Cambios del catálogo',
+                'indexes': [models.Index(fields=['created_at'], name='catalog_change_created_idx')],
+            },
+        ),
+    ]
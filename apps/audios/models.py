@@ -1,14 +1,25 @@
 import os
 import uuid
+from datetime import timedelta
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
 
 User = get_user_model()
 
 
+PITCH_NAMES = ['Do', 'Do#', 'Re', 'Re#', 'Mi', 'Fa', 'Fa#', 'Sol', 'Sol#', 'La', 'La#', 'Si']
+
+# Tonalidades: 0-11 mayores y 12-23 menores, desde Do (ver apps/audios/analysis.py)
+MUSICAL_KEY_CHOICES = (
+    [(index, f'{name} mayor') for index, name in enumerate(PITCH_NAMES)] +
+    [(12 + index, f'{name} menor') for index, name in enumerate(PITCH_NAMES)]
+)
+
+
 def audio_upload_path(instance, filename):
     """Genera la ruta donde se guardará el archivo de audio"""
     ext = filename.split('.')[-1]
@@ -32,6 +43,7 @@ class Category(models.Model):
                            help_text='Clase CSS del icono (ej: fas fa-music)')
     is_active = models.BooleanField(default=True, verbose_name='Activa')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = 'Categoría'
@@ -53,6 +65,7 @@ class Genre(models.Model):
     slug = models.SlugField(max_length=100, unique=True, verbose_name='Slug')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='genres', verbose_name='Categoría')
     is_active = models.BooleanField(default=True, verbose_name='Activo')
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = 'Género'
@@ -74,6 +87,7 @@ class Tag(models.Model):
     slug = models.SlugField(max_length=50, unique=True, verbose_name='Slug')
     color = models.CharField(max_length=7, default='#3B82F6', verbose_name='Color', 
                             help_text='Color en formato hexadecimal')
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = 'Etiqueta'
@@ -137,6 +151,21 @@ class Audio(models.Model):
     file_size = models.PositiveIntegerField(blank=True, null=True, verbose_name='Tamaño del archivo (bytes)')
     bitrate = models.PositiveIntegerField(blank=True, null=True, verbose_name='Bitrate (kbps)')
     sample_rate = models.PositiveIntegerField(blank=True, null=True, verbose_name='Sample Rate (Hz)')
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False,
+                                    verbose_name='Hash del contenido (SHA-256)')
+    media_info = models.JSONField(default=dict, blank=True, editable=False,
+                                  verbose_name='Información técnica del archivo')
+    
+    # Análisis acústico (indexado para los filtros del catálogo)
+    bpm = models.FloatField(blank=True, null=True, db_index=True, verbose_name='BPM')
+    musical_key = models.PositiveSmallIntegerField(choices=MUSICAL_KEY_CHOICES, blank=True, null=True,
+                                                   db_index=True, verbose_name='Tonalidad')
+    loudness_lufs = models.FloatField(blank=True, null=True, db_index=True,
+                                      verbose_name='Sonoridad integrada (LUFS)')
+    peak_db = models.FloatField(blank=True, null=True, verbose_name='Pico (dBFS)')
+    embedding = models.BinaryField(blank=True, null=True, editable=False,
+                                   verbose_name='Embedding acústico (float32)')
+    analyzed_at = models.DateTimeField(blank=True, null=True, editable=False, verbose_name='Analizado')
     
     # Precios y licencias
     price_standard = models.DecimalField(
@@ -172,6 +201,8 @@ class Audio(models.Model):
     views_count = models.PositiveIntegerField(default=0, verbose_name='Visualizaciones')
     downloads_count = models.PositiveIntegerField(default=0, verbose_name='Descargas')
     favorites_count = models.PositiveIntegerField(default=0, verbose_name='Favoritos')
+    # Actividad reciente con decaimiento temporal, recalculada por apps.audios.trending
+    trending_score = models.FloatField(default=0, verbose_name='Tendencia')
     
     # Fechas
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')
@@ -187,6 +218,10 @@ class Audio(models.Model):
             models.Index(fields=['category', 'status']),
             models.Index(fields=['seller', 'status']),
             models.Index(fields=['-published_at']),
+            # "Tendencias" general, por categoría y por género: un recorrido del índice
+            models.Index(fields=['status', '-trending_score', '-id'], name='audio_trending_idx'),
+            models.Index(fields=['status', 'category', '-trending_score', '-id'], name='audio_trending_category_idx'),
+            models.Index(fields=['status', 'genre', '-trending_score', '-id'], name='audio_trending_genre_idx'),
         ]
     
     def __str__(self):
@@ -264,8 +299,13 @@ class AudioPlaylist(models.Model):
     name = models.CharField(max_length=100, verbose_name='Nombre')
     description = models.TextField(blank=True, verbose_name='Descripción')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='playlists')
-    audios = models.ManyToManyField(Audio, blank=True, related_name='in_playlists')
+    audios = models.ManyToManyField(Audio, through='PlaylistItem', blank=True, related_name='in_playlists')
     is_public = models.BooleanField(default=False, verbose_name='Pública')
+    
+    # Totales desnormalizados, mantenidos por apps.audios.playlists
+    track_count = models.PositiveIntegerField(default=0, verbose_name='Cantidad de audios')
+    total_duration = models.DurationField(default=timedelta(0), verbose_name='Duración total')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -273,18 +313,293 @@ class AudioPlaylist(models.Model):
         verbose_name = 'Playlist'
         verbose_name_plural = 'Playlists'
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', '-updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.user.get_full_name()}"
+
+
+class PlaylistItem(models.Model):
+    """Audio dentro de una playlist con su posición"""
+    playlist = models.ForeignKey(AudioPlaylist, on_delete=models.CASCADE, related_name='items')
+    audio = models.ForeignKey(Audio, on_delete=models.CASCADE, related_name='playlist_items')
+    # Posiciones con huecos (múltiplos de POSITION_GAP) para reordenar sin reescribir todo
+    position = models.BigIntegerField(verbose_name='Posición')
+    added_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Audio de playlist'
+        verbose_name_plural = 'Audios de playlist'
+        ordering = ['position']
+        unique_together = ('playlist', 'audio')
+        indexes = [
+            models.Index(fields=['playlist', 'position']),
+        ]
+    
+    def __str__(self):
+        return f"{self.playlist.name} #{self.position} - {self.audio.title}"
+
+
+class FacetCount(models.Model):
+    """Audios publicados por categoría, género y rango de precio (ver apps.audios.facets)"""
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='+')
+    price_bucket = models.PositiveSmallIntegerField(verbose_name='Rango de precio')
+    count = models.IntegerField(default=0, verbose_name='Cantidad')
+    
+    class Meta:
+        verbose_name = 'Conteo de facetas'
+        verbose_name_plural = 'Conteos de facetas'
+        unique_together = ('category', 'genre', 'price_bucket')
+
+
+class TagFacetCount(models.Model):
+    """Audios publicados por etiqueta, categoría, género y rango de precio"""
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='+')
+    price_bucket = models.PositiveSmallIntegerField(verbose_name='Rango de precio')
+    count = models.IntegerField(default=0, verbose_name='Cantidad')
+    
+    class Meta:
+        verbose_name = 'Conteo de facetas por etiqueta'
+        verbose_name_plural = 'Conteos de facetas por etiqueta'
+        unique_together = ('tag', 'category', 'genre', 'price_bucket')
+
+
+class AudioPurchase(models.Model):
+    """Compra de una licencia de un audio (habilita la descarga del master)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='audio_purchases')
+    audio = models.ForeignKey(Audio, on_delete=models.CASCADE, related_name='purchases')
+    license = models.CharField(max_length=20, choices=Audio.License.choices, verbose_name='Licencia')
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Precio pagado')
+    purchased_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de compra')
+    
+    class Meta:
+        verbose_name = 'Compra'
+        verbose_name_plural = 'Compras'
+        ordering = ['-purchased_at']
+        unique_together = ('user', 'audio', 'license')
+    
+    def __str__(self):
+        return f"{self.user.get_full_name()} - {self.audio.title} ({self.get_license_display()})"
+
+
+class DownloadEvent(models.Model):
+    """Registro append-only de descargas (se agrega a downloads_count en lotes)"""
+    audio = models.ForeignKey(Audio, on_delete=models.CASCADE, related_name='download_events')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    purchase = models.ForeignKey(AudioPurchase, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='download_events')
+    ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name='IP')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
+    
+    class Meta:
+        verbose_name = 'Descarga'
+        verbose_name_plural = 'Descargas'
+    
+    def __str__(self):
+        return f"{self.audio_id} - {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class DownloadCounterState(models.Model):
+    """Último DownloadEvent ya sumado a los contadores (fila única)"""
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Estado de contadores de descargas'
+        verbose_name_plural = 'Estado de contadores de descargas'
+
+
+class FingerprintHash(models.Model):
+    """Índice invertido de huellas acústicas: hash de landmark -> (audio, instante)"""
+    hash = models.IntegerField()
+    audio = models.ForeignKey(Audio, on_delete=models.CASCADE, related_name='fingerprint_hashes')
+    offset = models.PositiveIntegerField(verbose_name='Instante (frames)')
+    
+    class Meta:
+        verbose_name = 'Hash de huella'
+        verbose_name_plural = 'Hashes de huellas'
+        indexes = [models.Index(fields=['hash', 'audio'], name='fingerprint_hash_idx')]
+    
+    def __str__(self):
+        return f"{self.hash:06x} - {self.audio_id}@{self.offset}"
+
+
+class DuplicateCandidate(models.Model):
+    """Audio que coincide con otro ya subido, para revisar en moderación"""
+    
+    class Kind(models.TextChoices):
+        EXACT = 'exact', 'Copia exacta'
+        NEAR = 'near', 'Casi duplicado'
+    
+    audio = models.ForeignKey(Audio, on_delete=models.CASCADE, related_name='duplicate_candidates')
+    match = models.ForeignKey(Audio, on_delete=models.CASCADE, related_name='+', verbose_name='Coincide con')
+    kind = models.CharField(max_length=10, choices=Kind.choices, verbose_name='Tipo')
+    score = models.FloatField(verbose_name='Coincidencia')
+    is_resolved = models.BooleanField(default=False, verbose_name='Revisado')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
+    
+    class Meta:
+        verbose_name = 'Posible duplicado'
+        verbose_name_plural = 'Posibles duplicados'
+        ordering = ['is_resolved', '-score']
+        unique_together = ('audio', 'match')
+    
+    def __str__(self):
+        return f"{self.audio.title} ~ {self.match.title} ({self.get_kind_display()})"
+
+
+class ModerationTask(models.Model):
+    """Audio enviado a revisión; los moderadores reclaman tareas por un tiempo limitado"""
+    
+    class Decision(models.TextChoices):
+        APPROVED = 'approved', 'Aprobado'
+        REJECTED = 'rejected', 'Rechazado'
+        WITHDRAWN = 'withdrawn', 'Retirado por el vendedor'
+    
+    audio = models.OneToOneField(Audio, on_delete=models.CASCADE, related_name='moderation_task')
+    submitted_at = models.DateTimeField(verbose_name='Enviado')
+    claimed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+', verbose_name='Reclamado por')
+    claimed_until = models.DateTimeField(null=True, blank=True, verbose_name='Reclamado hasta')
+    decision = models.CharField(max_length=10, choices=Decision.choices, blank=True, verbose_name='Decisión')
+    decided_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+', verbose_name='Moderador')
+    decided_at = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de decisión')
+    note = models.TextField(blank=True, verbose_name='Motivo')
+    
+    class Meta:
+        verbose_name = 'Tarea de moderación'
+        verbose_name_plural = 'Tareas de moderación'
+        ordering = ['submitted_at']
+        indexes = [
+            # La cola: solo las tareas abiertas, en orden de llegada
+            models.Index(fields=['submitted_at'], condition=models.Q(decided_at__isnull=True),
+                         name='moderation_open_idx'),
+            models.Index(fields=['decided_at'], name='moderation_decided_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.audio.title} ({self.get_decision_display() or 'pendiente'})"
+
+
+class AudioActivity(models.Model):
+    """Eventos de un audio agrupados por hora (ventana de apps.audios.trending)"""
+    audio = models.ForeignKey(Audio, on_delete=models.CASCADE, related_name='activity')
+    hour = models.DateTimeField(verbose_name='Hora')
+    views = models.PositiveIntegerField(default=0, verbose_name='Visualizaciones')
+    favorites = models.PositiveIntegerField(default=0, verbose_name='Favoritos')
+    downloads = models.PositiveIntegerField(default=0, verbose_name='Descargas')
+    reviews = models.PositiveIntegerField(default=0, verbose_name='Reseñas')
+    
+    class Meta:
+        verbose_name = 'Actividad por hora'
+        verbose_name_plural = 'Actividad por hora'
+        unique_together = ('audio', 'hour')
+        indexes = [
+            models.Index(fields=['hour'], name='audio_activity_hour_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.audio_id} - {self.hour:%Y-%m-%d %H:00}"
+
+
+class AudioCard(models.Model):
+    """
+    Tarjeta de un audio publicado para los listados (ver apps.audios.cards).
+
+    Copia desnormalizada de los datos que muestra una tarjeta: la página se
+    lee de esta tabla sin joins ni consulta de etiquetas.
+    """
+    audio = models.OneToOneField(Audio, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    title = models.CharField(max_length=200, verbose_name='Título')
+    slug = models.SlugField(max_length=200, db_index=False, verbose_name='Slug')
+    cover = models.ImageField(blank=True, verbose_name='Portada')
+    price_standard = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Precio estándar')
+    duration = models.DurationField(blank=True, null=True, verbose_name='Duración')
+    is_featured = models.BooleanField(default=False, verbose_name='Destacado')
+    published_at = models.DateTimeField(blank=True, null=True, verbose_name='Fecha de publicación')
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    seller_name = models.CharField(max_length=300, verbose_name='Vendedor')
+    seller_username = models.CharField(max_length=150, verbose_name='Usuario del vendedor')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    category_name = models.CharField(max_length=100, verbose_name='Categoría')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='+')
+    genre_name = models.CharField(max_length=100, verbose_name='Género')
+    # [{"name": ..., "color": ...}] ordenadas por nombre
+    tags = models.JSONField(default=list, blank=True, verbose_name='Etiquetas')
+    # Contadores: se refrescan con reconcile_audio_cards (y trending_score con compute_trending)
+    views_count = models.PositiveIntegerField(default=0, verbose_name='Visualizaciones')
+    downloads_count = models.PositiveIntegerField(default=0, verbose_name='Descargas')
+    favorites_count = models.PositiveIntegerField(default=0, verbose_name='Favoritos')
+    trending_score = models.FloatField(default=0, verbose_name='Tendencia')
+    # Última escritura de la tarjeta (versión de la API de catálogo)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Tarjeta de audio'
+        verbose_name_plural = 'Tarjetas de audios'
+        # El orden de los ids coincide con el de creación (orden por defecto del listado)
+        ordering = ['-audio']
+        indexes = [
+            models.Index(fields=['category', '-audio'], name='audio_card_category_idx'),
+            models.Index(fields=['genre', '-audio'], name='audio_card_genre_idx'),
+            models.Index(fields=['seller', '-published_at'], name='audio_card_seller_idx'),
+            models.Index(fields=['-published_at'], name='audio_card_published_idx'),
+            models.Index(fields=['price_standard'], name='audio_card_price_idx'),
+            models.Index(fields=['-trending_score', '-audio'], name='audio_card_trending_idx'),
+            models.Index(fields=['is_featured', '-audio'], name='audio_card_featured_idx'),
+            models.Index(fields=['updated_at'], name='audio_card_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return self.title
     
     @property
-    def total_duration(self):
-        """Duración total de la playlist"""
-        from django.db.models import Sum
-        from datetime import timedelta
-        
-        total = self.audios.aggregate(
-            total_duration=Sum('duration')
-        )['total_duration']
-        
-        return total or timedelta(seconds=0)
+    def id(self):
+        """Mismo id que el audio (user_state y los templates usan ``id``)"""
+        return self.audio_id
+    
+    def get_absolute_url(self):
+        return reverse('audios:detail', kwargs={'slug': self.slug})
+
+
+class CatalogChange(models.Model):
+    """
+    Registro append-only de cambios del catálogo publicado: solo qué objeto
+    cambió. El id es la marca de agua del feed (``changelog.py``).
+    """
+    
+    class Kind(models.TextChoices):
+        AUDIO = 'audio', 'Audio'
+        CATEGORY = 'category', 'Categoría'
+        GENRE = 'genre', 'Género'
+        TAG = 'tag', 'Etiqueta'
+    
+    kind = models.CharField(max_length=10, choices=Kind.choices, verbose_name='Tipo')
+    object_id = models.BigIntegerField(verbose_name='Id')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Fecha')
+    
+    class Meta:
+        verbose_name = 'Cambio del catálogo'
+        verbose_name_plural = 'Cambios del catálogo'
+        indexes = [
+            models.Index(fields=['created_at'], name='catalog_change_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"#{self.pk} {self.kind} {self.object_id}"
+
+
+class CatalogChangelogState(models.Model):
+    """Último CatalogChange borrado por la retención (fila única)"""
+    pruned_through = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Estado del registro de cambios'
+        verbose_name_plural = 'Estado del registro de cambios'
@@ -0,0 +1,205 @@
+"""
+Cola de moderación de los audios enviados a revisión.
+
+Cada audio en ``PENDING`` tiene una ``ModerationTask`` abierta (se crea al
+enviarlo, ver ``signals``). Un moderador reclama un lote de tareas por
+``MODERATION_CLAIM_MINUTES``; mientras el reclamo está vigente nadie más
+las recibe, y si vence vuelven a la cola.
+
+El reclamo no bloquea la tabla:
+
+- PostgreSQL: ``SELECT ... FOR UPDATE SKIP LOCKED`` sobre las tareas
+  libres, así dos moderadores que piden a la vez reciben lotes distintos
+  sin esperarse.
+- SQLite y otras bases sin ``SKIP LOCKED``: compare-and-swap, un
+  ``UPDATE`` por tarea condicionado a que el reclamo siga siendo el que se
+  leyó. Si otro moderador la tomó antes, el ``UPDATE`` no afecta filas y
+  se pasa a la siguiente.
+
+Las decisiones se aplican en lote en una transacción: estado y
+``published_at`` con un ``UPDATE`` por decisión, y ``catalog.track()``
+para que facetas e índices del catálogo se actualicen.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min, Prefetch, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import catalog
+from .models import Audio, DuplicateCandidate, ModerationTask
+
+DecisionResult = namedtuple('DecisionResult', ['decided', 'skipped'])
+
+QueueStats = namedtuple('QueueStats', [
+    'depth', 'claimed', 'oldest_wait', 'decided', 'approved', 'rejected', 'avg_latency', 'p95_latency',
+])
+
+
+def claim_duration():
+    return timedelta(minutes=getattr(settings, 'MODERATION_CLAIM_MINUTES', 15))
+
+
+def submit(audio):
+    """Pone el audio al final de la cola (o lo vuelve a poner si ya se había decidido)"""
+    ModerationTask.objects.update_or_create(audio=audio, defaults={
+        'submitted_at': timezone.now(),
+        'claimed_by': None,
+        'claimed_until': None,
+        'decision': '',
+        'decided_by': None,
+        'decided_at': None,
+        'note': '',
+    })
+
+
+def resolve(audio, user=None):
+    """Cierra la tarea de un audio que dejó de estar pendiente sin pasar por la cola"""
+    decision = {
+        Audio.Status.PUBLISHED: ModerationTask.Decision.APPROVED,
+        Audio.Status.REJECTED: ModerationTask.Decision.REJECTED,
+    }.get(audio.status, ModerationTask.Decision.WITHDRAWN)
+    close_tasks([audio.pk], user, decision)
+
+
+def open_tasks():
+    return ModerationTask.objects.filter(decided_at__isnull=True, audio__status=Audio.Status.PENDING)
+
+
+def _available(user, now):
+    """Tareas abiertas libres, con el reclamo vencido o ya reclamadas por ``user``"""
+    return open_tasks().filter(
+        Q(claimed_by__isnull=True) | Q(claimed_until__lt=now) | Q(claimed_by=user)
+    ).order_by('submitted_at')
+
+
+def claim(user, limit=None):
+    """
+    Reclama (o renueva) hasta ``limit`` tareas para ``user``, las más viejas primero.
+
+    Retorna las tareas con el audio, sus metadatos y los posibles duplicados
+    ya cargados.
+    """
+    limit = limit or getattr(settings, 'MODERATION_BATCH_SIZE', 10)
+    now = timezone.now()
+    until = now + claim_duration()
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            task_ids = list(
+                _available(user, now).select_for_update(skip_locked=True, of=('self',))
+                .values_list('pk', flat=True)[:limit]
+            )
+            ModerationTask.objects.filter(pk__in=task_ids).update(claimed_by=user, claimed_until=until)
+    else:
+        task_ids = []
+        # Se leen de más: algunas pueden perderse contra otro moderador
+        candidates = _available(user, now).values_list('pk', 'claimed_by_id', 'claimed_until')[:limit * 2]
+        for task_id, claimed_by_id, claimed_until in candidates:
+            won = ModerationTask.objects.filter(
+                pk=task_id, decided_at__isnull=True, claimed_by_id=claimed_by_id, claimed_until=claimed_until,
+            ).update(claimed_by=user, claimed_until=until)
+            if won:
+                task_ids.append(task_id)
+                if len(task_ids) == limit:
+                    break
+    return load(task_ids)
+
+
+def load(task_ids):
+    """Tareas con todo lo que necesita la pantalla de revisión, en orden de llegada"""
+    return list(
+        ModerationTask.objects.filter(pk__in=task_ids)
+        .select_related('audio__seller', 'audio__category', 'audio__genre', 'claimed_by')
+        .prefetch_related(
+            'audio__tags',
+            Prefetch(
+                'audio__duplicate_candidates',
+                queryset=DuplicateCandidate.objects.filter(is_resolved=False).select_related('match__seller'),
+                to_attr='open_duplicates',
+            ),
+        )
+        .order_by('submitted_at')
+    )
+
+
+def release(user, audio_ids):
+    """Devuelve a la cola las tareas reclamadas por ``user``"""
+    return ModerationTask.objects.filter(
+        audio_id__in=audio_ids, claimed_by=user, decided_at__isnull=True
+    ).update(claimed_by=None, claimed_until=None)
+
+
+def close_tasks(audio_ids, user, decision, note='', now=None):
+    """Registra la decisión en las tareas abiertas de ``audio_ids``"""
+    return ModerationTask.objects.filter(audio_id__in=audio_ids, decided_at__isnull=True).update(
+        decision=decision, decided_by=user, decided_at=now or timezone.now(), note=note,
+        claimed_by=None, claimed_until=None,
+    )
+
+
+def decide(user, audio_ids, approve, note=''):
+    """
+    Aprueba o rechaza en una transacción los audios pendientes de ``audio_ids``.
+
+    Se saltean los que otro moderador tiene reclamados y los que ya no
+    están pendientes.
+    """
+    audio_ids = set(audio_ids)
+    now = timezone.now()
+    with transaction.atomic():
+        decided_ids = list(
+            open_tasks().filter(audio_id__in=audio_ids)
+            .filter(Q(claimed_by__isnull=True) | Q(claimed_until__lt=now) | Q(claimed_by=user))
+            .select_for_update(of=('self',)).values_list('audio_id', flat=True)
+        )
+        if decided_ids:
+            audios = Audio.objects.filter(pk__in=decided_ids)
+            with catalog.track(decided_ids):
+                if approve:
+                    audios.update(
+                        status=Audio.Status.PUBLISHED, updated_at=now,
+                        published_at=Coalesce('published_at', Value(now)),
+                    )
+                else:
+                    audios.update(status=Audio.Status.REJECTED, updated_at=now)
+            decision = ModerationTask.Decision.APPROVED if approve else ModerationTask.Decision.REJECTED
+            close_tasks(decided_ids, user, decision, note, now)
+            # El moderador ya vio las coincidencias
+            DuplicateCandidate.objects.filter(audio_id__in=decided_ids).update(is_resolved=True)
+    return DecisionResult(decided=len(decided_ids), skipped=len(audio_ids) - len(decided_ids))
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else None
+
+
+def queue_stats(window=timedelta(hours=24)):
+    """Profundidad de la cola y latencia (envío -> decisión) de las decisiones de ``window``"""
+    now = timezone.now()
+    pending = open_tasks()
+    oldest = pending.aggregate(oldest=Min('submitted_at'))['oldest']
+
+    decisions = ModerationTask.objects.filter(
+        decided_at__gte=now - window,
+        decision__in=[ModerationTask.Decision.APPROVED, ModerationTask.Decision.REJECTED],
+    ).values_list('decision', 'submitted_at', 'decided_at')
+    latencies, approved = [], 0
+    for decision, submitted_at, decided_at in decisions:
+        latencies.append((decided_at - submitted_at).total_seconds())
+        approved += decision == ModerationTask.Decision.APPROVED
+
+    return QueueStats(
+        depth=pending.count(),
+        claimed=pending.filter(claimed_until__gte=now).count(),
+        oldest_wait=(now - oldest).total_seconds() if oldest else 0,
+        decided=len(latencies),
+        approved=approved,
+        rejected=len(latencies) - approved,
+        avg_latency=sum(latencies) / len(latencies) if latencies else None,
+        p95_latency=_percentile(latencies, 0.95),
+    )
@@ -0,0 +1,57 @@
+"""
+Métricas del módulo de audios (ver ``core.metrics``).
+
+Los contadores e histogramas se actualizan donde ocurre el trabajo
+(subidas, análisis, transcodificación, caché de facetas, volcado de
+descargas). Las colas y atrasos son gauges: se calculan con una consulta
+en cada scrape.
+"""
+from django.db.models import Min
+from django.utils import timezone
+
+from core import metrics
+
+from . import moderation
+from .models import Audio, DownloadCounterState, DownloadEvent
+
+UPLOAD_BYTES = metrics.Histogram(
+    'audio_upload_bytes', 'Tamaño de los audios subidos', ['outcome'],
+    buckets=[size * 1024 * 1024 for size in (1, 5, 10, 25, 50, 100, 250)],
+)
+JOB_SECONDS = metrics.Histogram(
+    'audio_job_duration_seconds', 'Duración de los procesos sobre archivos de audio', ['job', 'outcome'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+CACHE_LOOKUPS = metrics.Counter(
+    'cache_lookups_total', 'Lecturas de caché por resultado (hit/miss)', ['cache', 'result'],
+)
+DOWNLOADS_FLUSHED = metrics.Counter(
+    'download_events_flushed_total', 'Eventos de descarga sumados a downloads_count',
+)
+
+
+def cache_lookup(name, hit):
+    CACHE_LOOKUPS.inc(cache=name, result='hit' if hit else 'miss')
+
+
+@metrics.gauge('moderation_queue_depth', 'Audios pendientes de revisión')
+def moderation_queue_depth():
+    return moderation.open_tasks().count()
+
+
+@metrics.gauge('moderation_queue_oldest_seconds', 'Espera del audio pendiente más antiguo')
+def moderation_queue_oldest():
+    oldest = moderation.open_tasks().aggregate(oldest=Min('submitted_at'))['oldest']
+    return (timezone.now() - oldest).total_seconds() if oldest else 0
+
+
+@metrics.gauge('audio_analysis_backlog', 'Audios con archivo que todavía no se analizaron')
+def analysis_backlog():
+    return Audio.objects.exclude(audio_file='').filter(analyzed_at__isnull=True).count()
+
+
+@metrics.gauge('download_counter_lag_seconds', 'Antigüedad del evento de descarga más viejo sin sumar al contador')
+def download_counter_lag():
+    last_id = DownloadCounterState.objects.filter(pk=1).values_list('last_event_id', flat=True).first() or 0
+    oldest = DownloadEvent.objects.filter(pk__gt=last_id).order_by('pk').values_list('created_at', flat=True).first()
+    return (timezone.now() - oldest).total_seconds() if oldest else 0
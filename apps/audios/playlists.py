@@ -0,0 +1,188 @@
+"""
+Servicio de playlists.
+
+Los audios de una playlist se guardan en ``PlaylistItem`` con posiciones
+separadas por ``POSITION_GAP``: mover un audio solo reescribe su fila,
+salvo que no quede hueco entre sus vecinos (en ese caso se renumera la
+playlist completa). ``track_count`` y ``total_duration`` se ajustan con
+deltas en la misma transacción que modifica los items.
+"""
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from .models import Audio, AudioPlaylist, PlaylistItem
+
+POSITION_GAP = 1024
+
+
+def user_playlists(user):
+    """Playlists del usuario con sus totales (una sola consulta)"""
+    return AudioPlaylist.objects.filter(user=user).order_by('-updated_at')
+
+
+def _lock(playlist):
+    """Bloquea la fila de la playlist para serializar ediciones concurrentes"""
+    AudioPlaylist.objects.select_for_update().filter(pk=playlist.pk).values_list('pk').first()
+
+
+def _apply_totals(playlist, count, duration):
+    AudioPlaylist.objects.filter(pk=playlist.pk).update(
+        track_count=F('track_count') + count,
+        total_duration=F('total_duration') + duration,
+        updated_at=timezone.now(),
+    )
+
+
+def add_audios(playlist, audio_ids):
+    """Agrega audios publicados al final de la playlist. Retorna los ids agregados."""
+    audio_ids = list(dict.fromkeys(audio_ids))
+    with transaction.atomic():
+        _lock(playlist)
+        existing = set(
+            PlaylistItem.objects.filter(playlist=playlist, audio_id__in=audio_ids)
+            .values_list('audio_id', flat=True)
+        )
+        durations = dict(
+            Audio.objects.filter(pk__in=audio_ids, status=Audio.Status.PUBLISHED)
+            .exclude(pk__in=existing)
+            .values_list('id', 'duration')
+        )
+        new_ids = [audio_id for audio_id in audio_ids if audio_id in durations]
+        if not new_ids:
+            return []
+
+        last = PlaylistItem.objects.filter(playlist=playlist).aggregate(last=Max('position'))['last'] or 0
+        PlaylistItem.objects.bulk_create([
+            PlaylistItem(playlist=playlist, audio_id=audio_id, position=last + (index + 1) * POSITION_GAP)
+            for index, audio_id in enumerate(new_ids)
+        ])
+        total = sum((durations[audio_id] or timedelta(0) for audio_id in new_ids), timedelta(0))
+        _apply_totals(playlist, len(new_ids), total)
+    return new_ids
+
+
+def remove_audios(playlist, audio_ids):
+    """Quita audios de la playlist. Retorna la cantidad de audios quitados."""
+    with transaction.atomic():
+        _lock(playlist)
+        items = PlaylistItem.objects.filter(playlist=playlist, audio_id__in=list(audio_ids))
+        removed = items.aggregate(total=Sum('audio__duration'))['total'] or timedelta(0)
+        count, _ = items.delete()
+        if count:
+            _apply_totals(playlist, -count, -removed)
+    return count
+
+
+def reorder(playlist, audio_ids):
+    """
+    Reordena la playlist según ``audio_ids``.
+
+    Los audios no incluidos conservan su orden relativo al final. Solo se
+    reescriben las filas que quedan fuera de la subsecuencia creciente más
+    larga de posiciones actuales. Retorna la cantidad de filas modificadas.
+    """
+    with transaction.atomic():
+        _lock(playlist)
+        items = list(
+            PlaylistItem.objects.filter(playlist=playlist).only('id', 'audio_id', 'position').order_by('position')
+        )
+        by_audio = {item.audio_id: item for item in items}
+        ordered = [by_audio[audio_id] for audio_id in dict.fromkeys(audio_ids) if audio_id in by_audio]
+        listed = {item.audio_id for item in ordered}
+        ordered += [item for item in items if item.audio_id not in listed]
+
+        changed = _assign_positions(ordered)
+        if changed:
+            PlaylistItem.objects.bulk_update(changed, ['position'])
+            AudioPlaylist.objects.filter(pk=playlist.pk).update(updated_at=timezone.now())
+    return len(changed)
+
+
+def _longest_increasing(items):
+    """Índices de la subsecuencia creciente más larga de posiciones"""
+    tails, tails_index, previous = [], [], [None] * len(items)
+    for index, item in enumerate(items):
+        slot = bisect_left(tails, item.position)
+        if slot == len(tails):
+            tails.append(item.position)
+            tails_index.append(index)
+        else:
+            tails[slot] = item.position
+            tails_index[slot] = index
+        previous[index] = tails_index[slot - 1] if slot else None
+
+    keep = set()
+    index = tails_index[-1] if tails_index else None
+    while index is not None:
+        keep.add(index)
+        index = previous[index]
+    return keep
+
+
+def _assign_positions(ordered):
+    """Asigna posiciones nuevas solo a los items que rompen el orden"""
+    keep = _longest_increasing(ordered)
+    planned = {}
+    lower = 0
+    index = 0
+    while index < len(ordered):
+        if index in keep:
+            lower = ordered[index].position
+            index += 1
+            continue
+
+        end = index
+        while end < len(ordered) and end not in keep:
+            end += 1
+        slots = end - index + 1
+        upper = ordered[end].position if end < len(ordered) else lower + slots * POSITION_GAP
+        step = (upper - lower) // slots
+        if step < 1:
+            # Sin hueco entre los vecinos: se renumera la playlist completa
+            planned = {item_index: (item_index + 1) * POSITION_GAP for item_index in range(len(ordered))}
+            break
+
+        for item_index in range(index, end):
+            lower += step
+            planned[item_index] = lower
+        index = end
+
+    changed = []
+    for item_index, position in planned.items():
+        item = ordered[item_index]
+        if item.position != position:
+            item.position = position
+            changed.append(item)
+    return changed
+
+
+def recalculate(playlist):
+    """Recalcula los totales desde los items (reconciliación)"""
+    totals = PlaylistItem.objects.filter(playlist=playlist).aggregate(
+        count=Count('id'), duration=Sum('audio__duration')
+    )
+    AudioPlaylist.objects.filter(pk=playlist.pk).update(
+        track_count=totals['count'],
+        total_duration=totals['duration'] or timedelta(0),
+    )
+
+
+def forget_audio(audio):
+    """Descuenta un audio de todas las playlists que lo contienen (antes de borrarlo)"""
+    AudioPlaylist.objects.filter(items__audio=audio).update(
+        track_count=F('track_count') - 1,
+        total_duration=F('total_duration') - (audio.duration or timedelta(0)),
+    )
+
+
+def apply_duration_change(audio, previous_duration):
+    """Ajusta la duración de las playlists cuando cambia la de un audio"""
+    delta = (audio.duration or timedelta(0)) - (previous_duration or timedelta(0))
+    if delta:
+        AudioPlaylist.objects.filter(items__audio=audio).update(
+            total_duration=F('total_duration') + delta
+        )
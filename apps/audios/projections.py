@@ -0,0 +1,87 @@
+"""
+Proyección liviana de las tarjetas para los listados.
+
+Aun leyendo de ``AudioCard``, cada fila del listado se convertía en una
+instancia de modelo (estado de la instancia, descriptores, caché de
+relaciones y todas las columnas). ``Projection`` envuelve un queryset de
+tarjetas, lee solo ``CARD_COLUMNS`` con ``values_list`` y arma objetos
+``Card`` con ``__slots__``: sin ``__dict__`` por fila y sin columnas que la
+plantilla no usa. Es una secuencia perezosa para ``Paginator`` (como
+``catalog_index.IndexResult``): se cuenta con ``count()`` y solo la página
+cortada se lee y se arma.
+
+``benchmarks/card_projections.py`` compara memoria y latencia por página
+contra instancias de ``Audio`` y de ``AudioCard``.
+"""
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from .models import AudioCard
+
+CARD_COLUMNS = (
+    'audio_id', 'title', 'slug', 'cover', 'price_standard', 'duration', 'is_featured',
+    'seller_id', 'seller_name', 'seller_username', 'category_name', 'genre_name', 'tags',
+    'views_count', 'downloads_count', 'favorites_count',
+)
+# Los completa user_state.annotate
+USER_STATE = (
+    'user_is_favorite', 'user_has_reviewed', 'user_has_purchased', 'user_playlist_ids', 'user_is_owner',
+)
+
+
+class Card:
+    """Datos de una tarjeta del listado (misma interfaz que usan los templates con ``Audio``)"""
+    __slots__ = CARD_COLUMNS + USER_STATE
+
+    def __init__(self, row):
+        for name, value in zip(CARD_COLUMNS, row):
+            setattr(self, name, value)
+
+    @property
+    def id(self):
+        return self.audio_id
+
+    pk = id
+
+    @property
+    def cover_url(self):
+        return default_storage.url(self.cover) if self.cover else ''
+
+    def get_absolute_url(self):
+        return reverse('audios:detail', kwargs={'slug': self.slug})
+
+    def __repr__(self):
+        return f'<Card {self.audio_id}: {self.title}>'
+
+
+def hydrate(rows):
+    return [Card(row) for row in rows]
+
+
+def by_ids(ids):
+    """{audio_id: Card} de los audios publicados entre ``ids`` (una consulta)"""
+    rows = AudioCard.objects.filter(audio_id__in=ids).values_list(*CARD_COLUMNS)
+    return {card.audio_id: card for card in hydrate(rows)}
+
+
+class Projection:
+    """Secuencia perezosa de ``Card`` sobre un queryset de ``AudioCard``"""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def count(self):
+        return self.queryset.count()
+
+    __len__ = count
+
+    def rows(self):
+        return self.queryset.values_list(*CARD_COLUMNS)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        return hydrate(self.rows()[item])
+
+    def __iter__(self):
+        return iter(hydrate(self.rows()))
@@ -1,41 +1,78 @@
+import logging
 import os
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
-from mutagen import File
-from mutagen.id3 import ID3NoHeaderError
 from PIL import Image
-from .models import Audio, AudioFavorite
+from .models import Audio, AudioCard, AudioFavorite, AudioReview, Category, Genre, Tag
+from .favorites import remove_favorites
+from .transcoding import file_digest
+from .upload_validation import InvalidAudio, inspect_file
+from . import analysis, cards, catalog, catalog_index, changelog, facets, fingerprints, moderation, playlists, trending
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def previous_instance(instance):
+    """Versión guardada del audio antes de este save (una consulta por save)"""
+    if not instance.pk:
+        return None
+    if '_previous_instance' not in instance.__dict__:
+        instance._previous_instance = Audio.objects.filter(pk=instance.pk).first()
+    return instance._previous_instance
 
 
 @receiver(pre_save, sender=Audio)
 def extract_audio_metadata(sender, instance, **kwargs):
-    """Extrae automáticamente metadata del archivo de audio"""
-    if instance.audio_file:
+    """Completa duración, bitrate y sample rate desde ``media_info``"""
+    if not instance.audio_file:
+        return
+    old_audio = previous_instance(instance)
+    changed = old_audio is None or old_audio.audio_file != instance.audio_file
+    # El formulario ya validó y analizó el archivo nuevo durante la subida
+    fresh = bool(instance.media_info) and (old_audio is None or instance.media_info != old_audio.media_info)
+    if not fresh and (changed or not instance.media_info):
         try:
-            # Obtener información del archivo usando mutagen
-            audio_file = File(instance.audio_file.file.name)
-            if audio_file is not None:
-                # Duración
-                if audio_file.info.length:
-                    instance.duration = timezone.timedelta(seconds=int(audio_file.info.length))
-                
-                # Bitrate
-                if hasattr(audio_file.info, 'bitrate') and audio_file.info.bitrate:
-                    instance.bitrate = audio_file.info.bitrate
-                
-                # Sample rate
-                if hasattr(audio_file.info, 'sample_rate'):
-                    instance.sample_rate = audio_file.info.sample_rate
-                elif hasattr(audio_file.info, 'samplerate'):
-                    instance.sample_rate = audio_file.info.samplerate
-            
-            # Tamaño del archivo
-            instance.file_size = instance.audio_file.size
-            
-        except (ID3NoHeaderError, Exception) as e:
+            instance.media_info = inspect_file(instance.audio_file.path)
+        except (InvalidAudio, NotImplementedError, ValueError) as e:
             # Si no se puede leer la metadata, continuar sin error
-            print(f"No se pudo extraer metadata del audio {instance.title}: {e}")
+            logger.warning('No se pudo extraer metadata del audio %s: %s', instance.title, e,
+                           extra={'audio_id': instance.pk})
+            return
+    elif not fresh:
+        return
+
+    info = instance.media_info
+    if info.get('duration'):
+        instance.duration = timezone.timedelta(seconds=int(info['duration']))
+    if info.get('bitrate'):
+        instance.bitrate = info['bitrate']
+    if info.get('sample_rate'):
+        instance.sample_rate = info['sample_rate']
+    try:
+        instance.file_size = instance.audio_file.size
+    except OSError:
+        instance.file_size = info.get('size')
+
+
+@receiver(pre_save, sender=Audio)
+def update_content_hash(sender, instance, **kwargs):
+    """Calcula el SHA-256 del master cuando es nuevo o cambió (clave de la caché de derivados)"""
+    if not instance.audio_file:
+        return
+    old_audio = previous_instance(instance)
+    changed = old_audio is None or old_audio.audio_file != instance.audio_file
+    if not changed and instance.content_hash:
+        return
+    try:
+        # extract_audio_metadata (anterior) deja el SHA-256 calculado en la subida
+        instance.content_hash = instance.media_info.get('sha256') or file_digest(instance.audio_file)
+    except OSError as e:
+        logger.warning('No se pudo calcular el hash del audio %s: %s', instance.title, e,
+                       extra={'audio_id': instance.pk})
 
 
 @receiver(pre_save, sender=Audio)
@@ -59,29 +96,160 @@ def optimize_cover_image(sender, instance, **kwargs):
                 img.save(instance.cover_image.file.name, 'JPEG', quality=85, optimize=True)
                 
         except Exception as e:
-            print(f"No se pudo optimizar la imagen de portada para {instance.title}: {e}")
+            logger.warning('No se pudo optimizar la imagen de portada de %s: %s', instance.title, e,
+                           extra={'audio_id': instance.pk})
 
 
 @receiver(post_save, sender=Audio)
 def update_published_at(sender, instance, **kwargs):
     """Actualiza la fecha de publicación cuando el estado cambia a publicado"""
     if instance.status == Audio.Status.PUBLISHED and not instance.published_at:
-        Audio.objects.filter(id=instance.id).update(published_at=timezone.now())
+        instance.published_at = timezone.now()
+        Audio.objects.filter(id=instance.id).update(published_at=instance.published_at)
+
+
+@receiver(pre_save, sender=Audio)
+def remember_catalog_entry(sender, instance, **kwargs):
+    """Guarda la foto del catálogo previa al save"""
+    if instance.pk:
+        instance._catalog_before = catalog.snapshot([instance.pk])
+
+
+@receiver(post_save, sender=Audio)
+def notify_catalog_change(sender, instance, **kwargs):
+    """Notifica si el audio entró, salió o cambió dentro del catálogo publicado"""
+    before = instance.__dict__.pop('_catalog_before', {instance.pk: None})
+    if before[instance.pk] is None and instance.status != Audio.Status.PUBLISHED:
+        return
+    catalog.notify(before, catalog.snapshot([instance.pk]))
+
+
+@receiver(m2m_changed, sender=Audio.tags.through)
+def notify_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Notifica los cambios de etiquetas de audios publicados"""
+    if action.startswith('pre_'):
+        if not reverse:
+            audio_ids = [instance.pk]
+        elif pk_set is not None:
+            audio_ids = list(pk_set)
+        else:
+            audio_ids = list(instance.audios.values_list('pk', flat=True))
+        instance._catalog_tags_before = catalog.snapshot(audio_ids)
+    else:
+        before = instance.__dict__.pop('_catalog_tags_before', {})
+        catalog.notify(before, catalog.snapshot(before.keys()))
+
+
+@receiver(pre_delete, sender=Audio)
+def remember_catalog_entry_on_delete(sender, instance, **kwargs):
+    """Guarda la foto del catálogo antes de borrar el audio"""
+    instance._catalog_before = catalog.snapshot([instance.pk])
+
+
+@receiver(post_delete, sender=Audio)
+def notify_catalog_removal(sender, instance, **kwargs):
+    """Notifica la baja del audio del catálogo"""
+    before = instance.__dict__.pop('_catalog_before', {})
+    catalog.notify(before, {instance.pk: None})
+
+
+@receiver(catalog.catalog_changed)
+def update_facet_counts(sender, before, after, **kwargs):
+    """Mantiene los conteos de facetas de la barra lateral"""
+    facets.apply_change(before, after)
+
+
+@receiver(catalog.catalog_changed)
+def update_catalog_index(sender, before, after, **kwargs):
+    """Mantiene el índice en memoria del proceso (al confirmar la transacción)"""
+    transaction.on_commit(lambda: catalog_index.apply_change(before, after))
+
 
+@receiver(catalog.catalog_changed)
+def update_audio_card(sender, audio_id, **kwargs):
+    """Crea, actualiza o borra la tarjeta del listado"""
+    cards.sync([audio_id])
 
-@receiver(post_save, sender=AudioFavorite)
-def update_favorites_count_add(sender, instance, created, **kwargs):
-    """Incrementa el contador de favoritos cuando se agrega un favorito"""
+
+@receiver(post_save, sender=Audio)
+def update_audio_card_display(sender, instance, created, **kwargs):
+    """Refresca la tarjeta si cambió algo que solo se ve en ella (título, portada, destacado...)"""
+    old_audio = instance.__dict__.get('_previous_instance')
+    if created or old_audio is None or instance.status != Audio.Status.PUBLISHED:
+        return
+    if any(getattr(old_audio, field) != getattr(instance, field) for field in cards.DISPLAY_FIELDS):
+        cards.sync([instance.pk])
+
+
+def _rename_cards(cards_to_rename, **values):
+    """Actualiza las tarjetas con ``QuerySet.update()`` y registra los audios en el feed"""
+    audio_ids = list(cards_to_rename.values_list('audio_id', flat=True))
+    if audio_ids:
+        AudioCard.objects.filter(audio_id__in=audio_ids).update(**values, updated_at=timezone.now())
+        changelog.record(changelog.Kind.AUDIO, audio_ids)
+
+
+@receiver(post_save, sender=Category)
+def rename_category_cards(sender, instance, created, **kwargs):
+    if not created:
+        _rename_cards(
+            AudioCard.objects.filter(category=instance).exclude(category_name=instance.name),
+            category_name=instance.name,
+        )
+
+
+@receiver(post_save, sender=Genre)
+def rename_genre_cards(sender, instance, created, **kwargs):
+    if not created:
+        _rename_cards(
+            AudioCard.objects.filter(genre=instance).exclude(genre_name=instance.name),
+            genre_name=instance.name,
+        )
+
+
+@receiver(post_save, sender=Tag)
+def rename_tag_cards(sender, instance, created, **kwargs):
+    """Las tarjetas guardan nombre y color de cada etiqueta"""
+    if not created:
+        cards.sync(instance.audios.filter(status=Audio.Status.PUBLISHED).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def rename_seller_cards(sender, instance, created, update_fields=None, **kwargs):
+    # Los logins guardan solo last_login
+    if update_fields is not None and not {'username', 'first_name', 'last_name'} & set(update_fields):
+        return
+    if not created:
+        name = instance.get_full_name() or instance.username
+        _rename_cards(
+            AudioCard.objects.filter(seller=instance).exclude(seller_name=name, seller_username=instance.username),
+            seller_name=name, seller_username=instance.username,
+        )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def record_taxonomy_change(sender, instance, **kwargs):
+    """Registra el cambio de la categoría, género o etiqueta en el feed del catálogo"""
+    kinds = {Category: changelog.Kind.CATEGORY, Genre: changelog.Kind.GENRE, Tag: changelog.Kind.TAG}
+    changelog.record(kinds[sender], [instance.pk])
+
+
+@receiver(post_save, sender=AudioReview)
+def count_review_activity(sender, instance, created, **kwargs):
+    """Las reseñas nuevas suman al ranking de tendencias"""
     if created:
-        instance.audio.favorites_count += 1
-        instance.audio.save(update_fields=['favorites_count'])
+        trending.record(instance.audio_id, 'reviews')
 
 
-@receiver(post_delete, sender=AudioFavorite)
-def update_favorites_count_remove(sender, instance, **kwargs):
-    """Decrementa el contador de favoritos cuando se elimina un favorito"""
-    instance.audio.favorites_count = max(0, instance.audio.favorites_count - 1)
-    instance.audio.save(update_fields=['favorites_count'])
+@receiver(pre_delete, sender=User)
+def discount_user_favorites(sender, instance, **kwargs):
+    """Descuenta los favoritos del usuario antes de que se borren en cascada"""
+    remove_favorites(AudioFavorite.objects.filter(user=instance))
 
 
 @receiver(post_delete, sender=Audio)
@@ -93,7 +261,7 @@ def delete_audio_files(sender, instance, **kwargs):
             try:
                 os.remove(instance.audio_file.path)
             except Exception as e:
-                print(f"Error eliminando archivo de audio: {e}")
+                logger.error('Error eliminando archivo de audio: %s', e, extra={'audio_id': instance.pk})
     
     # Eliminar imagen de portada
     if instance.cover_image:
@@ -101,19 +269,15 @@ def delete_audio_files(sender, instance, **kwargs):
             try:
                 os.remove(instance.cover_image.path)
             except Exception as e:
-                print(f"Error eliminando imagen de portada: {e}")
+                logger.error('Error eliminando imagen de portada: %s', e, extra={'audio_id': instance.pk})
 
 
 # Signal para limpiar archivos cuando se actualiza el audio
 @receiver(pre_save, sender=Audio)
 def delete_old_files_on_update(sender, instance, **kwargs):
     """Elimina archivos antiguos cuando se actualizan"""
-    if not instance.pk:
-        return
-    
-    try:
-        old_audio = Audio.objects.get(pk=instance.pk)
-    except Audio.DoesNotExist:
+    old_audio = previous_instance(instance)
+    if old_audio is None:
         return
     
     # Eliminar archivo de audio antiguo si cambió
@@ -122,7 +286,7 @@ def delete_old_files_on_update(sender, instance, **kwargs):
             try:
                 os.remove(old_audio.audio_file.path)
             except Exception as e:
-                print(f"Error eliminando archivo de audio antiguo: {e}")
+                logger.error('Error eliminando archivo de audio antiguo: %s', e, extra={'audio_id': instance.pk})
     
     # Eliminar imagen de portada antigua si cambió
     if old_audio.cover_image and old_audio.cover_image != instance.cover_image:
@@ -130,4 +294,47 @@ def delete_old_files_on_update(sender, instance, **kwargs):
             try:
                 os.remove(old_audio.cover_image.path)
             except Exception as e:
-                print(f"Error eliminando imagen de portada antigua: {e}")
+                logger.error('Error eliminando imagen de portada antigua: %s', e, extra={'audio_id': instance.pk})
+
+
+@receiver(post_save, sender=Audio)
+def sync_playlist_durations(sender, instance, created, **kwargs):
+    """Ajusta la duración de las playlists si cambió la del audio"""
+    old_audio = instance.__dict__.get('_previous_instance')
+    if old_audio is not None and old_audio.duration != instance.duration:
+        playlists.apply_duration_change(instance, old_audio.duration)
+
+
+@receiver(post_save, sender=Audio)
+def schedule_acoustic_analysis(sender, instance, created, **kwargs):
+    """Analiza el archivo (BPM, tonalidad, sonoridad, huella) cuando es nuevo o cambió"""
+    if not instance.audio_file:
+        return
+    old_audio = instance.__dict__.get('_previous_instance')
+    if created or (old_audio is not None and old_audio.audio_file != instance.audio_file):
+        # Las copias exactas se detectan ya; los casi duplicados, con la huella del análisis
+        fingerprints.flag_exact(instance)
+        transaction.on_commit(lambda: analysis.schedule(instance))
+
+
+@receiver(post_save, sender=Audio)
+def update_moderation_queue(sender, instance, created, **kwargs):
+    """Encola el audio al enviarlo a revisión; cierra la tarea si sale de revisión por otro camino"""
+    old_audio = instance.__dict__.get('_previous_instance')
+    was_pending = old_audio is not None and old_audio.status == Audio.Status.PENDING
+    if instance.status == Audio.Status.PENDING and not was_pending:
+        moderation.submit(instance)
+    elif was_pending and instance.status != Audio.Status.PENDING:
+        moderation.resolve(instance)
+
+
+@receiver(pre_delete, sender=Audio)
+def discount_audio_from_playlists(sender, instance, **kwargs):
+    """Descuenta el audio de las playlists antes de que se borre en cascada"""
+    playlists.forget_audio(instance)
+
+
+@receiver(post_save, sender=Audio)
+def forget_previous_instance(sender, instance, **kwargs):
+    """Descarta la versión anterior cacheada; debe ser el último receiver de post_save"""
+    instance.__dict__.pop('_previous_instance', None)
@@ -0,0 +1,213 @@
+"""
+Búsqueda de audios que suenan parecido.
+
+Cada audio analizado tiene un embedding acústico (``Audio.embedding``, ver
+``analysis``). ``rebuild()`` arma con los publicados un índice en
+``SIMILARITY_INDEX_DIR``:
+
+- ``vectors.npy``: matriz (N, D) float32, cada dimensión estandarizada
+  (z-score) y cada fila con norma 1, así el producto punto es la similitud
+  coseno.
+- ``ids.npy``: ids de los audios de cada fila, ordenados.
+- ``scale.npy``: media y desvío usados para estandarizar.
+
+Los archivos se abren con ``mmap``: los workers comparten las páginas del
+sistema operativo en lugar de cargar una copia cada uno. Cada build se
+escribe en un directorio nuevo y ``CURRENT`` se reemplaza de forma atómica;
+los procesos recargan el índice cuando cambia.
+
+La consulta calcula la similitud contra todo el índice con un producto
+matriz-vector y se queda con los k mejores con ``argpartition``. Los audios
+subidos después del último build se consultan con su propio embedding y
+aparecen como resultado tras el siguiente ``rebuild_similarity_index``.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from . import analysis
+from .models import Audio
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy no hay búsqueda por similitud
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index_dir():
+    return Path(getattr(settings, 'SIMILARITY_INDEX_DIR', Path(settings.BASE_DIR) / 'var' / 'similarity'))
+
+
+def _current_file():
+    return index_dir() / 'CURRENT'
+
+
+class SimilarityIndex:
+    """Vectores normalizados en memoria compartida (mmap) y búsqueda top-k"""
+
+    def __init__(self, path):
+        self.path = path
+        self.vectors = np.load(path / 'vectors.npy', mmap_mode='r')
+        self.ids = np.load(path / 'ids.npy', mmap_mode='r')
+        self.mean, self.std = np.load(path / 'scale.npy')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def normalize(self, vectors):
+        vectors = (np.atleast_2d(vectors) - self.mean) / self.std
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+    def row_of(self, audio_id):
+        position = int(np.searchsorted(self.ids, audio_id))
+        if position < len(self.ids) and self.ids[position] == audio_id:
+            return position
+        return None
+
+    def query_vector(self, audio_id, embedding=None):
+        """Vector de consulta: la fila del índice o el embedding normalizado"""
+        row = self.row_of(audio_id)
+        if row is not None:
+            return np.asarray(self.vectors[row])
+        if embedding:
+            return self.normalize(np.frombuffer(embedding, dtype=np.float32))[0]
+        return None
+
+    def nearest(self, vector, k, exclude=()):
+        """[(audio_id, similitud)] de los ``k`` más parecidos, de mayor a menor"""
+        scores = self.vectors @ vector
+        for audio_id in exclude:
+            row = self.row_of(audio_id)
+            if row is not None:
+                scores[row] = -np.inf
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[row]), float(scores[row])) for row in top if np.isfinite(scores[row])]
+
+
+def get_index():
+    """Índice actual (lo recarga si hubo un build nuevo); None si no hay"""
+    global _index
+    if np is None:
+        return None
+    try:
+        version = _current_file().read_text().strip()
+    except FileNotFoundError:
+        return None
+    path = index_dir() / version
+    if _index is None or _index.path != path:
+        with _index_lock:
+            if _index is None or _index.path != path:
+                try:
+                    _index = SimilarityIndex(path)
+                except (FileNotFoundError, ValueError) as e:
+                    logger.warning('No se pudo abrir el índice de similitud %s: %s', version, e)
+                    return None
+    return _index
+
+
+def similar(audio, limit=6, queryset=None):
+    """
+    Audios publicados que suenan parecido a ``audio``, más parecidos primero.
+
+    Cada audio trae su ``similarity`` (coseno). Retorna [] si no hay índice
+    o el audio no tiene embedding.
+    """
+    index = get_index()
+    if index is None or not len(index):
+        return []
+    embedding = audio.embedding if 'embedding' in audio.__dict__ else None
+    if embedding is None and index.row_of(audio.pk) is None:
+        embedding = Audio.objects.filter(pk=audio.pk).values_list('embedding', flat=True).first()
+    vector = index.query_vector(audio.pk, embedding)
+    if vector is None:
+        return []
+
+    # Pide de más por si algún audio del índice ya no está publicado
+    neighbours = index.nearest(vector, limit * 2, exclude=[audio.pk])
+    if queryset is None:
+        queryset = Audio.objects.select_related('seller')
+    found = queryset.filter(status=Audio.Status.PUBLISHED).in_bulk([audio_id for audio_id, _ in neighbours])
+    results = []
+    for audio_id, score in neighbours:
+        if audio_id in found:
+            found[audio_id].similarity = score
+            results.append(found[audio_id])
+    return results[:limit]
+
+
+def build(items):
+    """Escribe un índice nuevo con ``items`` [(audio_id, embedding)] y lo activa"""
+    items = sorted((audio_id, bytes(embedding)) for audio_id, embedding in items if embedding)
+    dim = analysis.EMBEDDING_DIM
+    ids = np.array([audio_id for audio_id, _ in items], dtype=np.int64)
+    raw = np.frombuffer(b''.join(embedding for _, embedding in items), dtype=np.float32).reshape(-1, dim)
+
+    mean = raw.mean(axis=0) if len(raw) else np.zeros(dim, dtype=np.float32)
+    std = raw.std(axis=0) if len(raw) else np.ones(dim, dtype=np.float32)
+    std[std == 0] = 1
+
+    version = f'{time.strftime("%Y%m%d%H%M%S")}-{os.getpid()}-{time.monotonic_ns()}'
+    path = index_dir() / version
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(path / 'ids.npy', ids)
+    np.save(path / 'scale.npy', np.stack([mean, std]).astype(np.float32))
+    vectors = np.lib.format.open_memmap(path / 'vectors.npy', mode='w+', dtype=np.float32, shape=raw.shape)
+    if len(raw):
+        normalized = (raw - mean) / std
+        norms = np.linalg.norm(normalized, axis=1, keepdims=True)
+        vectors[:] = normalized / np.where(norms > 0, norms, 1)
+    vectors.flush()
+    del vectors
+
+    current = _current_file()
+    temporary = current.with_name(f'CURRENT.{os.getpid()}')
+    temporary.write_text(version)
+    os.replace(temporary, current)
+    _remove_old_builds()
+    return len(ids)
+
+
+def _remove_old_builds(keep=2):
+    """Borra los builds viejos (un mmap abierto sigue siendo válido tras borrar el archivo)"""
+    builds = sorted(path for path in index_dir().iterdir() if path.is_dir())
+    for path in builds[:-keep]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def rebuild(recompute=False, workers=None, batch_size=200):
+    """
+    Analiza los audios publicados sin embedding (todos con ``recompute``) en
+    paralelo y arma el índice. Retorna (analizados, fallidos, indexados).
+    """
+    published = Audio.objects.filter(status=Audio.Status.PUBLISHED).exclude(audio_file='')
+    pending = published if recompute else published.filter(embedding__isnull=True)
+    pending = pending.only('id', 'audio_file').order_by('id')
+
+    done = failed = 0
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        analyzed, errors = analysis.analyze_many(batch, workers=workers)
+        done += analyzed
+        failed += errors
+
+    items = published.filter(embedding__isnull=False).values_list('id', 'embedding').iterator(chunk_size=2000)
+    return done, failed, build(items)
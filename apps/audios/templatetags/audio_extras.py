@@ -0,0 +1,40 @@
+from django import template
+
+from ..transcoding import FORMATS
+from ..user_state import get_user_state
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def audio_user_state(context, audio):
+    """Estado del usuario para un audio: {% audio_user_state audio as state %}"""
+    request = context.get('request')
+    if request is None:
+        return {}
+    state = get_user_state(request)
+    return {
+        'is_favorite': state.is_favorite(audio.id),
+        'has_reviewed': state.has_reviewed(audio.id),
+        'playlist_ids': state.playlists_for(audio.id),
+        'is_owner': state.is_owner(audio),
+    }
+
+
+@register.simple_tag(takes_context=True)
+def facet_url(context, **params):
+    """Query string actual reemplazando los parámetros indicados (sin 'page')"""
+    query = context['request'].GET.copy()
+    query.pop('page', None)
+    for key, value in params.items():
+        if value is None or value == '':
+            query.pop(key, None)
+        else:
+            query[key] = value
+    return f'?{query.urlencode()}'
+
+
+@register.simple_tag
+def delivery_formats():
+    """Formatos de entrega disponibles: {% delivery_formats as formats %}"""
+    return [{'code': code, 'label': output.label} for code, output in FORMATS.items()]
@@ -0,0 +1,235 @@
+"""
+Transcodificación de masters a formatos de entrega.
+
+Los derivados (MP3 320, FLAC, WAV 16/24 bits) se generan con ffmpeg
+(``TRANSCODE_FFMPEG``) y se guardan en una caché en disco
+(``TRANSCODE_CACHE_DIR``) con nombre ``<sha256 del master>.<formato>``:
+un audio popular se transcodifica una sola vez y dos audios con el mismo
+contenido comparten derivados. La caché tiene un tamaño máximo
+(``TRANSCODE_CACHE_MAX_BYTES``) y se vacía por LRU; cada acierto actualiza
+la fecha de modificación del archivo.
+
+Los encoders corren como procesos de ffmpeg, a lo sumo
+``TRANSCODE_WORKERS`` a la vez. Los pedidos simultáneos del mismo derivado
+esperan el mismo trabajo: dentro del proceso comparten el Future y entre
+procesos se serializan con un lock de archivo.
+"""
+import hashlib
+import logging
+import os
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import Audio
+from .monitoring import JOB_SECONDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se coalescen los trabajos del mismo proceso
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+Format = namedtuple('Format', ['label', 'extension', 'content_type', 'muxer', 'codec_args'])
+
+FORMATS = {
+    'mp3-320': Format('MP3 320 kbps', 'mp3', 'audio/mpeg', 'mp3', ['-codec:a', 'libmp3lame', '-b:a', '320k']),
+    'flac': Format('FLAC', 'flac', 'audio/flac', 'flac', ['-codec:a', 'flac']),
+    'wav-16': Format('WAV 16 bits', 'wav', 'audio/wav', 'wav', ['-codec:a', 'pcm_s16le']),
+    'wav-24': Format('WAV 24 bits', 'wav', 'audio/wav', 'wav', ['-codec:a', 'pcm_s24le']),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class TranscodeError(Exception):
+    """El encoder falló o no está disponible"""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def cache_dir():
+    return Path(_setting('TRANSCODE_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'transcodes'))
+
+
+def cache_path(digest, fmt):
+    return cache_dir() / f'{digest}.{fmt}.{FORMATS[fmt].extension}'
+
+
+def file_digest(file):
+    """SHA-256 del contenido, leído por partes"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ensure_content_hash(audio):
+    """Hash del master; lo calcula y guarda si falta (audios anteriores al campo)"""
+    if not audio.content_hash:
+        with audio.audio_file.open('rb') as file:
+            audio.content_hash = file_digest(file)
+        Audio.objects.filter(pk=audio.pk).update(content_hash=audio.content_hash)
+    return audio.content_hash
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_setting('TRANSCODE_WORKERS', 2), thread_name_prefix='transcode'
+            )
+    return _executor
+
+
+def transcode(audio, fmt):
+    """Ruta del derivado en la caché; lo genera si hace falta (bloquea hasta tenerlo)"""
+    if fmt not in FORMATS:
+        raise ValueError(f'Formato desconocido: {fmt}')
+    target = cache_path(ensure_content_hash(audio), fmt)
+    if target.exists():
+        _touch(target)
+        return target
+
+    with _jobs_lock:
+        future = _jobs.get(target)
+        if future is None:
+            future = _get_executor().submit(_run_job, audio.audio_file.path, target, fmt)
+            _jobs[target] = future
+            future.add_done_callback(lambda _: _forget_job(target))
+    timeout = _setting('TRANSCODE_TIMEOUT', 600)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError as exc:
+        # El trabajo sigue y queda en la caché para el próximo pedido
+        raise TranscodeError(f'La transcodificación no terminó en {timeout} s') from exc
+
+
+def open_transcoded(audio, fmt, attempts=2):
+    """
+    Derivado abierto para leer. El ``evict`` de otro proceso puede borrarlo
+    entre ``transcode()`` y el ``open()``: entonces se vuelve a generar. Ya
+    abierto se puede leer entero aunque otro proceso lo borre.
+    """
+    for _ in range(attempts):
+        try:
+            return open(transcode(audio, fmt), 'rb')
+        except FileNotFoundError:
+            continue
+    raise TranscodeError('El derivado se desalojó de la caché antes de entregarlo')
+
+
+def _forget_job(target):
+    with _jobs_lock:
+        _jobs.pop(target, None)
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+@contextmanager
+def _file_lock(target):
+    """Lock exclusivo entre procesos para generar ``target``"""
+    if fcntl is None:
+        yield
+        return
+    lock_dir = target.parent / 'locks'
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    with open(lock_dir / f'{target.name}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _run_job(source, target, fmt):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with _file_lock(target):
+        # Otro proceso pudo generarlo mientras se esperaba el lock
+        if not target.exists():
+            partial = target.with_name(f'{target.name}.{os.getpid()}.{threading.get_ident()}.part')
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                encode(source, partial, fmt)
+                os.replace(partial, target)
+                outcome = 'ok'
+            finally:
+                JOB_SECONDS.observe(time.perf_counter() - start, job=f'transcode-{fmt}', outcome=outcome)
+                if partial.exists():
+                    partial.unlink()
+    # El derivado recién generado no se desaloja aunque solo él supere el tamaño máximo
+    evict(keep=target)
+    return target
+
+
+def encode(source, target, fmt):
+    """Ejecuta ffmpeg para convertir ``source`` al formato pedido"""
+    output = FORMATS[fmt]
+    command = [
+        _setting('TRANSCODE_FFMPEG', 'ffmpeg'), '-nostdin', '-v', 'error', '-y',
+        '-i', str(source), '-map', '0:a:0', '-map_metadata', '0',
+        *output.codec_args, '-f', output.muxer, str(target),
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=_setting('TRANSCODE_TIMEOUT', 600))
+    except FileNotFoundError as exc:
+        raise TranscodeError('ffmpeg no está instalado') from exc
+    except subprocess.CalledProcessError as exc:
+        raise TranscodeError(exc.stderr.decode(errors='replace').strip()) from exc
+    except subprocess.TimeoutExpired as exc:
+        raise TranscodeError('La transcodificación superó el tiempo máximo') from exc
+
+
+def evict(max_bytes=None, keep=None):
+    """
+    Borra los derivados usados hace más tiempo hasta respetar el tamaño
+    máximo (salvo ``keep``, que se está por entregar).
+    """
+    if max_bytes is None:
+        max_bytes = _setting('TRANSCODE_CACHE_MAX_BYTES', 2 * 1024 ** 3)
+    entries = []
+    for path in cache_dir().glob('*'):
+        if path.suffix == '.part' or not path.is_file():
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    if removed:
+        logger.info('Caché de transcodificación: %s derivados eliminados', removed)
+    return removed
@@ -0,0 +1,131 @@
+"""
+Ranking de tendencias del catálogo.
+
+"Más populares" (``-views_count``) es un total histórico: los audios viejos
+lo dominan para siempre. Acá los eventos (vistas, favoritos, descargas,
+reseñas) se cuentan por audio y por hora en ``AudioActivity``, con un
+UPDATE ... + n sobre la fila de la hora actual.
+
+``recompute()`` (comando ``compute_trending``, periódico) suma la ventana de
+``TRENDING_WINDOW_DAYS`` ponderando cada tipo de evento con
+``TRENDING_WEIGHTS`` y cada hora con un decaimiento exponencial de vida
+media ``TRENDING_HALF_LIFE_HOURS``. El resultado queda en
+``Audio.trending_score``, con índices (estado, [categoría|género],
+-score, -id): "Tendencias" general, por categoría o por género es un
+recorrido de índice que corta en el límite. Las horas que salen de la
+ventana se borran en la misma pasada.
+"""
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Audio, AudioActivity, AudioCard
+
+KINDS = ('views', 'favorites', 'downloads', 'reviews')
+DEFAULT_WEIGHTS = {'views': 1, 'favorites': 4, 'downloads': 6, 'reviews': 8}
+
+TrendingRun = namedtuple('TrendingRun', ['scored', 'updated', 'pruned'])
+
+
+def _window():
+    return timedelta(days=getattr(settings, 'TRENDING_WINDOW_DAYS', 7))
+
+
+def _half_life():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 36)
+
+
+def _weights():
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'TRENDING_WEIGHTS', {})}
+    return [weights[kind] for kind in KINDS]
+
+
+def hour_of(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record(audio_id, kind, amount=1, when=None):
+    """Suma ``amount`` eventos de ``kind`` a la hora de ``when`` (ahora por defecto)"""
+    if kind not in KINDS:
+        raise ValueError(f'Tipo de evento desconocido: {kind}')
+    hour = hour_of(when or timezone.now())
+    rows = AudioActivity.objects.filter(audio_id=audio_id, hour=hour)
+    if rows.update(**{kind: F(kind) + amount}):
+        return
+    try:
+        with transaction.atomic():
+            AudioActivity.objects.create(audio_id=audio_id, hour=hour, **{kind: amount})
+    except IntegrityError:
+        # Otro request creó la fila de esta hora en paralelo
+        rows.update(**{kind: F(kind) + amount})
+
+
+def record_many(counts, kind):
+    """
+    Suma eventos en lote: ``counts`` es {(audio_id, hora): cantidad}.
+
+    Un INSERT de las filas que falten (en cero, ignorando las que ya
+    existen) y un UPDATE por cada par (hora, cantidad) distinto, como
+    ``view_counting.flush`` con los contadores.
+    """
+    if kind not in KINDS:
+        raise ValueError(f'Tipo de evento desconocido: {kind}')
+    if not counts:
+        return
+    AudioActivity.objects.bulk_create(
+        [AudioActivity(audio_id=audio_id, hour=hour) for audio_id, hour in counts],
+        batch_size=500, ignore_conflicts=True,
+    )
+    audios_by_amount = defaultdict(list)
+    for (audio_id, hour), amount in counts.items():
+        audios_by_amount[hour, amount].append(audio_id)
+    for (hour, amount), audio_ids in audios_by_amount.items():
+        AudioActivity.objects.filter(hour=hour, audio_id__in=audio_ids).update(**{kind: F(kind) + amount})
+
+
+def recompute(now=None):
+    """Recalcula ``trending_score`` desde la ventana y borra las horas vencidas"""
+    now = now or timezone.now()
+    since = hour_of(now - _window())
+    half_life = _half_life()
+    weights = _weights()
+
+    scores = defaultdict(float)
+    rows = AudioActivity.objects.filter(hour__gte=since).values_list('audio_id', 'hour', *KINDS)
+    for audio_id, hour, *counts in rows.iterator(chunk_size=2000):
+        # Edad desde el final de la hora: la hora en curso no decae
+        age = max((now - hour).total_seconds() / 3600 - 1, 0)
+        events = sum(weight * count for weight, count in zip(weights, counts))
+        scores[audio_id] += events * 0.5 ** (age / half_life)
+
+    # Solo se escriben los scores que cambiaron (incluye los que vuelven a 0)
+    current = dict(Audio.objects.filter(trending_score__gt=0).values_list('pk', 'trending_score'))
+    changed = []
+    for audio_id in scores.keys() | current.keys():
+        score = round(scores.get(audio_id, 0.0), 4)
+        if score != current.get(audio_id, 0.0):
+            changed.append(Audio(pk=audio_id, trending_score=score))
+    Audio.objects.bulk_update(changed, ['trending_score'], batch_size=500)
+    AudioCard.objects.bulk_update(
+        [AudioCard(audio_id=audio.pk, trending_score=audio.trending_score, updated_at=now) for audio in changed],
+        ['trending_score', 'updated_at'], batch_size=500,
+    )
+
+    pruned, _ = AudioActivity.objects.filter(hour__lt=since).delete()
+    return TrendingRun(scored=len(scores), updated=len(changed), pruned=pruned)
+
+
+def top(limit, category_id=None, genre_id=None):
+    """Audios publicados en tendencia, opcionalmente de una categoría o género"""
+    audios = Audio.objects.filter(status=Audio.Status.PUBLISHED, trending_score__gt=0)
+    if category_id is not None:
+        audios = audios.filter(category_id=category_id)
+    if genre_id is not None:
+        audios = audios.filter(genre_id=genre_id)
+    return list(
+        audios.order_by('-trending_score', '-id').select_related('seller', 'category', 'genre')[:limit]
+    )
@@ -0,0 +1,427 @@
+"""
+Validación de los audios subidos a partir del stream de la subida.
+
+``AudioUploadHandler`` (primero en ``FILE_UPLOAD_HANDLERS``) recibe los
+chunks del campo ``audio_file`` antes de escribirlos: identifica el
+contenedor por sus magic bytes (libmagic si está instalado, y las firmas
+propias como respaldo) y parsea la cabecera (WAV ``fmt``, FLAC
+``STREAMINFO``, frames MP3/ADTS, página de identificación Ogg). Hasta que
+la cabecera es válida no se escribe nada en disco; un archivo corrupto, con
+la extensión equivocada o de más de ``AUDIO_UPLOAD_MAX_BYTES`` se descarta
+sin terminar de guardarse.
+
+Con el archivo completo mutagen calcula la duración en un intérprete
+aparte, con un tiempo máximo (``AUDIO_PROBE_TIMEOUT``): si el parseo se
+cuelga, el proceso se mata y no queda ocupando nada en el servidor. El
+resultado queda en ``file.media_info`` y el formulario lo guarda en
+``Audio.media_info``, de donde lo toman las señales en lugar de volver a
+parsear el archivo.
+"""
+import hashlib
+import io
+import json
+import os
+import struct
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from .monitoring import JOB_SECONDS, UPLOAD_BYTES
+
+try:
+    import magic
+except ImportError:  # libmagic no instalado: solo firmas propias
+    magic = None
+
+ALLOWED_EXTENSIONS = ['mp3', 'wav', 'flac', 'aac', 'ogg']
+# Tope de bytes en memoria para encontrar la cabecera (las etiquetas ID3 pueden traer la portada)
+MAX_PROBE_BYTES = 4 * 1024 * 1024
+
+MAGIC_MIME_TYPES = {
+    'audio/mpeg': 'mp3',
+    'audio/x-wav': 'wav',
+    'audio/wav': 'wav',
+    'audio/flac': 'flac',
+    'audio/x-flac': 'flac',
+    'audio/ogg': 'ogg',
+    'application/ogg': 'ogg',
+    'audio/aac': 'aac',
+    'audio/x-hx-aac-adts': 'aac',
+}
+
+MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = [44100, 48000, 32000]
+MP3_VERSIONS = {3: 1, 2: 2, 0: 2.5}
+ADTS_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350]
+
+# Corre con ``python -c``: la ruta como argumento o el contenido por stdin
+PROBE_SCRIPT = """
+import io, json, sys
+import mutagen
+source = sys.argv[1] if len(sys.argv) > 1 else io.BytesIO(sys.stdin.buffer.read())
+parsed = mutagen.File(source)
+info = parsed.info if parsed is not None else None
+json.dump(info and {
+    'length': info.length,
+    'bitrate': getattr(info, 'bitrate', None),
+    'sample_rate': getattr(info, 'sample_rate', None) or getattr(info, 'samplerate', None),
+}, sys.stdout)
+"""
+
+
+class InvalidAudio(Exception):
+    """El archivo no es un audio válido del formato declarado"""
+
+
+class NeedMoreData(Exception):
+    """La cabecera todavía no llegó completa"""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def max_upload_bytes():
+    return _setting('AUDIO_UPLOAD_MAX_BYTES', 50 * 1024 * 1024)
+
+
+def size_error():
+    return InvalidAudio(f'El archivo de audio no puede superar los {max_upload_bytes() // (1024 * 1024)}MB.')
+
+
+def extension_of(file_name):
+    return os.path.splitext(file_name or '')[1].lstrip('.').lower()
+
+
+def sniff(head):
+    """Contenedor según los magic bytes, o None si no se reconoce"""
+    if magic is not None:
+        container = MAGIC_MIME_TYPES.get(magic.from_buffer(bytes(head[:4096]), mime=True))
+        if container:
+            return container
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'OggS':
+        return 'ogg'
+    if head[:3] == b'ID3':
+        return 'mp3'
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        # Sincronía de frame: layer 0 es ADTS (AAC), el resto MPEG audio
+        return 'aac' if head[1] & 0x06 == 0 else 'mp3'
+    return None
+
+
+def _need(head, size):
+    if len(head) < size:
+        raise NeedMoreData
+
+
+def parse_wav(head):
+    _need(head, 12)
+    offset = 12
+    while True:
+        _need(head, offset + 8)
+        chunk_id, chunk_size = struct.unpack_from('<4sI', head, offset)
+        if chunk_id == b'fmt ':
+            _need(head, offset + 24)
+            audio_format, channels, sample_rate, byte_rate, _, bits = struct.unpack_from('<HHIIHH', head, offset + 8)
+            if audio_format not in (1, 3, 0xFFFE) or bits not in (8, 16, 24, 32, 64):
+                raise InvalidAudio('El WAV no contiene audio PCM.')
+            return {'codec': 'pcm', 'sample_rate': sample_rate, 'channels': channels,
+                    'bits_per_sample': bits, 'bitrate': byte_rate * 8}
+        offset += 8 + chunk_size + (chunk_size & 1)
+
+
+def parse_flac(head):
+    _need(head, 42)
+    if head[4] & 0x7F != 0 or int.from_bytes(head[5:8], 'big') != 34:
+        raise InvalidAudio('El FLAC no empieza con el bloque STREAMINFO.')
+    (fields,) = struct.unpack_from('>Q', head, 18)
+    sample_rate = fields >> 44
+    total_samples = fields & (2 ** 36 - 1)
+    return {
+        'codec': 'flac',
+        'sample_rate': sample_rate,
+        'channels': ((fields >> 41) & 0x7) + 1,
+        'bits_per_sample': ((fields >> 36) & 0x1F) + 1,
+        'duration': total_samples / sample_rate if sample_rate and total_samples else None,
+    }
+
+
+def _mp3_frame(head, offset):
+    """(info, largo del frame) del header MPEG audio layer III en ``offset``"""
+    _need(head, offset + 4)
+    b1, b2, b3 = head[offset + 1], head[offset + 2], head[offset + 3]
+    if head[offset] != 0xFF or b1 & 0xE0 != 0xE0:
+        raise InvalidAudio('No se encontró un frame MP3 válido.')
+    version = MP3_VERSIONS.get((b1 >> 3) & 0x3)
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 0x3
+    if version is None or (b1 >> 1) & 0x3 != 1 or bitrate_index == 15 or rate_index == 3:
+        raise InvalidAudio('No se encontró un frame MP3 válido.')
+    bitrate = MP3_BITRATES[1 if version == 1 else 2][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[rate_index] // {1: 1, 2: 2, 2.5: 4}[version]
+    length = None
+    if bitrate:
+        length = (144 if version == 1 else 72) * bitrate // sample_rate + ((b2 >> 1) & 0x1)
+    info = {'codec': 'mp3', 'sample_rate': sample_rate, 'channels': 1 if b3 >> 6 == 3 else 2,
+            'bitrate': bitrate or None}
+    return info, length
+
+
+def parse_mp3(head):
+    offset = 0
+    if head[:3] == b'ID3':
+        _need(head, 10)
+        size = sum((byte & 0x7F) << (7 * (3 - index)) for index, byte in enumerate(head[6:10]))
+        offset = 10 + size + (10 if head[5] & 0x10 else 0)
+        if offset > MAX_PROBE_BYTES:
+            raise InvalidAudio('La etiqueta ID3 es demasiado grande.')
+    # Algunos encoders dejan relleno entre la etiqueta y el primer frame
+    _need(head, offset + 4)
+    while head[offset] == 0:
+        offset += 1
+        _need(head, offset + 4)
+    info, length = _mp3_frame(head, offset)
+    if length:
+        # El frame siguiente tiene que estar donde dice el primero
+        _mp3_frame(head, offset + length)
+    return info
+
+
+def parse_adts(head):
+    _need(head, 7)
+    if head[0] != 0xFF or head[1] & 0xF6 != 0xF0:
+        raise InvalidAudio('No se encontró un frame AAC (ADTS) válido.')
+    rate_index = (head[2] >> 2) & 0xF
+    if rate_index >= len(ADTS_SAMPLE_RATES):
+        raise InvalidAudio('Frecuencia de muestreo AAC inválida.')
+    length = ((head[3] & 0x3) << 11) | (head[4] << 3) | (head[5] >> 5)
+    if length < 7:
+        raise InvalidAudio('No se encontró un frame AAC (ADTS) válido.')
+    _need(head, length + 2)
+    if head[length] != 0xFF or head[length + 1] & 0xF6 != 0xF0:
+        raise InvalidAudio('El stream AAC está corrupto.')
+    return {'codec': 'aac', 'sample_rate': ADTS_SAMPLE_RATES[rate_index],
+            'channels': ((head[2] & 0x1) << 2) | (head[3] >> 6)}
+
+
+def parse_ogg(head):
+    _need(head, 27)
+    if head[4] != 0 or not head[5] & 0x02:
+        raise InvalidAudio('El Ogg no empieza con una página de inicio.')
+    segments = head[26]
+    _need(head, 27 + segments)
+    payload = 27 + segments
+    _need(head, payload + 19)
+    if head[payload:payload + 7] == b'\x01vorbis':
+        channels, sample_rate = struct.unpack_from('<BI', head, payload + 11)
+        return {'codec': 'vorbis', 'sample_rate': sample_rate, 'channels': channels}
+    if head[payload:payload + 8] == b'OpusHead':
+        # Opus siempre decodifica a 48 kHz
+        return {'codec': 'opus', 'sample_rate': 48000, 'channels': head[payload + 9]}
+    raise InvalidAudio('Códec Ogg no soportado (se aceptan Vorbis y Opus).')
+
+
+PARSERS = {
+    'wav': parse_wav,
+    'flac': parse_flac,
+    'mp3': parse_mp3,
+    'aac': parse_adts,
+    'ogg': parse_ogg,
+}
+
+
+def probe_head(head, extension):
+    """
+    Valida los primeros bytes del archivo contra su extensión.
+
+    Retorna el dict de cabecera; lanza ``NeedMoreData`` si faltan bytes o
+    ``InvalidAudio`` si el contenido no corresponde.
+    """
+    if extension not in ALLOWED_EXTENSIONS:
+        raise InvalidAudio(f'Formato no permitido. Use: {", ".join(ALLOWED_EXTENSIONS)}')
+    _need(head, 12)
+    container = sniff(head)
+    if container is None:
+        raise InvalidAudio('El archivo no es un audio reconocible.')
+    if container != extension:
+        raise InvalidAudio(f'El contenido es {container.upper()} pero la extensión es .{extension}.')
+    info = PARSERS[container](head)
+    if not 1 <= info['channels'] <= 8 or not 8000 <= info['sample_rate'] <= 384000:
+        raise InvalidAudio('La cabecera del audio tiene valores inválidos.')
+    return {'container': container, **info}
+
+
+def _probe_command(source):
+    """(argumentos, stdin) para el proceso de parseo"""
+    if isinstance(source, str):
+        return [sys.executable, '-c', PROBE_SCRIPT, source], None
+    source.seek(0)
+    return [sys.executable, '-c', PROBE_SCRIPT], source.read()
+
+
+def inspect_file(source, timeout=None):
+    """
+    Parsea el archivo completo con mutagen (ruta o archivo abierto).
+
+    El parseo corre en un proceso aparte que se mata después de
+    ``AUDIO_PROBE_TIMEOUT`` segundos.
+    """
+    if timeout is None:
+        timeout = _setting('AUDIO_PROBE_TIMEOUT', 10)
+    start = time.perf_counter()
+    command, data = _probe_command(source)
+    try:
+        result = subprocess.run(command, input=data, capture_output=True, timeout=timeout, check=True)
+        info = json.loads(result.stdout)
+    except subprocess.TimeoutExpired:
+        JOB_SECONDS.observe(time.perf_counter() - start, job='probe', outcome='timeout')
+        raise InvalidAudio('El audio tardó demasiado en analizarse.')
+    except (subprocess.CalledProcessError, ValueError) as e:
+        JOB_SECONDS.observe(time.perf_counter() - start, job='probe', outcome='error')
+        stderr = getattr(e, 'stderr', None) or b''
+        reason = stderr.decode(errors='replace').strip().splitlines()[-1:] or [str(e)]
+        raise InvalidAudio(f'No se pudo leer el audio: {reason[0]}')
+    JOB_SECONDS.observe(time.perf_counter() - start, job='probe', outcome='ok')
+    if not info or not info['length']:
+        raise InvalidAudio('No se pudo leer el audio.')
+    return {
+        'duration': round(info['length'], 3),
+        'bitrate': info['bitrate'] or None,
+        'sample_rate': info['sample_rate'],
+    }
+
+
+class StreamValidator:
+    """Valida un archivo a medida que llegan sus chunks"""
+
+    def __init__(self, file_name):
+        self.extension = extension_of(file_name)
+        self.size = 0
+        self.head = bytearray()
+        self.header = None
+        self.digest = hashlib.sha256()
+
+    def feed(self, data):
+        """Bytes que ya se pueden escribir (vacío mientras la cabecera no se validó)"""
+        self.size += len(data)
+        if self.size > max_upload_bytes():
+            raise size_error()
+        self.digest.update(data)
+        if self.header is not None:
+            return data
+        self.head += data
+        try:
+            self.header = probe_head(self.head, self.extension)
+        except NeedMoreData:
+            if len(self.head) >= MAX_PROBE_BYTES:
+                raise InvalidAudio('No se encontró una cabecera de audio válida.')
+            return b''
+        data, self.head = bytes(self.head), None
+        return data
+
+    def finish(self):
+        """Bytes pendientes al terminar la subida (archivos más chicos que la cabecera)"""
+        if self.header is not None:
+            return b''
+        try:
+            self.header = probe_head(self.head, self.extension)
+        except NeedMoreData:
+            raise InvalidAudio('El archivo de audio está truncado.')
+        return bytes(self.head)
+
+    def media_info(self, details):
+        return {**self.header, **{key: value for key, value in details.items() if value},
+                'size': self.size, 'sha256': self.digest.hexdigest()}
+
+
+class RejectedUpload(InMemoryUploadedFile):
+    """Archivo descartado durante la subida; el formulario reporta ``validation_error``"""
+
+    def __init__(self, name, content_type, size, error):
+        # Sin contenido, pero con el tamaño recibido para que FileField no lo reporte como vacío
+        super().__init__(io.BytesIO(), 'audio_file', name, content_type, size, None)
+        self.validation_error = error
+
+
+class AudioUploadHandler(TemporaryFileUploadHandler):
+    """Valida el audio mientras llega; los demás campos pasan a los handlers siguientes"""
+
+    field_names = ('audio_file',)
+
+    def new_file(self, field_name, *args, **kwargs):
+        self.active = field_name in self.field_names
+        if not self.active:
+            return
+        super().new_file(field_name, *args, **kwargs)
+        self.error = None
+        self.validator = StreamValidator(self.file_name)
+        if self.content_length and self.content_length > max_upload_bytes():
+            self.reject(size_error())
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.error is None:
+            try:
+                self.file.write(self.validator.feed(raw_data))
+            except InvalidAudio as error:
+                self.reject(error)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        if self.error is None:
+            try:
+                self.file.write(self.validator.finish())
+                self.file.flush()
+                details = inspect_file(self.file.temporary_file_path())
+            except InvalidAudio as error:
+                self.reject(error)
+        UPLOAD_BYTES.observe(file_size, outcome='rejected' if self.error is not None else 'accepted')
+        if self.error is not None:
+            return RejectedUpload(self.file_name, self.content_type, file_size, str(self.error))
+        upload = super().file_complete(file_size)
+        upload.media_info = self.validator.media_info(details)
+        return upload
+
+    def reject(self, error):
+        """Descarta lo escrito; el resto del stream no llega al disco"""
+        self.error = error
+        self.upload_interrupted()
+
+
+def validate_upload(upload):
+    """
+    ``media_info`` de un archivo subido; lanza ``InvalidAudio``.
+
+    Reutiliza lo calculado por ``AudioUploadHandler``; si el archivo llegó
+    por otro camino (tests, scripts) lo valida leyéndolo por partes.
+    """
+    error = getattr(upload, 'validation_error', None)
+    if error:
+        raise InvalidAudio(error)
+    if getattr(upload, 'media_info', None):
+        return upload.media_info
+
+    validator = StreamValidator(upload.name)
+    for chunk in upload.chunks():
+        validator.feed(chunk)
+    validator.finish()
+    if hasattr(upload, 'temporary_file_path'):
+        details = inspect_file(upload.temporary_file_path())
+    else:
+        details = inspect_file(upload.file)
+    upload.seek(0)
+    upload.media_info = validator.media_info(details)
+    return upload.media_info
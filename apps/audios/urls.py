@@ -1,28 +1,49 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# En ASGI las vistas de lectura del catálogo tienen versión async
+catalog_views = async_views if settings.ASYNC_VIEWS else views
 
 app_name = 'audios'
 
 urlpatterns = [
     # Listado y búsqueda
-    path('', views.audio_list, name='list'),
-    path('buscar/', views.audio_list, name='search'),
+    path('', catalog_views.audio_list, name='list'),
+    path('buscar/', catalog_views.audio_list, name='search'),
     
     # Gestión de audios del usuario (ANTES de slug para evitar conflictos)
     path('mis-audios/', views.my_audios, name='my_audios'),
     path('subir/', views.audio_upload, name='upload'),
     path('favoritos/', views.favorites_list, name='favorites'),
     
+    # Playlists
+    path('playlists/', views.playlists_list, name='playlists'),
+    path('playlists/<int:pk>/', views.playlist_detail, name='playlist_detail'),
+    path('playlists/<int:pk>/agregar/', views.playlist_add_audios, name='playlist_add'),
+    path('playlists/<int:pk>/quitar/', views.playlist_remove_audios, name='playlist_remove'),
+    path('playlists/<int:pk>/ordenar/', views.playlist_reorder, name='playlist_reorder'),
+    
+    # Moderación
+    path('moderacion/', views.moderation_queue, name='moderation'),
+    path('moderacion/decidir/', views.moderation_decide, name='moderation_decide'),
+    path('moderacion/metricas/', views.moderation_stats, name='moderation_stats'),
+    
     # Categorías y vendedores
     path('categoria/<slug:slug>/', views.category_detail, name='category'),
     path('vendedor/<str:username>/', views.seller_profile, name='seller_profile'),
     
+    # Descargas con token firmado
+    path('descargas/<str:token>/', views.download_file, name='download_file'),
+    
     # API endpoints
-    path('api/buscar-sugerencias/', views.search_suggestions, name='search_suggestions'),
+    path('api/buscar-sugerencias/', catalog_views.search_suggestions, name='search_suggestions'),
     
     # Detalle y acciones de audios (AL FINAL para evitar conflictos de slug)
-    path('<slug:slug>/', views.audio_detail, name='detail'),
-    path('<slug:slug>/favorito/', views.toggle_favorite, name='toggle_favorite'),
+    path('<slug:slug>/', catalog_views.audio_detail, name='detail'),
+    path('<slug:slug>/favorito/', catalog_views.toggle_favorite, name='toggle_favorite'),
+    path('<slug:slug>/descargar/', views.download_audio, name='download'),
+    path('<slug:slug>/similares/', views.similar_audios, name='similar'),
     path('<slug:slug>/reseña/', views.add_review, name='add_review'),
     path('<slug:slug>/editar/', views.audio_edit, name='edit'),
     path('<slug:slug>/eliminar/', views.delete_audio, name='delete'),
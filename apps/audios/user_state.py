@@ -0,0 +1,83 @@
+"""
+Estado del usuario actual sobre los audios de una página.
+
+Resuelve en lote si cada audio está en favoritos, si el usuario ya lo
+reseñó o compró, en qué playlists lo tiene y si es el dueño. Se hace una consulta
+por relación para toda la página y el resultado se memoriza en el request,
+de modo que varias secciones de la misma vista no repiten consultas.
+"""
+from .models import AudioPurchase, AudioReview, PlaylistItem
+from . import favorites
+
+
+class UserAudioState:
+    """Estado por audio del usuario, cargado en lote y memorizado"""
+
+    def __init__(self, user):
+        self.user = user
+        self.favorite_ids = set()
+        self.reviewed_ids = set()
+        self.purchased_ids = set()
+        self.playlist_ids = {}
+        self._loaded_ids = set()
+
+    def load(self, audio_ids):
+        """Carga el estado de los audios que aún no se consultaron"""
+        pending = set(audio_ids) - self._loaded_ids
+        if not pending:
+            return self
+        self._loaded_ids |= pending
+        if not self.user.is_authenticated:
+            return self
+
+        self.favorite_ids |= favorites.favorite_ids(self.user, pending)
+        self.reviewed_ids |= set(
+            AudioReview.objects.filter(user=self.user, audio_id__in=pending)
+            .values_list('audio_id', flat=True)
+        )
+        self.purchased_ids |= set(
+            AudioPurchase.objects.filter(user=self.user, audio_id__in=pending)
+            .values_list('audio_id', flat=True)
+        )
+        memberships = PlaylistItem.objects.filter(
+            playlist__user=self.user, audio_id__in=pending
+        ).values_list('audio_id', 'playlist_id')
+        for audio_id, playlist_id in memberships:
+            self.playlist_ids.setdefault(audio_id, set()).add(playlist_id)
+        return self
+
+    def is_favorite(self, audio_id):
+        return audio_id in self.load([audio_id]).favorite_ids
+
+    def has_reviewed(self, audio_id):
+        return audio_id in self.load([audio_id]).reviewed_ids
+
+    def has_purchased(self, audio_id):
+        return audio_id in self.load([audio_id]).purchased_ids
+
+    def playlists_for(self, audio_id):
+        return self.load([audio_id]).playlist_ids.get(audio_id, set())
+
+    def is_owner(self, audio):
+        return self.user.is_authenticated and audio.seller_id == self.user.id
+
+    def annotate(self, audios):
+        """Agrega los atributos ``user_*`` a cada audio y retorna la misma colección"""
+        audios = list(audios)
+        self.load(audio.id for audio in audios)
+        for audio in audios:
+            audio.user_is_favorite = audio.id in self.favorite_ids
+            audio.user_has_reviewed = audio.id in self.reviewed_ids
+            audio.user_has_purchased = audio.id in self.purchased_ids
+            audio.user_playlist_ids = self.playlist_ids.get(audio.id, set())
+            audio.user_is_owner = self.is_owner(audio)
+        return audios
+
+
+def get_user_state(request):
+    """Retorna el estado del usuario memorizado para este request"""
+    state = getattr(request, '_audio_user_state', None)
+    if state is None:
+        state = UserAudioState(request.user)
+        request._audio_user_state = state
+    return state
@@ -0,0 +1,195 @@
+"""
+Conteo de visualizaciones del detalle de un audio.
+
+Antes cada GET sumaba una visualización con su UPDATE, incluidas recargas,
+crawlers y prefetch del navegador. Ahora una visita cuenta si:
+
+- no es de un bot (User-Agent vacío o conocido) ni un prefetch/preview;
+- el mismo visitante (usuario, sesión o IP + User-Agent) no vio ese audio
+  en la ventana de ``VIEW_DEDUPE_HOURS``.
+
+Para lo segundo se usa un filtro de Bloom rotativo: un arreglo de bits por
+ventana, en un archivo de ``VIEW_DEDUPE_DIR`` mapeado en memoria y
+compartido por todos los workers. Se consulta la ventana actual y la
+anterior, y se marca la actual, así que una visita se recuerda entre una y
+dos ventanas. El tamaño sale de ``VIEW_DEDUPE_CAPACITY`` (pares
+visitante-audio por ventana) y ``VIEW_DEDUPE_ERROR_RATE``: un falso
+positivo descarta una visualización real. Las escrituras de bits entre
+procesos no son atómicas; en el peor caso se pierde una marca y la
+visita se cuenta dos veces.
+
+Las visualizaciones que cuentan se acumulan por proceso y se escriben cada
+``VIEW_FLUSH_INTERVAL`` segundos: un UPDATE por cantidad distinta en
+``views_count`` (como ``flush_download_counts``) y los buckets de
+``trending``.
+"""
+import hashlib
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from apps.analytics import tracking
+from apps.analytics.models import EventKind
+from core.buffers import ProcessBuffer
+
+from . import trending
+from .models import Audio
+
+logger = logging.getLogger(__name__)
+
+BOT_PATTERN = re.compile(
+    r'bot|crawl|spider|slurp|archiver|facebookexternalhit|embedly|preview|monitor|'
+    r'headless|phantomjs|curl|wget|python-requests|httpx|aiohttp|go-http-client|java/|okhttp',
+    re.IGNORECASE,
+)
+
+
+def is_bot(request):
+    """Crawlers, clientes HTTP de scripts y prefetch/preview del navegador"""
+    user_agent = request.headers.get('User-Agent', '')
+    if not user_agent or BOT_PATTERN.search(user_agent):
+        return True
+    purpose = ' '.join(
+        request.headers.get(header, '') for header in ('Sec-Purpose', 'Purpose', 'X-Purpose', 'X-Moz')
+    ).lower()
+    return 'prefetch' in purpose or 'preview' in purpose
+
+
+def visitor_key(request):
+    """Identidad del visitante sin crear sesiones para los anónimos"""
+    if request.user.is_authenticated:
+        return f'u:{request.user.pk}'
+    session_key = getattr(request, 'session', None) and request.session.session_key
+    if session_key:
+        return f's:{session_key}'
+    return f'a:{request.META.get("REMOTE_ADDR", "")}:{request.headers.get("User-Agent", "")}'
+
+
+class RotatingBloomFilter:
+    """Filtro de Bloom por ventana de tiempo en archivos compartidos entre procesos"""
+
+    def __init__(self, directory, window, capacity, error_rate):
+        self.directory = Path(directory)
+        self.window = window
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(int(math.ceil(bits / 8)), 1024)  # bytes
+        self.hashes = max(1, round(-math.log2(error_rate)))
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        bits = self.size * 8
+        return [(first + index * second) % bits for index in range(self.hashes)]
+
+    def _map(self, generation, create):
+        if generation in self._maps:
+            return self._maps[generation]
+        path = self.directory / f'{generation}.bloom'
+        if not create and not path.exists():
+            return None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != self.size:
+                os.ftruncate(fd, self.size)
+            self._maps[generation] = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        return self._maps[generation]
+
+    def _rotate(self, generation):
+        """Cierra y borra las ventanas anteriores a la previa"""
+        for old in [old for old in self._maps if old < generation - 1]:
+            self._maps.pop(old).close()
+        for path in self.directory.glob('*.bloom'):
+            if path.stem.isdigit() and int(path.stem) < generation - 1:
+                path.unlink(missing_ok=True)
+
+    def add(self, key, now=None):
+        """Marca la clave; True si no estaba en la ventana actual ni en la anterior"""
+        positions = self._positions(key)
+        generation = int((now if now is not None else time.time()) // self.window)
+        with self._lock:
+            if generation not in self._maps:
+                self._rotate(generation)
+            current = self._map(generation, create=True)
+            previous = self._map(generation - 1, create=False)
+            seen = any(
+                bloom is not None and all(bloom[position >> 3] & (1 << (position & 7)) for position in positions)
+                for bloom in (current, previous)
+            )
+            for position in positions:
+                current[position >> 3] |= 1 << (position & 7)
+        return not seen
+
+
+_filter = None
+_filter_config = None
+_filter_lock = threading.Lock()
+_pending = ProcessBuffer(Counter, interval=lambda: getattr(settings, 'VIEW_FLUSH_INTERVAL', 10))
+
+
+def get_filter():
+    """Filtro del proceso (se rehace si cambia la configuración)"""
+    global _filter, _filter_config
+    config = (
+        getattr(settings, 'VIEW_DEDUPE_DIR', Path(settings.BASE_DIR) / 'var' / 'views'),
+        getattr(settings, 'VIEW_DEDUPE_HOURS', 12) * 3600,
+        getattr(settings, 'VIEW_DEDUPE_CAPACITY', 1_000_000),
+        getattr(settings, 'VIEW_DEDUPE_ERROR_RATE', 0.01),
+    )
+    with _filter_lock:
+        if _filter is None or _filter_config != config:
+            _filter, _filter_config = RotatingBloomFilter(*config), config
+        return _filter
+
+
+def count_view(request, audio):
+    """Registra la visualización si corresponde; retorna si contó"""
+    if is_bot(request):
+        return False
+    visitor = visitor_key(request)
+    if not get_filter().add(f'{visitor}:{audio.pk}'):
+        return False
+
+    with _pending as pending:
+        pending[audio.pk] += 1
+    if _pending.due():
+        flush()
+    user_id = request.user.pk if request.user.is_authenticated else None
+    tracking.track(EventKind.VIEW, audio.pk, user_id, visitor=visitor)
+    return True
+
+
+@_pending.flusher
+def flush():
+    """Escribe las visualizaciones acumuladas; retorna cuántas"""
+    counts = _pending.take()
+    if not counts:
+        return 0
+
+    audios_by_count = {}
+    for audio_id, count in counts.items():
+        audios_by_count.setdefault(count, []).append(audio_id)
+    hour = trending.hour_of(timezone.now())
+    try:
+        for count, audio_ids in audios_by_count.items():
+            Audio.objects.filter(pk__in=audio_ids).update(views_count=F('views_count') + count)
+        trending.record_many({(audio_id, hour): count for audio_id, count in counts.items()}, 'views')
+    except DatabaseError as e:
+        logger.warning('Se descartaron %s visualizaciones: %s', sum(counts.values()), e)
+        return 0
+    return sum(counts.values())
@@ -1,92 +1,122 @@
+import json
+import logging
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Avg, Count
-from django.http import JsonResponse, Http404, HttpResponseForbidden
+from django.db.models import Q, Avg, Count, Sum
+from django.core import signing
+from django.http import JsonResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseGone
 from django.urls import reverse
 from django.views.decorators.http import require_POST
 from django.contrib.auth import get_user_model
-from django.db.models import F
 
-from .models import Audio, Category, Genre, Tag, AudioFavorite, AudioReview, AudioPlaylist
+from .models import Audio, AudioCard, Category, Genre, Tag, AudioReview, AudioPlaylist
 from .forms import AudioUploadForm, AudioFilterForm, AudioReviewForm, PlaylistForm
+from . import cards, catalog, catalog_index, downloads, facets, favorites, moderation, similarity, transcoding, view_counting
+from .catalog import CatalogFilters
+from .projections import Projection
+from . import playlists as playlist_service
+from .user_state import get_user_state
+from apps.analytics import reports
+from core.fanout import fan_out
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def _with_facet_counts(queryset, counts, limit=None):
+    """Objetos con al menos un audio según los conteos, ordenados por cantidad"""
+    objects = list(queryset.filter(pk__in=[pk for pk, count in counts.items() if count > 0]))
+    for obj in objects:
+        obj.audio_count = counts[obj.pk]
+    objects.sort(key=lambda obj: -obj.audio_count)
+    return objects[:limit] if limit else objects
+
+
+def listing_stats(facet_counts):
+    """Estadísticas de la sidebar del listado a partir de los conteos de facetas"""
+    categories = list(Category.objects.filter(is_active=True))
+    for category in categories:
+        category.audio_count = facet_counts.categories.get(category.pk, 0)
+    
+    price_buckets = []
+    for bucket, label in enumerate(facets.PRICE_BUCKET_LABELS):
+        low, high = facets.bucket_bounds(bucket)
+        price_buckets.append({
+            'label': label,
+            'min': low,
+            'max': high,
+            'audio_count': facet_counts.price_buckets.get(bucket, 0),
+        })
+    
+    return {
+        'total_audios': facets.counts(CatalogFilters()).total,
+        'categories': categories,
+        'genres': _with_facet_counts(Genre.objects.filter(is_active=True), facet_counts.genres, limit=15),
+        'tags': _with_facet_counts(Tag.objects.all(), facet_counts.tags, limit=15),
+        'price_buckets': price_buckets,
+        'facets_exact': facet_counts.exact,
+        'featured_audios': Projection(AudioCard.objects.filter(is_featured=True))[:6]
+    }
 
 
 def audio_list(request):
     """Lista de audios con filtros y búsqueda"""
     form = AudioFilterForm(request.GET)
-    audios = Audio.objects.filter(status=Audio.Status.PUBLISHED).select_related(
-        'seller', 'category', 'genre'
-    ).prefetch_related('tags')
-    
-    # Aplicar filtros
-    if form.is_valid():
-        search = form.cleaned_data.get('search')
-        if search:
-            audios = audios.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(seller__first_name__icontains=search) |
-                Q(seller__last_name__icontains=search) |
-                Q(tags__name__icontains=search)
-            ).distinct()
-        
-        category = form.cleaned_data.get('category')
-        if category:
-            audios = audios.filter(category=category)
-        
-        genre = form.cleaned_data.get('genre')
-        if genre:
-            audios = audios.filter(genre=genre)
-        
-        min_price = form.cleaned_data.get('min_price')
-        if min_price:
-            audios = audios.filter(price_standard__gte=min_price)
-        
-        max_price = form.cleaned_data.get('max_price')
-        if max_price:
-            audios = audios.filter(price_standard__lte=max_price)
-        
-        sort_by = form.cleaned_data.get('sort_by')
-        if sort_by:
-            audios = audios.order_by(sort_by)
+    filters = form.catalog_filters()
+    published = Audio.objects.filter(status=Audio.Status.PUBLISHED)
+    sort_by = form.cleaned_data.get('sort_by') if form.is_valid() else None
+    search_results = catalog.restrict_queryset(published, filters)
+    
+    if catalog_index.enabled():
+        # Filtros resueltos en memoria; la búsqueda de texto y los filtros acústicos siguen en la base
+        index = catalog_index.get_index()
+        search_ids = list(search_results.values_list('pk', flat=True)) if search_results is not None else None
+        audios = index.query(filters, sort_by, search_ids)
+        facet_counts = index.counts(filters, search_ids)
+    else:
+        # Tarjetas desnormalizadas: una consulta a una tabla por página
+        audios = Projection(cards.listing(filters, sort_by, restricted=search_results))
+        # Conteos de facetas para la sidebar (respetan los filtros activos)
+        facet_counts = facets.counts(filters, queryset=search_results)
     
     # Paginación
     paginator = Paginator(audios, 12)  # 12 audios por página
     page = request.GET.get('page')
     audios_page = paginator.get_page(page)
-    
-    # Estadísticas para la sidebar
-    stats = {
-        'total_audios': Audio.objects.filter(status=Audio.Status.PUBLISHED).count(),
-        'categories': Category.objects.filter(is_active=True).annotate(
-            audio_count=Count('audios', filter=Q(audios__status=Audio.Status.PUBLISHED))
-        ),
-        'featured_audios': Audio.objects.filter(
-            status=Audio.Status.PUBLISHED, 
-            is_featured=True
-        )[:6]
-    }
+    get_user_state(request).annotate(audios_page)
     
     context = {
         'audios': audios_page,
         'form': form,
-        'stats': stats,
-        'active_filters': any([
-            form.cleaned_data.get('search') if form.is_valid() else False,
-            form.cleaned_data.get('category') if form.is_valid() else False,
-            form.cleaned_data.get('genre') if form.is_valid() else False,
-            form.cleaned_data.get('min_price') if form.is_valid() else False,
-            form.cleaned_data.get('max_price') if form.is_valid() else False,
-        ])
+        'stats': listing_stats(facet_counts),
+        'active_filters': any(filters)
     }
     
     return render(request, 'audios/list.html', context)
 
 
+def detail_queries(audio):
+    """Consultas de lectura del detalle que no dependen entre sí (para fan_out)"""
+    others = Audio.objects.filter(status=Audio.Status.PUBLISHED).exclude(id=audio.id)
+    return {
+        # Reseñas y sus estadísticas
+        'reviews': audio.reviews.select_related('user').order_by('-created_at')[:10],
+        'review_stats': lambda: audio.reviews.aggregate(
+            avg_rating=Avg('rating'),
+            total_reviews=Count('rating')
+        ),
+        # Audios que suenan parecido (mismo género si no hay índice) y más audios del mismo vendedor
+        'related_audios': lambda: (
+            similarity.similar(audio, 6) or
+            list(others.filter(genre_id=audio.genre_id).select_related('seller')[:6])
+        ),
+        'more_from_seller': others.filter(seller_id=audio.seller_id).select_related('category')[:4],
+    }
+
+
 def audio_detail(request, slug):
     """Detalle de un audio específico"""
     audio = get_object_or_404(
@@ -95,40 +125,23 @@ def audio_detail(request, slug):
         status=Audio.Status.PUBLISHED
     )
     
-    # Incrementar contador de visualizaciones
-    Audio.objects.filter(id=audio.id).update(views_count=F('views_count') + 1)
-    
-    # Verificar si está en favoritos (si el usuario está logueado)
-    is_favorite = False
-    if request.user.is_authenticated:
-        is_favorite = AudioFavorite.objects.filter(user=request.user, audio=audio).exists()
+    # Visualización deduplicada por visitante y sin bots (se escribe en lotes)
+    view_counting.count_view(request, audio)
     
-    # Obtener reseñas
-    reviews = audio.reviews.select_related('user').order_by('-created_at')[:10]
-    
-    # Estadísticas de reseñas
-    review_stats = audio.reviews.aggregate(
-        avg_rating=Avg('rating'),
-        total_reviews=Count('rating')
-    )
+    # Consultas independientes entre sí, en paralelo
+    results = fan_out(detail_queries(audio))
+    related_audios = results['related_audios']
+    more_from_seller = results['more_from_seller']
     
-    # Audios relacionados (mismo género, excluyendo el actual)
-    related_audios = Audio.objects.filter(
-        genre=audio.genre,
-        status=Audio.Status.PUBLISHED
-    ).exclude(id=audio.id).select_related('seller')[:6]
-    
-    # Más audios del mismo vendedor
-    more_from_seller = Audio.objects.filter(
-        seller=audio.seller,
-        status=Audio.Status.PUBLISHED
-    ).exclude(id=audio.id).select_related('category')[:4]
+    # Estado del usuario (favoritos, reseñas, playlists) para toda la página
+    get_user_state(request).annotate([audio, *related_audios, *more_from_seller])
     
     context = {
         'audio': audio,
-        'is_favorite': is_favorite,
-        'reviews': reviews,
-        'review_stats': review_stats,
+        'is_favorite': audio.user_is_favorite,
+        'has_reviewed': audio.user_has_reviewed,
+        'reviews': results['reviews'],
+        'review_stats': results['review_stats'],
         'related_audios': related_audios,
         'more_from_seller': more_from_seller,
         'can_review': request.user.is_authenticated and request.user != audio.seller,
@@ -237,43 +250,101 @@ def my_audios(request):
 @require_POST
 def toggle_favorite(request, slug):
     """Toggle de favorito para un audio"""
-    audio = get_object_or_404(Audio, slug=slug, status=Audio.Status.PUBLISHED)
-    
-    favorite, created = AudioFavorite.objects.get_or_create(
-        user=request.user,
-        audio=audio
+    audio = get_object_or_404(
+        Audio.objects.only('id'), slug=slug, status=Audio.Status.PUBLISHED
     )
     
-    if not created:
-        favorite.delete()
-        is_favorite = False
-        action = 'removed'
-    else:
-        is_favorite = True
-        action = 'added'
+    result = favorites.toggle_favorite(request.user, audio.id)
+    action = 'added' if result.is_favorite else 'removed'
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({
             'success': True,
-            'is_favorite': is_favorite,
+            'is_favorite': result.is_favorite,
             'action': action,
-            'favorites_count': audio.favorites_count
+            'favorites_count': result.favorites_count
         })
     
     return redirect('audios:detail', slug=slug)
 
 
+def similar_audios(request, slug):
+    """Audios que suenan parecido a este (JSON)"""
+    audio = get_object_or_404(Audio.objects.only('id', 'embedding'), slug=slug, status=Audio.Status.PUBLISHED)
+    try:
+        limit = min(max(int(request.GET.get('limit', 12)), 1), 50)
+    except ValueError:
+        limit = 12
+    results = similarity.similar(audio, limit)
+    return JsonResponse({
+        'results': [
+            {
+                'title': other.title,
+                'slug': other.slug,
+                'url': other.get_absolute_url(),
+                'seller': other.seller.get_full_name(),
+                'price': str(other.price_standard),
+                'bpm': other.bpm,
+                'musical_key': other.get_musical_key_display() if other.musical_key is not None else None,
+                'similarity': round(other.similarity, 4),
+            }
+            for other in results
+        ]
+    })
+
+
+@login_required
+def download_audio(request, slug):
+    """Verifica la compra y redirige a la descarga con un token de vida corta"""
+    audio = get_object_or_404(Audio, slug=slug)
+    purchase = downloads.purchase_for(request.user, audio)
+    if purchase is None and audio.seller_id != request.user.id:
+        messages.error(request, 'Necesitas comprar una licencia para descargar este audio.')
+        return redirect('audios:detail', slug=slug)
+    
+    fmt = request.GET.get('formato') or None
+    if fmt is not None and fmt not in transcoding.FORMATS:
+        raise Http404
+    token = downloads.make_token(audio, request.user, purchase, fmt)
+    return redirect('audios:download_file', token=token)
+
+
+def download_file(request, token):
+    """Entrega el master (el token reemplaza a la sesión; admite Range)"""
+    try:
+        grant = downloads.read_token(token)
+    except signing.SignatureExpired:
+        return HttpResponseGone('El enlace de descarga expiró.')
+    except signing.BadSignature:
+        raise Http404
+    
+    audio = get_object_or_404(Audio.objects.only('id', 'audio_file', 'content_hash'), pk=grant.audio_id)
+    try:
+        response = downloads.file_response(audio, request.headers.get('Range'), grant.fmt)
+    except transcoding.TranscodeError:
+        logger.exception('No se pudo transcodificar el audio %s a %s', audio.pk, grant.fmt)
+        response = HttpResponse('El formato pedido no está disponible en este momento.', status=503)
+        response['Retry-After'] = '60'
+        return response
+    if response.status_code in (200, 206) and downloads.is_new_download(request):
+        downloads.record_download(grant, request.META.get('REMOTE_ADDR'))
+    return response
+
+
 @login_required
 def favorites_list(request):
     """Lista de audios favoritos del usuario"""
-    favorites = AudioFavorite.objects.filter(user=request.user).select_related(
-        'audio__seller', 'audio__category'
-    ).order_by('-created_at')
+    # Tarjetas de los favoritos publicados, del más reciente al más viejo
+    favorites = Projection(
+        AudioCard.objects.filter(audio__favorited_by__user=request.user)
+        .order_by('-audio__favorited_by__created_at')
+    )
     
     # Paginación
     paginator = Paginator(favorites, 12)
     page = request.GET.get('page')
     favorites_page = paginator.get_page(page)
+    get_user_state(request).annotate(favorites_page)
     
     context = {
         'favorites': favorites_page
@@ -282,6 +353,170 @@ def favorites_list(request):
     return render(request, 'audios/favorites.html', context)
 
 
+@login_required
+def playlists_list(request):
+    """Playlists del usuario logueado y alta de nuevas playlists"""
+    if request.method == 'POST':
+        form = PlaylistForm(request.POST)
+        if form.is_valid():
+            playlist = form.save(commit=False)
+            playlist.user = request.user
+            playlist.save()
+            messages.success(request, f'Playlist "{playlist.name}" creada exitosamente.')
+            return redirect('audios:playlist_detail', pk=playlist.pk)
+    else:
+        form = PlaylistForm()
+    
+    context = {
+        'playlists': playlist_service.user_playlists(request.user),
+        'form': form
+    }
+    
+    return render(request, 'audios/playlists.html', context)
+
+
+def playlist_detail(request, pk):
+    """Detalle de una playlist (pública o propia)"""
+    playlist = get_object_or_404(AudioPlaylist.objects.select_related('user'), pk=pk)
+    
+    is_owner = playlist.user == request.user
+    if not playlist.is_public and not is_owner:
+        raise Http404('Playlist no encontrada')
+    
+    items = playlist.items.select_related('audio__seller', 'audio__category').order_by('position')
+    
+    context = {
+        'playlist': playlist,
+        'items': items,
+        'is_owner': is_owner
+    }
+    
+    return render(request, 'audios/playlist_detail.html', context)
+
+
+def _audio_ids_from_request(request):
+    """Lee la lista ``audio_ids`` del formulario o de un cuerpo JSON"""
+    if request.content_type == 'application/json':
+        try:
+            values = json.loads(request.body or b'{}').get('audio_ids', [])
+        except (ValueError, AttributeError):
+            return None
+    else:
+        values = request.POST.getlist('audio_ids')
+    
+    try:
+        return [int(value) for value in values]
+    except (TypeError, ValueError):
+        return None
+
+
+def _playlist_edit(request, pk, operation, success_message):
+    """Aplica una edición en lote sobre una playlist propia"""
+    playlist = get_object_or_404(AudioPlaylist, pk=pk, user=request.user)
+    audio_ids = _audio_ids_from_request(request)
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    
+    if audio_ids is None:
+        if is_ajax:
+            return JsonResponse({'success': False, 'error': 'Lista de audios inválida.'}, status=400)
+        messages.error(request, 'Lista de audios inválida.')
+        return redirect('audios:playlist_detail', pk=pk)
+    
+    result = operation(playlist, audio_ids)
+    
+    if is_ajax:
+        playlist.refresh_from_db(fields=['track_count', 'total_duration'])
+        return JsonResponse({
+            'success': True,
+            'result': result,
+            'track_count': playlist.track_count,
+            'total_duration': int(playlist.total_duration.total_seconds())
+        })
+    
+    messages.success(request, success_message)
+    return redirect('audios:playlist_detail', pk=pk)
+
+
+@login_required
+def moderation_queue(request):
+    """Lote de audios pendientes reclamado por el moderador"""
+    if not request.user.is_admin_user:
+        messages.warning(request, 'No tienes permisos para acceder a esta sección.')
+        return redirect('core:home')
+    
+    context = {
+        'tasks': moderation.claim(request.user),
+        'stats': moderation.queue_stats(),
+        'claim_minutes': int(moderation.claim_duration().total_seconds() // 60),
+    }
+    return render(request, 'audios/moderation_queue.html', context)
+
+
+@login_required
+@require_POST
+def moderation_decide(request):
+    """Aprueba, rechaza o libera en lote los audios seleccionados"""
+    if not request.user.is_admin_user:
+        return HttpResponseForbidden()
+    audio_ids = _audio_ids_from_request(request)
+    action = request.POST.get('action')
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    
+    if audio_ids is None or action not in ('approve', 'reject', 'release'):
+        if is_ajax:
+            return JsonResponse({'success': False, 'error': 'Solicitud inválida.'}, status=400)
+        messages.error(request, 'Solicitud inválida.')
+        return redirect('audios:moderation')
+    
+    if action == 'release':
+        released = moderation.release(request.user, audio_ids)
+        result = {'released': released}
+        message = f'{released} audio(s) devuelto(s) a la cola.'
+    else:
+        decision = moderation.decide(
+            request.user, audio_ids, approve=action == 'approve', note=request.POST.get('note', '').strip()
+        )
+        result = decision._asdict()
+        verb = 'aprobado(s)' if action == 'approve' else 'rechazado(s)'
+        message = f'{decision.decided} audio(s) {verb}.'
+        if decision.skipped:
+            message += f' {decision.skipped} omitido(s): ya decididos o reclamados por otro moderador.'
+    
+    if is_ajax:
+        return JsonResponse({'success': True, 'result': result})
+    messages.success(request, message)
+    return redirect('audios:moderation')
+
+
+@login_required
+def moderation_stats(request):
+    """Profundidad y latencia de la cola de moderación (JSON)"""
+    if not request.user.is_admin_user:
+        return HttpResponseForbidden()
+    return JsonResponse(moderation.queue_stats()._asdict())
+
+
+@login_required
+@require_POST
+def playlist_add_audios(request, pk):
+    """Agrega uno o varios audios a la playlist"""
+    return _playlist_edit(request, pk, playlist_service.add_audios, 'Audios agregados a la playlist.')
+
+
+@login_required
+@require_POST
+def playlist_remove_audios(request, pk):
+    """Quita uno o varios audios de la playlist"""
+    return _playlist_edit(request, pk, playlist_service.remove_audios, 'Audios quitados de la playlist.')
+
+
+@login_required
+@require_POST
+def playlist_reorder(request, pk):
+    """Reordena la playlist según la lista de ids recibida"""
+    return _playlist_edit(request, pk, playlist_service.reorder, 'Playlist reordenada.')
+
+
 @login_required
 def add_review(request, slug):
     """Agregar reseña a un audio"""
@@ -322,58 +557,67 @@ def category_detail(request, slug):
     """Audios de una categoría específica"""
     category = get_object_or_404(Category, slug=slug, is_active=True)
     
-    audios = Audio.objects.filter(
-        category=category,
-        status=Audio.Status.PUBLISHED
-    ).select_related('seller', 'genre').order_by('-published_at')
+    audios = Projection(AudioCard.objects.filter(category=category).order_by('-published_at', '-audio'))
     
     # Paginación
     paginator = Paginator(audios, 12)
     page = request.GET.get('page')
     audios_page = paginator.get_page(page)
+    get_user_state(request).annotate(audios_page)
     
-    # Géneros disponibles en esta categoría
-    genres = Genre.objects.filter(
-        category=category,
-        is_active=True,
-        audios__status=Audio.Status.PUBLISHED
-    ).distinct().annotate(
-        audio_count=Count('audios', filter=Q(audios__status=Audio.Status.PUBLISHED))
+    # Géneros disponibles en esta categoría (conteos precalculados)
+    facet_counts = facets.counts(CatalogFilters(category_id=category.pk))
+    genres = _with_facet_counts(
+        Genre.objects.filter(category=category, is_active=True), facet_counts.genres
     )
     
     context = {
         'category': category,
         'audios': audios_page,
         'genres': genres,
-        'total_audios': audios.count()
+        'total_audios': facet_counts.total
     }
     
     return render(request, 'audios/category_detail.html', context)
 
 
+def _load_page(paginator, number):
+    """Página con sus objetos ya cargados (para evaluarla dentro de fan_out)"""
+    page = paginator.get_page(number)
+    page.object_list = list(page.object_list)
+    return page
+
+
 def seller_profile(request, username):
     """Perfil público de un vendedor"""
     seller = get_object_or_404(User, username=username, user_type='seller')
     
-    audios = Audio.objects.filter(
-        seller=seller,
-        status=Audio.Status.PUBLISHED
-    ).select_related('category', 'genre').order_by('-published_at')
-    
-    # Estadísticas del vendedor
-    stats = {
-        'total_audios': audios.count(),
-        'total_downloads': sum(audio.downloads_count for audio in audios),
-        'avg_rating': AudioReview.objects.filter(
-            audio__seller=seller
-        ).aggregate(avg=Avg('rating'))['avg'] or 0,
-        'total_reviews': AudioReview.objects.filter(audio__seller=seller).count()
-    }
+    audios = Audio.objects.filter(seller=seller, status=Audio.Status.PUBLISHED)
+    audio_cards = Projection(AudioCard.objects.filter(seller=seller).order_by('-published_at', '-audio'))
     
     # Paginación
-    paginator = Paginator(audios, 12)
+    paginator = Paginator(audio_cards, 12)
     page = request.GET.get('page')
-    audios_page = paginator.get_page(page)
+    
+    # Estadísticas del vendedor y página de audios, en paralelo
+    results = fan_out({
+        'audio_totals': lambda: audios.aggregate(total=Count('id'), downloads=Sum('downloads_count')),
+        'review_totals': lambda: AudioReview.objects.filter(audio__seller=seller).aggregate(
+            avg=Avg('rating'), total=Count('id')
+        ),
+        'page': lambda: _load_page(paginator, page),
+        'uniques': lambda: reports.seller_uniques(seller, days=30),
+    })
+    audio_totals, review_totals = results['audio_totals'], results['review_totals']
+    stats = {
+        'total_audios': audio_totals['total'],
+        'total_downloads': audio_totals['downloads'] or 0,
+        'avg_rating': review_totals['avg'] or 0,
+        'total_reviews': review_totals['total'],
+        'unique_listeners': results['uniques'].listeners,
+    }
+    audios_page = results['page']
+    get_user_state(request).annotate(audios_page)
     
     context = {
         'seller': seller,
@@ -434,12 +678,10 @@ def change_audio_status(request, slug):
     audio = get_object_or_404(Audio, slug=slug, seller=request.user)
     new_status = request.POST.get('status')
     
-    # Debug: imprimir datos recibidos
-    print(f"DEBUG: Cambiando estado de '{audio.title}' de '{audio.status}' a '{new_status}'")
-    
     # Validar que el nuevo estado sea válido
     valid_statuses = [choice[0] for choice in Audio.Status.choices]
     if new_status not in valid_statuses:
+        logger.warning('Estado inválido para el audio %s: %s', audio.pk, new_status, extra={'audio_id': audio.pk})
         messages.error(request, f'Estado inválido: {new_status}. Estados válidos: {valid_statuses}')
         return redirect('audios:my_audios')
     
@@ -450,10 +692,12 @@ def change_audio_status(request, slug):
     if new_status == Audio.Status.PUBLISHED and old_status != Audio.Status.PUBLISHED:
         from django.utils import timezone
         audio.published_at = timezone.now()
-        print(f"DEBUG: Establecida fecha de publicación: {audio.published_at}")
     
     audio.save()
-    print(f"DEBUG: Audio guardado con estado: {audio.status}")
+    logger.info(
+        'Estado de "%s" cambiado de %s a %s', audio.title, old_status, new_status,
+        extra={'audio_id': audio.pk, 'user_id': request.user.pk, 'old_status': old_status, 'status': new_status},
+    )
     
     # Mensajes informativos
     status_messages = {
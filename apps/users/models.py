@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils.functional import cached_property
 
 
 class UserType(models.TextChoices):
@@ -112,6 +113,11 @@ class Profile(models.Model):
     
     def __str__(self):
         return f"Perfil de {self.user.get_full_name()}"
+    
+    @cached_property
+    def genre_list(self):
+        """Géneros musicales ya separados y sin espacios (se calcula una vez por instancia)"""
+        return [genre.strip() for genre in self.genres.split(',') if genre.strip()]
 
 
 @receiver(post_save, sender=User)
@@ -1 +0,0 @@
-# Este archivo hace que Python trate esta carpeta como un paquete
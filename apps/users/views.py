@@ -4,9 +4,13 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.generic import CreateView
 from django.urls import reverse_lazy
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from functools import wraps
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, ProfileForm
 from .models import User
+from apps.analytics import reports
+from core.fanout import fan_out
 
 
 def redirect_authenticated_users(view_func):
@@ -168,29 +172,40 @@ def dashboard_seller(request):
     # Obtener audios del vendedor
     user_audios = Audio.objects.filter(seller=request.user).order_by('-created_at')
     
-    # Estadísticas del vendedor
-    stats = {
-        'total_audios': user_audios.count(),
-        'published_audios': user_audios.filter(status=Audio.Status.PUBLISHED).count(),
-        'pending_audios': user_audios.filter(status=Audio.Status.PENDING).count(),
-        'draft_audios': user_audios.filter(status=Audio.Status.DRAFT).count(),
-        'total_views': sum(audio.views_count for audio in user_audios),
-        'total_downloads': sum(audio.downloads_count for audio in user_audios),
-        'total_favorites': sum(audio.favorites_count for audio in user_audios),
-    }
-    
-    # Calcular ganancias (por ahora 0, se implementará con el sistema de pagos)
-    stats['total_sales'] = 0
-    stats['monthly_sales'] = 0
-    
-    # Audios recientes (últimos 5)
-    recent_audios = user_audios[:5]
+    # Estadísticas del vendedor (una agregación) y audios recientes, en paralelo
+    results = fan_out({
+        'stats': lambda: user_audios.aggregate(
+            total_audios=Count('id'),
+            published_audios=Count('id', filter=Q(status=Audio.Status.PUBLISHED)),
+            pending_audios=Count('id', filter=Q(status=Audio.Status.PENDING)),
+            draft_audios=Count('id', filter=Q(status=Audio.Status.DRAFT)),
+            total_views=Coalesce(Sum('views_count'), 0),
+            total_downloads=Coalesce(Sum('downloads_count'), 0),
+            total_favorites=Coalesce(Sum('favorites_count'), 0),
+        ),
+        # Audios recientes (últimos 5)
+        'recent_audios': user_audios[:5],
+        # Series y ventas desde los agregados de analíticas
+        'daily': lambda: reports.seller_daily(request.user, days=30),
+        'sales': lambda: reports.seller_sales(request.user),
+        'top_tracks': lambda: reports.top_tracks(request.user, days=30),
+        'uniques': lambda: reports.seller_uniques(request.user, days=30),
+        'monthly_uniques': lambda: reports.seller_uniques_this_month(request.user),
+    })
+    stats = results['stats']
+    stats['total_sales'] = results['sales'].total
+    stats['monthly_sales'] = results['sales'].this_month
+    stats['unique_visitors'] = results['uniques'].visitors
+    stats['unique_listeners'] = results['uniques'].listeners
+    stats['monthly_listeners'] = results['monthly_uniques'].listeners
     
     context = {
         'user': request.user,
         'user_type': 'seller',
         'stats': stats,
-        'recent_audios': recent_audios,
+        'recent_audios': results['recent_audios'],
+        'charts': reports.charts(results['daily']),
+        'top_tracks': results['top_tracks'],
     }
     return render(request, 'users/dashboard_seller.html', context)
 
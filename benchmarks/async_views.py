@@ -0,0 +1,125 @@
+"""
+Benchmark de las vistas del catálogo: WSGI (gunicorn) contra ASGI (uvicorn).
+
+Levanta cada servidor con un solo proceso sobre la base configurada, lanza
+requests concurrentes al listado y al detalle de un audio publicado y
+reporta requests por segundo y latencias p50/p95 por nivel de concurrencia.
+
+Uso (requiere requirements/dev.txt y algunos audios publicados):
+
+    python benchmarks/async_views.py --requests 300 --concurrency 1 10 50
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SERVERS = {
+    'wsgi': ['gunicorn', 'config.wsgi:application', '--workers', '1', '--threads', '{threads}',
+             '--bind', '127.0.0.1:{port}'],
+    'asgi': ['uvicorn', 'config.asgi:application', '--workers', '1', '--no-access-log',
+             '--host', '127.0.0.1', '--port', '{port}'],
+}
+
+
+def published_slug():
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from apps.audios.models import Audio
+
+    slug = Audio.objects.filter(status=Audio.Status.PUBLISHED).values_list('slug', flat=True).first()
+    if slug is None:
+        sys.exit('No hay audios publicados para el benchmark.')
+    return slug
+
+
+def server_env(kind):
+    env = dict(os.environ)
+    # DEBUG evita la redirección a HTTPS; el resto de la instrumentación se apaga
+    env.update({
+        'DEBUG': 'True',
+        'ALLOWED_HOSTS': '127.0.0.1,localhost',
+        'TEMPLATE_TIMING': 'False',
+        'ASYNC_VIEWS': 'True' if kind == 'asgi' else 'False',
+    })
+    return env
+
+
+def wait_until_ready(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/audios/')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'El servidor en el puerto {port} no respondió')
+
+
+def fetch(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    start = time.perf_counter()
+    connection.request('GET', path)
+    response = connection.getresponse()
+    response.read()
+    elapsed = time.perf_counter() - start
+    connection.close()
+    if response.status != 200:
+        raise RuntimeError(f'{path} respondió {response.status}')
+    return elapsed
+
+
+def run_load(port, paths, total, concurrency):
+    requests = [paths[index % len(paths)] for index in range(total)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(lambda path: fetch(port, path), requests))
+    elapsed = time.perf_counter() - start
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--threads', type=int, default=8, help='hilos de gunicorn (WSGI)')
+    args = parser.parse_args()
+
+    slug = published_slug()
+    paths = ['/audios/', f'/audios/{slug}/', '/audios/?sort_by=-views_count']
+
+    print(f"{'servidor':<8} {'conc.':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for kind, command in SERVERS.items():
+        command = [part.format(port=args.port, threads=args.threads) for part in command]
+        server = subprocess.Popen(command, cwd=BASE_DIR, env=server_env(kind),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_ready(args.port)
+            run_load(args.port, paths, min(args.requests, 30), 1)  # calentamiento
+            for concurrency in args.concurrency:
+                result = run_load(args.port, paths, args.requests, concurrency)
+                print(f"{kind:<8} {concurrency:>6} {result['rps']:>9.1f} "
+                      f"{result['p50']:>9.1f} {result['p95']:>9.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
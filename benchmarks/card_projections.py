@@ -0,0 +1,128 @@
+"""
+Benchmark de las páginas del listado: memoria y latencia por forma de carga.
+
+Compara, para páginas de 12, 48 y 100 tarjetas:
+
+- ``audio``: instancias de ``Audio`` con ``select_related`` de vendedor,
+  categoría y género y ``prefetch_related('tags')`` (la carga anterior);
+- ``card``: instancias del modelo ``AudioCard``;
+- ``projection``: ``projections.Projection`` (``values_list`` y objetos
+  con ``__slots__``).
+
+Cada página se carga ``--repeat`` veces: se reporta la mediana de la
+latencia y el pico de memoria asignada (``tracemalloc``) al armar la página.
+Con ``--seed N`` se crean N audios publicados de prueba dentro de una
+transacción que se revierte al final.
+
+Uso:
+
+    python benchmarks/card_projections.py --seed 200 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PAGE_SIZES = (12, 48, 100)
+
+
+class Rollback(Exception):
+    pass
+
+
+def setup():
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def seed(count):
+    """Audios publicados con descripción larga, etiquetas y sus tarjetas"""
+    from django.contrib.auth import get_user_model
+    from apps.audios import cards
+    from apps.audios.models import Audio, Category, Genre, Tag
+
+    seller = get_user_model().objects.create_user(
+        username='bench-seller', email='bench@example.com', password=None,
+        first_name='Bench', last_name='Seller', user_type='seller',
+    )
+    category = Category.objects.create(name='Bench categoría')
+    genre = Genre.objects.create(name='Bench género', category=category)
+    tags = [Tag.objects.create(name=f'bench-{index}') for index in range(5)]
+    audios = Audio.objects.bulk_create([
+        Audio(
+            title=f'Bench {index}', slug=f'bench-{index}', description='Descripción larga. ' * 200,
+            seller=seller, category=category, genre=genre, audio_file=f'audios/bench-{index}.mp3',
+            price_standard=Decimal('9.99'), status=Audio.Status.PUBLISHED,
+            media_info={'duration': 180, 'bitrate': 320, 'sample_rate': 44100},
+        )
+        for index in range(count)
+    ])
+    Audio.tags.through.objects.bulk_create([
+        Audio.tags.through(audio_id=audio.pk, tag_id=tag.pk) for audio in audios for tag in tags[:3]
+    ])
+    cards.sync([audio.pk for audio in audios])
+
+
+def loaders():
+    from apps.audios.models import Audio, AudioCard
+    from apps.audios.projections import Projection
+
+    audios = Audio.objects.filter(status=Audio.Status.PUBLISHED)
+    return {
+        'audio': lambda size: list(
+            audios.select_related('seller', 'category', 'genre').prefetch_related('tags')[:size]
+        ),
+        'card': lambda size: list(AudioCard.objects.all()[:size]),
+        'projection': lambda size: Projection(AudioCard.objects.all())[:size],
+    }
+
+
+def measure(load, size, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(size)
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    page = load(size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(page), statistics.median(latencies) * 1000, peak / 1024
+
+
+def run(repeat):
+    print(f"{'carga':<11} {'página':>7} {'filas':>6} {'p50 ms':>9} {'pico KiB':>10}")
+    for size in PAGE_SIZES:
+        for name, load in loaders().items():
+            load(size)  # calentamiento
+            rows, latency, peak = measure(load, size, repeat)
+            print(f'{name:<11} {size:>7} {rows:>6} {latency:>9.2f} {peak:>10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0, help='audios de prueba (se revierten al final)')
+    args = parser.parse_args()
+
+    setup()
+    from django.db import transaction
+    try:
+        with transaction.atomic():
+            if args.seed:
+                seed(args.seed)
+            run(args.repeat)
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -11,4 +11,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 application = get_asgi_application()
+
+from apps.audios import catalog_index  # noqa: E402
+from core import templating  # noqa: E402
+
+catalog_index.warm()
+templating.warm()
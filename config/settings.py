@@ -41,6 +41,8 @@ INSTALLED_APPS = [
     'core',
     'apps.users',
     'apps.audios',
+    'apps.analytics',
+    'apps.api',
 ]
 
 MIDDLEWARE = [
@@ -52,6 +54,9 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'apps.users.middleware.AdminAccessMiddleware',  # Middleware personalizado para proteger admin
+    'core.middleware.TemplateTimingMiddleware',  # Tiempos de render (solo si TEMPLATE_TIMING)
+    'core.middleware.MetricsMiddleware',  # Latencia y consultas por vista para /metrics
+    'core.middleware.ProfilingMiddleware',  # Perfiles de requests (solo con PROFILING_*)
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -72,13 +77,43 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Loader cacheado explícito: cada template se compila una sola vez por proceso
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+# Precompilar todos los templates al iniciar el proceso (core/templating.py)
+TEMPLATES_PRECOMPILE = os.getenv('TEMPLATES_PRECOMPILE', str(not DEBUG)) == 'True'
+
+# Tiempos de render por template/bloque en el header Server-Timing (y panel si DEBUG)
+TEMPLATE_TIMING = os.getenv('TEMPLATE_TIMING', str(DEBUG)) == 'True'
+
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Hilos para ejecutar consultas independientes en paralelo (core/fanout.py); 0 = en secuencia
+QUERY_FANOUT_WORKERS = int(os.getenv('QUERY_FANOUT_WORKERS', '4'))
+
+# Descargas de masters (apps/audios/downloads.py): django | x-accel | x-sendfile
+DOWNLOAD_BACKEND = os.getenv('DOWNLOAD_BACKEND', 'django')
+DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+DOWNLOAD_TOKEN_MAX_AGE = int(os.getenv('DOWNLOAD_TOKEN_MAX_AGE', '300'))
+
+# Vistas async del catálogo (config/asgi.py lo activa para despliegues ASGI)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
 # Database
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Segundos que se reutiliza cada conexión; core/fanout.py
+        # solo ejecuta en paralelo con conexiones persistentes
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
     }
 }
 
@@ -115,6 +150,50 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Los audios se validan mientras se suben (apps/audios/upload_validation.py)
+FILE_UPLOAD_HANDLERS = [
+    'apps.audios.upload_validation.AudioUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+AUDIO_UPLOAD_MAX_BYTES = int(os.getenv('AUDIO_UPLOAD_MAX_BYTES', str(50 * 1024 * 1024)))
+AUDIO_PROBE_TIMEOUT = int(os.getenv('AUDIO_PROBE_TIMEOUT', '10'))
+# Procesos para el análisis acústico de los audios subidos (apps/audios/analysis.py); 0 = en el request
+AUDIO_ANALYSIS_WORKERS = int(os.getenv('AUDIO_ANALYSIS_WORKERS', '2'))
+# Se analizan los primeros N segundos (~200 MB de muestras con 600) y ffmpeg tiene un tiempo máximo
+AUDIO_ANALYSIS_MAX_SECONDS = int(os.getenv('AUDIO_ANALYSIS_MAX_SECONDS', '600'))
+AUDIO_ANALYSIS_TIMEOUT = int(os.getenv('AUDIO_ANALYSIS_TIMEOUT', '120'))
+# Índice de embeddings para "suena parecido" (apps/audios/similarity.py)
+SIMILARITY_INDEX_DIR = Path(os.getenv('SIMILARITY_INDEX_DIR', BASE_DIR / 'var' / 'similarity'))
+# Cola de moderación (apps/audios/moderation.py): audios por lote y vigencia del reclamo
+MODERATION_BATCH_SIZE = int(os.getenv('MODERATION_BATCH_SIZE', '10'))
+MODERATION_CLAIM_MINUTES = int(os.getenv('MODERATION_CLAIM_MINUTES', '15'))
+# Tendencias (apps/audios/trending.py): ventana de actividad y vida media del decaimiento
+TRENDING_WINDOW_DAYS = int(os.getenv('TRENDING_WINDOW_DAYS', '7'))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '36'))
+TRENDING_WEIGHTS = {'views': 1, 'favorites': 4, 'downloads': 6, 'reviews': 8}
+
+# Visualizaciones (apps/audios/view_counting.py): una por visitante y audio cada VIEW_DEDUPE_HOURS
+VIEW_DEDUPE_DIR = Path(os.getenv('VIEW_DEDUPE_DIR', BASE_DIR / 'var' / 'views'))
+VIEW_DEDUPE_HOURS = int(os.getenv('VIEW_DEDUPE_HOURS', '12'))
+VIEW_DEDUPE_CAPACITY = int(os.getenv('VIEW_DEDUPE_CAPACITY', '1000000'))  # pares visitante-audio por ventana
+VIEW_DEDUPE_ERROR_RATE = float(os.getenv('VIEW_DEDUPE_ERROR_RATE', '0.01'))
+VIEW_FLUSH_INTERVAL = float(os.getenv('VIEW_FLUSH_INTERVAL', '10'))
+
+# Analíticas (apps/analytics): eventos en lotes por proceso y retención de los datos
+ANALYTICS_BUFFER_SIZE = int(os.getenv('ANALYTICS_BUFFER_SIZE', '200'))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_FLUSH_INTERVAL', '5'))
+ANALYTICS_RAW_RETENTION_DAYS = int(os.getenv('ANALYTICS_RAW_RETENTION_DAYS', '30'))
+ANALYTICS_HOURLY_RETENTION_DAYS = int(os.getenv('ANALYTICS_HOURLY_RETENTION_DAYS', '14'))
+ANALYTICS_DAILY_RETENTION_DAYS = int(os.getenv('ANALYTICS_DAILY_RETENTION_DAYS', '400'))
+
+# Derivados de los masters (apps/audios/transcoding.py), generados con ffmpeg
+TRANSCODE_FFMPEG = os.getenv('TRANSCODE_FFMPEG', 'ffmpeg')
+TRANSCODE_CACHE_DIR = Path(os.getenv('TRANSCODE_CACHE_DIR', MEDIA_ROOT / 'transcodes'))
+TRANSCODE_CACHE_MAX_BYTES = int(os.getenv('TRANSCODE_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+TRANSCODE_WORKERS = int(os.getenv('TRANSCODE_WORKERS', '2'))
+TRANSCODE_TIMEOUT = int(os.getenv('TRANSCODE_TIMEOUT', '600'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -126,6 +205,37 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'core:home'
 LOGOUT_REDIRECT_URL = 'core:home'
 
+# Índice en memoria del catálogo (apps/audios/catalog_index.py)
+CATALOG_INDEX_ENABLED = os.getenv('CATALOG_INDEX_ENABLED', 'False') == 'True'
+CATALOG_INDEX_REFRESH = int(os.getenv('CATALOG_INDEX_REFRESH', '300'))
+
+# API de catálogo de solo lectura (apps/api): tamaño de página por defecto y máximo (?limit=)
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '50'))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '200'))
+# Respuestas más chicas que esto no se comprimen
+API_GZIP_MIN_LENGTH = int(os.getenv('API_GZIP_MIN_LENGTH', '512'))
+# Feed de sincronización (apps/api/feed.py): filas por bloque, cambios por pedido, espera para que
+# confirmen las transacciones en curso y retención del registro de cambios
+CATALOG_FEED_CHUNK_SIZE = int(os.getenv('CATALOG_FEED_CHUNK_SIZE', '1000'))
+CATALOG_FEED_LIMIT = int(os.getenv('CATALOG_FEED_LIMIT', '10000'))
+CATALOG_FEED_SETTLE_SECONDS = float(os.getenv('CATALOG_FEED_SETTLE_SECONDS', '5'))
+CATALOG_CHANGELOG_RETENTION_DAYS = int(os.getenv('CATALOG_CHANGELOG_RETENTION_DAYS', '30'))
+
+# Métricas Prometheus en /metrics (core/metrics.py): un archivo por proceso en METRICS_DIR
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = Path(os.getenv('METRICS_DIR', BASE_DIR / 'var' / 'metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+# Perfiles de requests (core/profiling.py), desactivados por defecto. Se ven en /perfiles/
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))  # fracción con cProfile
+PROFILING_SLOW_MS = int(os.getenv('PROFILING_SLOW_MS', '0'))  # guarda los requests más lentos que esto
+PROFILING_INTERVAL_MS = int(os.getenv('PROFILING_INTERVAL_MS', '5'))
+PROFILING_VIEWS = [name for name in os.getenv('PROFILING_VIEWS', '').split(',') if name]  # vacío = todas
+PROFILING_DIR = Path(os.getenv('PROFILING_DIR', BASE_DIR / 'var' / 'profiles'))
+PROFILING_MAX_BYTES = int(os.getenv('PROFILING_MAX_BYTES', str(200 * 1024 * 1024)))
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -139,13 +249,16 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.log_formatters.JsonFormatter',
+        },
     },
     'handlers': {
         'file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
             'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
+            'formatter': os.getenv('LOG_FORMAT', 'json'),
         },
         'console': {
             'level': 'DEBUG',
@@ -172,7 +285,7 @@ if not DEBUG:
     SECURE_CONTENT_TYPE_NOSNIFF = True
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_SECONDS = 31536000
-    SECURE_REDIRECT_EXEMPT = []
+    SECURE_REDIRECT_EXEMPT = [r'^metrics$']  # Prometheus scrapea por la red interna
     SECURE_SSL_REDIRECT = True
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
@@ -8,6 +8,8 @@ urlpatterns = [
     path('', include('core.urls')),
     path('users/', include('apps.users.urls')),
     path('audios/', include('apps.audios.urls')),
+    path('analytics/', include('apps.analytics.urls')),
+    path('api/v1/', include('apps.api.urls')),
 ]
 
 # Serve media files in development
@@ -12,3 +12,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 application = get_wsgi_application()
+
+from apps.audios import catalog_index  # noqa: E402
+from core import templating  # noqa: E402
+
+catalog_index.warm()
+templating.warm()
@@ -0,0 +1,105 @@
+"""
+Buffers en memoria de un proceso que se escriben por lotes.
+
+Métricas, eventos de analíticas y visualizaciones evitan una escritura por
+operación: acumulan en memoria y escriben cuando toca. ``ProcessBuffer``
+junta lo que tienen en común:
+
+- el contenido (lista, ``Counter``...) se protege con un lock;
+- después de un fork el hijo empieza vacío: lo acumulado es del padre, que
+  lo escribe él (gunicorn hace fork de los workers después de importar);
+- ``due()`` dice si pasó el intervalo o se llegó al tamaño máximo;
+- la función decorada con ``@buffer.flusher`` también se llama al terminar
+  el proceso (``atexit``).
+
+Uso::
+
+    _events = ProcessBuffer(list, interval=_flush_interval, size=_buffer_size)
+
+    def track(event):
+        with _events as events:
+            events.append(event)
+        if _events.due():
+            flush()
+
+    @_events.flusher
+    def flush():
+        events = _events.take()
+        ...
+
+Los intervalos y tamaños son funciones para leer los settings en cada uso.
+"""
+import atexit
+import copy
+import os
+import threading
+import time
+
+
+class ProcessBuffer:
+    def __init__(self, factory, interval, size=None):
+        self.factory = factory
+        self.interval = interval
+        self.size = size
+        self.lock = threading.Lock()
+        self.pid = None
+        # Identifica al proceso actual (un pid puede reutilizarse)
+        self.token = None
+        self.items = factory()
+        self.flushed_at = 0.0
+        self.dirty = False
+
+    def _check_fork(self):
+        pid = os.getpid()
+        if self.pid != pid:
+            self.pid = pid
+            self.token = f'{pid}-{time.monotonic_ns()}'
+            self.items = self.factory()
+            self.flushed_at = time.monotonic()
+            self.dirty = False
+
+    def __enter__(self):
+        """Toma el lock y retorna el contenido para modificarlo"""
+        self.lock.acquire()
+        try:
+            self._check_fork()
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.items
+
+    def __exit__(self, *exc_info):
+        self.dirty = True
+        self.lock.release()
+
+    def due(self):
+        """Si toca escribir: pasó el intervalo desde la última vez o se llegó al tamaño"""
+        with self.lock:
+            self._check_fork()
+            if not self.dirty:
+                return False
+            if self.size is not None and len(self.items) >= self.size():
+                return True
+            return time.monotonic() - self.flushed_at >= self.interval()
+
+    def take(self, clear=True):
+        """
+        Contenido a escribir, o ``None`` si no cambió desde la última vez.
+        Con ``clear=False`` retorna una copia y lo deja (valores acumulados).
+        """
+        with self.lock:
+            self._check_fork()
+            if not self.dirty:
+                return None
+            if clear:
+                items, self.items = self.items, self.factory()
+            else:
+                items = copy.copy(self.items)
+            self.flushed_at = time.monotonic()
+            self.dirty = False
+            return items
+
+    def flusher(self, function):
+        """Decorador: registra la función que escribe el buffer para el final del proceso"""
+        atexit.register(function)
+        return function
@@ -0,0 +1,124 @@
+"""
+Ejecución en paralelo de consultas de lectura independientes.
+
+Una vista declara sus consultas como un dict ``{nombre: consulta}``, donde
+la consulta es un QuerySet (se evalúa con ``list()``) o un callable sin
+argumentos. ``fan_out()`` las ejecuta en un pool de hilos (WSGI) y
+``afan_out()`` con ``asyncio.gather`` (ASGI). Cada hilo usa su propia
+conexión a la base, así que las consultas corren realmente en paralelo.
+
+Si hay una transacción abierta en la conexión de quien llama (incluidos
+los tests) las consultas se ejecutan en secuencia sobre esa conexión,
+porque otras conexiones no verían los datos sin confirmar. Lo mismo pasa
+con ``QUERY_FANOUT_WORKERS = 0`` o con una sola consulta.
+
+El paralelismo necesita conexiones persistentes (``CONN_MAX_AGE`` distinto
+de 0, ``DB_CONN_MAX_AGE`` en el entorno): con 0 cada hilo abriría y
+cerraría una conexión por consulta, y esa conexión nueva cuesta más que lo
+que se gana al ejecutar en paralelo consultas de pocos milisegundos. Sin
+conexiones persistentes las consultas se ejecutan en secuencia.
+
+El tiempo de cada consulta se registra en el logger y en el
+``Server-Timing`` del request (ver ``core.templating.record_timing``).
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.models import QuerySet
+
+from .templating import record_timing
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class FanOutResult(dict):
+    """Resultados por nombre; ``timings`` guarda los segundos de cada consulta"""
+
+    def __init__(self, results, timings):
+        super().__init__(results)
+        self.timings = timings
+
+
+def _workers():
+    return getattr(settings, 'QUERY_FANOUT_WORKERS', 4)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix='query-fanout')
+    return _pool
+
+
+def _evaluate(query):
+    if isinstance(query, QuerySet):
+        return list(query)
+    return query()
+
+
+def _timed(query):
+    start = time.perf_counter()
+    result = _evaluate(query)
+    return result, time.perf_counter() - start
+
+
+def _in_worker(query):
+    """Ejecuta en un hilo del pool y libera su conexión según CONN_MAX_AGE"""
+    try:
+        return _timed(query)
+    finally:
+        close_old_connections()
+
+
+def _can_parallelize(queries, using):
+    connection = connections[using]
+    return (
+        len(queries) > 1 and _workers() > 0 and
+        connection.settings_dict['CONN_MAX_AGE'] != 0 and
+        not connection.in_atomic_block
+    )
+
+
+def _collect(names, outcomes):
+    results, timings = {}, {}
+    for name, (result, seconds) in zip(names, outcomes):
+        results[name] = result
+        timings[name] = seconds
+        record_timing('query', name, seconds)
+    logger.debug('Fan-out: %s', ', '.join(f'{name}={seconds * 1000:.1f}ms' for name, seconds in timings.items()))
+    return FanOutResult(results, timings)
+
+
+def fan_out(queries, using=DEFAULT_DB_ALIAS):
+    """Ejecuta las consultas en paralelo y retorna un ``FanOutResult``"""
+    names = list(queries)
+    if not _can_parallelize(queries, using):
+        return _collect(names, [_timed(queries[name]) for name in names])
+
+    futures = [_get_pool().submit(_in_worker, queries[name]) for name in names]
+    return _collect(names, [future.result() for future in futures])
+
+
+async def afan_out(queries, using=DEFAULT_DB_ALIAS):
+    """Versión async de ``fan_out()`` para vistas ASGI"""
+    names = list(queries)
+    # La conexión del ORM async es la del hilo de sync_to_async, no la del event loop
+    if not await sync_to_async(_can_parallelize)(queries, using):
+        run = sync_to_async(lambda: [_timed(queries[name]) for name in names])
+        return _collect(names, await run())
+
+    outcomes = await asyncio.gather(*[
+        sync_to_async(_in_worker, thread_sensitive=False)(queries[name]) for name in names
+    ])
+    return _collect(names, outcomes)
@@ -0,0 +1,31 @@
+"""
+Formato JSON para los logs (una línea por registro).
+
+Incluye los datos pasados en ``extra=`` como campos propios, así los logs
+se pueden filtrar por ``audio_id``, ``status``, etc. sin parsear el mensaje.
+"""
+import json
+import logging
+from datetime import datetime, timezone
+
+# Atributos que todo LogRecord trae; el resto vino en ``extra``
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.thread,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
@@ -0,0 +1,292 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus.
+
+Con gunicorn cada worker es un proceso con su propia memoria, así que los
+contadores no se pueden leer desde el worker que atiende ``/metrics``. Cada
+proceso acumula sus valores en memoria y los vuelca (como mucho una vez por
+``METRICS_FLUSH_INTERVAL`` segundos) a su propio archivo en
+``METRICS_DIR``; el scrape suma los archivos de todos los procesos. Los
+archivos de procesos que ya terminaron se agregan a ``dead.json`` para que
+los contadores no retrocedan cuando gunicorn recicla workers.
+
+Tipos:
+
+- ``Counter``: suma monótona.
+- ``Histogram``: buckets acumulados, ``_sum`` y ``_count``.
+- ``gauge()``: valor calculado en el momento del scrape por una función
+  (profundidad de colas, atrasos); no necesita compartirse entre procesos.
+"""
+import fcntl
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .buffers import ProcessBuffer
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry = {}
+_gauges = {}
+_queries = ContextVar('metrics_queries', default=None)
+
+
+def metrics_dir():
+    return Path(getattr(settings, 'METRICS_DIR', Path(settings.BASE_DIR) / 'var' / 'metrics'))
+
+
+def _flush_interval():
+    return getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+
+
+# Los contadores son acumulados: se escriben completos y no se vacían
+_values = ProcessBuffer(lambda: defaultdict(float), interval=_flush_interval)
+
+
+def _add(key, amount):
+    with _values as values:
+        values[key] += amount
+    if _values.due():
+        flush()
+
+
+@_values.flusher
+def flush():
+    """Escribe los valores de este proceso en su archivo (reemplazo atómico)"""
+    values = _values.take(clear=False)
+    if values is None:
+        return
+    rows = [[name, list(labels), value] for (name, labels), value in values.items()]
+    path = metrics_dir() / f'{_values.token}.json'
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(rows))
+        os.replace(temporary, path)
+    except OSError as e:
+        _values.dirty = True
+        logger.warning('No se pudieron guardar las métricas en %s: %s', path, e)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry[name] = self
+
+    def _labels(self, labels):
+        return tuple((name, str(labels.get(name, ''))) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        _add((self.name, self._labels(labels)), amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        for bound in self.buckets:
+            if value <= bound:
+                _add((f'{self.name}_bucket', labels + (('le', _format_bound(bound)),)), 1)
+        _add((f'{self.name}_sum', labels), value)
+        _add((f'{self.name}_count', labels), 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+def gauge(name, documentation, labelnames=()):
+    """
+    Registra la función decorada como gauge calculado en el scrape.
+
+    La función retorna un número o, con ``labelnames``, un dict
+    {tupla de valores de las etiquetas: número}.
+    """
+    def register(function):
+        _gauges[name] = (documentation, tuple(labelnames), function)
+        return function
+    return register
+
+
+# Consultas por request
+
+def _count_query(execute, sql, params, many, context):
+    stats = _queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+
+def _add_query_counter(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install_query_counter():
+    """Cuenta las consultas de todas las conexiones (las nuevas y las ya abiertas en este hilo)"""
+    connection_created.connect(_add_query_counter, dispatch_uid='metrics_query_counter')
+    for connection in connections.all(initialized_only=True):
+        _add_query_counter(connection)
+
+
+@contextmanager
+def count_queries():
+    """
+    Produce [consultas, segundos] del bloque.
+
+    El contador viaja en el contexto, así que incluye las consultas hechas
+    en hilos de ``sync_to_async`` durante una vista async.
+    """
+    stats = [0, 0.0]
+    token = _queries.set(stats)
+    try:
+        yield stats
+    finally:
+        _queries.reset(token)
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _alive(token):
+    try:
+        os.kill(int(token.split('-')[0]), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return []
+
+
+def _merge_dead_processes(directory):
+    """Suma los archivos de procesos terminados a ``dead.json`` y los borra"""
+    dead = [path for path in directory.glob('*-*.json') if not _alive(path.stem)]
+    if not dead:
+        return
+    with open(directory / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        totals = defaultdict(float)
+        for name, labels, value in _read(directory / 'dead.json'):
+            totals[name, tuple(map(tuple, labels))] += value
+        for path in dead:
+            if not path.exists():  # Otro scrape ya lo agregó
+                continue
+            for name, labels, value in _read(path):
+                totals[name, tuple(map(tuple, labels))] += value
+            temporary = directory / 'dead.json.tmp'
+            temporary.write_text(json.dumps([[name, list(labels), value] for (name, labels), value in totals.items()]))
+            os.replace(temporary, directory / 'dead.json')
+            path.unlink()
+
+
+def collect():
+    """{(nombre, etiquetas): valor} sumando todos los procesos"""
+    flush()
+    directory = metrics_dir()
+    totals = defaultdict(float)
+    if not directory.exists():
+        return totals
+    _merge_dead_processes(directory)
+    for path in directory.glob('*.json'):
+        for name, labels, value in _read(path):
+            totals[name, tuple(map(tuple, labels))] += value
+    return totals
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _sample(name, labels, value):
+    if labels:
+        rendered = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+        return f'{name}{{{rendered}}} {value!r}'
+    return f'{name} {value!r}'
+
+
+def _family(name):
+    """Métrica registrada a la que pertenece la serie (los histogramas tienen sufijos)"""
+    if name in _registry:
+        return name
+    base, _, suffix = name.rpartition('_')
+    if suffix in ('bucket', 'sum', 'count') and base in _registry:
+        return base
+    return name
+
+
+def _series_key(item):
+    (name, labels), _ = item
+    bound = dict(labels).get('le')
+    order = float('inf') if bound == '+Inf' else float(bound) if bound else 0
+    return (name, [label for label in labels if label[0] != 'le'], order)
+
+
+def render():
+    """Todas las métricas en formato de texto de Prometheus 0.0.4"""
+    families = defaultdict(list)
+    for (name, labels), value in collect().items():
+        families[_family(name)].append(((name, labels), value))
+
+    lines = []
+    for family in sorted(families):
+        metric = _registry.get(family)
+        if metric is not None:
+            lines.append(f'# HELP {family} {metric.documentation}')
+            lines.append(f'# TYPE {family} {metric.kind}')
+        for (name, labels), value in sorted(families[family], key=_series_key):
+            lines.append(_sample(name, labels, value))
+
+    for name, (documentation, labelnames, function) in sorted(_gauges.items()):
+        try:
+            value = function()
+        except Exception as e:
+            logger.warning('No se pudo calcular la métrica %s: %s', name, e)
+            continue
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} gauge')
+        if labelnames:
+            for label_values, sample in sorted(value.items()):
+                lines.append(_sample(name, tuple(zip(labelnames, label_values)), float(sample)))
+        else:
+            lines.append(_sample(name, (), float(value)))
+    return '\n'.join(lines) + '\n'
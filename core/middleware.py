@@ -0,0 +1,217 @@
+import cProfile
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.html import format_html, format_html_join
+
+from . import metrics, profiling
+from .templating import collect_timings, install
+
+REQUEST_SECONDS = metrics.Histogram(
+    'http_request_duration_seconds', 'Duración de los requests por vista', ['view', 'method'],
+)
+REQUESTS = metrics.Counter(
+    'http_requests_total', 'Requests atendidos por vista y código de respuesta', ['view', 'method', 'status'],
+)
+REQUEST_QUERIES = metrics.Histogram(
+    'http_request_db_queries', 'Consultas a la base por request', ['view'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_SECONDS = metrics.Counter(
+    'http_request_db_seconds_total', 'Tiempo en consultas a la base por vista', ['view'],
+)
+
+
+class TemplateTimingMiddleware:
+    """
+    Middleware que mide el render de templates y bloques del request
+    (y las consultas registradas con ``record_timing``, p. ej. el fan-out).
+
+    Agrega los tiempos al header ``Server-Timing`` (visible en las
+    herramientas de desarrollo del navegador) y, con DEBUG, un panel al
+    final de las páginas HTML.
+    """
+
+    sync_capable = True
+    async_capable = True
+    max_entries = 15
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'TEMPLATE_TIMING', False):
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_timings() as timings:
+            response = self.get_response(request)
+        return self._add_timings(response, timings)
+
+    async def __acall__(self, request):
+        # El contexto se copia a los hilos de sync_to_async, así que también
+        # se miden los renders de las vistas async
+        with collect_timings() as timings:
+            response = await self.get_response(request)
+        return self._add_timings(response, timings)
+
+    def _add_timings(self, response, timings):
+        if not timings or response.streaming:
+            return response
+
+        entries = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:self.max_entries]
+        response['Server-Timing'] = ', '.join(
+            f'{kind}{index};desc="{self._header_safe(name)} x{count}";dur={total * 1000:.2f}'
+            for index, ((kind, name), (count, total)) in enumerate(entries)
+        )
+
+        if settings.DEBUG and 'text/html' in response.get('Content-Type', ''):
+            self._inject_panel(response, entries)
+        return response
+
+    @staticmethod
+    def _header_safe(name):
+        return name.replace('"', "'").replace('\\', '/')
+
+    def _inject_panel(self, response, entries):
+        content = response.content.decode(response.charset)
+        if '</body>' not in content:
+            return
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{} ms</td></tr>',
+            ((kind, name, count, f'{total * 1000:.2f}') for (kind, name), (count, total) in entries),
+        )
+        panel = format_html(
+            '<div id="template-timing" style="position:fixed;bottom:0;right:0;z-index:9999;'
+            'max-height:40vh;overflow:auto;background:#111;color:#eee;font:12px monospace;'
+            'padding:.5rem;opacity:.9"><strong>Render de templates</strong>'
+            '<table><tr><th>Tipo</th><th>Nombre</th><th>Veces</th><th>Tiempo</th></tr>{}</table></div>',
+            rows,
+        )
+        content = content.replace('</body>', f'{panel}</body>', 1)
+        response.content = content.encode(response.charset)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+
+
+class MetricsMiddleware:
+    """
+    Latencia, código de respuesta y consultas a la base de cada request,
+    agrupados por nombre de vista (ver ``core.metrics``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        metrics.install_query_counter()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with metrics.count_queries() as queries:
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with metrics.count_queries() as queries:
+            response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    @staticmethod
+    def _record(request, response, seconds, queries):
+        match = getattr(request, 'resolver_match', None)
+        # Nombre de la ruta, no la URL: los slugs no generan series nuevas
+        view = (match.view_name or match._func_path) if match else 'sin_ruta'
+        REQUEST_SECONDS.observe(seconds, view=view, method=request.method)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        REQUEST_QUERIES.observe(queries[0], view=view)
+        DB_SECONDS.inc(queries[1], view=view)
+
+
+class ProfilingMiddleware:
+    """
+    Guarda perfiles de requests muestreados (``cProfile``) o lentos
+    (muestreo de pilas), con su log de SQL. Ver ``core.profiling``.
+
+    Sin ``PROFILING_SAMPLE_RATE`` ni ``PROFILING_SLOW_MS`` no se instala.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        self.slow_seconds = getattr(settings, 'PROFILING_SLOW_MS', 0) / 1000
+        if not self.sample_rate and not self.slow_seconds:
+            raise MiddlewareNotUsed
+        self.views = set(getattr(settings, 'PROFILING_VIEWS', ()))
+        profiling.install_query_log()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sampled = random.random() < self.sample_rate
+        if not sampled and not self.slow_seconds:
+            return self.get_response(request)
+
+        profile = cProfile.Profile() if sampled else None
+        sampler, ident = profiling.get_sampler(), threading.get_ident()
+        stacks = None if sampled else sampler.start(ident)
+        start = time.perf_counter()
+        try:
+            with profiling.record_queries() as queries:
+                if profile is not None:
+                    profile.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profile is not None:
+                        profile.disable()
+        finally:
+            if stacks is not None:
+                sampler.stop(ident)
+        self._save(request, response, time.perf_counter() - start, queries, profile, stacks)
+        return response
+
+    async def __acall__(self, request):
+        # En el event loop conviven varios requests: solo se guarda el SQL de los lentos
+        if not self.slow_seconds:
+            return await self.get_response(request)
+        start = time.perf_counter()
+        with profiling.record_queries() as queries:
+            response = await self.get_response(request)
+        self._save(request, response, time.perf_counter() - start, queries)
+        return response
+
+    def _save(self, request, response, duration, queries, profile=None, stacks=None):
+        if profile is None and (not self.slow_seconds or duration < self.slow_seconds):
+            return
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else ''
+        if self.views and view not in self.views:
+            return
+        if profile is not None:
+            kind, profile_text = 'cprofile', profiling.cprofile_report(profile)
+        else:
+            kind, profile_text = ('stack' if stacks is not None else 'sql'), ''
+        profiling.save(view, request, response.status_code, duration, kind, queries, profile_text, stacks)
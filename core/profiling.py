@@ -0,0 +1,275 @@
+"""
+Perfiles de requests lentos o muestreados (ver ``ProfilingMiddleware``).
+
+Dos formas de captura, las dos opcionales:
+
+- Muestreo (``PROFILING_SAMPLE_RATE``): una fracción de los requests
+  corre bajo ``cProfile``. Da el detalle por función, pero cuesta: por eso
+  solo se activa en los requests elegidos.
+- Lentos (``PROFILING_SLOW_MS``): no se sabe de antemano qué request va a
+  ser lento, así que cada request se registra en un muestreador de pilas
+  (un hilo que cada ``PROFILING_INTERVAL_MS`` lee la pila de los hilos
+  registrados con ``sys._current_frames()``). Al terminar, si superó el
+  umbral se guarda lo muestreado; si no, se descarta. El costo es el del
+  hilo muestreador, independiente de la cantidad de requests.
+
+Cada captura incluye el log de SQL del request y se guarda comprimida en
+``PROFILING_DIR`` (``.json.gz``) con la vista y la duración en el nombre.
+Se borran las más viejas al pasar ``PROFILING_MAX_BYTES``.
+"""
+import gzip
+import io
+import json
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.text import slugify
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERIES = 1000
+MAX_STACK_DEPTH = 80
+ARTIFACT_PATTERN = re.compile(r'^(?P<stamp>\d{8}-\d{6})-(?P<ms>\d+)ms-(?P<view>[\w-]*)-(?P<kind>[a-z]+)-[0-9a-f]+\.json\.gz$')
+
+Artifact = namedtuple('Artifact', ['name', 'created_at', 'duration_ms', 'view', 'kind', 'size'])
+
+_queries = ContextVar('profiling_queries', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def profiles_dir():
+    return Path(_setting('PROFILING_DIR', Path(settings.BASE_DIR) / 'var' / 'profiles'))
+
+
+# Log de SQL
+
+def _log_query(execute, sql, params, many, context):
+    log = _queries.get()
+    if log is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if len(log) < MAX_QUERIES:
+            log.append((sql, (time.perf_counter() - start) * 1000, many))
+
+
+def _add_query_log(connection, **kwargs):
+    if _log_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_log_query)
+
+
+def install_query_log():
+    connection_created.connect(_add_query_log, dispatch_uid='profiling_query_log')
+    for connection in connections.all(initialized_only=True):
+        _add_query_log(connection)
+
+
+@contextmanager
+def record_queries():
+    """Produce la lista de (sql, ms, many) de las consultas del bloque (sin parámetros)"""
+    log = []
+    token = _queries.set(log)
+    try:
+        yield log
+    finally:
+        _queries.reset(token)
+
+
+# Muestreador de pilas
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', code.co_filename)
+    return f'{module}:{code.co_name}:{frame.f_lineno}'
+
+
+def _stack(frame):
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Un hilo que muestrea periódicamente la pila de los hilos registrados"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, ident):
+        samples = Counter()
+        with self._lock:
+            self._samples[ident] = samples
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+                self._thread.start()
+        return samples
+
+    def stop(self, ident):
+        with self._lock:
+            self._samples.pop(ident, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            # Con el lock tomado: al volver de stop() el Counter ya no cambia
+            with self._lock:
+                if not self._samples:
+                    continue
+                frames = sys._current_frames()
+                for ident, samples in self._samples.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[_stack(frame)] += 1
+                del frames
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = StackSampler(_setting('PROFILING_INTERVAL_MS', 5) / 1000)
+        return _sampler
+
+
+# Perfiles
+
+def cprofile_report(profile, limit=60):
+    """Texto de ``pstats`` ordenado por tiempo acumulado"""
+    output = io.StringIO()
+    stats = pstats.Stats(profile, stream=output)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def query_summary(queries):
+    """Consultas agrupadas por texto (las repetidas suelen ser un N+1), más costosas primero"""
+    groups = {}
+    for query in queries:
+        count, total = groups.get(query['sql'], (0, 0.0))
+        groups[query['sql']] = (count + 1, total + query['ms'])
+    return sorted(
+        ({'sql': sql, 'count': count, 'ms': round(total, 3)} for sql, (count, total) in groups.items()),
+        key=lambda group: -group['ms'],
+    )
+
+
+def function_summary(stacks, limit=40):
+    """[(función, muestras inclusivas, muestras propias)] a partir de pilas plegadas"""
+    inclusive, own = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = [frame.rsplit(':', 1)[0] for frame in stack.split(';')]
+        for name in set(frames):
+            inclusive[name] += count
+        own[frames[-1]] += count
+    return [(name, count, own[name]) for name, count in inclusive.most_common(limit)]
+
+
+def save(view, request, status, duration, kind, queries, profile_text='', stacks=None):
+    """Guarda la captura comprimida y aplica el tope de disco; retorna el nombre"""
+    now = datetime.now()
+    duration_ms = int(duration * 1000)
+    label = slugify(view.replace(':', '-'))[:60]
+    name = f'{now:%Y%m%d-%H%M%S}-{duration_ms}ms-{label}-{kind}-{uuid.uuid4().hex[:8]}.json.gz'
+    artifact = {
+        'view': view,
+        'path': request.path,
+        'method': request.method,
+        'status': status,
+        'duration_ms': duration_ms,
+        'kind': kind,
+        'created_at': now.isoformat(timespec='seconds'),
+        'query_count': len(queries),
+        'query_ms': round(sum(ms for _, ms, _ in queries), 3),
+        'queries': [{'sql': sql, 'ms': round(ms, 3), 'many': many} for sql, ms, many in queries],
+        'profile': profile_text,
+        'stacks': dict(stacks or {}),
+        'interval_ms': _setting('PROFILING_INTERVAL_MS', 5),
+    }
+    directory = profiles_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        temporary = directory / f'.{name}.part'
+        with gzip.open(temporary, 'wt', encoding='utf-8') as output:
+            json.dump(artifact, output)
+        temporary.replace(directory / name)
+    except OSError as e:
+        logger.warning('No se pudo guardar el perfil de %s: %s', view, e)
+        return None
+    evict()
+    return name
+
+
+def evict(max_bytes=None):
+    """Borra las capturas más viejas hasta respetar ``PROFILING_MAX_BYTES``"""
+    if max_bytes is None:
+        max_bytes = _setting('PROFILING_MAX_BYTES', 200 * 1024 * 1024)
+    entries = artifacts()
+    total = sum(entry.size for entry in entries)
+    for entry in reversed(entries):
+        if total <= max_bytes:
+            break
+        (profiles_dir() / entry.name).unlink(missing_ok=True)
+        total -= entry.size
+
+
+def artifacts():
+    """Capturas guardadas, la más nueva primero"""
+    entries = []
+    directory = profiles_dir()
+    if not directory.exists():
+        return entries
+    for path in directory.iterdir():
+        match = ARTIFACT_PATTERN.match(path.name)
+        if not match:
+            continue
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            continue
+        entries.append(Artifact(
+            name=path.name,
+            created_at=datetime.strptime(match['stamp'], '%Y%m%d-%H%M%S'),
+            duration_ms=int(match['ms']),
+            view=match['view'],
+            kind=match['kind'],
+            size=size,
+        ))
+    return sorted(entries, key=lambda entry: entry.name, reverse=True)
+
+
+def load(name):
+    """Contenido de una captura; None si el nombre no es válido o ya no existe"""
+    if not ARTIFACT_PATTERN.match(name):
+        return None
+    try:
+        with gzip.open(profiles_dir() / name, 'rt', encoding='utf-8') as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
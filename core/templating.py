@@ -0,0 +1,107 @@
+"""
+Utilidades de rendimiento de templates.
+
+``warm()`` carga todos los templates del proyecto al iniciar el proceso
+para que el loader cacheado ya los tenga compilados en el primer
+request. ``collect_timings()`` mide el tiempo de render de cada template
+y cada ``{% block %}`` durante el request actual (lo usa
+``core.middleware.TemplateTimingMiddleware``); otras mediciones del
+request se suman con ``record_timing()``.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.base import Template
+from django.template.loader_tags import BlockNode
+
+logger = logging.getLogger(__name__)
+
+_timings = ContextVar('template_timings', default=None)
+_installed = False
+
+
+def template_names(engine):
+    """Nombres de todos los templates visibles para el engine"""
+    names = set()
+    directories = {directory for loader in engine.template_loaders for directory in loader.get_dirs()}
+    for directory in directories:
+        root = Path(directory)
+        names.update(
+            path.relative_to(root).as_posix()
+            for path in root.rglob('*.html')
+            if path.is_file()
+        )
+    return sorted(names)
+
+
+def precompile():
+    """Compila y cachea todos los templates. Retorna la cantidad cargada."""
+    loaded = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+                loaded += 1
+            except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+                logger.warning('No se pudo precompilar %s: %s', name, exc)
+    return loaded
+
+
+def warm():
+    """Precompila los templates al iniciar el proceso (si está habilitado)"""
+    if getattr(settings, 'TEMPLATES_PRECOMPILE', False):
+        logger.info('Templates precompilados: %s', precompile())
+
+
+def record_timing(kind, name, seconds):
+    """Suma una medición a los tiempos del request actual (si se están juntando)"""
+    timings = _timings.get()
+    if timings is not None:
+        count, total = timings.get((kind, name), (0, 0.0))
+        timings[(kind, name)] = (count + 1, total + seconds)
+
+
+def _timed(kind, name_of, render):
+    def wrapper(self, context):
+        if _timings.get() is None:
+            return render(self, context)
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            record_timing(kind, name_of(self), time.perf_counter() - start)
+    return wrapper
+
+
+def install():
+    """Instrumenta el render de templates y bloques (una sola vez por proceso)"""
+    global _installed
+    if _installed:
+        return
+    Template._render = _timed('tpl', lambda template: template.name or '<string>', Template._render)
+    BlockNode.render = _timed('block', lambda block: block.name, BlockNode.render)
+    _installed = True
+
+
+@contextmanager
+def collect_timings():
+    """
+    Junta los tiempos de render dentro del bloque.
+
+    Produce un dict {(tipo, nombre): (veces, segundos)}; los tiempos son
+    inclusivos (un template incluye el de sus bloques e includes).
+    """
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
@@ -5,4 +5,7 @@ app_name = 'core'
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('metrics', views.metrics, name='metrics'),
+    path('perfiles/', views.profile_list, name='profiles'),
+    path('perfiles/<str:name>/', views.profile_detail, name='profile_detail'),
 ]
@@ -1,10 +1,85 @@
-from django.shortcuts import render
+import hmac
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import redirect, render
+
+from apps.audios import trending
+
+from . import metrics as app_metrics
+from . import profiling
+
+HOME_TRENDING = 8
+HOME_TRENDING_CATEGORIES = 3
 
 
 def home(request):
     """Vista principal del sitio."""
+    trending_audios = trending.top(HOME_TRENDING)
+    # Una fila por cada categoría presente en las tendencias generales, en ese orden
+    categories = list({audio.category_id: audio.category for audio in trending_audios}.values())
     context = {
         'title': 'Inicio - Proyecto de gestion',
         'welcome_message': 'Bienvenido al Sistema de Gestión',
+        'trending_audios': trending_audios,
+        'trending_by_category': [
+            (category, trending.top(4, category_id=category.pk))
+            for category in categories[:HOME_TRENDING_CATEGORIES]
+        ],
     }
     return render(request, 'inicio/home.html', context)
+
+
+def _may_scrape(request):
+    """Con ``METRICS_TOKEN`` se pide ``Authorization: Bearer``; sin él, solo IPs de ``METRICS_ALLOWED_IPS``"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        expected = f'Bearer {token}'
+        return hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode())
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+
+
+def metrics(request):
+    """Métricas de todos los workers en formato de texto de Prometheus"""
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(app_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@login_required
+def profile_list(request):
+    """Perfiles de requests guardados por ProfilingMiddleware"""
+    if not request.user.is_admin_user:
+        messages.warning(request, 'No tienes permisos para acceder a esta sección.')
+        return redirect('core:home')
+    entries = profiling.artifacts()
+    context = {
+        'artifacts': entries,
+        'total_size': sum(entry.size for entry in entries),
+    }
+    return render(request, 'profiling/list.html', context)
+
+
+@login_required
+def profile_detail(request, name):
+    """Detalle de un perfil: funciones, consultas agrupadas y log de SQL"""
+    if not request.user.is_admin_user:
+        messages.warning(request, 'No tienes permisos para acceder a esta sección.')
+        return redirect('core:home')
+    artifact = profiling.load(name)
+    if artifact is None:
+        raise Http404('Perfil no encontrado')
+    samples = sum(artifact['stacks'].values())
+    context = {
+        'name': name,
+        'artifact': artifact,
+        'functions': [
+            (function, inclusive * 100 / samples, own * 100 / samples)
+            for function, inclusive, own in profiling.function_summary(artifact['stacks'])
+        ] if samples else [],
+        'samples': samples,
+        'query_groups': profiling.query_summary(artifact['queries'])[:30],
+    }
+    return render(request, 'profiling/detail.html', context)
@@ -0,0 +1,88 @@
+import wave
+
+import pytest
+from decimal import Decimal
+
+from apps.audios.models import Audio, Category, Genre
+from apps.users.models import User, UserType
+from core import metrics
+
+
+@pytest.fixture
+def seller(db):
+    return User.objects.create_user(
+        username='vendedor', email='vendedor@example.com', password='clave-segura-123',
+        first_name='Ana', last_name='Vendedora', user_type=UserType.SELLER
+    )
+
+
+@pytest.fixture
+def buyer(db):
+    return User.objects.create_user(
+        username='comprador', email='comprador@example.com', password='clave-segura-123',
+        first_name='Beto', last_name='Comprador', user_type=UserType.BUYER
+    )
+
+
+@pytest.fixture
+def category(db):
+    return Category.objects.create(name='Música')
+
+
+@pytest.fixture
+def genre(category):
+    return Genre.objects.create(name='Rock', category=category)
+
+
+@pytest.fixture
+def make_audio(seller, category, genre):
+    """Crea audios publicados con valores por defecto razonables"""
+    def _make_audio(**kwargs):
+        defaults = {
+            'title': 'Audio de prueba',
+            'description': 'Descripción',
+            'seller': seller,
+            'category': category,
+            'genre': genre,
+            'audio_file': 'audios/prueba.mp3',
+            'price_standard': Decimal('9.99'),
+            'status': Audio.Status.PUBLISHED,
+        }
+        defaults.update(kwargs)
+        return Audio.objects.create(**defaults)
+    return _make_audio
+
+
+@pytest.fixture
+def write_wav():
+    """Escribe una señal (float entre -1 y 1) como WAV mono de 16 bits"""
+    np = pytest.importorskip('numpy')
+
+    def _write_wav(path, signal, rate=22050):
+        with wave.open(str(path), 'wb') as output:
+            output.setnchannels(1)
+            output.setsampwidth(2)
+            output.setframerate(rate)
+            output.writeframes((np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes())
+    return _write_wav
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(settings, tmp_path):
+    """Cada test escribe las métricas en su propio directorio"""
+    settings.METRICS_DIR = tmp_path / 'metrics'
+    yield settings.METRICS_DIR
+    metrics.flush()
+
+
+@pytest.fixture(autouse=True)
+def analytics_unbuffered(settings):
+    """Los eventos de analíticas se escriben en el momento (sin buffer entre tests)"""
+    settings.ANALYTICS_BUFFER_SIZE = 1
+
+
+@pytest.fixture(autouse=True)
+def view_counting_unbuffered(settings, tmp_path):
+    """Filtro de visualizaciones propio de cada test y escritura inmediata"""
+    settings.VIEW_DEDUPE_DIR = tmp_path / 'views'
+    settings.VIEW_FLUSH_INTERVAL = 0
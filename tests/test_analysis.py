@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+from django.db import DatabaseError
+from django.urls import reverse
+
+from apps.audios import analysis
+
+np = pytest.importorskip('numpy')
+
+RATE = 22050
+
+
+def loop(seconds=8, bpm=120):
+    """La menor sostenido con un golpe de ruido en cada pulso"""
+    t = np.arange(RATE * seconds) / RATE
+    signal = sum(0.1 * np.sin(2 * np.pi * freq * t) for freq in (220.0, 261.63, 329.63))
+    noise = np.random.RandomState(0).uniform(-0.5, 0.5, 200) * np.exp(-np.arange(200) / 40)
+    for beat in np.arange(0, seconds, 60 / bpm):
+        start = int(beat * RATE)
+        signal[start:start + 200] += noise[:len(signal[start:start + 200])]
+    return signal
+
+
+def test_analyze_loop(tmp_path, write_wav):
+    write_wav(tmp_path / 'loop.wav', loop(), RATE)
+    results = analysis.analyze(str(tmp_path / 'loop.wav'))
+
+    assert results['bpm'] == pytest.approx(120, abs=1)
+    assert results['musical_key'] == 21  # La menor
+    assert -25 < results['loudness_lufs'] < -10
+    assert results['peak_db'] <= 0
+
+
+def test_loudness_reference_tone():
+    # Seno de 1 kHz a -20 dBFS en ambos canales: -20 LUFS
+    tone = 0.1 * np.sin(2 * np.pi * 997 * np.arange(44100 * 5) / 44100)
+    stereo = np.stack([tone, tone], axis=1)
+    assert analysis.integrated_loudness(stereo, 44100) == pytest.approx(-20, abs=0.1)
+    assert analysis.peak_db(stereo) == pytest.approx(-20, abs=0.01)
+
+
+def test_decode_is_capped(tmp_path, settings, write_wav):
+    settings.AUDIO_ANALYSIS_MAX_SECONDS = 2
+    write_wav(tmp_path / 'loop.wav', loop(), RATE)
+    samples, rate = analysis.decode(str(tmp_path / 'loop.wav'))
+    assert (len(samples), rate) == (2 * RATE, RATE)
+
+
+def test_results_are_stored_off_the_pool_thread(monkeypatch):
+    stored, logged = [], []
+
+    def save(outcome):
+        stored.append(threading.current_thread().name)
+        raise DatabaseError('sin base')
+
+    monkeypatch.setattr(analysis, '_save_outcome', save)
+    monkeypatch.setattr(analysis.logger, 'exception', lambda message, *args: logged.append(args))
+    future = Future()
+    future.set_result((7, {}, None, 0.1))
+
+    analysis._finish(future)
+    analysis._get_store_executor().submit(lambda: None).result()
+
+    assert stored[0].startswith('analysis-store')
+    assert logged == [(7,)]
+
+
+@pytest.mark.django_db
+def test_upload_is_analyzed_and_filterable(client, settings, tmp_path, make_audio, write_wav,
+                                           django_capture_on_commit_callbacks):
+    settings.MEDIA_ROOT = tmp_path
+    settings.AUDIO_ANALYSIS_WORKERS = 0
+    (tmp_path / 'audios').mkdir()
+    write_wav(tmp_path / 'audios' / 'loop.wav', loop(), RATE)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        audio = make_audio(audio_file='audios/loop.wav')
+    make_audio(title='Sin analizar')
+
+    audio.refresh_from_db()
+    assert audio.analyzed_at is not None
+    assert audio.musical_key == 21
+
+    def listed(**params):
+        response = client.get(reverse('audios:list'), params, secure=True)
+        return [item.pk for item in response.context['audios']]
+
+    assert listed(min_bpm=110, max_bpm=130) == [audio.pk]
+    assert listed(musical_key=21) == [audio.pk]
+    assert listed(min_bpm=140) == []
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.analytics import reports, rollups, tracking
+from apps.analytics.models import AudioRollup, Event, EventKind, Period, SellerRollup
+from apps.audios import downloads
+
+
+def test_buffered_events_are_written_in_batches(settings, make_audio, django_capture_on_commit_callbacks):
+    settings.ANALYTICS_BUFFER_SIZE = 3
+    settings.ANALYTICS_FLUSH_INTERVAL = 3600
+    audio = make_audio()
+    tracking.flush()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tracking.track(EventKind.VIEW, audio.pk)
+        tracking.track(EventKind.PLAY, audio.pk)
+    assert not Event.objects.exists()
+    with django_capture_on_commit_callbacks(execute=True):
+        tracking.track(EventKind.PLAY, audio.pk)
+    assert Event.objects.count() == 3
+
+
+def test_rolled_back_work_leaves_no_event(settings, make_audio, django_capture_on_commit_callbacks):
+    settings.ANALYTICS_BUFFER_SIZE = 2
+    settings.ANALYTICS_FLUSH_INTERVAL = 3600
+    audio = make_audio()
+    tracking.flush()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tracking.track(EventKind.VIEW, audio.pk)
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                tracking.track(EventKind.FAVORITE, audio.pk)
+                raise RuntimeError
+    # El favorito revertido no llegó al buffer y el de la vista no se escribió adentro
+    assert not Event.objects.exists()
+    assert tracking.flush() == 1
+    assert list(Event.objects.values_list('kind', flat=True)) == [EventKind.VIEW]
+
+
+def test_rollups_feed_the_seller_dashboard(client, seller, buyer, make_audio, django_capture_on_commit_callbacks):
+    audio = make_audio()
+    with django_capture_on_commit_callbacks(execute=True):
+        for user_agent in ('Mozilla/5.0 (X11)', 'Mozilla/5.0 (iPhone)'):
+            client.get(reverse('audios:detail', args=[audio.slug]), secure=True, HTTP_USER_AGENT=user_agent)
+        assert client.post(reverse('analytics:play', args=[audio.slug]), secure=True).status_code == 204
+        downloads.purchase(buyer, audio)
+
+    assert rollups.rollup(lag=timedelta(0)) == 4
+    assert rollups.rollup(lag=timedelta(0)) == 0
+    day = rollups.period_starts(timezone.now())[Period.DAY]
+    assert SellerRollup.objects.get(seller=seller, period=Period.DAY, start=day, kind=EventKind.VIEW).count == 2
+    assert AudioRollup.objects.filter(audio=audio, kind=EventKind.PLAY).count() == 3  # hora, día y mes
+
+    # Los eventos tardíos se suman a los agregados existentes
+    with django_capture_on_commit_callbacks(execute=True):
+        tracking.track(EventKind.PLAY, audio.pk)
+    rollups.rollup(lag=timedelta(0))
+    assert reports.seller_daily(seller, days=7)[-1].plays == 2
+    assert reports.seller_sales(seller) == (Decimal('9.99'), Decimal('9.99'))
+
+    client.force_login(seller)
+    response = client.get(reverse('users:dashboard_seller'), secure=True)
+    assert response.context['stats']['monthly_sales'] == Decimal('9.99')
+    assert response.context['top_tracks'][0]['plays'] == 2
+    # Únicos: dos visitantes anónimos distintos y un oyente (el evento tardío no trae visitante)
+    assert (response.context['stats']['unique_visitors'], response.context['stats']['unique_listeners']) == (2, 1)
+    assert response.context['top_tracks'][0]['listeners'] == 1
+    profile = client.get(reverse('audios:seller_profile', args=[seller.username]), secure=True)
+    assert profile.context['stats']['unique_listeners'] == 1
+    assert client.get(reverse('analytics:audio_stats', args=[audio.slug]), secure=True).status_code == 200
+
+
+def test_compaction_keeps_daily_and_monthly_rollups(make_audio, django_capture_on_commit_callbacks):
+    audio = make_audio()
+    with django_capture_on_commit_callbacks(execute=True):
+        tracking.track(EventKind.VIEW, audio.pk)
+    rollups.rollup(lag=timedelta(0))
+
+    removed = rollups.compact(now=timezone.now() + timedelta(days=60))
+    assert (removed.events, removed.hourly, removed.daily, removed.sketches) == (1, 2, 0, 0)
+    assert not Event.objects.exists()
+    assert set(AudioRollup.objects.values_list('period', flat=True)) == {Period.DAY, Period.MONTH}
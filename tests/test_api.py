@@ -0,0 +1,85 @@
+import gzip
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+def _get(client, resource, **params):
+    return client.get(reverse('api:collection', kwargs={'resource': resource}), params, secure=True)
+
+
+@pytest.mark.django_db
+def test_collection_selects_fields_and_pages_by_cursor(client, make_audio):
+    audios = [make_audio(title=f'Audio {index}') for index in range(5)]
+
+    response = _get(client, 'audios', fields='id,title,seller', limit=2)
+    page = response.json()
+    assert response.status_code == 200
+    assert page['results'] == [
+        {'id': audio.pk, 'title': audio.title, 'seller': 'vendedor'} for audio in audios[:2:-1]
+    ]
+
+    seen = [item['id'] for item in page['results']]
+    while page['next']:
+        page = client.get(page['next'], secure=True).json()
+        seen += [item['id'] for item in page['results']]
+    assert seen == [audio.pk for audio in reversed(audios)]
+
+    assert _get(client, 'audios', fields='id,password').status_code == 400
+    assert _get(client, 'audios', cursor='no es un cursor').status_code == 400
+    assert _get(client, 'nada').status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {'category': '9' * 23},
+    {'min_price': 'NaN'},
+    {'max_price': '-Infinity'},
+    {'min_price': '1e999'},
+    {'cursor': 'OTk5OTk5OTk5OTk5OTk5OTk5OTk5OQ'},  # 23 nueves
+])
+def test_collection_rejects_values_out_of_range(client, params):
+    response = _get(client, 'audios', **params)
+    assert response.status_code == 400
+    assert 'error' in response.json()
+
+
+@pytest.mark.django_db
+def test_collection_revalidates_with_a_single_query(client, make_audio):
+    audio = make_audio(title='Lluvia')
+    response = _get(client, 'audios')
+    etag = response['ETag']
+    assert not etag.startswith('W/') and response['Last-Modified']
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            reverse('api:collection', kwargs={'resource': 'audios'}), secure=True, HTTP_IF_NONE_MATCH=etag,
+        )
+    assert response.status_code == 304
+    assert len(queries) == 1
+
+    audio.title = 'Lluvia de verano'
+    audio.save()
+    response = client.get(
+        reverse('api:collection', kwargs={'resource': 'audios'}), secure=True, HTTP_IF_NONE_MATCH=etag,
+    )
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.json()['results'][0]['title'] == 'Lluvia de verano'
+
+
+@pytest.mark.django_db
+def test_collection_compresses_with_its_own_etag(client, make_audio, settings):
+    settings.API_GZIP_MIN_LENGTH = 0
+    make_audio()
+    plain = _get(client, 'audios')
+    compressed = client.get(
+        reverse('api:collection', kwargs={'resource': 'audios'}), secure=True, HTTP_ACCEPT_ENCODING='gzip',
+    )
+    assert compressed['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed['Vary']
+    assert json.loads(gzip.decompress(compressed.content)) == plain.json()
+    assert compressed['ETag'] != plain['ETag']
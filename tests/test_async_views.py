@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.test import AsyncRequestFactory
+
+from apps.audios import async_views
+from apps.audios.models import Audio, Genre, Tag
+
+
+def _call(view, request, user, *args):
+    request.user = user
+    return async_to_sync(view)(request, *args)
+
+
+@pytest.fixture
+def rf():
+    return AsyncRequestFactory()
+
+
+@pytest.mark.django_db
+def test_audio_list_filters_and_tags(rf, make_audio, category):
+    jazz = Genre.objects.create(name='Jazz', category=category)
+    make_audio(title='Lluvia').tags.add(Tag.objects.create(name='Ambiente'))
+    make_audio(title='Swing', genre=jazz)
+
+    response = _call(async_views.audio_list, rf.get('/audios/', {'genre': jazz.pk}), AnonymousUser())
+
+    assert response.status_code == 200
+    assert b'Swing' in response.content
+    assert b'Lluvia' not in response.content
+
+    response = _call(async_views.audio_list, rf.get('/audios/'), AnonymousUser())
+    assert b'Ambiente' in response.content
+
+
+@pytest.mark.django_db
+def test_audio_detail_counts_view(rf, buyer, make_audio):
+    audio = make_audio(title='Lluvia')
+    make_audio(title='Tormenta')
+
+    response = _call(async_views.audio_detail, rf.get('/', headers={'User-Agent': 'Mozilla/5.0'}), buyer, audio.slug)
+
+    assert response.status_code == 200
+    assert b'Tormenta' in response.content
+    assert Audio.objects.get(pk=audio.pk).views_count == 1
+
+
+@pytest.mark.django_db
+def test_toggle_favorite(rf, buyer, make_audio):
+    audio = make_audio()
+    ajax = {'headers': {'X-Requested-With': 'XMLHttpRequest'}}
+
+    response = _call(async_views.toggle_favorite, rf.post('/', **ajax), buyer, audio.slug)
+    assert json.loads(response.content)['favorites_count'] == 1
+
+    assert _call(async_views.toggle_favorite, rf.get('/'), buyer, audio.slug).status_code == 405
+    assert _call(async_views.toggle_favorite, rf.post('/'), AnonymousUser(), audio.slug).status_code == 302
+
+
+@pytest.mark.django_db
+def test_search_suggestions(rf, buyer, make_audio):
+    make_audio(title='Lluvia suave')
+
+    response = _call(async_views.search_suggestions, rf.get('/', {'q': 'lluv'}), buyer)
+
+    assert json.loads(response.content) == {'suggestions': ['Lluvia suave']}
@@ -0,0 +1,23 @@
+import os
+
+from core.buffers import ProcessBuffer
+
+
+def test_buffer_is_due_by_size_and_starts_empty_after_fork():
+    buffer = ProcessBuffer(list, interval=lambda: 3600, size=lambda: 2)
+    with buffer as items:
+        items.append(1)
+    assert not buffer.due()
+
+    pid = os.fork()
+    if pid == 0:
+        # Lo acumulado es del padre: el hijo no lo escribe
+        os._exit(0 if buffer.take() is None else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    with buffer as items:
+        items.append(2)
+    assert buffer.due()
+    assert buffer.take() == [1, 2]
+    assert buffer.take() is None
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.audios import cards, catalog, favorites
+from apps.audios.catalog import CatalogFilters
+from apps.audios.models import Audio, AudioCard, Tag
+
+
+@pytest.mark.django_db
+def test_cards_follow_audio_changes(make_audio, seller, category):
+    audio = make_audio(title='Lluvia')
+    audio.tags.add(Tag.objects.create(name='Ambiente', color='#112233'))
+    card = AudioCard.objects.get(pk=audio.pk)
+    assert (card.seller_name, card.category_name) == ('Ana Vendedora', 'Música')
+    assert card.tags == [{'name': 'Ambiente', 'color': '#112233'}]
+
+    audio.title = 'Lluvia de verano'
+    audio.save()
+    category.name = 'Efectos'
+    category.save()
+    seller.first_name = 'Anabel'
+    seller.save()
+    card.refresh_from_db()
+    assert (card.title, card.category_name, card.seller_name) == ('Lluvia de verano', 'Efectos', 'Anabel Vendedora')
+
+    # Los cambios con QuerySet.update() dentro de catalog.track() también llegan
+    with catalog.track([audio.pk]):
+        Audio.objects.filter(pk=audio.pk).update(status=Audio.Status.DRAFT)
+    assert not AudioCard.objects.filter(pk=audio.pk).exists()
+
+
+@pytest.mark.django_db
+def test_reconcile_repairs_cards_and_refreshes_counters(make_audio):
+    audio, stale = make_audio(), make_audio()
+    AudioCard.objects.filter(pk=stale.pk).delete()
+    Audio.objects.filter(pk=audio.pk).update(views_count=7)
+
+    assert cards.reconcile() == (1, 1, 0)
+    assert AudioCard.objects.get(pk=audio.pk).views_count == 7
+    assert cards.reconcile() == (0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_listing_page_is_a_single_query(client, make_audio):
+    tag = Tag.objects.create(name='Loop')
+    for price in ('3', '12', '25'):
+        make_audio(price_standard=Decimal(price)).tags.add(tag)
+
+    with CaptureQueriesContext(connection) as queries:
+        page = list(cards.listing(CatalogFilters(tag_id=tag.pk, min_price=Decimal('10')), '-price_standard'))
+    assert len(queries) == 1
+    assert [card.price_standard for card in page] == [Decimal('25'), Decimal('12')]
+    assert client.get(reverse('audios:list'), secure=True).status_code == 200
+
+
+@pytest.mark.django_db
+def test_listing_pages_render_slotted_cards(client, buyer, make_audio, category):
+    liked, other = make_audio(title='Lluvia'), make_audio(title='Tormenta')
+    favorites.toggle_favorite(buyer, liked.pk)
+    client.force_login(buyer)
+
+    response = client.get(reverse('audios:favorites'), secure=True)
+    page = list(response.context['favorites'])
+    assert [card.pk for card in page] == [liked.pk]
+    assert page[0].user_is_favorite and not hasattr(page[0], '__dict__')
+
+    response = client.get(reverse('audios:category', args=[category.slug]), secure=True)
+    assert [card.pk for card in response.context['audios']] == [other.pk, liked.pk]
+    assert b'Tormenta' in response.content
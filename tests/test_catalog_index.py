@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+import pytest
+
+from apps.audios import catalog, catalog_index, facets
+from apps.audios.catalog import CatalogFilters
+from apps.audios.catalog_index import CatalogIndex
+from apps.audios.models import Audio, Genre, Tag
+
+
+@pytest.fixture
+def catalog_audios(make_audio, category, genre):
+    other_genre = Genre.objects.create(name='Jazz', category=category)
+    loop = Tag.objects.create(name='Loop')
+    audios = [
+        make_audio(price_standard=Decimal('3'), views_count=5),
+        make_audio(price_standard=Decimal('12'), views_count=50),
+        make_audio(genre=other_genre, price_standard=Decimal('12.50'), views_count=1),
+        make_audio(genre=other_genre, price_standard=Decimal('40')),
+    ]
+    for audio in audios[1:3]:
+        audio.tags.add(loop)
+    make_audio(status=Audio.Status.DRAFT)
+    return {'audios': audios, 'genre': other_genre, 'tag': loop}
+
+
+def _db_ids(filters, sort_by):
+    queryset = catalog.filter_queryset(Audio.objects.filter(status=Audio.Status.PUBLISHED), filters)
+    return list(queryset.order_by(sort_by or '-created_at', '-id').values_list('pk', flat=True))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('sort_by', ['', 'price_standard', '-price_standard', '-views_count'])
+def test_query_matches_database(catalog_audios, sort_by):
+    index = CatalogIndex().build()
+    tag = catalog_audios['tag']
+    for filters in (
+        CatalogFilters(),
+        CatalogFilters(genre_id=catalog_audios['genre'].pk),
+        CatalogFilters(tag_id=tag.pk, min_price=Decimal('12.25')),
+        CatalogFilters(max_price=Decimal('12')),
+    ):
+        result = index.query(filters, sort_by)
+        assert len(result) == len(_db_ids(filters, sort_by))
+        assert [audio.pk for audio in result] == _db_ids(filters, sort_by)
+
+
+@pytest.mark.django_db
+def test_counts_are_exact_for_price_ranges(catalog_audios):
+    index = CatalogIndex().build()
+
+    counts = index.counts(CatalogFilters(min_price=Decimal('12.25')))
+
+    assert counts.total == 2
+    assert counts.genres == {catalog_audios['genre'].pk: 2}
+    assert counts.price_buckets == {0: 1, 2: 2, 3: 1}
+
+
+@pytest.mark.django_db
+def test_index_follows_catalog_changes(catalog_audios, django_capture_on_commit_callbacks, settings):
+    settings.CATALOG_INDEX_ENABLED = True
+    index = catalog_index.get_index().build()
+    first, second = catalog_audios['audios'][:2]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.status = Audio.Status.INACTIVE
+        first.save()
+        second.tags.clear()
+        second.price_standard = Decimal('60')
+        second.save()
+
+    assert first.pk not in index.entries
+    assert index.counts(CatalogFilters()).tags == {catalog_audios['tag'].pk: 1}
+    assert [card.pk for card in index.query(CatalogFilters(min_price=Decimal('50')))] == [second.pk]
+    assert index.counts(CatalogFilters()) == facets.counts(CatalogFilters())
+
+
+@pytest.mark.django_db
+def test_audio_list_uses_index(client, catalog_audios, settings):
+    settings.CATALOG_INDEX_ENABLED = True
+    catalog_index.get_index().build()
+
+    response = client.get('/audios/', {'sort_by': 'price_standard'}, secure=True)
+
+    assert response.status_code == 200
+    assert [card.pk for card in response.context['audios']] == [audio.pk for audio in catalog_audios['audios']]
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+import pytest
+from django.core import signing
+from django.urls import reverse
+
+from apps.audios import downloads
+from apps.audios.models import Audio, DownloadEvent
+
+MASTER = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def master(settings, tmp_path, make_audio):
+    settings.MEDIA_ROOT = tmp_path
+    (tmp_path / 'audios').mkdir()
+    (tmp_path / 'audios' / 'prueba.mp3').write_bytes(MASTER)
+    return make_audio()
+
+
+def _download(client, token, **headers):
+    response = client.get(reverse('audios:download_file', args=[token]), secure=True, headers=headers)
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    return response, body
+
+
+@pytest.mark.django_db
+def test_download_requires_purchase(client, buyer, master):
+    client.force_login(buyer)
+    url = reverse('audios:download', args=[master.slug])
+
+    response = client.get(url, secure=True)
+    assert response.url == master.get_absolute_url()
+
+    downloads.purchase(buyer, master)
+    response = client.get(url, secure=True)
+    token = response.url.rstrip('/').rsplit('/', 1)[-1]
+    assert downloads.read_token(token).user_id == buyer.pk
+
+
+@pytest.mark.django_db
+def test_ranges_and_download_events(client, buyer, master):
+    token = downloads.make_token(master, buyer, downloads.purchase(buyer, master))
+
+    response, body = _download(client, token)
+    assert response.status_code == 200
+    assert body == MASTER
+    assert response['Accept-Ranges'] == 'bytes'
+
+    response, body = _download(client, token, Range='bytes=1000-')
+    assert response.status_code == 206
+    assert response['Content-Range'] == 'bytes 1000-1023/1024'
+    assert body == MASTER[1000:]
+
+    response, body = _download(client, token, Range='bytes=10-19')
+    assert body == MASTER[10:20]
+    assert response['Content-Length'] == '10'
+
+    response, _ = _download(client, token, Range='bytes=5000-')
+    assert response.status_code == 416
+
+    # Solo la descarga completa cuenta; las reanudaciones no
+    assert DownloadEvent.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_invalid_tokens(client, buyer, master, settings):
+    token = downloads.make_token(master, buyer)
+
+    assert _download(client, token + 'x')[0].status_code == 404
+    settings.DOWNLOAD_TOKEN_MAX_AGE = -1
+    assert _download(client, token)[0].status_code == 410
+    with pytest.raises(signing.BadSignature):
+        downloads.read_token(token)
+
+
+@pytest.mark.django_db
+def test_offloaded_download(client, buyer, master, settings):
+    settings.DOWNLOAD_BACKEND = 'x-accel'
+
+    response, body = _download(client, downloads.make_token(master, buyer))
+
+    assert response['X-Accel-Redirect'] == '/protected-media/audios/prueba.mp3'
+    assert body == b''
+
+
+@pytest.mark.django_db
+def test_flush_download_counts(buyer, make_audio):
+    first, second = make_audio(), make_audio()
+    for audio in (first, first, second):
+        downloads.record_download(downloads.DownloadGrant(audio.pk, buyer.pk, None))
+
+    assert downloads.flush_download_counts() == 0
+    assert downloads.flush_download_counts(lag=timedelta(0)) == 3
+    assert downloads.flush_download_counts(lag=timedelta(0)) == 0
+    assert Audio.objects.get(pk=first.pk).downloads_count == 2
+    assert Audio.objects.get(pk=second.pk).downloads_count == 1
@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+import pytest
+
+from apps.audios import facets
+from apps.audios.catalog import CatalogFilters
+from apps.audios.models import Audio, FacetCount, Genre, Tag, TagFacetCount
+
+
+def _tables():
+    cells = set(FacetCount.objects.filter(count__gt=0).values_list(
+        'category_id', 'genre_id', 'price_bucket', 'count'))
+    tag_cells = set(TagFacetCount.objects.filter(count__gt=0).values_list(
+        'tag_id', 'category_id', 'genre_id', 'price_bucket', 'count'))
+    return cells, tag_cells
+
+
+@pytest.mark.django_db
+def test_incremental_counts_match_rebuild(make_audio, category, genre):
+    other_genre = Genre.objects.create(name='Jazz', category=category)
+    loop, ambient = Tag.objects.create(name='Loop'), Tag.objects.create(name='Ambient')
+
+    cheap = make_audio(price_standard=Decimal('3'))
+    cheap.tags.set([loop, ambient])
+    pricey = make_audio(genre=other_genre, price_standard=Decimal('30'))
+    pricey.tags.add(loop)
+    draft = make_audio(status=Audio.Status.DRAFT)
+    draft.tags.add(ambient)
+
+    # Transiciones: cambio de precio, baja y despublicación
+    pricey.price_standard = Decimal('12')
+    pricey.save()
+    cheap.tags.remove(ambient)
+    draft.status = Audio.Status.PUBLISHED
+    draft.save()
+    draft.delete()
+
+    incremental = _tables()
+    facets.rebuild()
+    assert incremental == _tables()
+
+
+@pytest.mark.django_db
+def test_drifted_counts_never_go_negative(category, genre):
+    cell = {'category_id': category.pk, 'genre_id': genre.pk, 'price_bucket': 1}
+    FacetCount.objects.create(count=1, **cell)
+
+    facets._bump((None, category.pk, genre.pk, 1), -3)
+    facets._bump((None, category.pk, genre.pk, 2), -1)
+
+    assert list(FacetCount.objects.values_list('price_bucket', 'count')) == [(1, 0)]
+
+
+@pytest.mark.django_db
+def test_counts_apply_filters_of_other_dimensions(make_audio, category, genre):
+    other_genre = Genre.objects.create(name='Jazz', category=category)
+    loop = Tag.objects.create(name='Loop')
+    make_audio(price_standard=Decimal('3')).tags.add(loop)
+    make_audio(price_standard=Decimal('30'))
+    make_audio(genre=other_genre, price_standard=Decimal('30')).tags.add(loop)
+
+    counts = facets.counts(CatalogFilters())
+    assert counts.total == 3
+
+    counts = facets.counts(CatalogFilters(genre_id=genre.pk))
+    assert counts.total == 2
+    assert counts.genres == {genre.pk: 2, other_genre.pk: 1}
+    assert counts.price_buckets == {0: 1, 3: 1}
+    assert counts.tags == {loop.pk: 1}
+
+    counts = facets.counts(CatalogFilters(tag_id=loop.pk, min_price=Decimal('25')))
+    assert counts.total == 1
+    assert counts.genres == {other_genre.pk: 1}
+    assert counts.exact
+
+
+@pytest.mark.django_db
+def test_search_counts_use_matching_audios(make_audio):
+    make_audio(title='Lluvia suave')
+    make_audio(title='Tormenta')
+
+    search = Audio.objects.filter(title__icontains='lluvia')
+    assert facets.counts(CatalogFilters(search='lluvia'), queryset=search).total == 1
+
+
+@pytest.mark.django_db
+def test_audio_list_sidebar(client, make_audio):
+    make_audio()
+
+    response = client.get('/audios/', {'min_price': '5'}, secure=True)
+
+    assert response.status_code == 200
+    assert response.context['stats']['categories'][0].audio_count == 1
@@ -0,0 +1,78 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.audios.models import Audio
+from core import fanout, templating
+
+
+def _queries():
+    return {
+        'audios': Audio.objects.order_by('id'),
+        'total': lambda: Audio.objects.count(),
+    }
+
+
+@pytest.mark.django_db
+def test_inside_transaction_runs_on_callers_connection(make_audio):
+    audio = make_audio()
+
+    with CaptureQueriesContext(connection) as ctx:
+        results = fanout.fan_out(_queries())
+
+    # Los datos del test no están confirmados: tiene que usar esta conexión
+    assert results == {'audios': [audio], 'total': 1}
+    assert set(results.timings) == {'audios', 'total'}
+    assert len(ctx.captured_queries) == 2
+
+
+@pytest.mark.django_db
+def test_async_variant(make_audio):
+    audio = make_audio()
+
+    results = async_to_sync(fanout.afan_out)(_queries())
+
+    assert results == {'audios': [audio], 'total': 1}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_without_persistent_connections_runs_in_sequence(make_audio, monkeypatch):
+    monkeypatch.setitem(connection.settings_dict, 'CONN_MAX_AGE', 0)
+    audio = make_audio()
+
+    with CaptureQueriesContext(connection) as ctx:
+        results = fanout.fan_out(_queries())
+
+    # Abrir una conexión por consulta cuesta más que lo que se gana en paralelo
+    assert results == {'audios': [audio], 'total': 1}
+    assert len(ctx.captured_queries) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_uses_worker_connections(make_audio, monkeypatch):
+    monkeypatch.setitem(connection.settings_dict, 'CONN_MAX_AGE', 60)
+    audio = make_audio()
+
+    with CaptureQueriesContext(connection) as ctx, templating.collect_timings() as timings:
+        results = fanout.fan_out(_queries())
+
+    assert results == {'audios': [audio], 'total': 1}
+    assert ctx.captured_queries == []
+    assert set(timings) == {('query', 'audios'), ('query', 'total')}
+
+
+@pytest.mark.django_db
+def test_detail_and_seller_pages(client, buyer, seller, make_audio):
+    audio = make_audio(downloads_count=3)
+    make_audio(downloads_count=2)
+
+    response = client.get(f'/audios/{audio.slug}/', secure=True)
+    assert response.status_code == 200
+    assert len(response.context['related_audios']) == 1
+
+    client.force_login(seller)
+    response = client.get(reverse('users:dashboard_seller'), secure=True)
+    assert response.context['stats']['published_audios'] == 2
+    assert response.context['stats']['total_downloads'] == 5
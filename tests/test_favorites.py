@@ -0,0 +1,77 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.audios import favorites
+from apps.audios.models import Audio, AudioFavorite
+
+
+def _count(audio):
+    return Audio.objects.get(pk=audio.pk).favorites_count
+
+
+@pytest.mark.django_db
+def test_toggle_returns_fresh_count(buyer, make_audio):
+    audio = make_audio()
+
+    result = favorites.toggle_favorite(buyer, audio.id)
+    assert result == favorites.FavoriteResult(True, 1)
+    assert _count(audio) == 1
+
+    result = favorites.toggle_favorite(buyer, audio.id)
+    assert result == favorites.FavoriteResult(False, 0)
+    assert not AudioFavorite.objects.exists()
+
+
+@pytest.mark.django_db
+def test_toggle_remove_uses_two_statements(buyer, make_audio):
+    audio = make_audio()
+    favorites.toggle_favorite(buyer, audio.id)
+
+    with CaptureQueriesContext(connection) as ctx:
+        favorites.toggle_favorite(buyer, audio.id)
+
+    statements = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+    assert len(statements) == 2
+
+
+@pytest.mark.django_db
+def test_batch_lookup_and_add(buyer, make_audio):
+    audios = [make_audio(title=f'Audio {i}') for i in range(3)]
+    ids = [audio.id for audio in audios]
+
+    assert favorites.add_favorites(buyer, ids[:2]) == set(ids[:2])
+    assert favorites.add_favorites(buyer, ids) == {ids[2]}
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert favorites.favorite_ids(buyer, ids) == set(ids)
+    assert len(ctx.captured_queries) == 1
+    assert [_count(audio) for audio in audios] == [1, 1, 1]
+
+
+@pytest.mark.django_db
+def test_add_counts_only_rows_it_inserted(buyer, make_audio, monkeypatch):
+    audios = [make_audio(title=f'Audio {i}') for i in range(2)]
+    ids = [audio.id for audio in audios]
+    read = favorites.favorite_ids
+
+    def racing_read(user, audio_ids):
+        found = read(user, audio_ids)
+        # Otra petición agrega el primero entre la lectura y el INSERT
+        favorites.toggle_favorite(user, ids[0])
+        return found
+
+    monkeypatch.setattr(favorites, 'favorite_ids', racing_read)
+
+    assert favorites.add_favorites(buyer, ids) == {ids[1]}
+    assert [_count(audio) for audio in audios] == [1, 1]
+
+
+@pytest.mark.django_db
+def test_deleting_user_discounts_favorites(buyer, make_audio):
+    audio = make_audio()
+    favorites.toggle_favorite(buyer, audio.id)
+
+    buyer.delete()
+
+    assert _count(audio) == 0
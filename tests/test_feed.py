@@ -0,0 +1,101 @@
+import gzip
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.api import feed
+from apps.audios import catalog, changelog
+from apps.audios.models import Audio, CatalogChange, Tag
+
+
+@pytest.fixture(autouse=True)
+def settled(settings):
+    settings.CATALOG_FEED_SETTLE_SECONDS = 0
+
+
+def _lines(blocks):
+    return [json.loads(line) for line in ''.join(blocks).splitlines()]
+
+
+@pytest.mark.django_db
+def test_snapshot_streams_catalog_after_its_watermark(make_audio, genre):
+    published = make_audio(title='Lluvia', views_count=3)
+    make_audio(status=Audio.Status.DRAFT)
+    out = StringIO()
+    call_command('catalog_feed', 'snapshot', '--chunk-size', '1', stdout=out)
+
+    header, *entries = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert header == {'watermark': changelog.watermark()}
+    assert [(entry['type'], entry['id']) for entry in entries] == [
+        ('category', genre.category_id), ('genre', genre.pk), ('audio', published.pk),
+    ]
+    assert entries[-1]['data']['title'] == 'Lluvia'
+    assert 'views' not in entries[-1]['data']
+
+
+@pytest.mark.django_db
+def test_changes_resolve_current_state_once_per_object(make_audio, seller):
+    audio = make_audio(title='Lluvia')
+    since = changelog.watermark()
+
+    audio.title = 'Lluvia de verano'
+    audio.save()
+    audio.tags.add(Tag.objects.create(name='Ambiente'))
+    seller.first_name = 'Anabel'
+    seller.save()
+    *entries, end = _lines(feed.changes(since))
+    audio_entries = [entry for entry in entries if entry['type'] == 'audio']
+    assert len(audio_entries) == 1
+    assert audio_entries[0]['data']['title'] == 'Lluvia de verano'
+    assert audio_entries[0]['data']['seller_name'] == 'Anabel Vendedora'
+    assert audio_entries[0]['data']['tags'] == ['Ambiente']
+    assert end == {'watermark': CatalogChange.objects.latest('id').pk, 'more': False}
+
+    # Las bajas con QuerySet.update() dentro de catalog.track() también llegan
+    with catalog.track([audio.pk]):
+        Audio.objects.filter(pk=audio.pk).update(status=Audio.Status.DRAFT)
+    *entries, _ = _lines(feed.changes(end['watermark']))
+    assert entries == [{'seq': entries[0]['seq'], 'type': 'audio', 'id': audio.pk, 'op': 'delete'}]
+
+
+@pytest.mark.django_db
+def test_changes_endpoint_streams_ndjson_and_rejects_pruned_watermarks(client, make_audio):
+    audio = make_audio()
+    response = client.get(reverse('api:changes'), {'since': 0}, secure=True, HTTP_ACCEPT_ENCODING='gzip')
+    assert response['Content-Type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+    assert ('audio', audio.pk, 'upsert') in [(line.get('type'), line.get('id'), line.get('op')) for line in lines]
+    assert lines[-1] == {'watermark': changelog.watermark(), 'more': False}
+
+    CatalogChange.objects.update(created_at=timezone.now() - timedelta(days=60))
+    assert changelog.prune(days=30) > 0
+    assert client.get(reverse('api:changes'), {'since': 0}, secure=True).status_code == 410
+    assert client.get(reverse('api:changes'), {'since': changelog.watermark()}, secure=True).status_code == 200
+
+
+def test_changes_endpoint_rejects_watermarks_out_of_range(client):
+    for params in ({'since': '9' * 23}, {'since': -1}, {'limit': '9' * 23}, {'since': 'x'}):
+        response = client.get(reverse('api:changes'), params, secure=True)
+        assert response.status_code == 400
+        assert 'error' in response.json()
+
+
+@pytest.mark.django_db
+def test_changes_of_slow_transactions_are_recorded_again(settings, django_capture_on_commit_callbacks):
+    settings.CATALOG_FEED_SETTLE_SECONDS = 60
+    with django_capture_on_commit_callbacks(execute=True):
+        changelog.record(changelog.Kind.AUDIO, [7])
+    assert CatalogChange.objects.count() == 1
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        changelog.record(changelog.Kind.AUDIO, [7])
+    # La transacción confirma después de la ventana: un cliente pudo saltear la fila
+    settings.CATALOG_FEED_SETTLE_SECONDS = 0
+    for callback in callbacks:
+        callback()
+    assert list(CatalogChange.objects.values_list('object_id', flat=True)) == [7, 7, 7]
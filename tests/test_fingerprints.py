@@ -0,0 +1,67 @@
+import pytest
+
+from apps.audios import analysis, fingerprints
+from apps.audios.models import DuplicateCandidate
+
+np = pytest.importorskip('numpy')
+
+
+def melody(seed, rate, seconds=10, gain=0.2, skip=0.0):
+    """Notas al azar de 250 ms, reproducibles a cualquier frecuencia de muestreo"""
+    rng = np.random.RandomState(seed)
+    notes = 220 * 2 ** (rng.randint(0, 36, size=int(seconds * 4) + 1) / 12)
+    t = np.arange(int(rate * (seconds - skip))) / rate + skip
+    freqs = notes[(t * 4).astype(int)]
+    phase = 2 * np.pi * np.cumsum(freqs) / rate
+    return gain * (np.sin(phase) + 0.5 * np.sin(2 * phase))
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.AUDIO_ANALYSIS_WORKERS = 0
+    (tmp_path / 'audios').mkdir()
+    return tmp_path / 'audios'
+
+
+@pytest.mark.django_db
+def test_near_duplicates_are_flagged(media, make_audio, write_wav, django_capture_on_commit_callbacks):
+    write_wav(media / 'original.wav', melody(1, 22050), 22050)
+    # Misma grabación: otra frecuencia de muestreo, más baja y sin los primeros 3 s
+    write_wav(media / 'copia.wav', melody(1, 44100, gain=0.08, skip=3.0), 44100)
+    write_wav(media / 'otra.wav', melody(2, 22050), 22050)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        original = make_audio(title='Original', audio_file='audios/original.wav')
+        other = make_audio(title='Otra', audio_file='audios/otra.wav')
+        copy = make_audio(title='Copia', audio_file='audios/copia.wav', status='pending')
+
+    assert original.fingerprint_hashes.exists()
+    assert not other.duplicate_candidates.exists()
+    candidate = copy.duplicate_candidates.get()
+    assert candidate.match == original
+    assert candidate.kind == DuplicateCandidate.Kind.NEAR
+    assert candidate.score >= fingerprints.NEAR_THRESHOLD
+
+
+@pytest.mark.django_db
+def test_exact_copy_is_flagged_on_upload(media, make_audio, write_wav, django_capture_on_commit_callbacks):
+    write_wav(media / 'a.wav', melody(3, 22050), 22050)
+    (media / 'b.wav').write_bytes((media / 'a.wav').read_bytes())
+
+    with django_capture_on_commit_callbacks(execute=True):
+        original = make_audio(title='A', audio_file='audios/a.wav')
+        copy = make_audio(title='B', audio_file='audios/b.wav', status='pending')
+
+    candidate = copy.duplicate_candidates.get()
+    assert (candidate.match, candidate.kind, candidate.score) == (original, DuplicateCandidate.Kind.EXACT, 1.0)
+
+
+def test_resampling_filters_content_above_nyquist():
+    t = np.arange(48000 * 2) / 48000
+    # 19050 Hz se plegaría a 3 kHz, dentro de la banda de las huellas
+    for freq, expected in ((19050, 0.0), (1000, 0.5)):
+        tone = (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+        mono, rate = analysis._mono(np.stack([tone, tone], axis=1), 48000)
+        assert rate == analysis.ANALYSIS_RATE
+        assert np.abs(mono[1000:-1000]).max() == pytest.approx(expected, abs=0.01)
@@ -0,0 +1,46 @@
+import json
+import os
+import re
+import subprocess
+
+import pytest
+from django.urls import reverse
+
+from core import metrics
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(client, make_audio, settings):
+    make_audio(title='Pendiente', status='pending')
+    client.get(reverse('audios:list'), secure=True)
+
+    response = client.get('/metrics', secure=True)
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = response.content.decode()
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert re.search(r'^http_requests_total\{view="audios:list",method="GET",status="200"\} \d', body, re.M)
+    assert re.search(r'^http_request_duration_seconds_bucket\{view="audios:list",method="GET",le="\+Inf"\} \d', body, re.M)
+    assert 'cache_lookups_total{cache="facets",result="miss"}' in body
+    assert 'moderation_queue_depth 1.0' in body
+
+    settings.METRICS_TOKEN = 'secreto'
+    assert client.get('/metrics', secure=True).status_code == 403
+    assert client.get('/metrics', secure=True, HTTP_AUTHORIZATION='Bearer secreto').status_code == 200
+
+
+def test_processes_are_summed_and_dead_ones_kept(metrics_dir):
+    counter = metrics.Counter('test_jobs_total', 'Trabajos de prueba', ['kind'])
+    counter.inc(2, kind='a')
+
+    # Un worker vivo (el padre de pytest) y uno que ya terminó
+    metrics_dir.mkdir()
+    finished = subprocess.Popen(['true'])
+    finished.wait()
+    row = [['test_jobs_total', [['kind', 'a']], 3.0]]
+    (metrics_dir / f'{os.getppid()}-1.json').write_text(json.dumps(row))
+    (metrics_dir / f'{finished.pid}-1.json').write_text(json.dumps(row))
+
+    assert metrics.collect()[('test_jobs_total', (('kind', 'a'),))] == 8
+    assert not (metrics_dir / f'{finished.pid}-1.json').exists()
+    # Lo agregado de procesos terminados no se pierde en el scrape siguiente
+    assert metrics.collect()[('test_jobs_total', (('kind', 'a'),))] == 8
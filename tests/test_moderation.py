@@ -0,0 +1,78 @@
+import pytest
+from django.urls import reverse
+
+from apps.audios import moderation
+from apps.audios.models import Audio, ModerationTask
+from apps.users.models import User, UserType
+
+
+@pytest.fixture
+def make_moderator(db):
+    def _make_moderator(username):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com', password='clave-segura-123',
+            user_type=UserType.ADMIN
+        )
+    return _make_moderator
+
+
+@pytest.fixture
+def pending(make_audio):
+    return [make_audio(title=f'Pendiente {index}', status=Audio.Status.PENDING) for index in range(5)]
+
+
+def test_moderators_claim_disjoint_batches(pending, make_moderator):
+    first, second = make_moderator('mod1'), make_moderator('mod2')
+
+    batch = moderation.claim(first, limit=3)
+    assert [task.audio for task in batch] == pending[:3]
+    assert [task.audio for task in moderation.claim(second, limit=3)] == pending[3:]
+    # Volver a pedir renueva el mismo lote
+    assert [task.audio_id for task in moderation.claim(first, limit=3)] == [audio.pk for audio in pending[:3]]
+
+    moderation.release(first, [pending[0].pk])
+    assert [task.audio for task in moderation.claim(second, limit=3)] == [pending[0]] + pending[3:]
+
+
+def test_batch_decision(client, pending, make_moderator, make_audio):
+    moderator, other = make_moderator('mod1'), make_moderator('mod2')
+    moderation.claim(moderator, limit=3)
+    moderation.claim(other, limit=1)
+
+    client.force_login(moderator)
+    response = client.get(reverse('audios:moderation'), secure=True)
+    assert [task.audio for task in response.context['tasks']] == pending[:3] + pending[4:]
+
+    response = client.post(reverse('audios:moderation_decide'), {
+        'action': 'approve', 'audio_ids': [audio.pk for audio in pending[:4]],
+    }, secure=True)
+    assert response.status_code == 302
+
+    statuses = dict(Audio.objects.values_list('pk', 'status'))
+    assert [statuses[audio.pk] for audio in pending] == ['published'] * 3 + ['pending'] * 2
+    assert all(Audio.objects.filter(pk__in=[a.pk for a in pending[:3]]).values_list('published_at', flat=True))
+    listed = client.get(reverse('audios:list'), secure=True).context['audios']
+    assert {audio.pk for audio in pending[:3]} <= {audio.pk for audio in listed}
+
+    stats = moderation.queue_stats()
+    assert (stats.depth, stats.claimed, stats.decided, stats.approved) == (2, 2, 3, 3)
+    assert client.get(reverse('audios:moderation_stats'), secure=True).json()['depth'] == 2
+
+
+def test_queue_follows_status_changes(pending, make_moderator):
+    audio = pending[0]
+    audio.status = Audio.Status.DRAFT
+    audio.save()
+    assert ModerationTask.objects.get(audio=audio).decision == ModerationTask.Decision.WITHDRAWN
+
+    audio.status = Audio.Status.PENDING
+    audio.save()
+    task = ModerationTask.objects.get(audio=audio)
+    assert task.decided_at is None
+    assert moderation.claim(make_moderator('mod1'), limit=5)[-1].audio == audio
+
+
+def test_queue_requires_moderator(client, buyer):
+    client.force_login(buyer)
+    assert client.get(reverse('audios:moderation'), secure=True).status_code == 302
+    assert client.post(reverse('audios:moderation_decide'), secure=True).status_code == 403
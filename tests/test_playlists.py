@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+import pytest
+
+from apps.audios import playlists
+from apps.audios.models import AudioPlaylist
+
+
+def _order(playlist):
+    return list(playlist.items.order_by('position').values_list('audio_id', flat=True))
+
+
+@pytest.fixture
+def playlist(buyer):
+    return AudioPlaylist.objects.create(name='Mix', user=buyer)
+
+
+@pytest.fixture
+def tracks(make_audio):
+    audios = [make_audio(title=f'Audio {i}') for i in range(5)]
+    for index, audio in enumerate(audios):
+        # Las señales recalculan la duración al guardar; se fija directamente
+        type(audio).objects.filter(pk=audio.pk).update(duration=timedelta(seconds=60 * (index + 1)))
+    return [audio.id for audio in audios]
+
+
+@pytest.mark.django_db
+def test_bulk_add_and_remove_keep_totals(playlist, tracks):
+    assert playlists.add_audios(playlist, tracks + tracks[:1]) == tracks
+    playlist.refresh_from_db()
+    assert playlist.track_count == 5
+    assert playlist.total_duration == timedelta(minutes=15)
+
+    assert playlists.remove_audios(playlist, tracks[:2]) == 2
+    playlist.refresh_from_db()
+    assert playlist.track_count == 3
+    assert playlist.total_duration == timedelta(minutes=12)
+    assert _order(playlist) == tracks[2:]
+
+
+@pytest.mark.django_db
+def test_reorder_only_rewrites_moved_rows(playlist, tracks):
+    playlists.add_audios(playlist, tracks)
+
+    new_order = [tracks[-1]] + tracks[:-1]
+    assert playlists.reorder(playlist, new_order) == 1
+    assert _order(playlist) == new_order
+
+    reversed_order = list(reversed(tracks))
+    playlists.reorder(playlist, reversed_order)
+    assert _order(playlist) == reversed_order
+
+
+@pytest.mark.django_db
+def test_reorder_rebalances_when_gap_is_exhausted(playlist, tracks):
+    playlists.add_audios(playlist, tracks[:3])
+    for _ in range(15):
+        first, second, third = _order(playlist)
+        playlists.reorder(playlist, [first, third, second])
+    assert len(set(playlist.items.values_list('position', flat=True))) == 3
+
+
+@pytest.mark.django_db
+def test_deleting_audio_updates_playlist_totals(playlist, tracks):
+    playlists.add_audios(playlist, tracks[:2])
+
+    type(playlist.items.first().audio).objects.get(pk=tracks[0]).delete()
+
+    playlist.refresh_from_db()
+    assert playlist.track_count == 1
+    assert playlist.total_duration == timedelta(minutes=2)
+
+
+@pytest.mark.django_db
+def test_bulk_endpoints_accept_json_id_lists(client, buyer, playlist, tracks):
+    client.force_login(buyer)
+    headers = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+    response = client.post(
+        f'/audios/playlists/{playlist.pk}/agregar/', {'audio_ids': tracks[:3]},
+        content_type='application/json', secure=True, **headers
+    )
+    assert response.json()['track_count'] == 3
+
+    response = client.post(
+        f'/audios/playlists/{playlist.pk}/ordenar/', {'audio_ids': tracks[2::-1]},
+        content_type='application/json', secure=True, **headers
+    )
+    assert response.status_code == 200
+    assert _order(playlist) == tracks[2::-1]
+
+    response = client.get('/audios/playlists/', secure=True)
+    assert response.status_code == 200
+    assert response.context['playlists'][0].track_count == 3
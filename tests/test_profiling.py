@@ -0,0 +1,57 @@
+import pytest
+from django.urls import reverse
+
+from core import profiling
+from apps.users.models import User, UserType
+
+
+@pytest.fixture
+def profiles(settings, tmp_path):
+    settings.PROFILING_DIR = tmp_path / 'profiles'
+    settings.PROFILING_INTERVAL_MS = 1
+    return settings
+
+
+@pytest.mark.django_db
+def test_slow_requests_are_captured(client, profiles, make_audio):
+    profiles.PROFILING_SLOW_MS = 1
+    profiles.PROFILING_VIEWS = ['audios:list']
+    make_audio()
+    client.get(reverse('audios:list'), secure=True)
+    client.get(reverse('core:home'), secure=True)
+
+    [artifact] = profiling.artifacts()
+    assert (artifact.view, artifact.kind) == ('audios-list', 'stack')
+    data = profiling.load(artifact.name)
+    assert data['view'] == 'audios:list'
+    assert data['query_count'] == len(data['queries']) > 0
+
+
+@pytest.mark.django_db
+def test_sampled_request_and_admin_pages(client, profiles, buyer):
+    profiles.PROFILING_SAMPLE_RATE = 1.0
+    admin = User.objects.create_user(
+        username='admin', email='admin@example.com', password='clave-segura-123', user_type=UserType.ADMIN
+    )
+    client.force_login(admin)
+    client.get(reverse('audios:list'), secure=True)
+
+    artifact = next(entry for entry in profiling.artifacts() if entry.view == 'audios-list')
+    assert artifact.kind == 'cprofile'
+    response = client.get(reverse('core:profile_detail', args=[artifact.name]), secure=True)
+    assert 'cumulative' in response.context['artifact']['profile']
+    assert response.context['query_groups']
+    assert client.get(reverse('core:profiles'), secure=True).status_code == 200
+    assert client.get(reverse('core:profile_detail', args=['..']), secure=True).status_code == 404
+
+    client.force_login(buyer)
+    assert client.get(reverse('core:profiles'), secure=True).status_code == 302
+
+
+def test_disk_usage_is_bounded(profiles, rf):
+    request = rf.get('/audios/')
+    for _ in range(5):
+        profiling.save('audios:list', request, 200, 0.5, 'sql', [('SELECT 1', 1.0, False)] * 50)
+    size = profiling.artifacts()[0].size
+    profiling.evict(max_bytes=size * 2)
+    assert len(profiling.artifacts()) == 2
@@ -0,0 +1,62 @@
+import pytest
+from django.urls import reverse
+
+from apps.audios import analysis, similarity
+
+np = pytest.importorskip('numpy')
+
+RATE = 22050
+
+
+def tone(freqs, bpm, seed=0, seconds=6):
+    """Acorde sostenido con un golpe de ruido en cada pulso"""
+    t = np.arange(RATE * seconds) / RATE
+    signal = sum(0.1 * np.sin(2 * np.pi * freq * t) for freq in freqs)
+    noise = np.random.RandomState(seed).uniform(-0.5, 0.5, 300) * np.exp(-np.arange(300) / 50)
+    for beat in np.arange(0, seconds - 0.1, 60 / bpm):
+        start = int(beat * RATE)
+        signal[start:start + 300] += noise
+    return signal
+
+
+@pytest.fixture
+def index_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.SIMILARITY_INDEX_DIR = tmp_path / 'similarity'
+    settings.AUDIO_ANALYSIS_WORKERS = 0
+    (tmp_path / 'audios').mkdir()
+    return tmp_path
+
+
+def test_nearest_matches_brute_force(index_settings):
+    rng = np.random.RandomState(1)
+    raw = rng.normal(size=(50, analysis.EMBEDDING_DIM)).astype(np.float32)
+    similarity.build([(audio_id, raw[audio_id - 1].tobytes()) for audio_id in range(1, 51)])
+    index = similarity.get_index()
+    assert len(index) == 50
+
+    query = index.query_vector(7)
+    expected = np.argsort(-(np.asarray(index.vectors) @ query))
+    neighbours = index.nearest(query, 5, exclude=[7])
+    assert [audio_id for audio_id, _ in neighbours] == [int(row) + 1 for row in expected[1:6]]
+
+
+@pytest.mark.django_db
+def test_sound_alike_endpoint_and_related(client, index_settings, make_audio, write_wav):
+    write_wav(index_settings / 'audios' / 'a.wav', tone((220.0, 261.63, 329.63), 120, seed=0), RATE)
+    write_wav(index_settings / 'audios' / 'b.wav', tone((220.0, 261.63, 329.63), 122, seed=1), RATE)
+    write_wav(index_settings / 'audios' / 'c.wav', tone((1760.0, 2217.46), 75, seed=2), RATE)
+    loop = make_audio(title='Loop A', audio_file='audios/a.wav')
+    twin = make_audio(title='Loop B', audio_file='audios/b.wav')
+    other = make_audio(title='Campanas', audio_file='audios/c.wav')
+
+    analyzed, failed, indexed = similarity.rebuild()
+    assert (analyzed, failed, indexed) == (3, 0, 3)
+
+    response = client.get(reverse('audios:similar', args=[loop.slug]), secure=True)
+    results = response.json()['results']
+    assert [item['slug'] for item in results] == [twin.slug, other.slug]
+    assert results[0]['similarity'] > results[1]['similarity']
+
+    response = client.get(loop.get_absolute_url(), secure=True)
+    assert response.context['related_audios'][0] == twin
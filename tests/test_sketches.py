@@ -0,0 +1,23 @@
+from apps.analytics import sketches, tracking
+from apps.analytics.sketches import HyperLogLog
+
+
+def _sketch(keys):
+    sketch = HyperLogLog()
+    for key in keys:
+        sketch.add(tracking.visitor_hash(key))
+    return sketch
+
+
+def test_estimates_are_close_and_repeats_do_not_count():
+    assert _sketch([]).count() == 0
+    assert _sketch(['u:1'] * 50).count() == 1
+    estimate = _sketch(f'u:{n}' for n in range(20000)).count()
+    assert abs(estimate - 20000) < 20000 * 0.05
+
+
+def test_merging_is_a_union_and_survives_serialization():
+    first = _sketch(f'u:{n}' for n in range(3000))
+    second = HyperLogLog.from_bytes(_sketch(f'u:{n}' for n in range(2000, 5000)).to_bytes())
+    assert len(second.registers) == sketches.REGISTERS
+    assert abs(first.merge(second).count() - 5000) < 5000 * 0.05
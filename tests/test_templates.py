@@ -0,0 +1,38 @@
+import pytest
+from django.test import override_settings
+
+from core import templating
+
+
+@pytest.mark.django_db
+@override_settings(TEMPLATE_TIMING=True, DEBUG=True)
+def test_server_timing_header_and_panel(client, make_audio):
+    make_audio()
+
+    response = client.get('/audios/', secure=True)
+
+    header = response['Server-Timing']
+    assert 'desc="audios/list.html x1"' in header
+    assert 'desc="content x1"' in header
+    assert b'id="template-timing"' in response.content
+
+
+@pytest.mark.django_db
+@override_settings(TEMPLATE_TIMING=False)
+def test_timing_disabled(client):
+    response = client.get('/audios/', secure=True)
+
+    assert not response.has_header('Server-Timing')
+
+
+def test_precompile_loads_project_templates():
+    engine = templating.engines['django'].engine
+
+    assert templating.precompile() == len(templating.template_names(engine))
+
+
+@pytest.mark.django_db
+def test_profile_genre_list(seller):
+    seller.profile.genres = ' Rock, Jazz ,,Lo-fi '
+
+    assert seller.profile.genre_list == ['Rock', 'Jazz', 'Lo-fi']
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+import pytest
+from django.urls import reverse
+
+from apps.audios import downloads, transcoding
+
+MASTER = b'RIFF' + bytes(range(256)) * 8
+
+
+@pytest.fixture
+def master(settings, tmp_path, make_audio):
+    settings.MEDIA_ROOT = tmp_path
+    settings.TRANSCODE_CACHE_DIR = tmp_path / 'transcodes'
+    (tmp_path / 'audios').mkdir()
+    (tmp_path / 'audios' / 'prueba.mp3').write_bytes(MASTER)
+    return make_audio()
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    """Reemplaza ffmpeg por una copia del master; registra cada ejecución"""
+    calls = []
+
+    def fake_encode(source, target, fmt):
+        calls.append(fmt)
+        time.sleep(0.05)
+        shutil.copyfile(source, target)
+
+    monkeypatch.setattr(transcoding, 'encode', fake_encode)
+    return calls
+
+
+@pytest.mark.django_db
+def test_content_hash_on_save(master):
+    assert master.content_hash == hashlib.sha256(MASTER).hexdigest()
+
+
+@pytest.mark.django_db
+def test_cache_hit_reuses_derivative(master, encoder):
+    path = transcoding.transcode(master, 'flac')
+    assert path == transcoding.cache_path(master.content_hash, 'flac')
+    assert path.read_bytes() == MASTER
+
+    assert transcoding.transcode(master, 'flac') == path
+    assert encoder == ['flac']
+
+
+@pytest.mark.django_db
+def test_concurrent_requests_share_one_job(master, encoder):
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(transcoding.transcode(master, 'wav-24')))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(results)) == 1
+    assert encoder == ['wav-24']
+
+
+@pytest.mark.django_db
+def test_lru_eviction(master, encoder):
+    old = transcoding.transcode(master, 'mp3-320')
+    recent = transcoding.transcode(master, 'flac')
+    os.utime(old, (1, 1))
+
+    assert transcoding.evict(max_bytes=len(MASTER)) == 1
+    assert not old.exists()
+    assert recent.exists()
+
+
+@pytest.mark.django_db
+def test_fresh_derivative_survives_eviction(master, encoder, settings):
+    settings.TRANSCODE_CACHE_MAX_BYTES = len(MASTER) // 2
+    path = transcoding.transcode(master, 'flac')
+    assert path.read_bytes() == MASTER
+
+
+@pytest.mark.django_db
+def test_derivative_evicted_before_opening_is_regenerated(master, encoder, monkeypatch):
+    transcode = transcoding.transcode
+
+    def racing_transcode(audio, fmt):
+        path = transcode(audio, fmt)
+        if len(encoder) == 1:
+            path.unlink()  # El evict de otro proceso, antes del open()
+        return path
+
+    monkeypatch.setattr(transcoding, 'transcode', racing_transcode)
+    with transcoding.open_transcoded(master, 'flac') as file:
+        assert file.read() == MASTER
+    assert encoder == ['flac', 'flac']
+
+
+@pytest.mark.django_db
+def test_slow_job_is_a_transcode_error(master, monkeypatch, settings):
+    settings.TRANSCODE_TIMEOUT = 0.05
+    monkeypatch.setattr(transcoding, 'encode', lambda source, target, fmt: time.sleep(0.5))
+    with pytest.raises(transcoding.TranscodeError):
+        transcoding.transcode(master, 'wav-16')
+
+
+@pytest.mark.django_db
+def test_download_in_requested_format(client, buyer, master, encoder):
+    downloads.purchase(buyer, master)
+    client.force_login(buyer)
+
+    response = client.get(reverse('audios:download', args=[master.slug]) + '?formato=flac', secure=True)
+    token = response.url.rstrip('/').rsplit('/', 1)[-1]
+    assert downloads.read_token(token).fmt == 'flac'
+
+    response = client.get(reverse('audios:download_file', args=[token]), secure=True)
+    assert response['Content-Type'] == 'audio/flac'
+    assert 'prueba.flac' in response['Content-Disposition']
+    assert b''.join(response.streaming_content) == MASTER
+
+    response = client.get(reverse('audios:download', args=[master.slug]) + '?formato=ogg', secure=True)
+    assert response.status_code == 404
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.audios import favorites, trending
+from apps.audios.models import Audio, AudioActivity, AudioReview, Genre
+
+
+def test_recent_activity_outranks_all_time_popularity(client, make_audio, buyer,
+                                                      django_capture_on_commit_callbacks):
+    classic = make_audio(title='Clásico', views_count=10000)
+    fresh = make_audio(title='Nuevo')
+    trending.record(classic.pk, 'views', 40, when=timezone.now() - timedelta(days=5))
+
+    for user_agent in ('Mozilla/5.0 (X11)', 'Mozilla/5.0 (Macintosh)', 'Mozilla/5.0 (iPhone)'):
+        client.get(reverse('audios:detail', args=[fresh.slug]), secure=True, HTTP_USER_AGENT=user_agent)
+    with django_capture_on_commit_callbacks(execute=True):
+        favorites.toggle_favorite(buyer, fresh.pk)
+    AudioReview.objects.create(user=buyer, audio=fresh, rating=5)
+
+    activity = AudioActivity.objects.get(audio=fresh)
+    assert (activity.views, activity.favorites, activity.reviews) == (3, 1, 1)
+
+    run = trending.recompute()
+    assert (run.scored, run.updated) == (2, 2)
+    assert trending.top(5) == [fresh, classic]
+
+    listed = client.get(reverse('audios:list'), {'sort_by': '-trending_score'}, secure=True).context['audios']
+    assert [card.pk for card in listed][:2] == [fresh.pk, classic.pk]
+    assert client.get(reverse('core:home'), secure=True).context['trending_audios'] == [fresh, classic]
+
+
+def test_recompute_drops_activity_outside_window(make_audio, category, genre):
+    audio = make_audio()
+    other = make_audio(title='Otro género', genre=Genre.objects.create(name='Jazz', category=category))
+    trending.record(audio.pk, 'downloads', 2)
+    trending.record(other.pk, 'views', 1)
+    trending.recompute()
+    assert trending.top(5, genre_id=genre.pk) == [audio]
+
+    later = timezone.now() + timedelta(days=8)
+    run = trending.recompute(now=later)
+    assert run.pruned == 2
+    assert not AudioActivity.objects.exists()
+    assert list(Audio.objects.values_list('trending_score', flat=True)) == [0, 0]
+
+
+def test_record_many_is_one_insert_and_one_update_per_amount(make_audio):
+    audios = [make_audio(title=f'Audio {index}') for index in range(6)]
+    hour = trending.hour_of(timezone.now())
+    trending.record(audios[0].pk, 'views', 5)
+
+    with CaptureQueriesContext(connection) as ctx:
+        trending.record_many({(audio.pk, hour): 1 + index % 2 for index, audio in enumerate(audios)}, 'views')
+    assert len(ctx.captured_queries) == 3
+
+    views = dict(AudioActivity.objects.values_list('audio_id', 'views'))
+    assert [views[audio.pk] for audio in audios] == [6, 2, 1, 2, 1, 2]
@@ -0,0 +1,88 @@
+import hashlib
+import io
+import wave
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from apps.audios import upload_validation
+from apps.audios.models import Audio
+from apps.audios.upload_validation import InvalidAudio, StreamValidator, probe_head
+
+
+def make_wav(seconds=1, rate=22050, width=2):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as output:
+        output.setnchannels(1)
+        output.setsampwidth(width)
+        output.setframerate(rate)
+        output.writeframes(b'\x00' * width * rate * seconds)
+    return buffer.getvalue()
+
+
+def test_probe_reads_header():
+    info = probe_head(make_wav(), 'wav')
+    assert info['container'] == 'wav'
+    assert info['sample_rate'] == 22050
+    assert info['bits_per_sample'] == 16
+
+
+@pytest.mark.parametrize('content, name, message', [
+    (make_wav(), 'pista.mp3', 'extensión'),
+    (b'\x00' * 4096, 'pista.wav', 'reconocible'),
+    (b'fLaC' + b'\x04' + b'\x00' * 60, 'pista.flac', 'STREAMINFO'),
+])
+def test_probe_rejects_mislabeled_and_corrupt(content, name, message):
+    with pytest.raises(InvalidAudio, match=message):
+        probe_head(content, upload_validation.extension_of(name))
+
+
+def test_nothing_is_written_before_header(settings):
+    settings.AUDIO_UPLOAD_MAX_BYTES = 2048
+    validator = StreamValidator('pista.wav')
+    content = make_wav()
+    assert validator.feed(content[:8]) == b''
+    assert validator.feed(content[8:1024]) == content[:1024]
+    with pytest.raises(InvalidAudio, match='superar'):
+        validator.feed(content[1024:4096])
+
+
+@pytest.mark.django_db
+def test_upload_records_media_info(client, settings, tmp_path, seller, category, genre):
+    settings.MEDIA_ROOT = tmp_path
+    client.force_login(seller)
+    content = make_wav(seconds=2)
+    data = {
+        'title': 'Tono', 'description': 'Silencio', 'category': category.pk, 'genre': genre.pk,
+        'price_standard': '5.00', 'initial_status': Audio.Status.DRAFT,
+    }
+
+    response = client.post(reverse('audios:upload'), {
+        **data, 'audio_file': SimpleUploadedFile('tono.mp3', content),
+    }, secure=True)
+    assert response.status_code == 200
+    assert 'extensión' in response.context['form'].errors['audio_file'][0]
+    assert not Audio.objects.exists()
+
+    client.post(reverse('audios:upload'), {
+        **data, 'audio_file': SimpleUploadedFile('tono.wav', content),
+    }, secure=True)
+    audio = Audio.objects.get()
+    assert audio.media_info['codec'] == 'pcm'
+    assert audio.media_info['duration'] == 2
+    assert audio.sample_rate == 22050
+    assert audio.content_hash == hashlib.sha256(content).hexdigest()
+
+
+def test_hung_probe_is_killed(monkeypatch, tmp_path):
+    path = tmp_path / 'audio.wav'
+    path.write_bytes(make_wav())
+    with monkeypatch.context() as patched:
+        patched.setattr(upload_validation, 'PROBE_SCRIPT', 'import time; time.sleep(60)')
+        for _ in range(3):
+            with pytest.raises(InvalidAudio, match='tardó demasiado'):
+                upload_validation.inspect_file(str(path), timeout=0.5)
+    # Los parseos colgados no dejan nada ocupado
+    assert upload_validation.inspect_file(str(path))['duration'] == 1
+    assert upload_validation.inspect_file(io.BytesIO(make_wav(seconds=2)))['duration'] == 2
@@ -0,0 +1,42 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.audios import downloads, favorites, playlists
+from apps.audios.models import AudioPlaylist, AudioReview
+from apps.audios.user_state import UserAudioState
+
+
+@pytest.mark.django_db
+def test_page_state_loads_one_query_per_relation(buyer, seller, make_audio):
+    audios = [make_audio(title=f'Audio {i}') for i in range(5)]
+    favorites.toggle_favorite(buyer, audios[0].id)
+    AudioReview.objects.create(user=buyer, audio=audios[1], rating=4)
+    playlist = AudioPlaylist.objects.create(name='Mix', user=buyer)
+    playlists.add_audios(playlist, [audios[2].id])
+    downloads.purchase(buyer, audios[3])
+
+    state = UserAudioState(buyer)
+    with CaptureQueriesContext(connection) as ctx:
+        state.annotate(audios)
+        state.annotate(audios)
+    assert len(ctx.captured_queries) == 4
+
+    assert [a.user_is_favorite for a in audios] == [True, False, False, False, False]
+    assert [a.user_has_reviewed for a in audios] == [False, True, False, False, False]
+    assert [a.user_has_purchased for a in audios] == [False, False, False, True, False]
+    assert audios[2].user_playlist_ids == {playlist.id}
+    assert not any(a.user_is_owner for a in audios)
+    assert UserAudioState(seller).annotate(audios[:1])[0].user_is_owner
+
+
+@pytest.mark.django_db
+def test_audio_list_marks_favorites(client, buyer, make_audio):
+    audio = make_audio()
+    favorites.toggle_favorite(buyer, audio.id)
+    client.force_login(buyer)
+
+    response = client.get('/audios/', secure=True)
+
+    assert response.status_code == 200
+    assert response.context['audios'][0].user_is_favorite
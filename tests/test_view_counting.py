@@ -0,0 +1,39 @@
+from django.urls import reverse
+
+from apps.audios.models import Audio
+from apps.audios.view_counting import RotatingBloomFilter
+
+BROWSER = 'Mozilla/5.0 (X11; Linux x86_64) Firefox/130.0'
+
+
+def test_refreshes_bots_and_prefetches_are_not_counted(client, buyer, make_audio):
+    audio = make_audio()
+    url = reverse('audios:detail', args=[audio.slug])
+
+    client.get(url, secure=True, HTTP_USER_AGENT=BROWSER)
+    client.get(url, secure=True, HTTP_USER_AGENT=BROWSER)
+    client.get(url, secure=True, HTTP_USER_AGENT='Googlebot/2.1 (+http://www.google.com/bot.html)')
+    client.get(url, secure=True, HTTP_USER_AGENT='')
+    client.get(url, secure=True, HTTP_USER_AGENT='Mozilla/5.0 (Android)', HTTP_SEC_PURPOSE='prefetch')
+    assert Audio.objects.get(pk=audio.pk).views_count == 1
+
+    client.force_login(buyer)
+    client.get(url, secure=True, HTTP_USER_AGENT=BROWSER)
+    client.get(url, secure=True, HTTP_USER_AGENT='Mozilla/5.0 (iPhone)')  # mismo usuario, otro dispositivo
+    assert Audio.objects.get(pk=audio.pk).views_count == 2
+
+
+def test_bloom_filter_rotates_windows(tmp_path):
+    bloom = RotatingBloomFilter(tmp_path, window=3600, capacity=1000, error_rate=0.01)
+    assert bloom.add('u:1:7', now=0)
+    assert not bloom.add('u:1:7', now=10)
+    assert bloom.add('u:2:7', now=10)
+    # Se recuerda en la ventana siguiente y se olvida después
+    assert not bloom.add('u:2:7', now=3600)
+    assert not bloom.add('u:2:7', now=2 * 3600)
+    assert bloom.add('u:1:7', now=3 * 3600)
+    assert sorted(path.name for path in tmp_path.glob('*.bloom')) == ['2.bloom', '3.bloom']
+
+    # Otro proceso ve las mismas marcas
+    other = RotatingBloomFilter(tmp_path, window=3600, capacity=1000, error_rate=0.01)
+    assert not other.add('u:1:7', now=3 * 3600)